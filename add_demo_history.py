@@ -4,7 +4,7 @@
 添加演示历史数据 - 用于测试图表显示
 """
 
-import sqlite3
+from db_connection import get_connection
 from datetime import datetime, timedelta
 import random
 
@@ -12,7 +12,7 @@ DB_PATH = 'crypto_data.db'
 
 def add_demo_data():
     """添加演示历史数据"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
     
     # 获取当前最早的记录时间
@@ -97,7 +97,7 @@ def add_demo_data():
     print(f"\n✅ 共添加 {added} 条演示数据")
     
     # 显示最终统计
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
     cursor.execute('SELECT COUNT(*) FROM stats_history')
     total = cursor.fetchone()[0]
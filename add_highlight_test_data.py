@@ -2,10 +2,10 @@
 """
 添加几条测试数据来展示高亮功能
 """
-import sqlite3
+from db_connection import get_connection
 
 def add_test_data():
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     
     # 测试数据：展示不同的高亮情况
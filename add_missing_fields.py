@@ -2,11 +2,11 @@
 """
 为 stats_history 表添加缺失的字段
 """
-import sqlite3
+from db_connection import get_connection
 
 def add_missing_fields():
     """添加缺失的字段到数据库"""
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     
     print('=== 添加缺失字段到 stats_history 表 ===')
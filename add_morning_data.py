@@ -3,13 +3,13 @@
 添加今天早上的测试数据，用于展示图表功能
 添加从 08:00 到 10:20 的数据，模拟真实市场波动
 """
-import sqlite3
+from db_connection import get_connection
 import random
 from datetime import datetime
 
 def add_morning_history():
     """添加早上的历史数据"""
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     
     # 定义早上的数据点（从 08:00 到 10:20，每10分钟一个点）
@@ -3,12 +3,12 @@
 添加做多做空信号测试数据
 用于展示历史趋势图效果
 """
-import sqlite3
+from db_connection import get_connection
 from datetime import datetime, timedelta
 import random
 
 def add_test_data():
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     
     # 生成过去10小时的数据，每10分钟一条
@@ -6,16 +6,17 @@
 """
 
 import asyncio
-import sqlite3
 import time
 from datetime import datetime, timedelta
 import pytz
 import signal
 import sys
 from panic_wash_reader_v5 import PanicWashReaderV5
+from db_connection import get_connection
+from db_schema import ensure_schema, insert_summary_record
 
 # 配置
-DB_PATH = 'homepage_data.db'
+DB_PATH = 'crypto_data.db'
 BEIJING_TZ = pytz.timezone('Asia/Shanghai')
 COLLECTION_INTERVAL = 600  # 10分钟 = 600秒
 
@@ -31,76 +32,8 @@ def signal_handler(sig, frame):
 
 
 def init_database():
-    """初始化数据库表结构"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 创建汇总数据表
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS summary_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            rise_total INTEGER,
-            fall_total INTEGER,
-            five_states TEXT,
-            rise_fall_ratio REAL,
-            green_count INTEGER,
-            green_percent REAL,
-            count_times INTEGER,
-            all_green_score REAL,
-            price_lowest_score REAL,
-            price_new_high INTEGER,
-            fall_count INTEGER,
-            diff_result REAL,
-            record_time TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # 创建币种详细数据表
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS coin_details (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            summary_id INTEGER,
-            seq_num INTEGER,
-            coin_name TEXT,
-            rise_speed REAL,
-            rise_signal INTEGER,
-            fall_signal INTEGER,
-            update_time TEXT,
-            history_high REAL,
-            high_time TEXT,
-            drop_from_high REAL,
-            change_24h REAL,
-            plus_4_percent INTEGER,
-            minus_3_percent INTEGER,
-            ranking INTEGER,
-            current_price REAL,
-            high_ratio REAL,
-            low_ratio REAL,
-            anomaly TEXT,
-            record_time TEXT,
-            FOREIGN KEY (summary_id) REFERENCES summary_data(id)
-        )
-    """)
-    
-    # 创建索引
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_summary_time 
-        ON summary_data(record_time)
-    """)
-    
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_coin_time 
-        ON coin_details(record_time)
-    """)
-    
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_coin_summary 
-        ON coin_details(summary_id)
-    """)
-    
-    conn.commit()
-    conn.close()
+    """初始化数据库表结构（汇总和币种写入 stats_history / coin_history，见 db_schema）"""
+    ensure_schema(DB_PATH)
     print("✓ 数据库初始化完成")
 
 
@@ -117,59 +50,17 @@ def save_to_database(data):
         return False
     
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
         # 获取当前北京时间
         beijing_now = datetime.now(BEIJING_TZ)
         record_time = beijing_now.strftime('%Y-%m-%d %H:%M:%S')
         
-        # 插入汇总数据
-        cursor.execute("""
-            INSERT INTO summary_data (
-                rise_total, fall_total, five_states, rise_fall_ratio,
-                green_count, green_percent, count_times, all_green_score,
-                price_lowest_score, price_new_high, fall_count, diff_result,
-                record_time
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            data.get('rise_total', 0),
-            data.get('fall_total', 0),
-            data.get('five_states', ''),
-            data.get('rise_fall_ratio', 0.0),
-            data.get('green_count', 0),
-            0.0,  # green_percent
-            data.get('count_times', 0),
-            0.0,  # all_green_score
-            0.0,  # price_lowest_score
-            0,    # price_new_high
-            0,    # fall_count
-            data.get('diff_result', 0.0),
-            record_time
-        ))
-        
-        summary_id = cursor.lastrowid
-        
-        # 插入币种详细数据
-        coins_saved = 0
-        for coin in data.get('coins', []):
-            cursor.execute("""
-                INSERT INTO coin_details (
-                    summary_id, seq_num, coin_name, rise_speed, rise_signal,
-                    fall_signal, current_price, change_24h, record_time
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                summary_id,
-                coin.get('seq_num', 0),
-                coin.get('coin_name', ''),
-                coin.get('rise_speed', 0.0),
-                coin.get('rise_signal', 0),
-                coin.get('fall_signal', 0),
-                coin.get('current_price', 0.0),
-                coin.get('change_24h', 0.0),
-                record_time
-            ))
-            coins_saved += 1
+        # 插入汇总和币种数据（同一分钟已有数据时不重复写入）
+        coins = data.get('coins', [])
+        summary_id = insert_summary_record(cursor, data, coins, record_time, source='auto_gdrive_collector_v2')
+        coins_saved = len(coins) if summary_id else 0
         
         conn.commit()
         conn.close()
@@ -271,7 +162,7 @@ async def run_once_mode():
 def get_collection_status():
     """获取采集状态信息"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
         # 获取最新记录
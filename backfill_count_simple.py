@@ -1,9 +1,9 @@
 import os
 import re
-import sqlite3
 from datetime import datetime
 import asyncio
 from gdrive_home_data_reader import get_latest_file_by_sorting
+from db_connection import get_connection
 
 def extract_count_times(content):
     """从内容中提取计次"""
@@ -16,7 +16,7 @@ def extract_count_times(content):
 async def backfill_from_gdrive():
     """从Google Drive获取文件并回填"""
     # 连接数据库
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     
     # 获取所有计次为NULL的记录
@@ -1,8 +1,9 @@
 import os
 import re
-import sqlite3
 from datetime import datetime
 from gdrive_home_data_reader import get_files_by_date_folder
+from snapshot_cache import get_snapshot_cache, drive_file_version
+from db_connection import get_connection
 
 def extract_count_times(content):
     """从内容中提取计次"""
@@ -15,7 +16,7 @@ def extract_count_times(content):
 def backfill_count_data():
     """回填计次数据"""
     # 连接数据库
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     
     # 获取所有计次为NULL的记录
@@ -31,22 +32,38 @@ def backfill_count_data():
     
     # 获取2025-12-03日期文件夹中的所有文件
     date_str = "2025-12-03"
+    cache = get_snapshot_cache()
     try:
-        files = get_files_by_date_folder(date_str)
-        print(f"📂 从Google Drive获取到 {len(files)} 个文件")
+        # 先用本地缓存，只有缓存缺失的文件才去Google Drive获取
+        contents = {}
+        for _, filename, _ in records:
+            content = cache.get(date_str, filename)
+            if content is not None:
+                contents[filename] = content
         
-        # 创建文件名到文件对象的映射
-        file_map = {f['name']: f for f in files}
+        missing = {filename for _, filename, _ in records if filename not in contents}
+        print(f"💾 本地缓存命中 {len(contents)} 个文件，需下载 {len(missing)} 个")
+        
+        file_map = {}
+        if missing:
+            files = get_files_by_date_folder(date_str)
+            print(f"📂 从Google Drive获取到 {len(files)} 个文件")
+            
+            # 创建文件名到文件对象的映射
+            file_map = {f['name']: f for f in files}
         
         updated = 0
         not_found = 0
         
         for record_id, filename, record_time in records:
-            if filename in file_map:
-                file_obj = file_map[filename]
-                
-                # 获取文件内容
-                content = file_obj.GetContentString()
+            if filename in contents or filename in file_map:
+                if filename not in contents:
+                    # 获取文件内容并写入缓存
+                    file_obj = file_map[filename]
+                    contents[filename] = file_obj.GetContentString()
+                    cache.put(date_str, filename, contents[filename],
+                              version=drive_file_version(file_obj))
+                content = contents[filename]
                 
                 # 提取计次
                 count_times = extract_count_times(content)
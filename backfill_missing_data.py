@@ -2,12 +2,17 @@
 """
 补全缺失的历史数据
 从Google Drive读取所有TXT文件并导入数据库
+
+用法:
+    python backfill_missing_data.py                 # 只列出缺失的文件
+    python backfill_missing_data.py --import [--workers N]   # 用并行导入流水线补全
 """
-import sqlite3
+from db_connection import get_connection
 from datetime import datetime, timedelta
 import asyncio
 from playwright.async_api import async_playwright
 import re
+import sys
 import time
 
 async def get_all_files_from_gdrive():
@@ -69,7 +74,7 @@ def parse_filename_to_time(filename):
 
 def check_missing_files():
     """检查数据库中缺失的文件"""
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     
     # 获取已有的记录
@@ -123,10 +128,18 @@ async def main():
     if len(missing_files) > 10:
         print(f"  ... 还有 {len(missing_files) - 10} 个文件")
     
-    # 5. 询问是否导入
-    print(f"\n是否开始导入这 {len(missing_files)} 个文件？")
-    print("注意：每个文件需要约90秒，总计约 {:.1f} 分钟".format(len(missing_files) * 90 / 60))
-    print("=" * 80)
+    # 5. 导入（Drive API 下载 + 多进程解析 + 单一写入）
+    if '--import' not in sys.argv:
+        print(f"\n加 --import 参数即可导入这 {len(missing_files)} 个文件（并行导入流水线）")
+        print("=" * 80)
+        return
+    
+    from parallel_import import drive_source, run_pipeline, DEFAULT_WORKERS
+    workers = DEFAULT_WORKERS
+    if '--workers' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('--workers') + 1])
+    today = datetime.now().strftime('%Y-%m-%d')
+    run_pipeline(drive_source([today], exclude=existing_files), workers=workers)
 
 if __name__ == '__main__':
     asyncio.run(main())
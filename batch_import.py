@@ -5,100 +5,114 @@
 """
 
 import asyncio
-import sqlite3
 import sys
 import os
 import re
+import time
 from datetime import datetime
-from playwright.async_api import async_playwright
 import pytz
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from import_history_simple import parse_filename_datetime, parse_home_data, save_to_database
+from import_history_simple import (
+    parse_filename_datetime, parse_home_data, save_to_database, save_columns_to_database
+)
+from snapshot_parser import SnapshotColumns
+from browser_pool import get_browser_pool
+from snapshot_cache import get_snapshot_cache
+from gdrive_navigation import StepTimer, open_sorted_date_folder, goto_ready, wait_for_preview, file_ids_by_name
+from db_connection import get_connection
 
 DB_PATH = 'crypto_data.db'
 
+# 并发模式默认同时打开的标签页数（实际上限还受浏览器池 BROWSER_POOL_MAX_PAGES 约束）
+DEFAULT_PARALLEL_TABS = int(os.environ.get('BATCH_IMPORT_PARALLEL', '4'))
+
 async def read_file_content_by_index(files, index):
     """读取指定索引的文件内容"""
     beijing_tz = pytz.timezone('Asia/Shanghai')
     now = datetime.now(beijing_tz)
     today = now.strftime('%Y-%m-%d')
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(viewport={'width': 1920, 'height': 1080})
-        page = await context.new_page()
-        
-        try:
-            # 访问根文件夹
-            url = "https://drive.google.com/drive/folders/1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV"
-            await page.goto(url, wait_until='networkidle', timeout=30000)
-            await asyncio.sleep(2)
-            
-            # 进入今天的文件夹
-            folder_selector = f'[data-tooltip*="{today}"]'
-            await page.locator(folder_selector).first.dblclick()
-            await asyncio.sleep(4)
-            
-            # 点击排序
-            sort_selectors = [
-                'button:has-text("Sort")',
-                '[aria-label*="Sort"]',
-            ]
-            
-            for selector in sort_selectors:
-                try:
-                    element = page.locator(selector).first
-                    if await element.count() > 0:
-                        await element.click()
-                        await asyncio.sleep(2)
-                        break
-                except:
-                    pass
-            
-            # 选择修改时间排序
-            modified_selectors = ['text="Modified"']
-            for selector in modified_selectors:
-                try:
-                    element = page.locator(selector).first
-                    if await element.count() > 0:
-                        await element.click()
-                        await asyncio.sleep(3)
-                        break
-                except:
-                    pass
-            
-            # 点击指定文件
-            filename = files[index]
-            await page.click(f'text="{filename}"', timeout=15000)
-            await asyncio.sleep(3)
-            
-            # 读取内容
-            frames = page.frames
-            for frame in frames:
-                try:
-                    content = await frame.content()
-                    if '[超级列表框_首页开始]' in content or 'BTC' in content:
-                        text = await frame.evaluate('''() => {
-                            const pre = document.querySelector('pre');
-                            if (pre) return pre.textContent;
-                            const textbox = document.querySelector('[role="textbox"]');
-                            if (textbox) return textbox.textContent;
-                            return document.body.textContent;
-                        }''')
-                        
-                        await browser.close()
-                        return text
-                except:
-                    continue
-            
-            await browser.close()
-            return None
-            
-        except Exception as e:
-            await browser.close()
-            print(f"   ❌ 读取失败: {str(e)}")
-            return None
+    try:
+        # 已读过的文件直接用本地缓存
+        return await get_snapshot_cache().get_or_fetch_async(
+            today, files[index],
+            lambda: get_browser_pool().run(_read_file_on_page, today, files[index])
+        )
+    except Exception as e:
+        print(f"   ❌ 读取失败: {str(e)}")
+        return None
+
+async def _read_file_on_page(page, today, filename):
+    """在借来的页面上进入日期文件夹、排序并读取文件"""
+    timer = StepTimer(filename, verbose=False)
+    await open_sorted_date_folder(page, today, timer=timer)
+    
+    # 点击指定文件，预览内容出现即返回
+    return await wait_for_preview(
+        page, timer=timer,
+        open_action=lambda: page.click(f'text="{filename}"', timeout=15000)
+    )
+
+async def _open_today_folder(page, today):
+    """在借来的页面上进入今天的文件夹并按修改时间排序，返回页面HTML"""
+    return await open_sorted_date_folder(page, today, timer=StepTimer('文件列表'))
+
+async def _list_today_files(page, today):
+    """在借来的页面上列出今天文件夹中的文件名"""
+    content = await _open_today_folder(page, today)
+    
+    # 获取文件列表
+    pattern = r'2025-\d{2}-\d{2}_\d{4}\.txt'
+    return list(set(re.findall(pattern, content)))
+
+async def _list_today_file_ids(page, today):
+    """列出今天文件夹中的文件，返回 {文件名: 文件ID}（提取不到ID时为 None）"""
+    content = await _open_today_folder(page, today)
+    
+    pattern = r'2025-\d{2}-\d{2}_\d{4}\.txt'
+    ids = await file_ids_by_name(page, pattern)
+    files = {filename: ids.get(filename) for filename in set(re.findall(pattern, content))}
+    
+    missing = sorted(filename for filename, file_id in files.items() if not file_id)
+    if missing:
+        print(f"   ⚠️  {len(missing)} 个文件没有找到文件ID，将逐级导航读取: {', '.join(missing)}")
+    return files
+
+async def _read_file_by_id(page, file_id):
+    """在借来的页面上直接打开文件预览并读取内容"""
+    timer = StepTimer(file_id[:15], verbose=False)
+    return await wait_for_preview(
+        page, timer=timer,
+        open_action=lambda: goto_ready(page, f"https://drive.google.com/file/d/{file_id}/view",
+                                       timeout=20000)
+    )
+
+def _select_latest(files, count):
+    """按文件名中的时间倒序，取最新的 count 个文件"""
+    file_times = []
+    for f in files:
+        match = re.match(r'2025-\d{2}-\d{2}_(\d{2})(\d{2})\.txt', f)
+        if match:
+            time_val = int(match.group(1)) * 60 + int(match.group(2))
+            file_times.append((f, time_val))
+    
+    file_times.sort(key=lambda x: x[1], reverse=True)
+    return [f[0] for f in file_times[:count]]
+
+def _existing_filenames(filenames):
+    """一次查询返回已入库的文件名集合"""
+    if not filenames:
+        return set()
+    
+    conn = get_connection(DB_PATH)
+    cursor = conn.cursor()
+    placeholders = ','.join('?' * len(filenames))
+    cursor.execute(f'SELECT filename FROM stats_history WHERE filename IN ({placeholders})',
+                   list(filenames))
+    existing = {row[0] for row in cursor.fetchall()}
+    conn.close()
+    return existing
 
 async def batch_import(count=10):
     """批量导入指定数量的文件"""
@@ -113,52 +127,19 @@ async def batch_import(count=10):
     
     print(f"\n1. 获取文件列表...")
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(viewport={'width': 1920, 'height': 1080})
-        page = await context.new_page()
+    try:
+        files = await get_browser_pool().run(_list_today_files, today)
         
-        try:
-            url = "https://drive.google.com/drive/folders/1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV"
-            await page.goto(url, wait_until='networkidle', timeout=30000)
-            await asyncio.sleep(2)
-            
-            folder_selector = f'[data-tooltip*="{today}"]'
-            await page.locator(folder_selector).first.dblclick()
-            await asyncio.sleep(4)
-            
-            # 排序
-            await page.locator('button:has-text("Sort")').first.click()
-            await asyncio.sleep(2)
-            await page.locator('text="Modified"').first.click()
-            await asyncio.sleep(3)
-            
-            # 获取文件列表
-            content = await page.content()
-            pattern = r'2025-\d{2}-\d{2}_\d{4}\.txt'
-            files = list(set(re.findall(pattern, content)))
-            
-            await browser.close()
-            
-            # 解析时间并排序
-            file_times = []
-            for f in files:
-                match = re.match(r'2025-\d{2}-\d{2}_(\d{2})(\d{2})\.txt', f)
-                if match:
-                    time_val = int(match.group(1)) * 60 + int(match.group(2))
-                    file_times.append((f, time_val))
-            
-            file_times.sort(key=lambda x: x[1], reverse=True)
-            files = [f[0] for f in file_times[:count]]
-            
-            print(f"✅ 找到 {len(files)} 个文件")
-            for i, f in enumerate(files, 1):
-                print(f"   {i}. {f}")
-            
-        except Exception as e:
-            print(f"❌ 获取文件列表失败: {str(e)}")
-            await browser.close()
-            return
+        # 解析时间并排序
+        files = _select_latest(files, count)
+        
+        print(f"✅ 找到 {len(files)} 个文件")
+        for i, f in enumerate(files, 1):
+            print(f"   {i}. {f}")
+        
+    except Exception as e:
+        print(f"❌ 获取文件列表失败: {str(e)}")
+        return
     
     # 2. 逐个处理文件
     success_count = 0
@@ -172,7 +153,7 @@ async def batch_import(count=10):
         print(f"\n[{i}/{len(files)}] 处理: {filename}")
         
         # 检查是否已存在
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         cursor.execute('SELECT id FROM stats_history WHERE filename = ?', (filename,))
         existing = cursor.fetchone()
@@ -232,7 +213,7 @@ async def batch_import(count=10):
     print(f"📁 总计: {len(files)}")
     
     # 显示数据库统计
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
     cursor.execute('SELECT COUNT(*) FROM stats_history')
     total_stats = cursor.fetchone()[0]
@@ -250,7 +231,144 @@ async def batch_import(count=10):
     
     print("="*80)
 
+async def batch_import_concurrent(count=10, parallel=DEFAULT_PARALLEL_TABS):
+    """
+    并发批量导入：只列一次文件夹，多标签页并发读取，一个事务写入
+    
+    Args:
+        count: 导入最新的文件数量
+        parallel: 同时打开的标签页数量
+    """
+    print("="*80)
+    print(f"📥 并发批量导入历史数据（最新 {count} 个文件，{parallel} 个标签页）")
+    print("="*80)
+    
+    beijing_tz = pytz.timezone('Asia/Shanghai')
+    now = datetime.now(beijing_tz)
+    today = now.strftime('%Y-%m-%d')
+    pool = get_browser_pool()
+    
+    # 1. 只列一次文件夹，同时拿到文件ID
+    print(f"\n1. 获取文件列表...")
+    list_start = time.perf_counter()
+    try:
+        file_ids = await pool.run(_list_today_file_ids, today)
+    except Exception as e:
+        print(f"❌ 获取文件列表失败: {str(e)}")
+        return
+    
+    files = _select_latest(file_ids.keys(), count)
+    print(f"✅ 找到 {len(files)} 个文件 ({time.perf_counter() - list_start:.1f}秒)")
+    
+    # 2. 过滤已入库和无法解析时间的文件
+    existing = _existing_filenames(files)
+    skip_count = len(existing)
+    fail_count = 0
+    pending = []
+    for filename in files:
+        if filename in existing:
+            continue
+        record_time = parse_filename_datetime(filename)
+        if not record_time:
+            print(f"   ⚠️  无法解析时间: {filename}")
+            fail_count += 1
+            continue
+        pending.append((filename, record_time))
+    
+    print(f"   已存在 {skip_count} 个，待读取 {len(pending)} 个")
+    
+    # 3. 多标签页并发读取
+    print(f"\n2. 并发读取文件...")
+    print("-" * 80)
+    semaphore = asyncio.Semaphore(max(1, parallel))
+    cache = get_snapshot_cache()
+    
+    async def read(filename):
+        file_id = file_ids.get(filename)
+        if file_id:
+            return await pool.run(_read_file_by_id, file_id)
+        # 没有提取到ID时退回到逐级导航
+        return await pool.run(_read_file_on_page, today, filename)
+    
+    async def fetch(filename, record_time):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                content = await cache.get_or_fetch_async(today, filename, lambda: read(filename))
+            except Exception as e:
+                print(f"   ❌ {filename} 读取失败: {str(e)}")
+                content = None
+            latency = time.perf_counter() - start
+            status = f"{len(content)} 字符" if content else "无内容"
+            print(f"   {filename}: {latency:.1f}秒 ({status})")
+            return filename, record_time, content, latency
+    
+    fetch_start = time.perf_counter()
+    results = await asyncio.gather(*(fetch(f, t) for f, t in pending))
+    fetch_elapsed = time.perf_counter() - fetch_start
+    
+    # 4. 列式解析（所有文件的币种存进同一组列数组）
+    columns = SnapshotColumns()
+    latencies = []
+    for filename, record_time, content, latency in results:
+        latencies.append(latency)
+        if not content:
+            fail_count += 1
+            continue
+        try:
+            columns.add(filename, record_time, content)
+        except Exception as e:
+            print(f"   ❌ {filename} 解析失败: {str(e)}")
+            fail_count += 1
+            continue
+    
+    # 5. 一个事务写入
+    success_count = 0
+    if len(columns):
+        for filename, success, msg in save_columns_to_database(columns):
+            if success:
+                success_count += 1
+            else:
+                print(f"   ⏭️  {filename}: {msg}")
+                if msg == "已存在":
+                    skip_count += 1
+                else:
+                    fail_count += 1
+    
+    # 6. 汇总
+    print("\n" + "="*80)
+    print("📊 导入完成统计")
+    print("="*80)
+    print(f"✅ 成功: {success_count}")
+    print(f"⏭️  跳过: {skip_count}")
+    print(f"❌ 失败: {fail_count}")
+    print(f"📁 总计: {len(files)}")
+    if latencies:
+        print(f"⏱️  单文件耗时: 平均 {sum(latencies) / len(latencies):.1f}秒, "
+              f"最快 {min(latencies):.1f}秒, 最慢 {max(latencies):.1f}秒")
+        print(f"🚀 吞吐: {len(latencies) / fetch_elapsed:.2f} 文件/秒 "
+              f"(读取共 {fetch_elapsed:.1f}秒)")
+    print("="*80)
+    
+    return {
+        'success': success_count,
+        'skipped': skip_count,
+        'failed': fail_count,
+        'latencies': latencies,
+        'elapsed': fetch_elapsed,
+    }
+
 if __name__ == '__main__':
-    import sys
-    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
-    asyncio.run(batch_import(count))
+    # 用法: python batch_import.py [数量] [--parallel N]
+    args = sys.argv[1:]
+    parallel = None
+    if '--parallel' in args:
+        pos = args.index('--parallel')
+        parallel = int(args[pos + 1]) if pos + 1 < len(args) else DEFAULT_PARALLEL_TABS
+        del args[pos:pos + 2]
+    count = int(args[0]) if args else 10
+    
+    if parallel:
+        asyncio.run(batch_import_concurrent(count, parallel))
+    else:
+        asyncio.run(batch_import(count))
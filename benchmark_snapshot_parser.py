@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快照解析性能对比
+旧实现（逐行 strip/split/in 扫描的几份 parse_home_data）与 snapshot_parser 对比，
+同时校验两边的解析结果一致；另外对比历史回填时逐币种 dict 与列式存放的耗时和内存，
+装了 numpy 时校验 SnapshotColumns.to_numpy 的结构化数组与逐币种解析结果一致。
+
+用法:
+    python benchmark_snapshot_parser.py                       # 默认用 content_2025-12-06_1210.txt
+    python benchmark_snapshot_parser.py a.txt b.txt --rounds 2000
+    python benchmark_snapshot_parser.py --bulk 4320           # 回填文件数（不写数字时默认约一个月的 10 分钟快照）
+"""
+
+import re
+import sys
+import time
+import tracemalloc
+
+from snapshot_parser import parse_snapshot, coin_displays, SnapshotColumns, COLUMN_SPECS, NUMPY_AVAILABLE
+
+DEFAULT_FILES = ['content_2025-12-06_1210.txt']
+DEFAULT_ROUNDS = 1000
+DEFAULT_BULK_FILES = 30 * 24 * 6
+# 每项计时重复的轮数，取最快一轮
+TIMING_REPEAT = 5
+
+
+# ==================== 旧实现（仅用于对比） ====================
+
+def legacy_parse_for_db(content):
+    """旧 import_history_simple.parse_home_data"""
+    lines = content.strip().split('\n')
+    stats = {
+        'rushUp': 0, 'rushDown': 0, 'status': '', 'ratio': '', 'greenCount': 0, 'percentage': '',
+        'difference': '', 'priceLowest': '', 'priceNewHigh': '', 'countTimes': 0, 'rushDownCount': 0
+    }
+    coins = []
+    in_coin_section = False
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith('透明标签_'):
+            parts = line.split('=')
+            if len(parts) == 2:
+                key = parts[0].replace('透明标签_', '')
+                value = parts[1]
+                if '急涨总和' in key:
+                    stats['rushUp'] = int(value.split('：')[1]) if '：' in value else 0
+                elif '急跌总和' in key:
+                    stats['rushDown'] = int(value.split('：')[1]) if '：' in value else 0
+                elif '五种状态' in key:
+                    stats['status'] = value.split('：')[1] if '：' in value else value
+                elif '急涨急跌比值' in key:
+                    stats['ratio'] = value.split('：')[1] if '：' in value else value
+                elif '绿色数量' in key:
+                    match = re.search(r'\d+', value)
+                    stats['greenCount'] = int(match.group()) if match else 0
+                elif '百分比' in key:
+                    stats['percentage'] = value
+                elif '差值结果' in key:
+                    stats['difference'] = value.split('：')[1] if '：' in value else value
+                elif '比价最低得分' in key:
+                    stats['priceLowest'] = value.replace('比价最低', '').strip()
+                elif '仓位得分' in key:
+                    stats['priceNewHigh'] = value.replace('比价创新高', '').strip()
+                elif '计次' in key and key == '计次':
+                    match = re.search(r'\d+', value)
+                    stats['countTimes'] = int(match.group()) if match else 0
+                elif '急跌数量' in key:
+                    parts = value.split()
+                    if len(parts) >= 3:
+                        try:
+                            stats['rushDownCount'] = int(parts[2])
+                        except:
+                            pass
+
+        if '[超级列表框_首页开始]' in line:
+            in_coin_section = True
+            continue
+        if '[超级列表框_首页结束]' in line:
+            break
+
+        if in_coin_section and '|' in line:
+            parts = line.split('|')
+            if len(parts) >= 16:
+                try:
+                    coins.append({
+                        'index': int(parts[0]) if parts[0].isdigit() else 0,
+                        'symbol': parts[1],
+                        'change': float(parts[2]) if parts[2] and parts[2] != '' else 0,
+                        'rushUp': int(parts[3]) if parts[3].isdigit() else 0,
+                        'rushDown': int(parts[4]) if parts[4].isdigit() else 0,
+                        'updateTime': parts[5],
+                        'highPrice': float(parts[6]) if parts[6] and parts[6] != '' else 0,
+                        'highTime': parts[7],
+                        'decline': float(parts[8]) if parts[8] and parts[8] != '' else 0,
+                        'change24h': float(parts[9]) if parts[9] and parts[9] != '' else 0,
+                        'rank': int(parts[12]) if parts[12].isdigit() else 0,
+                        'currentPrice': float(parts[13]) if parts[13] and parts[13] != '' else 0,
+                        'ratio1': parts[14],
+                        'ratio2': parts[15]
+                    })
+                except:
+                    continue
+
+    return stats, coins
+
+
+def legacy_parse_for_api(content):
+    """旧 home_data_api_v2.parse_home_data"""
+    lines = content.strip().split('\n')
+    stats = {}
+    coins = []
+    in_coin_section = False
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith('透明标签_'):
+            parts = line.split('=')
+            if len(parts) == 2:
+                key = parts[0].replace('透明标签_', '')
+                value = parts[1]
+                if '急涨总和' in key:
+                    stats['rushUp'] = value.split('：')[1] if '：' in value else value
+                elif '急跌总和' in key:
+                    stats['rushDown'] = value.split('：')[1] if '：' in value else value
+                elif '五种状态' in key:
+                    stats['status'] = value.split('：')[1] if '：' in value else value
+                elif '急涨急跌比值' in key:
+                    stats['ratio'] = value.split('：')[1] if '：' in value else value
+                elif '绿色数量' in key:
+                    stats['greenCount'] = value
+                elif '百分比' in key:
+                    stats['percentage'] = value
+
+        if '[超级列表框_首页开始]' in line:
+            in_coin_section = True
+            continue
+        if '[超级列表框_首页结束]' in line:
+            break
+
+        if in_coin_section and '|' in line:
+            parts = line.split('|')
+            if len(parts) >= 16:
+                coins.append({
+                    'index': parts[0], 'symbol': parts[1], 'change': parts[2],
+                    'rushUp': parts[3], 'rushDown': parts[4], 'updateTime': parts[5],
+                    'highPrice': parts[6], 'highTime': parts[7], 'decline': parts[8],
+                    'change24h': parts[9], 'rank': parts[12], 'currentPrice': parts[13],
+                    'ratio1': parts[14], 'ratio2': parts[15]
+                })
+
+    update_time = coins[0]['updateTime'] if coins else ''
+    return {'stats': stats, 'coins': coins, 'updateTime': update_time}
+
+
+def legacy_parse_stats(content):
+    """旧 crypto_server.parse_txt_content（load_history_data 只用其中的统计数据）"""
+    stats = {}
+    data_lines = []
+    for line in content.strip().split('\n'):
+        line = line.strip()
+        if line.startswith('透明标签_'):
+            parts = line.split('=')
+            if len(parts) == 2:
+                stats[parts[0].replace('透明标签_', '')] = parts[1]
+        elif line.startswith('[超级列表框_首页开始]'):
+            continue
+        elif line.startswith('[超级列表框_首页结束]'):
+            break
+        elif line and not line.startswith('透明标签_') and not line.startswith('['):
+            data_lines.append(line)
+
+    parsed_data = []
+    for line in data_lines:
+        parts = line.split('|')
+        if len(parts) >= 15:
+            parsed_data.append({
+                'index': parts[0], 'symbol': parts[1], 'change': parts[2],
+                'rushUp': parts[3], 'rushDown': parts[4], 'updateTime': parts[5],
+                'highPrice': parts[6], 'highTime': parts[7], 'decline': parts[8],
+                'change24h': parts[9], 'col10': parts[10], 'col11': parts[11], 'col12': parts[12],
+                'rank': parts[13], 'currentPrice': parts[14],
+                'ratio1': parts[15] if len(parts) > 15 else '',
+                'ratio2': parts[16] if len(parts) > 16 else ''
+            })
+    return stats
+
+
+# ==================== 新实现（与各调用方的组装方式相同） ====================
+
+def shared_parse_for_db(content):
+    snapshot = parse_snapshot(content)
+    typed = snapshot.stats
+    defaults = {
+        'rushUp': 0, 'rushDown': 0, 'status': '', 'ratio': '', 'greenCount': 0, 'percentage': '',
+        'difference': '', 'priceLowest': '', 'priceNewHigh': '', 'countTimes': 0, 'rushDownCount': 0
+    }
+    stats = {key: typed[key] if typed[key] is not None else default for key, default in defaults.items()}
+    return stats, snapshot.coins
+
+
+def shared_parse_for_api(content):
+    snapshot = parse_snapshot(content)
+    stats = snapshot.text_stats(
+        labeled=[('急涨总和', 'rushUp'), ('急跌总和', 'rushDown'),
+                 ('五种状态', 'status'), ('急涨急跌比值', 'ratio')],
+        plain=[('绿色数量', 'greenCount'), ('百分比', 'percentage')]
+    )
+    coins = coin_displays(snapshot.coin_rows)
+    return {'stats': stats, 'coins': coins, 'updateTime': snapshot.update_time}
+
+
+def shared_parse_stats(content):
+    return parse_snapshot(content).raw_stats
+
+
+def time_per_call(*funcs, content, rounds, repeat=TIMING_REPEAT):
+    """
+    每个函数每次调用的耗时（µs）
+
+    多个函数逐轮交替计时，各取 repeat 轮中最快的一轮，机器负载波动对各函数的影响相同
+    """
+    best = [None] * len(funcs)
+    for _ in range(repeat):
+        for i, func in enumerate(funcs):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                func(content)
+            elapsed = time.perf_counter() - start
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return [elapsed / rounds * 1e6 for elapsed in best]
+
+
+def bulk_as_dicts(contents):
+    """逐文件解析成统计 dict + 币种 dict 列表（save_batch_to_database 的输入）"""
+    records = []
+    for content in contents:
+        snapshot = parse_snapshot(content)
+        records.append((snapshot.stats, snapshot.coins))
+    return records
+
+
+def bulk_as_columns(contents):
+    """解析进同一个 SnapshotColumns（save_columns_to_database 的输入）"""
+    columns = SnapshotColumns()
+    for i, content in enumerate(contents):
+        columns.add(str(i), str(i), content)
+    return columns
+
+
+def check_numpy_table(contents):
+    """to_numpy 的每一行与 snapshot.coins 的数值列、字典编码列一致"""
+    columns = bulk_as_columns(contents)
+    table = columns.to_numpy()
+    if len(table) != columns.total_coins:
+        return False
+    pos = 0
+    for file_index, content in enumerate(contents):
+        for coin in parse_snapshot(content).coins:
+            row = table[pos]
+            if row['file'] != file_index:
+                return False
+            for name, _, kind in COLUMN_SPECS:
+                if kind == 'dict':
+                    value = columns.values[name][row[name]]
+                elif kind is not None:
+                    value = row[name].item()
+                else:
+                    continue
+                if value != coin[name]:
+                    return False
+            pos += 1
+    return pos == len(table)
+
+
+def time_bulk(*funcs, contents, repeat=TIMING_REPEAT):
+    """每个批量解析函数的耗时（秒），与 time_per_call 一样逐轮交替、取最快一轮"""
+    best = [None] * len(funcs)
+    for _ in range(repeat):
+        for i, func in enumerate(funcs):
+            start = time.perf_counter()
+            func(contents)
+            elapsed = time.perf_counter() - start
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return best
+
+
+def retained_memory(func, contents):
+    """解析结果占用的内存（字节）"""
+    tracemalloc.start()
+    result = func(contents)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained
+
+
+def main():
+    args = sys.argv[1:]
+    rounds = DEFAULT_ROUNDS
+    if '--rounds' in args:
+        pos = args.index('--rounds')
+        rounds = int(args[pos + 1])
+        del args[pos:pos + 2]
+    bulk_files = DEFAULT_BULK_FILES
+    if '--bulk' in args:
+        # --bulk 后面不跟数字时用默认文件数
+        pos = args.index('--bulk')
+        end = pos + 1
+        if end < len(args) and args[end].isdigit():
+            bulk_files = int(args[end])
+            end += 1
+        del args[pos:end]
+    files = args or DEFAULT_FILES
+
+    cases = [
+        ('入库格式 (import_history_simple)', legacy_parse_for_db, shared_parse_for_db),
+        ('接口格式 (home_data_api_v2)', legacy_parse_for_api, shared_parse_for_api),
+        ('只取统计 (crypto_server 历史)', legacy_parse_stats, shared_parse_stats),
+    ]
+
+    print("=" * 70)
+    print(f"📊 快照解析性能对比 (每项 {rounds} 次 x {TIMING_REPEAT} 轮交替计时取最快)")
+    print("=" * 70)
+
+    all_same = True
+    for path in files:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        coins = len(parse_snapshot(content).coin_rows)
+        print(f"\n📄 {path} ({len(content)} 字符, {coins} 个币种)")
+        parse_us, = time_per_call(parse_snapshot, content=content, rounds=rounds)
+        print(f"   {'只解析 (parse_snapshot)':<34} {parse_us:>8.1f} µs")
+
+        for name, legacy, shared in cases:
+            # 字段和值都必须完全相同，多出字段也算不一致
+            same = legacy(content) == shared(content)
+            all_same = all_same and same
+            old_us, new_us = time_per_call(legacy, shared, content=content, rounds=rounds)
+            print(f"   {name:<34} 旧 {old_us:>8.1f} µs  新 {new_us:>8.1f} µs  "
+                  f"x{old_us / new_us:.2f}  {'✅ 结果一致' if same else '❌ 结果不一致'}")
+
+    contents = [open(path, 'r', encoding='utf-8').read() for path in files]
+    contents = (contents * (bulk_files // len(contents) + 1))[:bulk_files]
+    dict_time, column_time = time_bulk(bulk_as_dicts, bulk_as_columns, contents=contents)
+    dict_memory = retained_memory(bulk_as_dicts, contents)
+    column_memory = retained_memory(bulk_as_columns, contents)
+    print(f"\n📦 批量回填 {bulk_files} 个文件")
+    print(f"   {'逐币种 dict':<34} {dict_time:>8.2f} 秒  {dict_memory / 1e6:>8.1f} MB")
+    print(f"   {'列式 (SnapshotColumns)':<34} {column_time:>8.2f} 秒  {column_memory / 1e6:>8.1f} MB  "
+          f"内存 x{dict_memory / column_memory:.1f}")
+
+    if NUMPY_AVAILABLE:
+        same = check_numpy_table(contents[:len(files)])
+        all_same = all_same and same
+        print(f"   {'NumPy 结构化数组 (to_numpy)':<34} {'✅ 结果一致' if same else '❌ 结果不一致'}")
+    else:
+        print(f"   {'NumPy 结构化数组 (to_numpy)':<34} ⏭  numpy 未安装，跳过")
+
+    print("\n" + "=" * 70)
+    return 0 if all_same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享 Playwright 浏览器池
+整个进程只启动一次 Chromium，各个 Google Drive 读取器从池中借用页面：
+1. 浏览器常驻在独立线程的事件循环中，调用方可以来自任意事件循环
+   （asyncio.run / new_event_loop 每次新建循环也能复用同一个浏览器）
+2. 每个 context 使用 N 次后自动回收重建，避免长时间运行内存上涨
+3. 用信号量限制同时打开的页面数量
+4. 每次借用前做健康检查，浏览器断开后自动重启
+
+用法：
+    from browser_pool import get_browser_pool
+
+    async def read(page, url):
+        await page.goto(url)
+        return await page.content()
+
+    html = await get_browser_pool().run(read, url)
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+import time
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+# 同时打开的页面上限
+MAX_CONCURRENT_PAGES = int(os.environ.get('BROWSER_POOL_MAX_PAGES', 4))
+
+# 每个 context 使用多少次后回收
+CONTEXT_MAX_USES = int(os.environ.get('BROWSER_POOL_CONTEXT_MAX_USES', 50))
+
+# Drive 页面默认视口（与原读取器保持一致）
+DEFAULT_VIEWPORT = {'width': 1920, 'height': 1080}
+
+
+class BrowserPool:
+    """常驻浏览器池"""
+
+    def __init__(self, max_pages=MAX_CONCURRENT_PAGES,
+                 context_max_uses=CONTEXT_MAX_USES, headless=True):
+        """
+        :param max_pages: 同时打开的页面上限
+        :param context_max_uses: 单个 context 借出多少次后回收
+        :param headless: 是否无头模式
+        """
+        self.max_pages = max_pages
+        self.context_max_uses = context_max_uses
+        self.headless = headless
+
+        self._thread = None
+        self._loop = None
+        self._ready = threading.Event()
+        self._thread_lock = threading.Lock()
+
+        # 以下对象只在池线程的事件循环中访问
+        self._playwright = None
+        self._browser = None
+        self._launch_lock = None
+        self._context_lock = None
+        self._semaphore = None
+        self._contexts = {}  # 视口 -> 当前 context 记录
+        self._active_pages = 0
+
+        self.stats = {
+            'launches': 0,
+            'restarts': 0,
+            'pages_served': 0,
+            'contexts_created': 0,
+            'contexts_recycled': 0,
+            'started_at': None
+        }
+
+    # ------------------------------------------------------------
+    # 事件循环线程
+    # ------------------------------------------------------------
+
+    def _ensure_loop(self):
+        """确保池线程已启动"""
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name='browser-pool', daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._launch_lock = asyncio.Lock()
+        self._context_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(self.max_pages)
+        self._ready.set()
+        loop.run_forever()
+
+    # ------------------------------------------------------------
+    # 浏览器 / context 管理（运行在池线程中）
+    # ------------------------------------------------------------
+
+    def _is_healthy(self):
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _ensure_browser(self):
+        """健康检查，浏览器未启动或已断开时（重新）启动"""
+        if self._is_healthy():
+            return
+
+        async with self._launch_lock:
+            if self._is_healthy():
+                return
+
+            if self._browser is not None:
+                print("⚠️  浏览器池: 浏览器已断开，正在重启...")
+                self.stats['restarts'] += 1
+                await self._shutdown()
+
+            start = time.time()
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._contexts = {}
+            self.stats['launches'] += 1
+            if not self.stats['started_at']:
+                self.stats['started_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            print(f"🌐 浏览器池: Chromium 已启动 ({time.time() - start:.1f}秒)")
+
+    async def _acquire_context(self, viewport):
+        """借出一个 context，达到使用上限时换新的"""
+        key = (viewport['width'], viewport['height']) if viewport else None
+
+        # 检查和替换之间有 await，加锁避免并发调用各建一个、先建的被覆盖后泄漏
+        async with self._context_lock:
+            entry = self._contexts.get(key)
+
+            if entry is None or entry['uses'] >= self.context_max_uses:
+                if entry is not None:
+                    entry['retired'] = True
+                    self.stats['contexts_recycled'] += 1
+                    if entry['active'] == 0:
+                        await self._close_context(entry)
+
+                if viewport:
+                    context = await self._browser.new_context(viewport=viewport)
+                else:
+                    context = await self._browser.new_context()
+                entry = {'context': context, 'uses': 0, 'active': 0, 'retired': False}
+                self._contexts[key] = entry
+                self.stats['contexts_created'] += 1
+
+            entry['uses'] += 1
+            entry['active'] += 1
+            return entry
+
+    async def _release_context(self, entry):
+        entry['active'] -= 1
+        if entry['retired'] and entry['active'] == 0:
+            await self._close_context(entry)
+
+    async def _close_context(self, entry):
+        try:
+            await entry['context'].close()
+        except Exception:
+            pass
+
+    async def _run_job(self, fn, viewport, args, kwargs):
+        async with self._semaphore:
+            await self._ensure_browser()
+            entry = await self._acquire_context(viewport)
+            page = None
+            self._active_pages += 1
+            try:
+                page = await entry['context'].new_page()
+                self.stats['pages_served'] += 1
+                return await fn(page, *args, **kwargs)
+            finally:
+                self._active_pages -= 1
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+                await self._release_context(entry)
+
+    async def _shutdown(self):
+        for entry in list(self._contexts.values()):
+            await self._close_context(entry)
+        self._contexts = {}
+
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    # ------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------
+
+    def _submit(self, coro):
+        if not PLAYWRIGHT_AVAILABLE:
+            coro.close()
+            raise RuntimeError("Playwright 未安装，无法使用浏览器池")
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def run(self, fn, *args, viewport=DEFAULT_VIEWPORT, timeout=None, **kwargs):
+        """
+        借用一个页面执行 fn(page, *args, **kwargs)，返回其结果
+
+        :param fn: 协程函数，第一个参数为 page
+        :param viewport: 视口大小，None 表示使用 Playwright 默认值
+        :param timeout: 整体超时（秒），超时后取消任务并抛出 asyncio.TimeoutError
+        """
+        future = self._submit(self._run_job(fn, viewport, args, kwargs))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            future.cancel()
+            raise
+
+    def run_sync(self, fn, *args, viewport=DEFAULT_VIEWPORT, timeout=None, **kwargs):
+        """同步版本的 run，供非 async 代码调用"""
+        future = self._submit(self._run_job(fn, viewport, args, kwargs))
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def health_check(self):
+        """返回浏览器池状态"""
+        return {
+            'playwright_available': PLAYWRIGHT_AVAILABLE,
+            'running': bool(self._thread and self._thread.is_alive()),
+            'browser_connected': self._is_healthy(),
+            'active_pages': self._active_pages,
+            'max_pages': self.max_pages,
+            'contexts': [
+                {'viewport': key, 'uses': entry['uses'], 'active': entry['active']}
+                for key, entry in self._contexts.items()
+            ],
+            'context_max_uses': self.context_max_uses,
+            'stats': dict(self.stats)
+        }
+
+    def close(self):
+        """关闭浏览器并停止池线程"""
+        if not self._thread or not self._thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(10)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._thread = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """获取进程级共享浏览器池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+if __name__ == '__main__':
+    import json
+
+    async def _probe(page):
+        await page.goto('about:blank')
+        return await page.evaluate('() => navigator.userAgent')
+
+    pool = get_browser_pool()
+    for i in range(3):
+        start = time.time()
+        ua = asyncio.run(pool.run(_probe))
+        print(f"第{i + 1}次借用: {time.time() - start:.2f}秒 ({ua[:40]}...)")
+    print(json.dumps(pool.health_check(), ensure_ascii=False, indent=2))
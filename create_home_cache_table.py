@@ -3,14 +3,14 @@
 """
 创建首页数据缓存表
 """
-import sqlite3
+from db_connection import get_connection
 from datetime import datetime
 
 db_path = '/home/user/webapp/crypto_data.db'
 
 def create_home_cache_table():
     """创建首页数据缓存表"""
-    conn = sqlite3.connect(db_path)
+    conn = get_connection(db_path)
     cursor = conn.cursor()
     
     # 创建首页数据缓存表
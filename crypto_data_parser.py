@@ -6,6 +6,7 @@
 
 from typing import Dict, List, Optional
 import re
+from snapshot_parser import parse_snapshot, to_int
 
 class CryptoDataParser:
     """加密货币数据解析器"""
@@ -25,38 +26,9 @@ class CryptoDataParser:
             }
         """
         try:
-            lines = content.strip().split('\n')
-            
-            # 解析统计数据
-            stats = {}
-            crypto_list = []
-            in_data_section = False
-            
-            for line in lines:
-                line = line.strip()
-                
-                if not line:
-                    continue
-                
-                # 检查是否进入数据区
-                if '[超级列表框_首页开始]' in line:
-                    in_data_section = True
-                    continue
-                
-                if '[超级列表框_首页结束]' in line:
-                    in_data_section = False
-                    continue
-                
-                # 解析统计标签
-                if line.startswith('透明标签_'):
-                    CryptoDataParser._parse_stat_line(line, stats)
-                    continue
-                
-                # 解析币种数据
-                if in_data_section:
-                    crypto_data = CryptoDataParser._parse_crypto_line(line)
-                    if crypto_data:
-                        crypto_list.append(crypto_data)
+            snapshot = parse_snapshot(content)
+            stats = snapshot.raw_stats
+            crypto_list = [CryptoDataParser._crypto_record(parts) for parts in snapshot.coin_rows]
             
             # 处理统计数据
             processed_stats = CryptoDataParser._process_stats(stats)
@@ -78,47 +50,27 @@ class CryptoDataParser:
             return None
     
     @staticmethod
-    def _parse_stat_line(line: str, stats: Dict):
-        """解析统计行"""
-        # 格式：透明标签_急涨总和=急涨：5
-        match = re.match(r'透明标签_([^=]+)=(.+)', line)
-        if match:
-            key = match.group(1)
-            value = match.group(2)
-            stats[key] = value
-    
-    @staticmethod
-    def _parse_crypto_line(line: str) -> Optional[Dict]:
-        """解析币种行"""
-        try:
-            parts = line.split('|')
-            
-            if len(parts) < 16:
-                return None
-            
-            return {
-                'index': parts[0],              # 序号
-                'symbol': parts[1],             # 币名
-                'change': parts[2],             # 涨幅
-                'rushUp': int(parts[3]) if parts[3] else 0,        # 急涨
-                'rushDown': int(parts[4]) if parts[4] else 0,      # 急跌
-                'updateTime': parts[5],         # 更新时间
-                'highPrice': parts[6],          # 历史高价
-                'highTime': parts[7],           # 高价时间
-                'decline': parts[8],            # 跌幅
-                'change24h': parts[9],          # 24h涨幅
-                'col10': parts[10] if len(parts) > 10 else '',
-                'col11': parts[11] if len(parts) > 11 else '',
-                'col12': parts[12] if len(parts) > 12 else '',
-                'rank': parts[13] if len(parts) > 13 else '',              # 排名
-                'currentPrice': parts[14] if len(parts) > 14 else '',      # 当前价格
-                'ratio1': parts[15] if len(parts) > 15 else '',            # 比率1
-                'ratio2': parts[16] if len(parts) > 16 else ''             # 比率2
-            }
-            
-        except Exception as e:
-            print(f"⚠️  解析币种行失败: {e}")
-            return None
+    def _crypto_record(parts: List[str]) -> Dict:
+        """币种行字段 -> 币种数据"""
+        return {
+            'index': parts[0],              # 序号
+            'symbol': parts[1],             # 币名
+            'change': parts[2],             # 涨幅
+            'rushUp': to_int(parts[3]),     # 急涨
+            'rushDown': to_int(parts[4]),   # 急跌
+            'updateTime': parts[5],         # 更新时间
+            'highPrice': parts[6],          # 历史高价
+            'highTime': parts[7],           # 高价时间
+            'decline': parts[8],            # 跌幅
+            'change24h': parts[9],          # 24h涨幅
+            'col10': parts[10],
+            'col11': parts[11],
+            'col12': parts[12],
+            'rank': parts[13],              # 排名
+            'currentPrice': parts[14],      # 当前价格
+            'ratio1': parts[15],            # 比率1
+            'ratio2': parts[16] if len(parts) > 16 else ''   # 比率2
+        }
     
     @staticmethod
     def _process_stats(stats: Dict) -> Dict:
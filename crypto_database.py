@@ -4,7 +4,9 @@
 用于存储和查询历史加密货币数据
 """
 
-import sqlite3
+from db_connection import get_connection
+from db_schema import ensure_schema, insert_snapshot_record, insert_snapshot_rows, SNAPSHOT_COIN_FIELDS
+from history_archive import select_across
 from datetime import datetime
 import json
 from typing import List, Dict, Optional
@@ -16,113 +18,8 @@ class CryptoDatabase:
         self.init_database()
     
     def init_database(self):
-        """初始化数据库表结构"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 创建主表：存储每个时间点的完整数据快照
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS crypto_snapshots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                snapshot_time TEXT NOT NULL,
-                snapshot_date TEXT NOT NULL,
-                rush_up INTEGER,
-                rush_down INTEGER,
-                diff INTEGER,
-                count INTEGER,
-                ratio REAL,
-                status TEXT,
-                green_count INTEGER,
-                percentage TEXT,
-                filename TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(snapshot_time)
-            )
-        ''')
-        
-        # 创建信号监控数据表：存储做空/做多信号的历史数据
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS signal_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                snapshot_time TEXT NOT NULL,
-                snapshot_date TEXT NOT NULL,
-                short_value INTEGER,
-                short_change INTEGER,
-                long_value INTEGER,
-                long_change INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(snapshot_time)
-            )
-        ''')
-        
-        # 创建恐慌清洗数据表：存储恐慌清洗指标的历史数据
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS panic_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                snapshot_time TEXT NOT NULL,
-                snapshot_date TEXT NOT NULL,
-                panic_indicator TEXT,
-                trend_rating TEXT,
-                market_zone TEXT,
-                liquidation_24h_count TEXT,
-                liquidation_24h_amount TEXT,
-                total_position TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(snapshot_time)
-            )
-        ''')
-        
-        # 创建币种数据表：存储每个币种在每个时间点的详细数据
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS crypto_coin_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                snapshot_id INTEGER NOT NULL,
-                snapshot_time TEXT NOT NULL,
-                symbol TEXT NOT NULL,
-                index_order INTEGER DEFAULT 0,
-                change REAL,
-                rush_up INTEGER,
-                rush_down INTEGER,
-                update_time TEXT,
-                high_price REAL,
-                high_time TEXT,
-                decline REAL,
-                change_24h REAL,
-                rank INTEGER,
-                current_price REAL,
-                ratio1 TEXT,
-                ratio2 TEXT,
-                priority_level TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (snapshot_id) REFERENCES crypto_snapshots(id),
-                UNIQUE(snapshot_time, symbol)
-            )
-        ''')
-        
-        # 创建索引以提高查询性能
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_snapshot_time 
-            ON crypto_snapshots(snapshot_time)
-        ''')
-        
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_snapshot_date 
-            ON crypto_snapshots(snapshot_date)
-        ''')
-        
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_coin_snapshot_time 
-            ON crypto_coin_data(snapshot_time)
-        ''')
-        
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_coin_symbol 
-            ON crypto_coin_data(symbol)
-        ''')
-        
-        conn.commit()
-        conn.close()
-        print(f"✅ 数据库初始化完成: {self.db_path}")
+        """初始化数据库表结构（规范表和 crypto_snapshots 等兼容视图见 db_schema）"""
+        ensure_schema(self.db_path)
     
     def save_snapshot(self, data: List[Dict], stats: Dict, 
                      snapshot_time: str, filename: str = '') -> int:
@@ -136,65 +33,15 @@ class CryptoDatabase:
             filename: 源文件名
             
         Returns:
-            snapshot_id: 快照ID
+            snapshot_id: 快照ID（同一分钟已有快照时替换旧快照，返回新ID）
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         try:
-            # 提取日期部分
-            snapshot_date = snapshot_time.split()[0]
-            
-            # 保存快照统计数据
-            cursor.execute('''
-                INSERT OR REPLACE INTO crypto_snapshots 
-                (snapshot_time, snapshot_date, rush_up, rush_down, diff, count, 
-                 ratio, status, green_count, percentage, filename)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                snapshot_time,
-                snapshot_date,
-                int(stats.get('rushUp', 0)),
-                int(stats.get('rushDown', 0)),
-                int(stats.get('diff', 0)),
-                int(stats.get('count', 0)),
-                float(stats.get('ratio', 0)),
-                stats.get('status', ''),
-                int(stats.get('greenCount', 0)),
-                stats.get('percentage', ''),
-                filename
-            ))
-            
-            # 获取快照ID
-            snapshot_id = cursor.lastrowid
-            
-            # 保存每个币种的数据，记录原始顺序
-            for idx, coin in enumerate(data):
-                cursor.execute('''
-                    INSERT OR REPLACE INTO crypto_coin_data
-                    (snapshot_id, snapshot_time, symbol, index_order, change, rush_up, rush_down,
-                     update_time, high_price, high_time, decline, change_24h,
-                     rank, current_price, ratio1, ratio2, priority_level)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    snapshot_id,
-                    snapshot_time,
-                    coin.get('symbol', ''),
-                    idx,  # 记录原始顺序
-                    float(coin.get('change', 0)),
-                    int(coin.get('rushUp', 0)),
-                    int(coin.get('rushDown', 0)),
-                    coin.get('updateTime', ''),
-                    float(coin.get('highPrice', 0)),
-                    coin.get('highTime', ''),
-                    float(coin.get('decline', 0)),
-                    float(coin.get('change24h', 0)),
-                    int(coin.get('rank', 0)),
-                    float(coin.get('currentPrice', 0)),
-                    coin.get('ratio1', ''),
-                    coin.get('ratio2', ''),
-                    coin.get('priorityLevel', '-')
-                ))
+            # 写入规范表 stats_history / coin_history，同一分钟重新上传的快照替换旧的（与原 INSERT OR REPLACE 一致）
+            snapshot_id = insert_snapshot_record(cursor, stats, data, snapshot_time, filename or None,
+                                                 replace=True)
             
             conn.commit()
             print(f"✅ 数据快照已保存: {snapshot_time} (ID: {snapshot_id}, {len(data)}个币种)")
@@ -207,9 +54,62 @@ class CryptoDatabase:
         finally:
             conn.close()
     
+    def save_snapshot_columns(self, columns) -> List[tuple]:
+        """
+        在一个事务中批量保存列式解析的快照（snapshot_parser.SnapshotColumns）
+        
+        Args:
+            columns: SnapshotColumns，record_times 为快照时间 (格式: YYYY-MM-DD HH:MM:SS)
+            
+        Returns:
+            [(snapshot_time, snapshot_id), ...]，同一分钟已存在的快照跳过
+        """
+        conn = get_connection(self.db_path)
+        cursor = conn.cursor()
+        saved = []
+        
+        try:
+            for pos in columns.positions_by_time():
+                snapshot_time = columns.record_times[pos]
+                stats = columns.stats[pos]
+                filename = columns.filenames[pos]
+                
+                # 统计项换成 save_snapshot 的格式（比值、差值保留原文），转换规则见 db_schema
+                snapshot_stats = {
+                    'rushUp': stats['rushUp'] or 0,
+                    'rushDown': stats['rushDown'] or 0,
+                    'status': stats['status'] or '',
+                    'ratio': stats['ratio'] or '',
+                    'greenCount': stats['greenCount'] or 0,
+                    'percentage': stats['percentage'] or '',
+                    'diff': stats['difference'] or '',
+                    'count': stats['countTimes'] or 0,
+                }
+                # 币种行直接从列数组产出；快照文件没有优先级列，取缺省值
+                snapshot_id = insert_snapshot_rows(
+                    cursor, snapshot_stats,
+                    columns.rows(pos, SNAPSHOT_COIN_FIELDS[:-1], suffix=(None,)),
+                    snapshot_time, filename
+                )
+                if snapshot_id is None:
+                    # 同一分钟的快照已存在，不重复写入
+                    continue
+                saved.append((snapshot_time, snapshot_id))
+            
+            conn.commit()
+            print(f"✅ 批量保存 {len(saved)} 个快照 ({columns.total_coins}个币种记录)")
+            return saved
+            
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ 批量保存快照失败: {e}")
+            raise
+        finally:
+            conn.close()
+    
     def get_snapshot_by_time(self, snapshot_time: str) -> Optional[Dict]:
         """根据时间查询快照数据"""
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -274,16 +174,16 @@ class CryptoDatabase:
     
     def get_snapshots_by_date(self, date: str) -> List[Dict]:
         """查询某一天的所有快照"""
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
                 SELECT snapshot_time, rush_up, rush_down, diff, count
                 FROM crypto_snapshots
-                WHERE snapshot_date = ?
+                WHERE snapshot_time BETWEEN ? AND ?
                 ORDER BY snapshot_time
-            ''', (date,))
+            ''', (f'{date} 00:00:00', f'{date} 23:59:59'))
             
             snapshots = []
             for row in cursor.fetchall():
@@ -303,32 +203,33 @@ class CryptoDatabase:
     def get_coin_history(self, symbol: str, start_date: str = None, 
                         end_date: str = None) -> List[Dict]:
         """查询某个币种的历史数据"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        conn = get_connection(self.db_path)
         
         try:
+            # 直接查 coin_history（视图不能跨分区），早于保留期的部分从归档分区取
             query = '''
-                SELECT snapshot_time, current_price, change, change_24h,
-                       ratio1, ratio2, priority_level
-                FROM crypto_coin_data
+                SELECT record_time, current_price, change, change_24h,
+                       ratio1, ratio2, COALESCE(priority_level, '-')
+                FROM {table}
                 WHERE symbol = ?
             '''
             params = [symbol]
             
             if start_date:
-                query += ' AND snapshot_time >= ?'
+                query += ' AND record_time >= ?'
                 params.append(start_date)
             
             if end_date:
-                query += ' AND snapshot_time <= ?'
+                query += ' AND record_time <= ?'
                 params.append(end_date)
             
-            query += ' ORDER BY snapshot_time'
+            query += ' ORDER BY record_time'
             
-            cursor.execute(query, params)
+            _, rows = select_across(conn, 'coin_history', query, params, start_date, end_date,
+                                    sort_key=lambda row: row[0], db_path=self.db_path)
             
             history = []
-            for row in cursor.fetchall():
+            for row in rows:
                 history.append({
                     'snapshot_time': row[0],
                     'current_price': row[1],
@@ -346,7 +247,7 @@ class CryptoDatabase:
     
     def get_statistics(self) -> Dict:
         """获取数据库统计信息"""
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -390,7 +291,7 @@ class CryptoDatabase:
         Returns:
             bool: 保存成功返回 True，失败返回 False
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -430,7 +331,7 @@ class CryptoDatabase:
         Returns:
             bool: 保存成功返回 True，失败返回 False
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -474,7 +375,7 @@ class CryptoDatabase:
         Returns:
             List[Dict]: 信号历史数据列表
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -521,7 +422,7 @@ class CryptoDatabase:
         Returns:
             List[Dict]: 恐慌清洗历史数据列表
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -13,18 +13,23 @@ from datetime import datetime
 from flask import Flask, jsonify, send_from_directory
 from flask_cors import CORS
 import pytz
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-import io
+from drive_client import get_drive_client
+from snapshot_cache import get_snapshot_cache, drive_file_version
+from snapshot_parser import parse_snapshot
 
 # 配置
 MAIN_FOLDER_ID = "1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV"
-SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
+# 文件夹ID缓存: (父文件夹ID, 名称) -> 文件夹ID
+folder_id_cache = {}
+
+# 增量文件列表: 文件夹ID -> {'cursor': 最大modifiedTime, 'files': {文件ID: 文件元数据}}
+txt_listings = {}
+
 # 缓存数据
 cached_data = {
     'data': [],
@@ -40,28 +45,24 @@ def get_beijing_date():
     return beijing_time.strftime('%Y-%m-%d')
 
 def get_drive_service():
-    """创建Google Drive API服务"""
-    credentials_file = 'credentials.json'
-    if not os.path.exists(credentials_file):
-        print(f"错误: 未找到 {credentials_file}")
-        return None
-    
-    try:
-        credentials = service_account.Credentials.from_service_account_file(
-            credentials_file, scopes=SCOPES)
-        service = build('drive', 'v3', credentials=credentials)
-        return service
-    except Exception as e:
-        print(f"创建Drive服务失败: {e}")
-        return None
+    """获取共享的Google Drive API服务（凭证和连接在进程内复用）"""
+    client = get_drive_client()
+    return client.service if client else None
 
 def find_folder_by_name(service, parent_folder_id, folder_name):
-    """查找指定名称的文件夹"""
+    """查找指定名称的文件夹（结果缓存，文件夹ID不会变）"""
+    cache_key = (parent_folder_id, folder_name)
+    if cache_key in folder_id_cache:
+        return folder_id_cache[cache_key]
+    
     try:
         query = f"name='{folder_name}' and '{parent_folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
         results = service.files().list(q=query, spaces='drive', fields='files(id, name)', pageSize=10).execute()
         files = results.get('files', [])
-        return files[0]['id'] if files else None
+        if files:
+            folder_id_cache[cache_key] = files[0]['id']
+            return files[0]['id']
+        return None
     except HttpError as error:
         print(f"API错误: {error}")
         return None
@@ -81,20 +82,49 @@ def parse_filename_timestamp(filename):
     return None
 
 def list_txt_files(service, folder_id):
-    """列出文件夹中的所有txt文件"""
+    """
+    列出文件夹中的所有txt文件
+    第一次完整分页列出，之后只查询 modifiedTime 不早于游标的新文件并合并
+    """
+    listing = txt_listings.get(folder_id)
+    query = f"'{folder_id}' in parents and trashed=false and name contains '.txt'"
+    if listing and listing['cursor']:
+        # 用 >= 避免同一毫秒写入的文件被漏掉，重复的按文件ID去重
+        query += f" and modifiedTime >= '{listing['cursor']}'"
+    
     try:
-        query = f"'{folder_id}' in parents and trashed=false and name contains '.txt'"
-        results = service.files().list(
-            q=query,
-            spaces='drive',
-            fields='files(id, name)',
-            pageSize=100
-        ).execute()
-        files = results.get('files', [])
-        return [f for f in files if f['name'].endswith('.txt')]
+        items = []
+        page_token = None
+        while True:
+            results = service.files().list(
+                q=query,
+                spaces='drive',
+                fields='nextPageToken, files(id, name, modifiedTime, md5Checksum)',
+                pageSize=100,
+                pageToken=page_token
+            ).execute()
+            items.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
     except HttpError as error:
         print(f"API错误: {error}")
-        return []
+        if not listing:
+            return []
+        items = []
+    
+    if listing is None:
+        listing = {'cursor': None, 'files': {}}
+        txt_listings[folder_id] = listing
+    
+    for item in items:
+        if not item['name'].endswith('.txt'):
+            continue
+        listing['files'][item['id']] = item
+        if item.get('modifiedTime') and (not listing['cursor'] or item['modifiedTime'] > listing['cursor']):
+            listing['cursor'] = item['modifiedTime']
+    
+    return list(listing['files'].values())
 
 def get_latest_txt_file(service, folder_id):
     """获取最新的txt文件"""
@@ -116,79 +146,41 @@ def get_latest_txt_file(service, folder_id):
 
 def download_file_content(service, file_id):
     """下载文件内容"""
-    try:
-        request = service.files().get_media(fileId=file_id)
-        file_content = io.BytesIO()
-        
-        from googleapiclient.http import MediaIoBaseDownload
-        downloader = MediaIoBaseDownload(file_content, request)
-        
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-        
-        file_content.seek(0)
-        return file_content.read().decode('utf-8')
-    except Exception as e:
-        print(f"下载文件失败: {e}")
+    client = get_drive_client()
+    if not client:
         return None
+    return client.download(file_id)
 
 def parse_txt_content(content):
     """解析txt文件内容"""
-    lines = content.strip().split('\n')
-    
-    # 解析统计数据（从透明标签开始）
-    stats = {}
-    data_lines = []
-    
-    for line in lines:
-        line = line.strip()
-        if line.startswith('透明标签_'):
-            # 解析统计标签
-            parts = line.split('=')
-            if len(parts) == 2:
-                key = parts[0].replace('透明标签_', '')
-                value = parts[1]
-                stats[key] = value
-        elif line.startswith('[超级列表框_首页开始]'):
-            continue
-        elif line.startswith('[超级列表框_首页结束]'):
-            break
-        elif line and not line.startswith('透明标签_') and not line.startswith('['):
-            # 数据行
-            data_lines.append(line)
-    
-    # 解析数据行
+    return snapshot_to_data(parse_snapshot(content))
+
+def snapshot_to_data(snapshot):
+    """快照 -> (币种列表, 统计数据)"""
     parsed_data = []
-    for line in data_lines:
-        parts = line.split('|')
+    for parts in snapshot.rows:
         if len(parts) >= 15:
-            try:
-                row = {
-                    'index': parts[0],
-                    'symbol': parts[1],
-                    'change': parts[2],
-                    'rushUp': parts[3],
-                    'rushDown': parts[4],
-                    'updateTime': parts[5],
-                    'highPrice': parts[6],
-                    'highTime': parts[7],
-                    'decline': parts[8],
-                    'change24h': parts[9],
-                    'col10': parts[10] if len(parts) > 10 else '',
-                    'col11': parts[11] if len(parts) > 11 else '',
-                    'col12': parts[12] if len(parts) > 12 else '',
-                    'rank': parts[13] if len(parts) > 13 else '',
-                    'currentPrice': parts[14] if len(parts) > 14 else '',
-                    'ratio1': parts[15] if len(parts) > 15 else '',
-                    'ratio2': parts[16] if len(parts) > 16 else ''
-                }
-                parsed_data.append(row)
-            except Exception as e:
-                print(f"解析行失败: {line}, 错误: {e}")
-                continue
-    
-    return parsed_data, stats
+            parsed_data.append({
+                'index': parts[0],
+                'symbol': parts[1],
+                'change': parts[2],
+                'rushUp': parts[3],
+                'rushDown': parts[4],
+                'updateTime': parts[5],
+                'highPrice': parts[6],
+                'highTime': parts[7],
+                'decline': parts[8],
+                'change24h': parts[9],
+                'col10': parts[10],
+                'col11': parts[11],
+                'col12': parts[12],
+                'rank': parts[13],
+                'currentPrice': parts[14],
+                'ratio1': parts[15] if len(parts) > 15 else '',
+                'ratio2': parts[16] if len(parts) > 16 else ''
+            })
+    
+    return parsed_data, snapshot.raw_stats
 
 def load_history_data():
     """加载当天所有历史txt文件，补全图表数据"""
@@ -222,13 +214,36 @@ def load_history_data():
     
     print(f"找到 {len(files_with_time)} 个历史文件")
     
-    # 解析每个文件，提取统计数据
+    # 已下载过的文件直接读本地缓存，其余的并发下载
+    cache = get_snapshot_cache()
+    contents = {}
+    missing = []
+    for file, _ in files_with_time:
+        content = cache.get(beijing_date, file['name'], drive_file_version(file))
+        if content is not None:
+            contents[file['id']] = content
+        else:
+            missing.append(file)
+    
+    if missing:
+        client = get_drive_client()
+        if client:
+            # 边下载边解析，读到列表结束标记即停止；缓存只存精简后的文本
+            streams = client.download_snapshots([file['id'] for file in missing])
+            for file in missing:
+                stream = streams.get(file['id'])
+                if stream:
+                    content = stream.to_text()
+                    cache.put(beijing_date, file['name'], content, drive_file_version(file))
+                    contents[file['id']] = content
+    
+    # 按时间顺序解析，提取统计数据
     history_stats = []
     for file, timestamp in files_with_time:
         try:
-            content = download_file_content(service, file['id'])
+            content = contents.get(file['id'])
             if content:
-                _, stats = parse_txt_content(content)
+                stats = parse_snapshot(content).raw_stats
                 
                 # 提取时间（小时:分钟）
                 time_str = timestamp.strftime('%H:%M')
@@ -246,6 +261,8 @@ def load_history_data():
             continue
     
     print(f"成功加载 {len(history_stats)} 个历史数据点")
+    cache_stats = cache.stats()
+    print(f"快照缓存: 命中 {cache_stats['hits']}, 下载 {cache_stats['misses']}")
     return history_stats
 
 def fetch_latest_data():
@@ -274,15 +291,14 @@ def fetch_latest_data():
     
     print(f"找到最新文件: {latest_file['name']}")
     
-    content = download_file_content(service, latest_file['id'])
-    if not content:
+    # 边下载边解析，读到列表结束标记即停止
+    client = get_drive_client()
+    stream = client.download_snapshot(latest_file['id']) if client else None
+    if not stream:
         print("下载文件内容失败")
         return False
     
-    print(f"文件内容长度: {len(content)} 字节")
-    
-    # 解析内容
-    data, stats = parse_txt_content(content)
+    data, stats = snapshot_to_data(stream.snapshot())
     
     print(f"解析到 {len(data)} 条数据")
     
@@ -9,16 +9,18 @@ from flask_cors import CORS
 from datetime import datetime
 import pytz
 import sqlite3
+from db_connection import get_connection
+from history_series_api import register_series_route
 import os
 
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
-DB_PATH = 'homepage_data.db'
+DB_PATH = 'crypto_data.db'
 
 def get_db_connection():
     """获取数据库连接"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -145,6 +147,8 @@ def get_homepage_latest():
             'error': str(e)
         }), 500
 
+register_series_route(app)
+
 @app.route('/api/homepage/history')
 def get_homepage_history():
     """获取历史数据"""
@@ -9,16 +9,17 @@ from flask_cors import CORS
 from datetime import datetime
 import pytz
 import sqlite3
+from db_connection import get_connection
 import os
 
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
-DB_PATH = 'homepage_data.db'
+DB_PATH = 'crypto_data.db'
 
 def get_db_connection():
     """获取数据库连接"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -6,15 +6,24 @@
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import sqlite3
+import json
+import os
+import re
+import time
 from datetime import datetime
 import pytz
+from snapshot_parser import coin_detail, COIN_FIELD_COUNT
+from db_connection import get_connection
+from db_schema import ensure_schema, insert_summary_record
 
 app = Flask(__name__)
 CORS(app)
 
 BEIJING_TZ = pytz.timezone('Asia/Shanghai')
-DB_PATH = 'homepage_data.db'
+DB_PATH = 'crypto_data.db'
+
+# 批量上传时每多少个文件提交一次事务
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', '100'))
 
 
 def parse_summary_line(line):
@@ -55,106 +64,58 @@ def parse_summary_line(line):
 
 def parse_coin_line(line):
     """解析币种详情行"""
-    try:
-        parts = [p.strip() for p in line.split('|')]
-        if len(parts) >= 16:
-            def safe_int(s):
-                try:
-                    return int(s) if s and s.strip() else 0
-                except:
-                    return 0
-            
-            def safe_float(s):
-                try:
-                    return float(s) if s and s.strip() else 0.0
-                except:
-                    return 0.0
-            
-            return {
-                'seq_num': safe_int(parts[0]),
-                'coin_name': parts[1] if len(parts) > 1 else '',
-                'rise_speed': safe_float(parts[2]),
-                'rise_signal': safe_int(parts[3]),
-                'fall_signal': safe_int(parts[4]),
-                'update_time': parts[5] if len(parts) > 5 else '',
-                'history_high': safe_float(parts[6]),
-                'high_time': parts[7] if len(parts) > 7 else '',
-                'drop_from_high': safe_float(parts[8]),
-                'change_24h': safe_float(parts[9]),
-                'plus_4_percent': safe_int(parts[10]),
-                'minus_3_percent': safe_int(parts[11]),
-                'ranking': safe_int(parts[12]),
-                'current_price': safe_float(parts[13]),
-                'high_ratio': safe_float(parts[14]),
-                'low_ratio': safe_float(parts[15]),
-                'anomaly': parts[16] if len(parts) > 16 else ''
-            }
-    except Exception as e:
-        print(f"解析币种行失败: {e}")
-    return None
+    parts = [p.strip() for p in line.split('|')]
+    if len(parts) < COIN_FIELD_COUNT:
+        return None
+    return coin_detail(parts)
+
+
+def parse_upload_content(txt_content):
+    """
+    解析上传的txt内容：第一行汇总，其余行币种
+    
+    Returns:
+        (汇总数据, 币种列表, 错误信息)，成功时错误信息为 None
+    """
+    if not txt_content:
+        return None, None, '内容为空'
+    
+    lines = txt_content.strip().split('\n')
+    
+    if len(lines) < 2:
+        return None, None, '数据格式错误：行数不足'
+    
+    # 第一行是汇总数据
+    summary_data = parse_summary_line(lines[0])
+    if not summary_data:
+        return None, None, '解析汇总数据失败'
+    
+    # 后续行是币种数据
+    coins_data = []
+    for line in lines[1:]:
+        if line.strip():
+            coin_data = parse_coin_line(line)
+            if coin_data:
+                coins_data.append(coin_data)
+    
+    if len(coins_data) == 0:
+        return None, None, '未解析到币种数据'
+    
+    return summary_data, coins_data, None
+
+
+def insert_record(cursor, summary_data, coins_data, record_time):
+    """在给定游标上写入一条汇总及其币种详情（不提交），同一分钟已有数据时不重复写入，返回 None"""
+    return insert_summary_record(cursor, summary_data, coins_data, record_time, source='data_receiver')
 
 
 def save_to_database(summary_data, coins_data, record_time):
     """保存数据到数据库"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
-        # 保存汇总数据
-        cursor.execute('''
-            INSERT OR REPLACE INTO summary_data 
-            (rise_total, fall_total, five_states, rise_fall_ratio, green_count, 
-             green_percent, count_times, all_green_score, price_lowest_score, 
-             price_new_high, fall_count, diff_result, record_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            summary_data['rise_total'],
-            summary_data['fall_total'],
-            summary_data['five_states'],
-            summary_data['rise_fall_ratio'],
-            summary_data['green_count'],
-            summary_data['green_percent'],
-            summary_data['count_times'],
-            summary_data['all_green_score'],
-            summary_data['price_lowest_score'],
-            summary_data['price_new_high'],
-            summary_data['fall_count'],
-            summary_data['diff_result'],
-            record_time
-        ))
-        
-        summary_id = cursor.lastrowid
-        
-        # 保存币种详情
-        for coin in coins_data:
-            cursor.execute('''
-                INSERT INTO coin_details 
-                (summary_id, seq_num, coin_name, rise_speed, rise_signal, fall_signal,
-                 update_time, history_high, high_time, drop_from_high, change_24h,
-                 plus_4_percent, minus_3_percent, ranking, current_price, 
-                 high_ratio, low_ratio, anomaly, record_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                summary_id,
-                coin['seq_num'],
-                coin['coin_name'],
-                coin['rise_speed'],
-                coin['rise_signal'],
-                coin['fall_signal'],
-                coin['update_time'],
-                coin['history_high'],
-                coin['high_time'],
-                coin['drop_from_high'],
-                coin['change_24h'],
-                coin['plus_4_percent'],
-                coin['minus_3_percent'],
-                coin['ranking'],
-                coin['current_price'],
-                coin['high_ratio'],
-                coin['low_ratio'],
-                coin['anomaly'],
-                record_time
-            ))
+        insert_record(cursor, summary_data, coins_data, record_time)
         
         conn.commit()
         conn.close()
@@ -164,6 +125,49 @@ def save_to_database(summary_data, coins_data, record_time):
         return False
 
 
+def record_time_from_filename(filename):
+    """从 YYYY-MM-DD_HHMM.txt 文件名推出记录时间，推不出返回 None"""
+    match = re.search(r'(\d{4}-\d{2}-\d{2})_(\d{2})(\d{2})', filename or '')
+    if match:
+        return f"{match.group(1)} {match.group(2)}:{match.group(3)}:00"
+    return None
+
+
+def iter_bulk_items():
+    """
+    逐个产出批量上传中的文件: (序号, 文件名, 内容, 记录时间, 错误信息)
+    
+    - multipart/form-data: 每个上传的文件是一条
+    - NDJSON: 每行一个 {"content": ..., "filename": ..., "record_time": ...}，边读边产出
+    """
+    if request.mimetype == 'multipart/form-data':
+        index = 0
+        for _, storage in request.files.items(multi=True):
+            raw = storage.read()
+            try:
+                content = raw.decode('utf-8')
+            except UnicodeDecodeError:
+                content = raw.decode('gb18030', errors='replace')
+            yield index, storage.filename, content, record_time_from_filename(storage.filename), None
+            index += 1
+        return
+    
+    index = 0
+    for raw_line in request.stream:
+        line = raw_line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield index, None, None, None, f'JSON解析失败: {e}'
+        else:
+            filename = item.get('filename')
+            record_time = item.get('record_time') or record_time_from_filename(filename)
+            yield index, filename, item.get('content', ''), record_time, None
+        index += 1
+
+
 @app.route('/api/data/upload', methods=['POST'])
 def upload_data():
     """接收txt文件内容"""
@@ -171,30 +175,9 @@ def upload_data():
         data = request.json
         txt_content = data.get('content', '')
         
-        if not txt_content:
-            return jsonify({'success': False, 'message': '内容为空'})
-        
-        # 解析内容
-        lines = txt_content.strip().split('\n')
-        
-        if len(lines) < 2:
-            return jsonify({'success': False, 'message': '数据格式错误：行数不足'})
-        
-        # 第一行是汇总数据
-        summary_data = parse_summary_line(lines[0])
-        if not summary_data:
-            return jsonify({'success': False, 'message': '解析汇总数据失败'})
-        
-        # 后续行是币种数据
-        coins_data = []
-        for line in lines[1:]:
-            if line.strip():
-                coin_data = parse_coin_line(line)
-                if coin_data:
-                    coins_data.append(coin_data)
-        
-        if len(coins_data) == 0:
-            return jsonify({'success': False, 'message': '未解析到币种数据'})
+        summary_data, coins_data, error = parse_upload_content(txt_content)
+        if error:
+            return jsonify({'success': False, 'message': error})
         
         # 使用当前北京时间作为记录时间
         beijing_now = datetime.now(BEIJING_TZ)
@@ -216,6 +199,79 @@ def upload_data():
         return jsonify({'success': False, 'message': f'错误: {str(e)}'})
 
 
+@app.route('/api/data/upload/bulk', methods=['POST'])
+def upload_bulk():
+    """
+    批量接收txt文件内容（NDJSON 或 multipart），边读边解析，
+    每 BULK_BATCH_SIZE 个文件提交一次事务，返回逐个文件的结果和吞吐量
+    """
+    start = time.perf_counter()
+    results = []
+    saved = 0
+    coins_total = 0
+    pending = 0
+    
+    conn = get_connection(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        for index, filename, content, record_time, error in iter_bulk_items():
+            result = {'index': index, 'filename': filename}
+            
+            if not error:
+                summary_data, coins_data, error = parse_upload_content(content)
+            
+            if error:
+                result.update({'success': False, 'message': error})
+                results.append(result)
+                continue
+            
+            if not record_time:
+                record_time = datetime.now(BEIJING_TZ).strftime('%Y-%m-%d %H:%M:%S')
+            
+            # 每个文件一个保存点，单个文件失败不影响同批其他文件
+            if not conn.in_transaction:
+                cursor.execute('BEGIN')
+            cursor.execute('SAVEPOINT bulk_file')
+            try:
+                insert_record(cursor, summary_data, coins_data, record_time)
+                cursor.execute('RELEASE bulk_file')
+            except Exception as e:
+                cursor.execute('ROLLBACK TO bulk_file')
+                cursor.execute('RELEASE bulk_file')
+                result.update({'success': False, 'message': f'数据保存失败: {e}'})
+                results.append(result)
+                continue
+            
+            result.update({'success': True, 'record_time': record_time, 'coins_count': len(coins_data)})
+            results.append(result)
+            saved += 1
+            coins_total += len(coins_data)
+            pending += 1
+            
+            if pending >= BULK_BATCH_SIZE:
+                conn.commit()
+                pending = 0
+        
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': f'错误: {str(e)}', 'results': results})
+    finally:
+        conn.close()
+    
+    elapsed = time.perf_counter() - start
+    return jsonify({
+        'success': saved > 0 and saved == len(results),
+        'total': len(results),
+        'saved': saved,
+        'failed': len(results) - saved,
+        'coins_count': coins_total,
+        'elapsed_seconds': round(elapsed, 3),
+        'files_per_second': round(len(results) / elapsed, 1) if elapsed > 0 else None,
+        'results': results
+    })
+
+
 @app.route('/api/data/test', methods=['GET'])
 def test():
     """测试接口"""
@@ -233,7 +289,11 @@ if __name__ == '__main__':
     print("监听端口: 5005")
     print("上传接口: POST /api/data/upload")
     print("  请求格式: {\"content\": \"txt文件内容...\"}")
+    print("批量上传: POST /api/data/upload/bulk")
+    print("  NDJSON: 每行 {\"filename\": \"2025-12-06_1210.txt\", \"content\": \"...\"}")
+    print("  或 multipart/form-data 上传多个文件")
     print("测试接口: GET /api/data/test")
     print("="*70)
     
+    ensure_schema(DB_PATH)
     app.run(host='0.0.0.0', port=5005, debug=True)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 共享连接
+每个线程对每个数据库文件只保留一个连接，打开时设置一次：
+- journal_mode=WAL：读不阻塞写，API 线程和后台写入不再互相等待
+- synchronous=NORMAL：WAL 下仍然安全，提交不必每次 fsync
+- cache_size / mmap_size：页缓存和内存映射读
+- busy_timeout：写冲突时等待而不是立即报 database is locked
+- cached_statements：同一连接上重复的 SQL 不必重新编译
+- recursive_triggers：INSERT OR REPLACE 替换旧行时也触发删除触发器（daily_summary 计数依赖）
+
+get_connection() 的用法和 sqlite3.connect() 相同（commit / close / row_factory / with），
+close() 只是把连接还给当前线程（未提交的修改回滚，与真正关闭时一致）。
+同一线程里连接还没还回来时再次获取（嵌套调用），返回一个独立的新连接，
+事务互不影响，和以前各自 connect 的行为一样。
+"""
+
+import os
+import sqlite3
+import threading
+import weakref
+
+DB_PATH = 'crypto_data.db'
+
+BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', '30'))
+CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_KB', '65536'))
+MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_MB', '256')) * 1024 * 1024
+CACHED_STATEMENTS = 256
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {'opened': 0, 'reused': 0, 'nested': 0}
+
+
+def open_connection(db_path=DB_PATH):
+    """新建一个设置好 PRAGMA 的连接（不共享，调用方自己关闭）"""
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, cached_statements=CACHED_STATEMENTS)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+    except sqlite3.OperationalError:
+        # 只读文件系统等情况下保持原来的日志模式
+        pass
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA recursive_triggers=ON')
+    conn.execute(f'PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}')
+    with _stats_lock:
+        _stats['opened'] += 1
+    return conn
+
+
+class _Slot:
+    """线程内某个数据库文件的共享连接"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.in_use = False
+
+
+class _SharedCursor(sqlite3.Cursor):
+    """借出连接上的游标：持有借出对象，游标还在用时连接不会被回收归还"""
+
+    owner = None
+
+    def execute(self, *args):
+        self.owner._check_open()
+        return super().execute(*args)
+
+    def executemany(self, *args):
+        self.owner._check_open()
+        return super().executemany(*args)
+
+    def executescript(self, *args):
+        self.owner._check_open()
+        return super().executescript(*args)
+
+
+class SharedConnection:
+    """
+    借出的连接，接口与 sqlite3.Connection 相同
+
+    row_factory 只对这次借出生效，不会影响同一线程后续的使用者；
+    close() 之后再调用任何方法（包括已取得的游标执行 SQL）都抛出 sqlite3.ProgrammingError
+    """
+
+    def __init__(self, conn, slot=None):
+        self._conn = conn
+        self._slot = slot
+        self._closed = False
+        self.row_factory = None
+        # 使用者忘记 close() 时，对象（和它的游标）都被回收后也会归还连接
+        self._finalizer = weakref.finalize(self, _release, conn, slot)
+
+    def _check_open(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+
+    def cursor(self, factory=_SharedCursor):
+        self._check_open()
+        cursor = self._conn.cursor(factory)
+        cursor.owner = self
+        if self.row_factory is not None:
+            cursor.row_factory = self.row_factory
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def close(self):
+        """归还连接，未提交的修改回滚（重复调用无效果，与 sqlite3 相同）"""
+        self._closed = True
+        self._finalizer()
+
+    def __enter__(self):
+        self._check_open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # 与 sqlite3.Connection 相同：成功提交，异常回滚，不关闭
+        self._check_open()
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+    def __getattr__(self, name):
+        # commit / rollback / in_transaction / total_changes 等直接转给底层连接
+        if name.startswith('_'):
+            raise AttributeError(name)
+        self._check_open()
+        return getattr(self._conn, name)
+
+
+def _release(conn, slot):
+    if slot is None:
+        conn.close()
+        return
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        pass
+    slot.in_use = False
+
+
+def get_connection(db_path=DB_PATH):
+    """获取当前线程的共享连接（用法同 sqlite3.connect，用完 close()）"""
+    if db_path == ':memory:':
+        # 内存库每次连接都是新库，不能共享
+        return SharedConnection(open_connection(db_path))
+
+    slots = getattr(_local, 'slots', None)
+    if slots is None or getattr(_local, 'pid', None) != os.getpid():
+        # fork 出来的子进程不能沿用父进程的连接
+        slots = _local.slots = {}
+        _local.pid = os.getpid()
+
+    key = os.path.abspath(db_path)
+    slot = slots.get(key)
+    if slot is None:
+        slot = slots[key] = _Slot(open_connection(db_path))
+    elif slot.in_use:
+        with _stats_lock:
+            _stats['nested'] += 1
+        return SharedConnection(open_connection(db_path))
+    else:
+        with _stats_lock:
+            _stats['reused'] += 1
+
+    slot.in_use = True
+    return SharedConnection(slot.conn, slot)
+
+
+def close_thread_connections():
+    """关闭当前线程的所有共享连接（线程退出前或测试时调用）"""
+    slots = getattr(_local, 'slots', None) or {}
+    for slot in slots.values():
+        slot.conn.close()
+    _local.slots = {}
+
+
+def connection_stats():
+    """连接统计: 新建 / 复用 / 嵌套时另开的次数"""
+    with _stats_lock:
+        return dict(_stats)
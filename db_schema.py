@@ -1,92 +1,1066 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-数据库表结构定义
+数据库表结构定义（crypto_data.db 的唯一表结构来源）
+
+每类样本只存一份、只建一套索引：
+- stats_history / coin_history：首页快照（Drive 导入、首页上传/采集、CryptoDatabase 都写这里）
+- signal_data：信号多空数量
+- signal_stats_history：信号统计
+- panic_wash_history：恐慌清洗指标
+- panic_wash_new：新版恐慌清洗（美元口径、指数公式不同，是另一组指标）
+- score_history：币种多空得分
+- daily_summary：以上几类按天的记录数和首末时间，写入时由触发器维护，日期列表直接读这里
+- stats_rollup / coin_rollup：首页快照的 15 分钟 / 1 小时 / 1 天汇总，写入时由触发器维护，长时间范围的图表读这里
+- archive_partitions：coin_history / score_history 中已移到按月分区文件的数据（见 history_archive）
+- home_data_cache：首页最新数据的快速缓存（见 home_cache）
+
+以前各模块各自建的重复表由迁移合并去重，原表名换成同名视图，旧查询不用改：
+- crypto_data.db 的 crypto_snapshots / crypto_coin_data -> stats_history / coin_history
+- homepage_data.db 的 summary_data / coin_details        -> stats_history / coin_history
+- crypto_data.db 的 signal_history、signal_data.db 的 signal_data -> signal_data
+- crypto_data.db 的 panic_history                        -> panic_wash_history
+homepage_data.db / signal_data.db 合并后保持原样（不再使用，可作备份）。
+
+同一快照以 YYYY-MM-DD_HHMM.txt（记录时间到分钟）为唯一键，同一分钟的重复样本只保留第一条。
+
+表结构只通过 MIGRATIONS 修改：改 TABLES / INDEXES 后在末尾追加一个版本，
+schema_version 表记录已执行的版本，ensure_schema() 在各模块初始化时补跑未执行的版本。
+
+用法:
+    python db_schema.py              # 执行未完成的迁移
+    python db_schema.py --status     # 查看版本和各表行数
+    python db_schema.py --dry-run    # 在临时副本上演练迁移，不改动原库
+    python db_schema.py --rebuild-daily  # 按现有数据重新统计 daily_summary
+    python db_schema.py --rebuild-rollups [开始日期 [结束日期]]  # 重新计算多粒度汇总
 """
 
+import os
+import shutil
 import sqlite3
-from datetime import datetime
+import sys
+import tempfile
+import threading
+
+from db_connection import close_thread_connections, get_connection, open_connection
 
 DB_PATH = 'crypto_data.db'
 
-def init_database():
-    """初始化数据库表结构"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 创建统计数据表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS stats_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            filename TEXT NOT NULL UNIQUE,
-            record_time DATETIME NOT NULL,
-            rush_up INTEGER DEFAULT 0,
-            rush_down INTEGER DEFAULT 0,
-            status TEXT,
-            ratio TEXT,
-            green_count INTEGER DEFAULT 0,
-            percentage TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_record_time ON stats_history(record_time)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_filename ON stats_history(filename)')
-    
-    # 创建币种数据表
+# 合并来源（与 crypto_data.db 在同一目录）: 附加名 -> 文件名
+LEGACY_DATABASES = {
+    'legacy_homepage': 'homepage_data.db',
+    'legacy_signal': 'signal_data.db',
+}
+
+# ==================== 规范表结构 ====================
+# 表名 -> (列定义, 表约束)；已存在的表缺少的列用 ALTER TABLE 补上
+
+TABLES = {
+    'stats_history': ([
+        ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        ('filename', 'TEXT NOT NULL UNIQUE'),
+        ('record_time', 'DATETIME NOT NULL'),
+        ('rush_up', 'INTEGER DEFAULT 0'),
+        ('rush_down', 'INTEGER DEFAULT 0'),
+        ('status', 'TEXT'),
+        ('ratio', 'TEXT'),
+        ('green_count', 'INTEGER DEFAULT 0'),
+        ('percentage', 'TEXT'),
+        ('created_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+        ('difference', 'TEXT'),
+        ('price_lowest', 'TEXT'),
+        ('price_new_high', 'TEXT'),
+        ('count_times', 'INTEGER'),
+        ('rush_down_count', 'INTEGER'),
+        ('this_round_rush_up', 'INTEGER'),
+        ('this_round_rush_down', 'INTEGER'),
+        ('all_green_score', 'REAL'),
+        ('source', 'TEXT'),             # 数据来源（与 filename 不同的原文件名/采集器），Drive 导入为空
+    ], []),
+    'coin_history': ([
+        ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        ('stats_id', 'INTEGER NOT NULL'),
+        ('filename', 'TEXT NOT NULL'),
+        ('record_time', 'DATETIME NOT NULL'),
+        ('index_num', 'INTEGER'),
+        ('symbol', 'TEXT NOT NULL'),
+        ('change', 'REAL'),
+        ('rush_up', 'INTEGER DEFAULT 0'),
+        ('rush_down', 'INTEGER DEFAULT 0'),
+        ('update_time', 'DATETIME'),
+        ('high_price', 'REAL'),
+        ('high_time', 'DATE'),
+        ('decline', 'REAL'),
+        ('change_24h', 'REAL'),
+        ('rank', 'INTEGER'),
+        ('current_price', 'REAL'),
+        ('ratio1', 'TEXT'),
+        ('ratio2', 'TEXT'),
+        ('created_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+        ('plus_4_percent', 'INTEGER'),
+        ('minus_3_percent', 'INTEGER'),
+        ('anomaly', 'TEXT'),
+        ('priority_level', 'TEXT'),
+    ], ['FOREIGN KEY (stats_id) REFERENCES stats_history(id)']),
+    'signal_data': ([
+        ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        ('short_count', 'INTEGER NOT NULL'),
+        ('short_change', 'INTEGER NOT NULL'),
+        ('long_count', 'INTEGER NOT NULL'),
+        ('long_change', 'INTEGER NOT NULL'),
+        ('record_time', 'TEXT NOT NULL'),
+        ('folder_date', 'TEXT NOT NULL'),
+        ('created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+    ], ['UNIQUE(record_time)']),
+    'signal_stats_history': ([
+        ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        ('record_time', 'DATETIME NOT NULL'),
+        ('total_count', 'INTEGER DEFAULT 0'),
+        ('long_count', 'INTEGER DEFAULT 0'),
+        ('short_count', 'INTEGER DEFAULT 0'),
+        ('chaodi_count', 'INTEGER DEFAULT 0'),
+        ('dibu_count', 'INTEGER DEFAULT 0'),
+        ('dingbu_count', 'INTEGER DEFAULT 0'),
+        ('source_url', 'TEXT'),
+        ('created_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+    ], ['UNIQUE(record_time)']),
+    'panic_wash_history': ([
+        ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        ('record_time', 'DATETIME NOT NULL'),
+        ('panic_indicator', 'REAL NOT NULL'),
+        ('panic_color', 'TEXT'),
+        ('trend_rating', 'INTEGER'),
+        ('market_zone', 'TEXT'),
+        ('liquidation_24h_people', 'INTEGER'),
+        ('liquidation_24h_amount', 'REAL'),
+        ('total_position', 'REAL'),
+        ('created_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+    ], ['UNIQUE(record_time)']),
+    'panic_wash_new': ([
+        ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        ('record_time', 'DATETIME NOT NULL'),
+        ('hour_1_amount', 'REAL'),          # 1小时爆仓金额（美元）
+        ('hour_24_amount', 'REAL'),         # 24小时爆仓金额（美元）
+        ('hour_24_people', 'INTEGER'),      # 24小时爆仓人数
+        ('total_position', 'REAL'),         # 全网持仓量（美元）
+        ('panic_index', 'REAL'),            # 恐慌清洗指数
+        ('created_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+    ], []),
+    'score_history': ([
+        ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        ('symbol', 'TEXT NOT NULL'),
+        ('time_range', 'TEXT NOT NULL'),
+        ('long_score', 'REAL'),
+        ('short_score', 'REAL'),
+        ('score_diff', 'REAL'),
+        ('data_source', 'TEXT'),
+        ('record_time', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+    ], []),
+    # 每类数据每天一行，由 DAILY_SUMMARY_SOURCES 的触发器随写入维护
+    'daily_summary': ([
+        ('kind', 'TEXT NOT NULL'),
+        ('date', 'TEXT NOT NULL'),
+        ('record_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('first_time', 'TEXT'),
+        ('last_time', 'TEXT'),
+    ], ['PRIMARY KEY (kind, date)']),
+    # 15 分钟 / 1 小时 / 1 天汇总，由 ROLLUPS 的触发器随写入维护，
+    # 每个指标存首/末/最小/最大/合计/非空个数，平均值 = 合计 / 个数
+    'stats_rollup': ([
+        ('resolution', 'TEXT NOT NULL'),
+        ('bucket', 'TEXT NOT NULL'),        # 时间段起点 YYYY-MM-DD HH:MM:00
+        ('sample_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('first_time', 'TEXT'),
+        ('last_time', 'TEXT'),
+        ('rush_up_first', 'REAL'),
+        ('rush_up_last', 'REAL'),
+        ('rush_up_min', 'REAL'),
+        ('rush_up_max', 'REAL'),
+        ('rush_up_sum', 'REAL'),
+        ('rush_up_n', 'INTEGER DEFAULT 0'),
+        ('rush_down_first', 'REAL'),
+        ('rush_down_last', 'REAL'),
+        ('rush_down_min', 'REAL'),
+        ('rush_down_max', 'REAL'),
+        ('rush_down_sum', 'REAL'),
+        ('rush_down_n', 'INTEGER DEFAULT 0'),
+        ('ratio_first', 'REAL'),
+        ('ratio_last', 'REAL'),
+        ('ratio_min', 'REAL'),
+        ('ratio_max', 'REAL'),
+        ('ratio_sum', 'REAL'),
+        ('ratio_n', 'INTEGER DEFAULT 0'),
+        ('green_count_first', 'REAL'),
+        ('green_count_last', 'REAL'),
+        ('green_count_min', 'REAL'),
+        ('green_count_max', 'REAL'),
+        ('green_count_sum', 'REAL'),
+        ('green_count_n', 'INTEGER DEFAULT 0'),
+        ('count_times_first', 'REAL'),
+        ('count_times_last', 'REAL'),
+        ('count_times_min', 'REAL'),
+        ('count_times_max', 'REAL'),
+        ('count_times_sum', 'REAL'),
+        ('count_times_n', 'INTEGER DEFAULT 0'),
+    ], ['PRIMARY KEY (resolution, bucket)']),
+    'coin_rollup': ([
+        ('resolution', 'TEXT NOT NULL'),
+        ('bucket', 'TEXT NOT NULL'),
+        ('symbol', 'TEXT NOT NULL'),
+        ('sample_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('first_time', 'TEXT'),
+        ('last_time', 'TEXT'),
+        ('price_first', 'REAL'),
+        ('price_last', 'REAL'),
+        ('price_min', 'REAL'),
+        ('price_max', 'REAL'),
+        ('price_sum', 'REAL'),
+        ('price_n', 'INTEGER DEFAULT 0'),
+    ], ['PRIMARY KEY (resolution, bucket, symbol)']),
+    # 已归档到按月分区文件的数据（history_archive），查询时据此决定要附加哪些分区
+    'archive_partitions': ([
+        ('table_name', 'TEXT NOT NULL'),
+        ('month', 'TEXT NOT NULL'),         # YYYY-MM
+        ('path', 'TEXT NOT NULL'),          # 相对数据库所在目录
+        ('row_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('first_time', 'TEXT'),
+        ('last_time', 'TEXT'),
+        ('archived_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+    ], ['PRIMARY KEY (table_name, month)']),
+    # 首页最新数据的快速缓存（home_cache），采集守护进程写、API 服务读
+    'home_data_cache': ([
+        ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        ('filename', 'TEXT'),
+        ('time_diff', 'REAL'),
+        ('rush_up', 'INTEGER'),
+        ('rush_down', 'INTEGER'),
+        ('status', 'TEXT'),
+        ('ratio', 'REAL'),
+        ('green_count', 'INTEGER'),
+        ('percentage', 'REAL'),
+        ('coin_data', 'TEXT'),              # 币种列表 JSON
+        ('update_time', 'TEXT NOT NULL'),
+        ('cached_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+        ('parsed_data', 'TEXT'),            # 接口格式的完整解析结果 JSON
+    ], []),
+}
+
+# UNIQUE 约束自带索引，这里只列约束之外需要的
+INDEXES = {
+    'idx_record_time': 'stats_history(record_time)',
+    'idx_coin_record_time': 'coin_history(record_time)',
+    'idx_coin_symbol_time': 'coin_history(symbol, record_time)',
+    'idx_coin_stats_id': 'coin_history(stats_id)',
+    'idx_signal_folder_date': 'signal_data(folder_date)',
+    'idx_panic_time': 'panic_wash_new(record_time DESC)',
+    'idx_score_history_time': 'score_history(record_time DESC)',
+    'idx_home_cache_time': 'home_data_cache(update_time DESC)',
+}
+
+# 与 UNIQUE 约束或复合索引重复的旧索引，每次写入都要多维护一份
+REDUNDANT_INDEXES = (
+    'idx_filename',                   # stats_history(filename)，UNIQUE 已有
+    'idx_coin_symbol',                # coin_history(symbol)，被 (symbol, record_time) 覆盖
+    'idx_signal_stats_record_time',   # signal_stats_history(record_time)，UNIQUE 已有
+)
+
+# ==================== 兼容视图 ====================
+# 旧表名保留为视图，列名和顺序与原表一致
+
+COMPAT_VIEWS = {
+    'crypto_snapshots': '''
+        SELECT id, record_time AS snapshot_time, substr(record_time, 1, 10) AS snapshot_date,
+               rush_up, rush_down, CAST(difference AS INTEGER) AS diff, count_times AS count,
+               CAST(ratio AS REAL) AS ratio, status, green_count, percentage,
+               COALESCE(source, filename) AS filename, created_at
+        FROM stats_history
+    ''',
+    'crypto_coin_data': '''
+        SELECT id, stats_id AS snapshot_id, record_time AS snapshot_time, symbol,
+               index_num - 1 AS index_order, change, rush_up, rush_down, update_time,
+               high_price, high_time, decline, change_24h, rank, current_price,
+               ratio1, ratio2, COALESCE(priority_level, '-') AS priority_level, created_at
+        FROM coin_history
+    ''',
+    'summary_data': '''
+        SELECT id, rush_up AS rise_total, rush_down AS fall_total, status AS five_states,
+               CAST(ratio AS REAL) AS rise_fall_ratio, green_count,
+               CAST(rtrim(percentage, '%') AS REAL) AS green_percent, count_times,
+               all_green_score,
+               CAST(price_lowest AS REAL) AS price_lowest_score,
+               CAST(price_new_high AS INTEGER) AS price_new_high,
+               rush_down_count AS fall_count,
+               CAST(difference AS REAL) AS diff_result, record_time, created_at
+        FROM stats_history
+    ''',
+    'coin_details': '''
+        SELECT id, stats_id AS summary_id, index_num AS seq_num, symbol AS coin_name,
+               change AS rise_speed, rush_up AS rise_signal, rush_down AS fall_signal,
+               update_time, high_price AS history_high, high_time, decline AS drop_from_high,
+               change_24h, plus_4_percent, minus_3_percent, rank AS ranking, current_price,
+               CAST(rtrim(ratio1, '%') AS REAL) AS high_ratio,
+               CAST(rtrim(ratio2, '%') AS REAL) AS low_ratio,
+               anomaly, record_time
+        FROM coin_history
+    ''',
+    'signal_history': '''
+        SELECT id, record_time AS snapshot_time, folder_date AS snapshot_date,
+               short_count AS short_value, short_change, long_count AS long_value,
+               long_change, created_at
+        FROM signal_data
+    ''',
+    'panic_history': '''
+        SELECT id, record_time AS snapshot_time, substr(record_time, 1, 10) AS snapshot_date,
+               CASE WHEN panic_color IS NULL OR panic_color = ''
+                    THEN CAST(panic_indicator AS TEXT)
+                    ELSE CAST(panic_indicator AS TEXT) || '-' || panic_color END AS panic_indicator,
+               CAST(trend_rating AS TEXT) AS trend_rating, market_zone,
+               CAST(liquidation_24h_people AS TEXT) AS liquidation_24h_count,
+               CAST(liquidation_24h_amount AS TEXT) AS liquidation_24h_amount,
+               CAST(total_position AS TEXT) AS total_position, created_at
+        FROM panic_wash_history
+    ''',
+}
+
+# 单表视图可以直接写（INSERT OR REPLACE / OR IGNORE 按外层语句处理冲突），
+# 快照视图需要父表 id，写入走 insert_summary_record / insert_snapshot_record
+COMPAT_TRIGGERS = {
+    'signal_history': '''
+        INSERT INTO signal_data
+        (short_count, short_change, long_count, long_change, record_time, folder_date, created_at)
+        VALUES (COALESCE(NEW.short_value, 0), COALESCE(NEW.short_change, 0),
+                COALESCE(NEW.long_value, 0), COALESCE(NEW.long_change, 0),
+                NEW.snapshot_time, COALESCE(NEW.snapshot_date, substr(NEW.snapshot_time, 1, 10)),
+                COALESCE(NEW.created_at, CURRENT_TIMESTAMP));
+    ''',
+    # 旧表的恐慌指标是 '10.68-绿' 这样的文本，拆成数值和颜色
+    'panic_history': '''
+        INSERT INTO panic_wash_history
+        (record_time, panic_indicator, panic_color, trend_rating, market_zone,
+         liquidation_24h_people, liquidation_24h_amount, total_position, created_at)
+        VALUES (NEW.snapshot_time,
+                COALESCE(CAST(NEW.panic_indicator AS REAL), 0),
+                CASE WHEN instr(NEW.panic_indicator, '-') > 1
+                     THEN substr(NEW.panic_indicator, instr(NEW.panic_indicator, '-') + 1) END,
+                CAST(NEW.trend_rating AS INTEGER), NEW.market_zone,
+                CAST(NEW.liquidation_24h_count AS INTEGER),
+                CAST(NEW.liquidation_24h_amount AS REAL),
+                CAST(NEW.total_position AS REAL),
+                COALESCE(NEW.created_at, CURRENT_TIMESTAMP));
+    ''',
+}
+
+
+# ==================== 每日汇总 ====================
+# daily_summary 的种类 -> 来源表（都有 record_time 列且有索引）
+DAILY_SUMMARY_SOURCES = {
+    'stats': 'stats_history',
+    'signal': 'signal_data',
+    'signal_stats': 'signal_stats_history',
+    'score': 'score_history',
+}
+
+# 某天的记录时间范围（走 record_time 索引，不用 DATE(record_time)）
+_DAY_RANGE = "record_time >= {day} AND record_time < date({day}, '+1 day')"
+
+# 插入：当天计数 +1，更新首末时间
+_DAILY_INSERT_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS daily_summary_{kind}_insert AFTER INSERT ON {table}
+    WHEN NEW.record_time IS NOT NULL
+    BEGIN
+        INSERT INTO daily_summary (kind, date, record_count, first_time, last_time)
+        VALUES ('{kind}', substr(NEW.record_time, 1, 10), 1, NEW.record_time, NEW.record_time)
+        ON CONFLICT (kind, date) DO UPDATE SET
+            record_count = record_count + 1,
+            first_time = min(first_time, excluded.first_time),
+            last_time = max(last_time, excluded.last_time);
+    END
+"""
+
+# 删除（含 INSERT OR REPLACE 替换掉的旧行，需要 recursive_triggers，见 db_connection）：
+# 计数 -1，删掉的正好是首/末条时从索引重新取，当天没有记录时删掉汇总行
+_DAILY_DELETE_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS daily_summary_{kind}_delete AFTER DELETE ON {table}
+    WHEN OLD.record_time IS NOT NULL
+    BEGIN
+        UPDATE daily_summary SET
+            record_count = record_count - 1,
+            first_time = CASE WHEN OLD.record_time <= first_time
+                THEN (SELECT MIN(record_time) FROM {table} WHERE {day_range})
+                ELSE first_time END,
+            last_time = CASE WHEN OLD.record_time >= last_time
+                THEN (SELECT MAX(record_time) FROM {table} WHERE {day_range})
+                ELSE last_time END
+        WHERE kind = '{kind}' AND date = substr(OLD.record_time, 1, 10);
+        DELETE FROM daily_summary
+        WHERE kind = '{kind}' AND date = substr(OLD.record_time, 1, 10) AND record_count <= 0;
+    END
+"""
+
+
+def rebuild_daily_summary(cursor, kinds=None):
+    """按来源表重新统计每日汇总（不提交），返回 {种类: 天数}"""
+    result = {}
+    for kind in kinds or DAILY_SUMMARY_SOURCES:
+        table = DAILY_SUMMARY_SOURCES[kind]
+        cursor.execute('DELETE FROM daily_summary WHERE kind = ?', (kind,))
+        if _object_type(cursor, table) != 'table':
+            result[kind] = 0
+            continue
+        cursor.execute(f'''
+            INSERT INTO daily_summary (kind, date, record_count, first_time, last_time)
+            SELECT ?, substr(record_time, 1, 10), COUNT(*), MIN(record_time), MAX(record_time)
+            FROM {table}
+            WHERE record_time IS NOT NULL
+            GROUP BY substr(record_time, 1, 10)
+        ''', (kind,))
+        result[kind] = cursor.rowcount
+    return result
+
+
+def get_daily_summary(cursor, kind, since=None):
+    """
+    读取每日汇总（最新日期在前）
+
+    Returns:
+        [{'date', 'count', 'min_time', 'max_time'}, ...]
+    """
+    sql = 'SELECT date, record_count, first_time, last_time FROM daily_summary WHERE kind = ?'
+    params = [kind]
+    if since:
+        sql += ' AND date >= ?'
+        params.append(since)
+    cursor.execute(sql + ' ORDER BY date DESC', params)
+    return [{'date': row[0], 'count': row[1], 'min_time': row[2], 'max_time': row[3]}
+            for row in cursor.fetchall()]
+
+
+# ==================== 多粒度汇总 ====================
+# 粒度 -> (秒数, 记录时间所在时间段起点的表达式)
+ROLLUP_RESOLUTIONS = {
+    '15m': (900, "strftime('%Y-%m-%d %H:', {t}) || "
+                 "printf('%02d', CAST(strftime('%M', {t}) AS INTEGER) / 15 * 15) || ':00'"),
+    '1h': (3600, "strftime('%Y-%m-%d %H:00:00', {t})"),
+    '1d': (86400, "date({t}) || ' 00:00:00'"),
+}
+
+ROLLUP_AGGREGATES = ('first', 'last', 'min', 'max', 'sum', 'n')
+
+# 汇总表 -> 来源表、分组列、指标表达式（{row} 为 NEW. 或空）
+# ratio 是文本，'数据不足' 之类的非数字按空值处理
+ROLLUPS = {
+    'stats_rollup': {
+        'source': 'stats_history',
+        'keys': (),
+        'metrics': {
+            'rush_up': '{row}rush_up',
+            'rush_down': '{row}rush_down',
+            'ratio': "CASE WHEN {row}ratio GLOB '*[0-9]*' THEN CAST({row}ratio AS REAL) END",
+            'green_count': '{row}green_count',
+            'count_times': '{row}count_times',
+        },
+    },
+    'coin_rollup': {
+        'source': 'coin_history',
+        'keys': ('symbol',),
+        'metrics': {
+            'price': '{row}current_price',
+        },
+    },
+}
+
+
+def rollup_bucket(resolution, time_expr):
+    """时间段起点的 SQL 表达式"""
+    return ROLLUP_RESOLUTIONS[resolution][1].format(t=time_expr)
+
+
+def _rollup_upsert(name, resolution, row=None, where=None):
+    """
+    把来源行累加进汇总表的 UPSERT 语句
+
+    row='NEW.' 时用于触发器（VALUES 单行）；否则从来源表按 where 条件逐行累加
+    """
+    spec = ROLLUPS[name]
+    prefix = row or ''
+    time_expr = f'{prefix}record_time'
+    columns = ['resolution', 'bucket', *spec['keys'], 'sample_count', 'first_time', 'last_time']
+    values = [f"'{resolution}'", rollup_bucket(resolution, time_expr),
+              *[f'{prefix}{key}' for key in spec['keys']], '1', time_expr, time_expr]
+    updates = ['sample_count = sample_count + excluded.sample_count',
+               'first_time = min(first_time, excluded.first_time)',
+               'last_time = max(last_time, excluded.last_time)']
+
+    for metric, expr in spec['metrics'].items():
+        value = expr.format(row=prefix)
+        columns += [f'{metric}_{agg}' for agg in ROLLUP_AGGREGATES]
+        values += [value] * 5 + [f'({value}) IS NOT NULL']
+        col = {agg: f'{metric}_{agg}' for agg in ROLLUP_AGGREGATES}
+        # SET 里引用的都是更新前的值
+        updates += [
+            f"{col['first']} = CASE WHEN excluded.first_time < first_time "
+            f"THEN excluded.{col['first']} ELSE {col['first']} END",
+            f"{col['last']} = CASE WHEN excluded.last_time >= last_time "
+            f"THEN excluded.{col['last']} ELSE {col['last']} END",
+            f"{col['min']} = min(COALESCE({col['min']}, excluded.{col['min']}), "
+            f"COALESCE(excluded.{col['min']}, {col['min']}))",
+            f"{col['max']} = max(COALESCE({col['max']}, excluded.{col['max']}), "
+            f"COALESCE(excluded.{col['max']}, {col['max']}))",
+            f"{col['sum']} = COALESCE({col['sum']} + excluded.{col['sum']}, {col['sum']}, excluded.{col['sum']})",
+            f"{col['n']} = {col['n']} + excluded.{col['n']}",
+        ]
+
+    if row:
+        source = f"VALUES ({', '.join(values)})"
+    else:
+        # INSERT ... SELECT ... ON CONFLICT 需要 WHERE 才能正确解析
+        source = (f"SELECT {', '.join(values)} FROM {spec['source']} "
+                  f"WHERE record_time IS NOT NULL AND ({where or '1=1'}) ORDER BY record_time")
+
+    conflict = ', '.join(['resolution', 'bucket', *spec['keys']])
+    return (f"INSERT INTO {name} ({', '.join(columns)}) {source} "
+            f"ON CONFLICT ({conflict}) DO UPDATE SET {', '.join(updates)}")
+
+
+def _create_rollup_triggers(cursor):
+    for name, spec in ROLLUPS.items():
+        body = ';\n'.join(_rollup_upsert(name, resolution, row='NEW.') for resolution in ROLLUP_RESOLUTIONS)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {spec['source']}
+            WHEN NEW.record_time IS NOT NULL
+            BEGIN
+                {body};
+            END
+        """)
+
+
+def rebuild_rollups(cursor, start=None, end=None):
+    """
+    按来源表重新计算 [start, end] 所在整天的汇总（不提交），返回 {汇总表: 来源行数}
+
+    不指定范围时为来源表现有数据的范围；来源行已归档/删除的时间段不受影响
+    """
+    result = {}
+    for name, spec in ROLLUPS.items():
+        source = spec['source']
+        first, last = cursor.execute(f'SELECT MIN(record_time), MAX(record_time) FROM {source}').fetchone()
+        first, last = start or first, end or last
+        if not first:
+            result[name] = 0
+            continue
+        # 按整天重算，每个时间段都完整
+        day_start, day_end = cursor.execute("SELECT date(?), date(?, '+1 day')", (first, last)).fetchone()
+        cursor.execute(f'DELETE FROM {name} WHERE bucket >= ? AND bucket < ?', (day_start, day_end))
+        count = 0
+        for resolution in ROLLUP_RESOLUTIONS:
+            cursor.execute(_rollup_upsert(name, resolution, where='record_time >= ? AND record_time < ?'),
+                           (day_start, day_end))
+            count = cursor.rowcount
+        result[name] = count
+    return result
+
+
+# ==================== 规范写入 ====================
+
+def sample_filename(record_time):
+    """记录时间 -> 快照唯一键 YYYY-MM-DD_HHMM.txt（与 Drive 文件名一致）"""
+    return f"{record_time[:10]}_{record_time[11:13]}{record_time[14:16]}.txt"
+
+
+STATS_COLUMNS = ('rush_up', 'rush_down', 'status', 'ratio', 'green_count', 'percentage',
+                 'difference', 'price_lowest', 'price_new_high', 'count_times',
+                 'rush_down_count', 'all_green_score', 'source')
+
+COIN_COLUMNS = ('index_num', 'symbol', 'change', 'rush_up', 'rush_down', 'update_time',
+                'high_price', 'high_time', 'decline', 'change_24h', 'rank', 'current_price',
+                'ratio1', 'ratio2', 'plus_4_percent', 'minus_3_percent', 'anomaly', 'priority_level')
+
+_STATS_INSERT = f'''
+    INSERT OR IGNORE INTO stats_history (filename, record_time, {', '.join(STATS_COLUMNS)})
+    VALUES (?, ?, {', '.join('?' * len(STATS_COLUMNS))})
+'''
+
+_COIN_INSERT = f'''
+    INSERT INTO coin_history (stats_id, filename, record_time, {', '.join(COIN_COLUMNS)})
+    VALUES (?, ?, ?, {', '.join('?' * len(COIN_COLUMNS))})
+'''
+
+
+def _delete_sample(cursor, filename):
+    """删除同一分钟已有的样本（币种行一起删除），返回是否删除了"""
+    row = cursor.execute('SELECT id FROM stats_history WHERE filename = ?', (filename,)).fetchone()
+    if not row:
+        return False
+    cursor.execute('DELETE FROM coin_history WHERE stats_id = ?', (row[0],))
+    cursor.execute('DELETE FROM stats_history WHERE id = ?', (row[0],))
+    return True
+
+
+def insert_sample(cursor, record_time, stats, coins, replace=False):
+    """
+    写入一个快照样本（不提交）
+
+    Args:
+        stats: {STATS_COLUMNS 列名: 值}，缺少的列为 NULL
+        coins: [{COIN_COLUMNS 列名: 值}, ...]
+        replace: 同一分钟的样本已存在时替换（并重算当天的汇总），否则跳过
+
+    Returns:
+        stats_id；同一分钟的样本已存在且不替换时返回 None（不重复写入）
+    """
+    return insert_sample_rows(cursor, record_time, stats, [
+        tuple(coin.get(name) for name in COIN_COLUMNS) for coin in coins
+    ], replace)
+
+
+def insert_sample_rows(cursor, record_time, stats, coin_rows, replace=False):
+    """insert_sample 的按行版本：coin_rows 是 COIN_COLUMNS 顺序的元组（可以是生成器），直接交给 executemany"""
+    filename = sample_filename(record_time)
+    if stats.get('source') == filename:
+        stats = dict(stats, source=None)
+    replaced = replace and _delete_sample(cursor, filename)
+    cursor.execute(_STATS_INSERT, (filename, record_time) + tuple(stats.get(name) for name in STATS_COLUMNS))
+    if cursor.rowcount == 0:
+        return None
+    stats_id = cursor.lastrowid
+    cursor.executemany(_COIN_INSERT, (
+        (stats_id, filename, record_time) + tuple(row) for row in coin_rows
+    ))
+    if replaced:
+        # 汇总表只有插入触发器，被替换的旧样本要按整天重算
+        rebuild_rollups(cursor, record_time, record_time)
+    return stats_id
+
+
+def _percent_text(value):
+    return None if value is None else f"{value}%"
+
+
+def insert_summary_record(cursor, summary_data, coins_data, record_time, source=None):
+    """首页上传/采集格式（summary_data / coin_details 的字段）写入规范表，返回 stats_id 或 None"""
+    stats = {
+        'rush_up': summary_data.get('rise_total', 0),
+        'rush_down': summary_data.get('fall_total', 0),
+        'status': summary_data.get('five_states', ''),
+        'ratio': summary_data.get('rise_fall_ratio', 0.0),
+        'green_count': summary_data.get('green_count', 0),
+        'percentage': _percent_text(summary_data.get('green_percent', 0.0)),
+        'difference': summary_data.get('diff_result', 0.0),
+        'price_lowest': summary_data.get('price_lowest_score', 0.0),
+        'price_new_high': summary_data.get('price_new_high', 0),
+        'count_times': summary_data.get('count_times', 0),
+        'rush_down_count': summary_data.get('fall_count', 0),
+        'all_green_score': summary_data.get('all_green_score', 0.0),
+        'source': source,
+    }
+    coins = [
+        {
+            'index_num': coin.get('seq_num', 0),
+            'symbol': coin.get('coin_name', ''),
+            'change': coin.get('rise_speed', 0.0),
+            'rush_up': coin.get('rise_signal', 0),
+            'rush_down': coin.get('fall_signal', 0),
+            'update_time': coin.get('update_time'),
+            'high_price': coin.get('history_high'),
+            'high_time': coin.get('high_time'),
+            'decline': coin.get('drop_from_high'),
+            'change_24h': coin.get('change_24h', 0.0),
+            'rank': coin.get('ranking'),
+            'current_price': coin.get('current_price', 0.0),
+            'ratio1': _percent_text(coin.get('high_ratio')),
+            'ratio2': _percent_text(coin.get('low_ratio')),
+            'plus_4_percent': coin.get('plus_4_percent'),
+            'minus_3_percent': coin.get('minus_3_percent'),
+            'anomaly': coin.get('anomaly'),
+        }
+        for coin in coins_data
+    ]
+    return insert_sample(cursor, record_time, stats, coins)
+
+
+# CryptoDatabase 币种字段 -> (coin_history 列, 类型转换, 缺省值)；index 缺省为文件内序号
+_SNAPSHOT_COIN_FIELDS = (
+    ('index', 'index_num', int, None),
+    ('symbol', 'symbol', None, ''),
+    ('change', 'change', float, 0),
+    ('rushUp', 'rush_up', int, 0),
+    ('rushDown', 'rush_down', int, 0),
+    ('updateTime', 'update_time', None, ''),
+    ('highPrice', 'high_price', float, 0),
+    ('highTime', 'high_time', None, ''),
+    ('decline', 'decline', float, 0),
+    ('change24h', 'change_24h', float, 0),
+    ('rank', 'rank', int, 0),
+    ('currentPrice', 'current_price', float, 0),
+    ('ratio1', 'ratio1', None, ''),
+    ('ratio2', 'ratio2', None, ''),
+    ('priorityLevel', 'priority_level', None, '-'),
+)
+
+SNAPSHOT_COIN_FIELDS = tuple(field for field, _, _, _ in _SNAPSHOT_COIN_FIELDS)
+
+# COIN_COLUMNS 每一列取 _SNAPSHOT_COIN_FIELDS 的第几项（None 表示没有对应字段，写 NULL）
+_SNAPSHOT_COLUMN_POS = tuple(
+    next((pos for pos, spec in enumerate(_SNAPSHOT_COIN_FIELDS) if spec[1] == column), None)
+    for column in COIN_COLUMNS
+)
+
+
+def _snapshot_stats(stats, source):
+    return {
+        'rush_up': int(stats.get('rushUp', 0)),
+        'rush_down': int(stats.get('rushDown', 0)),
+        'status': stats.get('status', ''),
+        'ratio': stats.get('ratio', ''),
+        'green_count': int(stats.get('greenCount', 0)),
+        'percentage': stats.get('percentage', ''),
+        'difference': stats.get('diff', ''),
+        'count_times': int(stats.get('count', 0)),
+        'source': source,
+    }
+
+
+def _snapshot_coin_row(values, order):
+    """SNAPSHOT_COIN_FIELDS 顺序的值 -> COIN_COLUMNS 顺序的元组；None 取缺省值（index 取 order + 1）"""
+    converted = [
+        (order + 1 if field == 'index' else default) if value is None
+        else (convert(value) if convert else value)
+        for value, (field, _, convert, default) in zip(values, _SNAPSHOT_COIN_FIELDS)
+    ]
+    return tuple(None if pos is None else converted[pos] for pos in _SNAPSHOT_COLUMN_POS)
+
+
+def insert_snapshot_record(cursor, stats, coins, record_time, source=None, replace=False):
+    """CryptoDatabase 格式（rushUp / greenCount / ... 与币种字典列表）写入规范表，返回 stats_id 或 None"""
+    return insert_snapshot_rows(cursor, stats, (
+        [coin.get(field) for field in SNAPSHOT_COIN_FIELDS] for coin in coins
+    ), record_time, source, replace)
+
+
+def insert_snapshot_rows(cursor, stats, coin_rows, record_time, source=None, replace=False):
+    """
+    insert_snapshot_record 的按行版本（列式批量导入用）
+
+    Args:
+        coin_rows: SNAPSHOT_COIN_FIELDS 顺序的元组（如 SnapshotColumns.rows），逐行转换后 executemany
+    """
+    return insert_sample_rows(cursor, record_time, _snapshot_stats(stats, source), (
+        _snapshot_coin_row(values, order) for order, values in enumerate(coin_rows)
+    ), replace)
+
+
+# ==================== 迁移 ====================
+
+def _object_type(cursor, name, schema='main'):
+    """'table' / 'view' / None"""
+    row = cursor.execute(f"SELECT type FROM {schema}.sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _create_tables(cursor, attached):
+    """v1: 建规范表、补齐旧库缺少的列、建索引、删除重复索引"""
+    for table, (columns, constraints) in TABLES.items():
+        kind = _object_type(cursor, table)
+        if kind is None:
+            body = ',\n    '.join([f'{name} {decl}' for name, decl in columns] + constraints)
+            cursor.execute(f'CREATE TABLE {table} (\n    {body}\n)')
+        elif kind == 'table':
+            existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+            for name, decl in columns:
+                if name not in existing:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {decl}')
+
+    for name in REDUNDANT_INDEXES:
+        cursor.execute(f'DROP INDEX IF EXISTS {name}')
+    for name, target in INDEXES.items():
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+
+
+def _create_compat_view(cursor, name):
+    cursor.execute(f'CREATE VIEW IF NOT EXISTS {name} AS {COMPAT_VIEWS[name]}')
+    if name in COMPAT_TRIGGERS:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name}_insert INSTEAD OF INSERT ON {name}
+            BEGIN {COMPAT_TRIGGERS[name]} END
+        ''')
+
+
+def _keep_created_at(cursor, stats_id, created_at):
+    """合并的样本保留原来的入库时间"""
+    if created_at:
+        cursor.execute('UPDATE stats_history SET created_at = ? WHERE id = ?', (created_at, stats_id))
+        cursor.execute('UPDATE coin_history SET created_at = ? WHERE stats_id = ?', (created_at, stats_id))
+
+
+def _merge_snapshot_copies(cursor, attached):
+    """v2: crypto_snapshots / crypto_coin_data 与首页 summary_data / coin_details 合并进 stats_history / coin_history"""
+    row_cursor = cursor.connection.cursor()
+    row_cursor.row_factory = sqlite3.Row
+
+    if _object_type(cursor, 'crypto_snapshots') == 'table':
+        copied = skipped = 0
+        for snapshot in row_cursor.execute('SELECT * FROM main.crypto_snapshots ORDER BY snapshot_time, id').fetchall():
+            stats = {
+                'rushUp': snapshot['rush_up'] or 0, 'rushDown': snapshot['rush_down'] or 0,
+                'diff': snapshot['diff'], 'count': snapshot['count'] or 0, 'ratio': snapshot['ratio'],
+                'status': snapshot['status'], 'greenCount': snapshot['green_count'] or 0,
+                'percentage': snapshot['percentage'],
+            }
+            coins = [
+                {
+                    'index': coin['index_order'] + 1, 'symbol': coin['symbol'], 'change': coin['change'] or 0,
+                    'rushUp': coin['rush_up'] or 0, 'rushDown': coin['rush_down'] or 0,
+                    'updateTime': coin['update_time'], 'highPrice': coin['high_price'] or 0,
+                    'highTime': coin['high_time'], 'decline': coin['decline'] or 0,
+                    'change24h': coin['change_24h'] or 0, 'rank': coin['rank'] or 0,
+                    'currentPrice': coin['current_price'] or 0, 'ratio1': coin['ratio1'],
+                    'ratio2': coin['ratio2'], 'priorityLevel': coin['priority_level'],
+                }
+                for coin in row_cursor.execute(
+                    'SELECT * FROM main.crypto_coin_data WHERE snapshot_id = ? ORDER BY index_order, id',
+                    (snapshot['id'],)).fetchall()
+            ]
+            stats_id = insert_snapshot_record(cursor, stats, coins, snapshot['snapshot_time'], snapshot['filename'])
+            if stats_id is None:
+                skipped += 1
+            else:
+                _keep_created_at(cursor, stats_id, snapshot['created_at'])
+                copied += 1
+        print(f"   crypto_snapshots: 合并 {copied} 个快照, 重复跳过 {skipped} 个")
+        cursor.execute('DROP TABLE IF EXISTS main.crypto_coin_data')
+        cursor.execute('DROP TABLE main.crypto_snapshots')
+
+    for schema in ('main', 'legacy_homepage'):
+        if schema != 'main' and schema not in attached:
+            continue
+        if _object_type(cursor, 'summary_data', schema) != 'table':
+            continue
+        copied = skipped = 0
+        for summary in row_cursor.execute(f'SELECT * FROM {schema}.summary_data ORDER BY record_time, id').fetchall():
+            coins = [dict(coin) for coin in row_cursor.execute(
+                f'SELECT * FROM {schema}.coin_details WHERE summary_id = ? ORDER BY seq_num, id',
+                (summary['id'],)).fetchall()]
+            stats_id = insert_summary_record(cursor, dict(summary), coins, summary['record_time'],
+                                             LEGACY_DATABASES.get(schema))
+            if stats_id is None:
+                skipped += 1
+            else:
+                _keep_created_at(cursor, stats_id, summary['created_at'])
+                copied += 1
+        print(f"   {schema}.summary_data: 合并 {copied} 个快照, 重复跳过 {skipped} 个")
+        if schema == 'main':
+            cursor.execute('DROP TABLE IF EXISTS main.coin_details')
+            cursor.execute('DROP TABLE main.summary_data')
+
+    for name in ('crypto_snapshots', 'crypto_coin_data', 'summary_data', 'coin_details'):
+        _create_compat_view(cursor, name)
+
+
+def _merge_into_view(cursor, name, columns):
+    """旧表改名后建兼容视图，再把旧数据经视图触发器写入规范表（与日常写入同一套转换），重复的忽略"""
+    if _object_type(cursor, name) != 'table':
+        _create_compat_view(cursor, name)
+        return
+    legacy = f'{name}_legacy'
+    cursor.execute(f'ALTER TABLE main.{name} RENAME TO {legacy}')
+    _create_compat_view(cursor, name)
+
+    before = cursor.connection.total_changes
+    cursor.execute(f'INSERT OR IGNORE INTO {name} ({columns}) '
+                   f'SELECT {columns} FROM main.{legacy} ORDER BY snapshot_time, id')
+    print(f"   {name}: 合并 {cursor.connection.total_changes - before} 条")
+    cursor.execute(f'DROP TABLE main.{legacy}')
+
+
+def _merge_signal_copies(cursor, attached):
+    """v3: signal_history 与 signal_data.db 的 signal_data 合并进 signal_data"""
+    if 'legacy_signal' in attached and _object_type(cursor, 'signal_data', 'legacy_signal') == 'table':
+        before = cursor.connection.total_changes
+        cursor.execute('''
+            INSERT OR IGNORE INTO main.signal_data
+            (short_count, short_change, long_count, long_change, record_time, folder_date, created_at)
+            SELECT short_count, short_change, long_count, long_change, record_time, folder_date, created_at
+            FROM legacy_signal.signal_data ORDER BY record_time, id
+        ''')
+        print(f"   signal_data.db: 合并 {cursor.connection.total_changes - before} 条")
+    _merge_into_view(cursor, 'signal_history',
+                     'snapshot_time, snapshot_date, short_value, short_change, long_value, long_change, created_at')
+
+
+def _merge_panic_copies(cursor, attached):
+    """v4: panic_history（文本格式）合并进 panic_wash_history"""
+    _merge_into_view(cursor, 'panic_history',
+                     'snapshot_time, snapshot_date, panic_indicator, trend_rating, market_zone, '
+                     'liquidation_24h_count, liquidation_24h_amount, total_position, created_at')
+
+
+def _create_daily_summary(cursor, attached):
+    """v5: 建 daily_summary（及尚未建过的 score_history），加维护触发器，按现有数据统计一遍"""
+    _create_tables(cursor, attached)
+    for kind, table in DAILY_SUMMARY_SOURCES.items():
+        day_range = _DAY_RANGE.format(day='substr(OLD.record_time, 1, 10)')
+        cursor.execute(_DAILY_INSERT_TRIGGER.format(kind=kind, table=table))
+        cursor.execute(_DAILY_DELETE_TRIGGER.format(kind=kind, table=table, day_range=day_range))
+    for kind, days in rebuild_daily_summary(cursor).items():
+        print(f"   daily_summary {kind}: {days} 天")
+
+
+def _create_rollups(cursor, attached):
+    """v6: 建 15m/1h/1d 汇总表和维护触发器，按现有数据计算一遍"""
+    _create_tables(cursor, attached)
+    _create_rollup_triggers(cursor)
+    for name, rows in rebuild_rollups(cursor).items():
+        print(f"   {name}: {rows} 条来源数据")
+
+
+def _extend_rollups(cursor, attached):
+    """v8: ROLLUPS 增加指标后补列、重建触发器（触发器体含指标列表），重新计算"""
+    for name in ROLLUPS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}_insert')
+    _create_rollups(cursor, attached)
+
+
+# (版本号, 说明, 执行函数)；只能在末尾追加，已发布的版本不要修改
+MIGRATIONS = [
+    (1, '规范表结构与索引', _create_tables),
+    (2, '合并首页快照副本', _merge_snapshot_copies),
+    (3, '合并信号副本', _merge_signal_copies),
+    (4, '合并恐慌清洗副本', _merge_panic_copies),
+    (5, '每日汇总表', _create_daily_summary),
+    (6, '多粒度汇总表', _create_rollups),
+    (7, '归档分区登记表', _create_tables),
+    (8, '汇总表加计次', _extend_rollups),
+    (9, '首页快速缓存表', _create_tables),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _read_version(cursor):
+    """已执行到的版本（没有 schema_version 表为 0），只读"""
+    if _object_type(cursor, 'schema_version') != 'table':
+        return 0
+    return cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def _current_version(cursor):
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS coin_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            stats_id INTEGER NOT NULL,
-            filename TEXT NOT NULL,
-            record_time DATETIME NOT NULL,
-            index_num INTEGER,
-            symbol TEXT NOT NULL,
-            change REAL,
-            rush_up INTEGER DEFAULT 0,
-            rush_down INTEGER DEFAULT 0,
-            update_time DATETIME,
-            high_price REAL,
-            high_time DATE,
-            decline REAL,
-            change_24h REAL,
-            rank INTEGER,
-            current_price REAL,
-            ratio1 TEXT,
-            ratio2 TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (stats_id) REFERENCES stats_history(id)
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_coin_record_time ON coin_history(record_time)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_coin_symbol ON coin_history(symbol)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_coin_stats_id ON coin_history(stats_id)')
-    
-    conn.commit()
-    conn.close()
-    
+    return cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def migrate(db_path=DB_PATH, legacy_dir=None, verbose=True):
+    """
+    执行未完成的迁移（全部在一个事务里，失败整体回滚）
+
+    Args:
+        legacy_dir: 合并来源所在目录，默认与 db_path 相同
+
+    Returns:
+        本次执行的版本号列表
+    """
+    legacy_dir = legacy_dir or os.path.dirname(os.path.abspath(db_path))
+    conn = open_connection(db_path)
+    try:
+        # 已是最新版本时只读一次，不加写锁
+        if _read_version(conn.cursor()) >= LATEST_VERSION:
+            return []
+
+        # ATTACH 不能在事务里执行
+        attached = []
+        for alias, filename in LEGACY_DATABASES.items():
+            path = os.path.join(legacy_dir, filename)
+            if os.path.exists(path):
+                conn.execute('ATTACH DATABASE ? AS ' + alias, (path,))
+                attached.append(alias)
+
+        cursor = conn.cursor()
+        # 多个进程同时启动时只有一个执行迁移，其余等待后看到新版本
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            current = _current_version(cursor)
+            applied = []
+            for version, description, apply in MIGRATIONS:
+                if version <= current:
+                    continue
+                if verbose:
+                    print(f"🔧 迁移 v{version}: {description}")
+                apply(cursor, attached)
+                cursor.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                               (version, description))
+                applied.append(version)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return applied
+    finally:
+        conn.close()
+
+
+_ensured = set()
+_ensure_lock = threading.Lock()
+
+
+def ensure_schema(db_path=DB_PATH):
+    """确保数据库已迁移到最新版本（每个进程每个库只检查一次）"""
+    key = os.path.abspath(db_path)
+    with _ensure_lock:
+        if key in _ensured:
+            return
+        applied = migrate(db_path, verbose=False)
+        if applied:
+            print(f"✅ 数据库表结构已迁移到 v{LATEST_VERSION}: {db_path}")
+        _ensured.add(key)
+
+
+def schema_status(db_path=DB_PATH):
+    """当前版本与各规范表、兼容视图的行数"""
+    conn = get_connection(db_path)
+    try:
+        cursor = conn.cursor()
+        version = _read_version(cursor)
+        counts = {}
+        for name in list(TABLES) + list(COMPAT_VIEWS):
+            kind = _object_type(cursor, name)
+            if kind:
+                counts[name] = (kind, cursor.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0])
+        return {'version': version, 'latest': LATEST_VERSION, 'objects': counts}
+    finally:
+        conn.close()
+
+
+def init_database():
+    """初始化数据库表结构（执行全部迁移）"""
+    applied = migrate(DB_PATH)
+
     print("✅ 数据库表结构创建成功")
     print(f"   数据库路径: {DB_PATH}")
+    print(f"   版本: v{LATEST_VERSION}" + (f" (本次执行 {applied})" if applied else ""))
     print(f"   表: stats_history (统计数据)")
     print(f"   表: coin_history (币种数据)")
 
 def get_db_stats():
     """获取数据库统计信息"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
-    
+
     cursor.execute('SELECT COUNT(*) FROM stats_history')
     stats_count = cursor.fetchone()[0]
-    
+
     cursor.execute('SELECT COUNT(*) FROM coin_history')
     coin_count = cursor.fetchone()[0]
-    
+
     cursor.execute('SELECT MIN(record_time), MAX(record_time) FROM stats_history')
     time_range = cursor.fetchone()
-    
+
     conn.close()
-    
+
     return {
         'stats_count': stats_count,
         'coin_count': coin_count,
@@ -94,13 +1068,76 @@ def get_db_stats():
         'latest': time_range[1]
     }
 
+def rebuild_daily(db_path=DB_PATH):
+    """重新统计 daily_summary（数据被绕过触发器修改后使用）"""
+    ensure_schema(db_path)
+    conn = get_connection(db_path)
+    try:
+        result = rebuild_daily_summary(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+    for kind, days in result.items():
+        print(f"✅ daily_summary {kind}: {days} 天")
+
+def rebuild_rollup_tables(db_path=DB_PATH, start=None, end=None):
+    """重新计算多粒度汇总（start/end 为日期，缺省为全部现有数据）"""
+    ensure_schema(db_path)
+    conn = get_connection(db_path)
+    try:
+        result = rebuild_rollups(conn.cursor(), start, end)
+        conn.commit()
+    finally:
+        conn.close()
+    for name, rows in result.items():
+        print(f"✅ {name}: {rows} 条来源数据")
+
+def print_status(db_path=DB_PATH):
+    status = schema_status(db_path)
+    print(f"\n📋 表结构版本: v{status['version']} (最新 v{status['latest']})")
+    for name, (kind, count) in status['objects'].items():
+        label = '表' if kind == 'table' else '视图'
+        print(f"   {label} {name}: {count} 行")
+
+def dry_run(db_path=DB_PATH):
+    """复制到临时目录执行迁移，打印结果，原库不变"""
+    workdir = tempfile.mkdtemp(prefix='schema_dry_run_')
+    try:
+        copy_path = os.path.join(workdir, os.path.basename(db_path))
+        # 只读打开，原库的文件头（日志模式）也不改动
+        source = sqlite3.connect(f'file:{os.path.abspath(db_path)}?mode=ro', uri=True)
+        target = open_connection(copy_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        print(f"🧪 演练迁移: {copy_path}")
+        migrate(copy_path, legacy_dir=os.path.dirname(os.path.abspath(db_path)))
+        print_status(copy_path)
+    finally:
+        close_thread_connections()
+        shutil.rmtree(workdir, ignore_errors=True)
+
 if __name__ == '__main__':
-    init_database()
-    
-    # 显示统计信息
-    stats = get_db_stats()
-    print(f"\n📊 数据库统计:")
-    print(f"   统计记录数: {stats['stats_count']}")
-    print(f"   币种记录数: {stats['coin_count']}")
-    if stats['earliest']:
-        print(f"   时间范围: {stats['earliest']} ~ {stats['latest']}")
+    args = sys.argv[1:]
+    if '--status' in args:
+        print_status()
+    elif '--dry-run' in args:
+        dry_run()
+    elif '--rebuild-daily' in args:
+        rebuild_daily()
+    elif '--rebuild-rollups' in args:
+        dates = args[args.index('--rebuild-rollups') + 1:]
+        rebuild_rollup_tables(DB_PATH, *dates[:2])
+    else:
+        init_database()
+        print_status()
+
+        # 显示统计信息
+        stats = get_db_stats()
+        print(f"\n📊 数据库统计:")
+        print(f"   统计记录数: {stats['stats_count']}")
+        print(f"   币种记录数: {stats['coin_count']}")
+        if stats['earliest']:
+            print(f"   时间范围: {stats['earliest']} ~ {stats['latest']}")
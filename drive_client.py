@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Google Drive API 客户端池
+- 凭证只加载一次，Drive 服务对象按线程复用（httplib2 连接保持 keep-alive）
+- 元数据查询用 Drive 批量请求，多个 files.get 共用一次往返
+- 文件内容用线程池并发下载（Drive 批量请求不支持 alt=media 下载）
+- 快照文件可以按块下载、边下边解析，读到列表结束标记即停止
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+from googleapiclient.http import MediaIoBaseDownload
+
+from snapshot_parser import parse_snapshot_stream
+
+try:
+    import httplib2
+    import google_auth_httplib2
+    HTTPLIB2_AVAILABLE = True
+except ImportError:
+    HTTPLIB2_AVAILABLE = False
+
+CREDENTIALS_FILE = 'credentials.json'
+SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+
+# Drive 批量请求每批最多 100 个
+BATCH_LIMIT = 100
+DOWNLOAD_WORKERS = int(os.environ.get('DRIVE_DOWNLOAD_WORKERS', '8'))
+HTTP_TIMEOUT = 60
+# 流式下载时每块的大小（每块一次 Range 请求）
+STREAM_CHUNK_SIZE = int(os.environ.get('DRIVE_STREAM_CHUNK_KB', '256')) * 1024
+
+
+class DriveClient:
+    """共享凭证、按线程复用服务对象的 Drive 客户端"""
+
+    def __init__(self, credentials_file=CREDENTIALS_FILE, scopes=SCOPES):
+        self.credentials = service_account.Credentials.from_service_account_file(
+            credentials_file, scopes=scopes)
+        # googleapiclient 的服务对象不是线程安全的，每个线程一个
+        self._local = threading.local()
+
+    @property
+    def service(self):
+        """当前线程的 Drive 服务对象（第一次使用时创建）"""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            if HTTPLIB2_AVAILABLE:
+                http = google_auth_httplib2.AuthorizedHttp(
+                    self.credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+                service = build('drive', 'v3', http=http, cache_discovery=False)
+            else:
+                service = build('drive', 'v3', credentials=self.credentials, cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def list_files(self, folder_id, extra_query='', fields='id, name, size, modifiedTime, md5Checksum'):
+        """列出文件夹中的文件（自动翻页），返回元数据列表"""
+        query = f"'{folder_id}' in parents and trashed=false"
+        if extra_query:
+            query += f" and {extra_query}"
+        files = []
+        page_token = None
+        while True:
+            response = self.service.files().list(
+                q=query, spaces='drive', pageSize=1000, pageToken=page_token,
+                fields=f'nextPageToken, files({fields})'
+            ).execute()
+            files.extend(response.get('files', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return files
+
+    def find_folder(self, parent_id, name):
+        """按名称查找子文件夹，返回文件夹ID；找不到返回 None"""
+        folders = self.list_files(
+            parent_id, f"name='{name}' and mimeType='application/vnd.google-apps.folder'", fields='id, name')
+        return folders[0]['id'] if folders else None
+
+    def batch_get_metadata(self, file_ids, fields='id, name, size, modifiedTime, md5Checksum'):
+        """批量获取文件元数据，返回 {文件ID: 元数据}，失败的文件不在结果中"""
+        results = {}
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                print(f"⚠️  获取文件元数据失败: {request_id} - {exception}")
+                return
+            results[request_id] = response
+
+        file_ids = list(file_ids)
+        for start in range(0, len(file_ids), BATCH_LIMIT):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for file_id in file_ids[start:start + BATCH_LIMIT]:
+                batch.add(self.service.files().get(fileId=file_id, fields=fields), request_id=file_id)
+            batch.execute()
+
+        return results
+
+    def download(self, file_id, encoding='utf-8'):
+        """下载文件内容并解码，失败返回 None"""
+        try:
+            request = self.service.files().get_media(fileId=file_id)
+            buffer = io.BytesIO()
+            downloader = MediaIoBaseDownload(buffer, request)
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+            return buffer.getvalue().decode(encoding)
+        except Exception as e:
+            print(f"下载文件失败: {file_id} - {e}")
+            return None
+
+    def iter_download(self, file_id, chunk_size=STREAM_CHUNK_SIZE):
+        """按块下载文件，逐块产出字节；关闭生成器即停止下载"""
+        request = self.service.files().get_media(fileId=file_id)
+        buffer = io.BytesIO()
+        downloader = MediaIoBaseDownload(buffer, request, chunksize=chunk_size)
+        done = False
+        while not done:
+            _, done = downloader.next_chunk()
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if chunk:
+                yield chunk
+
+    def download_snapshot(self, file_id):
+        """流式下载并解析快照文件，返回 SnapshotStream；失败返回 None"""
+        try:
+            stream = parse_snapshot_stream(self.iter_download(file_id))
+        except Exception as e:
+            print(f"下载文件失败: {file_id} - {e}")
+            return None
+        if not stream.raw_stats and not stream.rows:
+            return None
+        return stream
+
+    def download_snapshots(self, file_ids, max_workers=DOWNLOAD_WORKERS):
+        """并发流式下载多个快照文件，返回 {文件ID: SnapshotStream}（失败为 None）"""
+        file_ids = list(file_ids)
+        if not file_ids:
+            return {}
+        workers = max(1, min(max_workers, len(file_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(file_ids, executor.map(self.download_snapshot, file_ids)))
+
+    def download_many(self, file_ids, max_workers=DOWNLOAD_WORKERS):
+        """并发下载多个文件，返回 {文件ID: 内容}（失败为 None）"""
+        file_ids = list(file_ids)
+        if not file_ids:
+            return {}
+        workers = max(1, min(max_workers, len(file_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            contents = executor.map(self.download, file_ids)
+            return dict(zip(file_ids, contents))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_drive_client(credentials_file=CREDENTIALS_FILE):
+    """获取进程内共享的 Drive 客户端，凭证文件不存在或加载失败返回 None"""
+    with _clients_lock:
+        client = _clients.get(credentials_file)
+        if client is None:
+            if not os.path.exists(credentials_file):
+                print(f"错误: 未找到 {credentials_file}")
+                return None
+            try:
+                client = DriveClient(credentials_file)
+            except Exception as e:
+                print(f"创建Drive客户端失败: {e}")
+                return None
+            _clients[credentials_file] = client
+        return client
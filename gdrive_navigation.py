@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Google Drive 页面导航辅助
+用具体的就绪信号（选择器出现、文件预览的网络响应、frame 中出现数据标记）
+代替固定的 asyncio.sleep，信号一到立即返回，并记录每一步耗时
+"""
+
+import asyncio
+import re
+import time
+
+ROOT_FOLDER_ID = '1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV'
+ROOT_FOLDER_URL = f"https://drive.google.com/drive/folders/{ROOT_FOLDER_ID}"
+
+# 首页数据文件中币种列表的开始标记
+DATA_MARKER = '[超级列表框_首页开始]'
+
+# Drive 文件列表中每一行都带 data-id
+FILE_ROW_SELECTOR = '[data-id]'
+
+SORT_SELECTORS = [
+    '[aria-label*="Sort"]',
+    '[aria-label*="排序"]',
+    'button:has-text("Sort")',
+    'button:has-text("排序")',
+    '[data-tooltip*="Sort"]',
+    '[data-tooltip*="排序"]',
+    'text=Sort',
+    'text=排序'
+]
+
+MODIFIED_SELECTORS = [
+    'text="Modified"',
+    'text="修改时间"',
+    'text="Date modified"',
+    '[role="menuitem"]:has-text("Modified")',
+    '[role="menuitem"]:has-text("修改")'
+]
+
+# 文件正文来自这些地址的响应（/viewer、/preview 是预览页面本身的 HTML，不是文件内容）
+PREVIEW_URL_PATTERN = re.compile(r'drive\.usercontent\.google\.com|export=download|alt=media')
+
+
+class StepTimer:
+    """记录每一步的耗时"""
+
+    def __init__(self, label='导航', verbose=True):
+        self.label = label
+        self.verbose = verbose
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.steps = []
+
+    def mark(self, step):
+        """记录从上一步到现在的耗时"""
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        self.steps.append((step, elapsed))
+        if self.verbose:
+            print(f"   ⏱️  {self.label} - {step}: {elapsed:.2f}秒")
+        return elapsed
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+    def summary(self):
+        """返回 {步骤: 秒}，并打印总耗时"""
+        if self.verbose:
+            print(f"   ⏱️  {self.label} 总耗时: {self.total():.2f}秒")
+        return {step: round(elapsed, 3) for step, elapsed in self.steps}
+
+
+def _mark(timer, step):
+    if timer:
+        timer.mark(step)
+
+
+async def settle(page, timeout=3000):
+    """等待网络空闲，超时不报错（用于排序、滚动后的列表刷新）"""
+    try:
+        await page.wait_for_load_state('networkidle', timeout=timeout)
+    except Exception:
+        pass
+
+
+async def goto_ready(page, url, selector=None, timeout=30000, timer=None, step='打开页面'):
+    """打开页面，DOM 就绪且 selector 出现后立即返回"""
+    await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
+    if selector:
+        await page.wait_for_selector(selector, state='attached', timeout=timeout)
+    _mark(timer, step)
+
+
+async def wait_for_page_text(page, pattern, timeout=15000):
+    """等待页面 HTML 中出现匹配 pattern（正则）的文本，返回 HTML；超时返回当前 HTML"""
+    regex = re.compile(pattern)
+    deadline = time.perf_counter() + timeout / 1000
+    while True:
+        html = await page.content()
+        if regex.search(html) or time.perf_counter() >= deadline:
+            return html
+        await asyncio.sleep(0.2)
+
+
+async def click_first(page, selectors, timeout=5000):
+    """点击第一个可见的选择器，返回命中的选择器；都没有则返回 None"""
+    deadline = time.perf_counter() + timeout / 1000
+    while True:
+        for selector in selectors:
+            try:
+                element = page.locator(selector).first
+                if await element.count() > 0 and await element.is_visible():
+                    await element.click()
+                    return selector
+            except Exception:
+                continue
+        if time.perf_counter() >= deadline:
+            return None
+        await asyncio.sleep(0.2)
+
+
+async def open_date_folder(page, date_str, timer=None, timeout=30000):
+    """从根文件夹双击进入日期文件夹，文件列表出现后返回"""
+    await goto_ready(page, ROOT_FOLDER_URL, selector=f'[data-tooltip*="{date_str}"]',
+                     timeout=timeout, timer=timer, step='根文件夹')
+
+    await page.locator(f'[data-tooltip*="{date_str}"]').first.dblclick()
+    # 地址离开根文件夹且文件行出现，即已进入日期文件夹
+    await page.wait_for_function(
+        '''([root, selector]) => location.href.indexOf(root) === -1
+                                  && document.querySelector(selector) !== null''',
+        arg=[ROOT_FOLDER_ID, FILE_ROW_SELECTOR],
+        timeout=timeout
+    )
+    _mark(timer, f'进入 {date_str} 文件夹')
+
+
+async def file_ids_by_name(page, pattern):
+    """
+    当前文件列表中 文件名 -> 文件ID
+
+    从 FILE_ROW_SELECTOR 元素的 data-id 属性和文本中取，不依赖 HTML 里属性和文件名的先后顺序。
+    外层容器的文本也包含文件名：匹配到多个文件名的元素跳过，同一个文件名取文本最短的元素（即文件行本身）
+
+    Args:
+        pattern: 文件名正则（单个文件名用 re.escape）
+    """
+    rows = await page.eval_on_selector_all(
+        FILE_ROW_SELECTOR, "els => els.map(el => [el.getAttribute('data-id'), el.textContent || ''])"
+    )
+    best = {}
+    for file_id, text in rows:
+        if not file_id:
+            continue
+        names = set(re.findall(pattern, text))
+        if len(names) != 1:
+            continue
+        name = names.pop()
+        if name not in best or len(text) < best[name][0]:
+            best[name] = (len(text), file_id)
+    return {name: file_id for name, (_, file_id) in best.items()}
+
+
+async def sort_by_modified(page, timer=None):
+    """按修改时间排序，返回是否点中了排序菜单"""
+    selector = await click_first(page, SORT_SELECTORS)
+    if selector:
+        print(f"   ✅ 点击了排序按钮 (选择器: {selector})")
+    else:
+        print(f"   ⚠️ 未找到排序按钮，尝试右键菜单...")
+        try:
+            await page.mouse.click(500, 300, button='right')
+        except Exception:
+            pass
+
+    # 菜单弹出后立即点击“修改时间”
+    modified = await click_first(page, MODIFIED_SELECTORS)
+    if modified:
+        print(f"   ✅ 选择了修改时间排序")
+        await settle(page)
+    _mark(timer, '按修改时间排序')
+    return modified is not None
+
+
+async def open_sorted_date_folder(page, date_str, timer=None):
+    """进入日期文件夹并按修改时间排序，返回页面 HTML"""
+    await open_date_folder(page, date_str, timer=timer)
+    await sort_by_modified(page, timer=timer)
+    return await page.content()
+
+
+async def _frame_text_with(page, marker, min_length):
+    """在所有 frame 中查找满足条件的文本"""
+    for frame in page.frames:
+        try:
+            text = await frame.evaluate('() => document.body ? document.body.innerText : ""')
+        except Exception:
+            continue
+        if not text or len(text) < min_length:
+            continue
+        if marker is None or marker in text:
+            return text
+    return None
+
+
+def _resolve(future, value):
+    """future 未完成时设置结果（响应监听和 frame 轮询可能同时拿到内容）"""
+    if not future.done():
+        future.set_result(value)
+
+
+async def wait_for_preview(page, marker=DATA_MARKER, min_length=100, timeout=20000, timer=None,
+                           open_action=None):
+    """
+    等待文件预览内容就绪，返回文本；超时返回 None
+
+    同时监听两种信号，哪个先到用哪个：
+    - 文件内容接口的网络响应正文中包含 marker（HTML 响应不算）
+    - 任意 frame 的文本中包含 marker
+
+    Args:
+        marker: 数据标记，None 表示只要求文本长度达到 min_length
+        open_action: 打开预览的协程函数（如按 Enter），在开始监听后调用，避免错过响应
+    """
+    loop = asyncio.get_running_loop()
+    found = loop.create_future()
+
+    async def check_response(response):
+        if found.done() or not PREVIEW_URL_PATTERN.search(response.url):
+            return
+        try:
+            if 'text/html' in response.headers.get('content-type', ''):
+                return
+            body = await response.text()
+        except Exception:
+            return
+        if len(body) >= min_length and (marker is None or marker in body):
+            _resolve(found, body)
+
+    def on_response(response):
+        asyncio.ensure_future(check_response(response))
+
+    page.on('response', on_response)
+    try:
+        if open_action:
+            await open_action()
+
+        deadline = time.perf_counter() + timeout / 1000
+        while not found.done():
+            text = await _frame_text_with(page, marker, min_length)
+            if text:
+                # 读取 frame 期间响应监听可能已经拿到内容，以先到的为准
+                _resolve(found, text)
+                break
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(asyncio.shield(found), timeout=min(0.25, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+        _mark(timer, '预览就绪' if found.done() else '预览超时')
+        return found.result() if found.done() else None
+    finally:
+        page.remove_listener('response', on_response)
+
+
+async def wait_for_stable_count(page, selector, timeout=10000, interval=0.3):
+    """等待 selector 的元素数量连续两次不变（表格渲染完成），返回数量"""
+    await page.wait_for_selector(selector, timeout=timeout)
+    deadline = time.perf_counter() + timeout / 1000
+    last = -1
+    while True:
+        count = await page.locator(selector).count()
+        if count == last or time.perf_counter() >= deadline:
+            return count
+        last = count
+        await asyncio.sleep(interval)
@@ -6,6 +6,7 @@ Google Drive 数据读取模块 - 从共享文件夹自动读取最新监控数
 import os
 import io
 import re
+import json
 from datetime import datetime
 from typing import Dict, Optional, List
 import pytz
@@ -13,28 +14,48 @@ import pytz
 try:
     from googleapiclient.discovery import build
     from googleapiclient.http import MediaIoBaseDownload
+    from googleapiclient.errors import HttpError
     from google.oauth2 import service_account
     GDRIVE_AVAILABLE = True
 except ImportError:
     GDRIVE_AVAILABLE = False
     print("⚠️  Google Drive API 库未安装，将使用备用方案")
 
+# 增量模式的状态文件：日期文件夹ID缓存 + 每个文件夹的 modifiedTime 游标
+INCREMENTAL_STATE_FILE = 'gdrive_incremental_state.json'
+# 状态文件中最多保留的文件夹列表数（每天一个文件夹）
+MAX_CACHED_LISTINGS = 7
+
+TXT_NAME_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})_(\d{4})\.txt')
+
 
 class GDriveReader:
     """Google Drive 数据读取器"""
     
-    def __init__(self, folder_id: str = '1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV'):
+    def __init__(self, folder_id: str = '1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV',
+                 incremental: bool = False, state_path: str = INCREMENTAL_STATE_FILE):
         """
         初始化 Google Drive 读取器
         
         Args:
             folder_id: Google Drive 共享文件夹 ID
+            incremental: 增量模式，每次只列出上次轮询之后修改过的文件
+            state_path: 增量模式的状态文件路径
         """
         self.folder_id = folder_id
         self.beijing_tz = pytz.timezone('Asia/Shanghai')
         self.service = None
         self.credentials_path = '/home/user/webapp/gdrive_credentials.json'
         
+        # 文件夹ID不会变，按 父文件夹/名称 缓存
+        self.incremental = incremental
+        self.state_path = state_path
+        self._folder_cache: Dict[str, str] = {}
+        # 文件夹ID -> {'cursor': 最大modifiedTime, 'full_date': 上次完整列出的日期, 'files': {文件ID: 文件元数据}}
+        self._listings: Dict[str, Dict] = {}
+        if incremental:
+            self._load_state()
+        
         # 尝试初始化 Google Drive API
         if GDRIVE_AVAILABLE and os.path.exists(self.credentials_path):
             try:
@@ -73,6 +94,10 @@ class GDriveReader:
         if not self.service:
             return None
         
+        cache_key = f"{parent_id}/{folder_name}"
+        if cache_key in self._folder_cache:
+            return self._folder_cache[cache_key]
+        
         try:
             query = f"'{parent_id}' in parents and name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
             results = self.service.files().list(
@@ -84,6 +109,9 @@ class GDriveReader:
             
             items = results.get('files', [])
             if items:
+                self._folder_cache[cache_key] = items[0]['id']
+                if self.incremental:
+                    self._save_state()
                 return items[0]['id']
             return None
         except Exception as e:
@@ -136,6 +164,11 @@ class GDriveReader:
         if not self.service:
             return None
         
+        if self.incremental:
+            latest = self._find_latest_incremental(parent_id)
+            if latest:
+                return latest
+        
         try:
             # 查找所有 .txt 文件
             query = f"'{parent_id}' in parents and name contains '.txt' and mimeType!='application/vnd.google-apps.folder' and trashed=false"
@@ -200,6 +233,132 @@ class GDriveReader:
             traceback.print_exc()
             return None
     
+    def _load_state(self):
+        """读取增量模式状态文件"""
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self._folder_cache.update(state.get('folders', {}))
+            self._listings.update(state.get('listings', {}))
+        except Exception as e:
+            print(f"⚠️  读取增量状态失败: {e}")
+    
+    def _save_state(self):
+        """保存增量模式状态文件（只保留最近的几个文件夹列表）"""
+        listings = dict(list(self._listings.items())[-MAX_CACHED_LISTINGS:])
+        self._listings = listings
+        try:
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'folders': self._folder_cache, 'listings': listings},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            print(f"⚠️  保存增量状态失败: {e}")
+    
+    def _list_txt_items(self, parent_id: str, since: Optional[str] = None) -> List[Dict]:
+        """分页列出文件夹中的 .txt 文件，since 为 modifiedTime 游标"""
+        query = f"'{parent_id}' in parents and name contains '.txt' and mimeType!='application/vnd.google-apps.folder' and trashed=false"
+        if since:
+            # 用 >= 避免同一毫秒写入的文件被漏掉，重复的按文件ID去重
+            query += f" and modifiedTime >= '{since}'"
+        
+        items = []
+        page_token = None
+        while True:
+            results = self.service.files().list(
+                q=query,
+                spaces='drive',
+                fields='nextPageToken, files(id, name, modifiedTime, md5Checksum)',
+                pageSize=1000,
+                pageToken=page_token
+            ).execute()
+            items.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return items
+    
+    def list_new_txt_files(self, parent_id: str) -> List[Dict]:
+        """
+        增量列出文件夹中上次轮询之后新增/修改的 .txt 文件
+        
+        第一次调用时完整列出文件夹并记录游标，之后每次只查询
+        modifiedTime 不早于游标的文件，成本与文件夹大小无关。
+        增量查询看不到被删除/移到回收站的文件，所以每天（北京时间）完整列出一次，
+        重建已知文件列表；状态文件只在游标或文件列表变化时才写
+        
+        Args:
+            parent_id: 文件夹 ID
+            
+        Returns:
+            新文件的元数据列表
+        """
+        if not self.service:
+            return []
+        
+        today = datetime.now(self.beijing_tz).strftime('%Y-%m-%d')
+        listing = self._listings.get(parent_id)
+        full = listing is None or listing.get('full_date') != today
+        since = listing['cursor'] if listing and not full else None
+        items = self._list_txt_items(parent_id, since)
+        
+        changed = full
+        if full:
+            known = listing['files'] if listing else {}
+            removed = len(set(known) - {item['id'] for item in items})
+            listing = {'cursor': None, 'full_date': today, 'files': {}}
+            print(f"📂 完整列出文件夹: {len(items)} 个 TXT 文件" +
+                  (f"（移除 {removed} 个已删除的文件）" if removed else ""))
+        else:
+            known = listing['files']
+        
+        new_items = [item for item in items
+                     if known.get(item['id'], {}).get('modifiedTime') != item.get('modifiedTime')]
+        for item in (items if full else new_items):
+            listing['files'][item['id']] = item
+            if item.get('modifiedTime') and (not listing['cursor'] or item['modifiedTime'] > listing['cursor']):
+                listing['cursor'] = item['modifiedTime']
+        changed = changed or bool(new_items)
+        
+        # 重新插入，保持最近使用的文件夹排在后面
+        self._listings.pop(parent_id, None)
+        self._listings[parent_id] = listing
+        if changed:
+            self._save_state()
+        
+        if since:
+            print(f"📂 增量列表: {len(new_items)} 个新文件 (游标: {since})")
+        return new_items
+    
+    def _forget_file(self, file_id: str):
+        """文件已不存在（下载返回 404），从已知文件列表中移除"""
+        removed = False
+        for listing in self._listings.values():
+            removed = listing['files'].pop(file_id, None) is not None or removed
+        if removed:
+            print(f"🗑️  文件已删除，从增量列表移除: {file_id}")
+            self._save_state()
+    
+    def _find_latest_incremental(self, parent_id: str) -> Optional[tuple]:
+        """增量模式下从已知文件中找出文件名时间戳最新的 .txt 文件"""
+        try:
+            self.list_new_txt_files(parent_id)
+        except Exception as e:
+            print(f"⚠️  增量列表失败，回退到完整列表: {e}")
+            return None
+        
+        files = self._listings.get(parent_id, {}).get('files', {}).values()
+        timestamped = [item for item in files if TXT_NAME_PATTERN.match(item['name'])]
+        if not timestamped:
+            return None
+        
+        latest = max(timestamped, key=lambda item: item['name'])
+        print(f"✅ 找到最新TXT文件: {latest['name']}")
+        print(f"   修改时间: {latest.get('modifiedTime', 'N/A')}")
+        return (latest['id'], latest['name'])
+    
     def download_file_content(self, file_id: str) -> Optional[str]:
         """
         下载文件内容
@@ -232,6 +391,11 @@ class GDriveReader:
             
             print("❌ 无法解码文件内容")
             return None
+        except HttpError as e:
+            print(f"❌ 下载文件失败: {e}")
+            if e.resp.status == 404 and self.incremental:
+                self._forget_file(file_id)
+            return None
         except Exception as e:
             print(f"❌ 下载文件失败: {e}")
             return None
@@ -10,16 +10,12 @@ import sys
 import re
 from datetime import datetime
 import pytz
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from drive_client import get_drive_client
 
 # Google Drive 主文件夹ID
 MAIN_FOLDER_ID = "1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV"
 
-# API 权限范围
-SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
-
 def get_beijing_date():
     """获取北京时间的今天日期，格式：YYYY-MM-DD"""
     beijing_tz = pytz.timezone('Asia/Shanghai')
@@ -54,16 +50,13 @@ def parse_filename_timestamp(filename):
     return None
 
 def get_drive_service(credentials_file='credentials.json'):
-    """创建Google Drive API服务对象"""
-    try:
-        credentials = service_account.Credentials.from_service_account_file(
-            credentials_file, scopes=SCOPES)
-        service = build('drive', 'v3', credentials=credentials)
-        return service
-    except Exception as e:
-        print(f"❌ 创建Drive服务失败: {e}")
+    """获取Google Drive API服务对象（凭证和连接在进程内复用）"""
+    client = get_drive_client(credentials_file)
+    if not client:
+        print(f"❌ 创建Drive服务失败")
         print(f"请确保 {credentials_file} 文件存在且格式正确")
         return None
+    return client.service
 
 def find_folder_by_name(service, parent_folder_id, folder_name):
     """在指定父文件夹中查找指定名称的子文件夹"""
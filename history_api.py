@@ -5,7 +5,6 @@
 """
 
 from flask import Flask, jsonify, request, send_file
-import sqlite3
 from datetime import datetime, timedelta
 import asyncio
 import sys
@@ -13,87 +12,46 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from import_history_simple import import_current_data
+from db_connection import get_connection
+from history_loader import load_history
+from history_series_api import register_series_route
+from db_schema import ensure_schema, get_daily_summary
 
 app = Flask(__name__)
 DB_PATH = 'crypto_data.db'
 
-def query_history_data(start_time=None, end_time=None, limit=100):
-    """查询历史数据"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    try:
-        # 构建查询条件
-        where_clauses = []
-        params = []
-        
-        if start_time:
-            where_clauses.append('record_time >= ?')
-            params.append(start_time)
-        
-        if end_time:
-            where_clauses.append('record_time <= ?')
-            params.append(end_time)
-        
-        where_sql = ' AND '.join(where_clauses) if where_clauses else '1=1'
-        
-        # 查询统计数据
-        cursor.execute(f'''
-            SELECT * FROM stats_history
-            WHERE {where_sql}
-            ORDER BY record_time DESC
-            LIMIT ?
-        ''', params + [limit])
-        
-        stats_records = [dict(row) for row in cursor.fetchall()]
-        
-        # 为每条统计数据查询对应的币种数据
-        for record in stats_records:
-            cursor.execute('''
-                SELECT * FROM coin_history
-                WHERE stats_id = ?
-                ORDER BY index_num
-            ''', (record['id'],))
-            
-            record['coins'] = [dict(row) for row in cursor.fetchall()]
-        
-        return stats_records
-        
-    finally:
-        conn.close()
+def query_history_data(start_time=None, end_time=None, limit=100, columnar=False):
+    """查询历史数据（币种数据批量加载，不再逐条查询）"""
+    return load_history(start_time, end_time, limit, columnar=columnar, db_path=DB_PATH)
 
 def get_available_dates():
     """获取数据库中有数据的日期列表"""
-    conn = sqlite3.connect(DB_PATH)
+    return [info['date'] for info in get_date_summary()]
+
+def get_date_summary():
+    """每个日期的记录数和首末时间（读 daily_summary，最新在前）"""
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
     
     try:
-        cursor.execute('''
-            SELECT DISTINCT DATE(record_time) as date
-            FROM stats_history
-            ORDER BY date DESC
-        ''')
-        
-        dates = [row[0] for row in cursor.fetchall()]
-        return dates
+        return get_daily_summary(cursor, 'stats')
         
     finally:
         conn.close()
 
 def get_time_range_for_date(date_str):
     """获取指定日期的时间范围"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
     
     try:
         cursor.execute('''
-            SELECT MIN(record_time) as min_time, MAX(record_time) as max_time
-            FROM stats_history
-            WHERE DATE(record_time) = ?
+            SELECT first_time, last_time
+            FROM daily_summary
+            WHERE kind = 'stats' AND date = ?
         ''', (date_str,))
         
-        row = cursor.fetchone()
+        row = cursor.fetchone() or (None, None)
         return {
             'min_time': row[0],
             'max_time': row[1]
@@ -111,31 +69,7 @@ def index():
 def get_dates():
     """获取有数据的日期列表"""
     try:
-        dates = get_available_dates()
-        
-        # 获取每个日期的统计信息
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        date_info = []
-        for date in dates:
-            cursor.execute('''
-                SELECT COUNT(*) as count,
-                       MIN(record_time) as min_time,
-                       MAX(record_time) as max_time
-                FROM stats_history
-                WHERE DATE(record_time) = ?
-            ''', (date,))
-            
-            row = cursor.fetchone()
-            date_info.append({
-                'date': date,
-                'count': row[0],
-                'min_time': row[1],
-                'max_time': row[2]
-            })
-        
-        conn.close()
+        date_info = get_date_summary()
         
         return jsonify({
             'success': True,
@@ -157,17 +91,19 @@ def query_history():
         end_time = request.args.get('end_time')
         date = request.args.get('date')  # 如果只查询某一天
         limit = int(request.args.get('limit', 100))
+        columnar = request.args.get('format') == 'columnar'
         
         # 如果指定了日期，自动设置时间范围
         if date:
             start_time = f"{date} 00:00:00"
             end_time = f"{date} 23:59:59"
         
-        records = query_history_data(start_time, end_time, limit)
+        records = query_history_data(start_time, end_time, limit, columnar)
         
         return jsonify({
             'success': True,
-            'count': len(records),
+            'count': len(records['offsets']) - 1 if columnar else len(records),
+            'format': 'columnar' if columnar else 'rows',
             'data': records,
             'query': {
                 'start_time': start_time,
@@ -184,11 +120,13 @@ def query_history():
             'error': str(e)
         }), 500
 
+register_series_route(app)
+
 @app.route('/api/history/stats')
 def get_stats():
     """获取数据库统计信息"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
         cursor.execute('SELECT COUNT(*) FROM stats_history')
@@ -200,7 +138,7 @@ def get_stats():
         cursor.execute('SELECT MIN(record_time), MAX(record_time) FROM stats_history')
         time_range = cursor.fetchone()
         
-        cursor.execute('SELECT COUNT(DISTINCT DATE(record_time)) FROM stats_history')
+        cursor.execute("SELECT COUNT(*) FROM daily_summary WHERE kind = 'stats'")
         day_count = cursor.fetchone()[0]
         
         conn.close()
@@ -246,4 +184,5 @@ if __name__ == '__main__':
     print("访问: http://0.0.0.0:5004/")
     print("="*60)
     
+    ensure_schema(DB_PATH)
     app.run(host='0.0.0.0', port=5004, debug=False, threaded=True)
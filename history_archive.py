@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史数据按月归档
+coin_history（每个快照 29 条）和 score_history（每 3 分钟一批）只增不减，
+超过保留天数的数据按记录时间所在月份移到 archive/crypto_data_YYYY-MM.db，
+主库只保留近期数据，索引能留在缓存里，VACUUM 也快。
+
+- 归档的分区登记在主库 archive_partitions 表（月份、行数、首末时间）
+- select_across() 只在查询时间范围和某个分区重叠时才 ATTACH 该分区，
+  近期查询不会碰到分区文件
+- 行 id 原样保留，stats_id 仍能对应主库的 stats_history
+- 归档天的 daily_summary 保留原值，日期列表里仍能看到这些天
+- stats_rollup / coin_rollup 不随归档减少，长时间范围的走势不需要读分区
+
+每个月份在一个事务里复制并删除；分区和主库是两个文件，中途中断时
+分区里可能已有部分行，重新执行时按 id 跳过（INSERT OR IGNORE）后继续。
+
+用法:
+    python history_archive.py                 # 归档超过 HISTORY_RETENTION_DAYS 天的数据
+    python history_archive.py --days 60       # 指定保留天数
+    python history_archive.py --vacuum        # 归档后 VACUUM 主库
+    python history_archive.py --status        # 查看已归档的分区
+"""
+
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+from db_connection import get_connection, open_connection
+from db_schema import DAILY_SUMMARY_SOURCES, ensure_schema
+
+DB_PATH = 'crypto_data.db'
+
+# 分区目录（相对数据库所在目录）
+ARCHIVE_DIR = os.environ.get('HISTORY_ARCHIVE_DIR', 'archive')
+RETENTION_DAYS = int(os.environ.get('HISTORY_RETENTION_DAYS', '30'))
+
+# 表 -> 分区里建的索引
+ARCHIVED_TABLES = {
+    'coin_history': ('record_time', 'symbol, record_time', 'stats_id'),
+    'score_history': ('record_time', 'symbol, time_range, record_time'),
+}
+
+PARTITION_ALIAS = 'archive_part'
+
+
+def partition_path(db_path, month, archive_dir=ARCHIVE_DIR):
+    """某月分区文件的路径: (绝对路径, 相对数据库目录的路径)"""
+    base = os.path.splitext(os.path.basename(db_path))[0]
+    relative = os.path.join(archive_dir, f'{base}_{month}.db')
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), relative), relative
+
+
+def _next_month(month):
+    year, mon = map(int, month.split('-'))
+    return f'{year + mon // 12}-{mon % 12 + 1:02d}-01'
+
+
+def _columns(cursor, schema, table):
+    return [row[1] for row in cursor.execute(f'PRAGMA {schema}.table_info({table})')]
+
+
+def _create_partition_table(cursor, table):
+    """在分区里按主库的建表语句建表和索引"""
+    sql = cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                         (table,)).fetchone()[0]
+    sql = re.sub(r'^CREATE TABLE\s+("?\w+"?)', f'CREATE TABLE IF NOT EXISTS {PARTITION_ALIAS}.{table}', sql)
+    cursor.execute(sql)
+    for i, columns in enumerate(ARCHIVED_TABLES[table]):
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {PARTITION_ALIAS}.idx_{table}_{i} ON {table}({columns})')
+
+
+def _archive_month(conn, db_path, table, month, cutoff, archive_dir):
+    """把 table 中 month 月、早于 cutoff 的数据移到分区，返回移动的行数"""
+    path, relative = partition_path(db_path, month, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    start = f'{month}-01'
+    end = min(_next_month(month), cutoff)
+    kinds = [kind for kind, source in DAILY_SUMMARY_SOURCES.items() if source == table]
+
+    # ATTACH 不能在事务里执行
+    conn.execute(f'ATTACH DATABASE ? AS {PARTITION_ALIAS}', (path,))
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            _create_partition_table(cursor, table)
+            main_columns = _columns(cursor, 'main', table)
+            columns = ', '.join(c for c in _columns(cursor, PARTITION_ALIAS, table) if c in main_columns)
+            where = 'record_time >= ? AND record_time < ?'
+
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO {PARTITION_ALIAS}.{table} ({columns})
+                SELECT {columns} FROM main.{table} WHERE {where}
+            ''', (start, end))
+
+            # 删除会触发 daily_summary 减计数，归档的天保留原来的汇总
+            kept = cursor.execute(f'''
+                SELECT kind, date, record_count, first_time, last_time FROM daily_summary
+                WHERE kind IN ({','.join('?' * len(kinds))}) AND date >= ? AND date < ?
+            ''', (*kinds, start, end)).fetchall() if kinds else []
+            cursor.execute(f'DELETE FROM main.{table} WHERE {where}', (start, end))
+            moved = cursor.rowcount
+            cursor.executemany('INSERT OR REPLACE INTO daily_summary VALUES (?, ?, ?, ?, ?)', kept)
+
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO archive_partitions
+                (table_name, month, path, row_count, first_time, last_time, archived_at)
+                SELECT ?, ?, ?, COUNT(*), MIN(record_time), MAX(record_time), CURRENT_TIMESTAMP
+                FROM {PARTITION_ALIAS}.{table}
+            ''', (table, month, relative))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute(f'DETACH DATABASE {PARTITION_ALIAS}')
+    return moved
+
+
+def archive_old_data(db_path=DB_PATH, days=RETENTION_DAYS, tables=None, vacuum=False,
+                     archive_dir=ARCHIVE_DIR):
+    """
+    把超过 days 天的数据移到按月分区
+
+    Returns:
+        {表名: {月份: 移动的行数}}
+    """
+    ensure_schema(db_path)
+    cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    result = {}
+
+    conn = open_connection(db_path)
+    try:
+        for table in tables or ARCHIVED_TABLES:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                  (table,)).fetchone()
+            if not exists:
+                continue
+            months = [row[0] for row in conn.execute(f'''
+                SELECT DISTINCT substr(record_time, 1, 7) FROM {table}
+                WHERE record_time < ? ORDER BY 1
+            ''', (cutoff,))]
+            result[table] = {}
+            for month in months:
+                moved = _archive_month(conn, db_path, table, month, cutoff, archive_dir)
+                result[table][month] = moved
+                print(f"📦 {table} {month}: 归档 {moved} 行")
+
+        if vacuum and any(result.values()):
+            print("🧹 VACUUM 主库...")
+            conn.execute('VACUUM')
+    finally:
+        conn.close()
+    return result
+
+
+# ==================== 跨分区查询 ====================
+
+def find_partitions(cursor, table, start_time=None, end_time=None):
+    """与 [start_time, end_time] 重叠的分区（相对路径列表，按月份排序）"""
+    exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'archive_partitions'")
+    if not exists.fetchone():
+        return []
+    sql = 'SELECT path FROM archive_partitions WHERE table_name = ? AND row_count > 0'
+    params = [table]
+    if start_time:
+        sql += ' AND last_time >= ?'
+        params.append(start_time)
+    if end_time:
+        sql += ' AND first_time <= ?'
+        params.append(end_time)
+    return [row[0] for row in cursor.execute(sql + ' ORDER BY month', params)]
+
+
+def select_across(conn, table, sql, params=(), start_time=None, end_time=None,
+                  sort_key=None, reverse=False, limit=None, db_path=DB_PATH):
+    """
+    在主库和时间范围涉及的分区上执行同一查询，合并结果
+
+    Args:
+        conn: 主库连接（不能处于事务中）
+        sql: 含 {table} 占位的查询，分别替换为主库表和分区表
+        sort_key: 合并后排序用的函数（行 -> 键），limit 在排序后截取
+
+    Returns:
+        (列名, 行列表)
+    """
+    cursor = conn.cursor()
+    cursor.execute(sql.format(table=f'main.{table}'), params)
+    columns = [d[0] for d in cursor.description]
+    rows = cursor.fetchall()
+
+    partitions = find_partitions(cursor, table, start_time, end_time)
+    base_dir = os.path.dirname(os.path.abspath(db_path))
+    for relative in partitions:
+        path = os.path.join(base_dir, relative)
+        if not os.path.exists(path):
+            print(f"⚠️  归档分区不存在: {path}")
+            continue
+        conn.execute(f'ATTACH DATABASE ? AS {PARTITION_ALIAS}', (path,))
+        try:
+            cursor.execute(sql.format(table=f'{PARTITION_ALIAS}.{table}'), params)
+            part_columns = [d[0] for d in cursor.description]
+            if part_columns == columns:
+                rows.extend(cursor.fetchall())
+            else:
+                # 分区建得早，缺少主库后来加的列
+                index = {name: i for i, name in enumerate(part_columns)}
+                rows.extend(tuple(row[index[name]] if name in index else None for name in columns)
+                            for row in cursor.fetchall())
+        finally:
+            conn.execute(f'DETACH DATABASE {PARTITION_ALIAS}')
+
+    if partitions and sort_key:
+        rows.sort(key=sort_key, reverse=reverse)
+    if limit is not None:
+        rows = rows[:limit]
+    return columns, rows
+
+
+def print_status(db_path=DB_PATH):
+    conn = get_connection(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT table_name, month, row_count, first_time, last_time, path, archived_at
+            FROM archive_partitions ORDER BY table_name, month
+        ''').fetchall()
+    finally:
+        conn.close()
+    print(f"\n📦 已归档分区: {len(rows)} 个")
+    for table, month, count, first, last, path, archived_at in rows:
+        print(f"   {table} {month}: {count} 行 ({first} ~ {last}) -> {path}  [{archived_at}]")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--status' in args:
+        ensure_schema(DB_PATH)
+        print_status()
+    else:
+        days = int(args[args.index('--days') + 1]) if '--days' in args else RETENTION_DAYS
+        print(f"🗄️  归档 {days} 天前的数据到 {ARCHIVE_DIR}/")
+        archive_old_data(DB_PATH, days, vacuum='--vacuum' in args)
+        print_status()
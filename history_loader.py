@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史快照批量加载
+按时间范围取 stats_history，再用一条 stats_id IN (...) 查询（走 idx_coin_stats_id）
+取回所有快照的币种数据，在 Python 里按 stats_id 分组，
+不再每条快照单独查一次 coin_history（limit=200 时从 201 次查询变为 2 次）。
+
+长时间范围的走势用 load_series：按跨度自动选原始 / 15m / 1h / 1d 粒度，
+读 stats_rollup / coin_rollup（db_schema 里由触发器维护），一个月的范围也只有几百个时间点。
+
+超过保留期的币种数据归档在按月分区里（history_archive），查询范围涉及时自动附加对应分区。
+
+两种返回格式:
+- 行格式（默认）：与原来相同，每条快照一个 dict，record['coins'] 为币种 dict 列表
+- 列格式：每个字段一个数组，币种按快照顺序首尾相接，offsets[i]:offsets[i+1] 为第 i 条快照的币种，
+  字段名只出现一次，范围大时 JSON 体积小很多
+"""
+
+from datetime import datetime, timedelta
+
+from db_connection import get_connection
+from db_schema import ROLLUP_AGGREGATES, ROLLUP_RESOLUTIONS, ROLLUPS
+from history_archive import ARCHIVED_TABLES, select_across
+
+DB_PATH = 'crypto_data.db'
+
+# 每条 IN 查询的参数个数（低于 SQLite 默认的 999 个变量上限）
+IN_CHUNK_SIZE = 900
+
+# 自动选粒度：跨度不超过该天数时用对应粒度，超过最后一档用 1d
+RESOLUTION_SPANS = [
+    (1, 'raw'),     # 3 分钟原始数据，约 480 点
+    (7, '15m'),     # 最多约 670 点
+    (45, '1h'),     # 最多约 1080 点
+]
+
+
+def _fetch_dicts(cursor):
+    columns = [d[0] for d in cursor.description]
+    return columns, [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def query_stats(cursor, start_time=None, end_time=None, limit=100):
+    """按时间范围查 stats_history（最新在前），返回 (字段名, 记录列表)"""
+    where_clauses = []
+    params = []
+
+    if start_time:
+        where_clauses.append('record_time >= ?')
+        params.append(start_time)
+
+    if end_time:
+        where_clauses.append('record_time <= ?')
+        params.append(end_time)
+
+    where_sql = ' AND '.join(where_clauses) if where_clauses else '1=1'
+
+    cursor.execute(f'''
+        SELECT * FROM stats_history
+        WHERE {where_sql}
+        ORDER BY record_time DESC
+        LIMIT ?
+    ''', params + [limit])
+    return _fetch_dicts(cursor)
+
+
+def load_coins(conn, stats_ids, start_time=None, end_time=None, db_path=DB_PATH):
+    """
+    批量取多条快照的币种数据，已归档的快照从 start_time~end_time 涉及的分区里取
+
+    Returns:
+        (字段名, {stats_id: [币种 dict, ...]})，每条快照内按 index_num 排序
+    """
+    columns = None
+    grouped = {stats_id: [] for stats_id in stats_ids}
+    ids = list(grouped)
+
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        chunk = ids[start:start + IN_CHUNK_SIZE]
+        placeholders = ','.join('?' * len(chunk))
+        # 同一快照的币种时间相同，只会在一个库里，分组后顺序不受合并影响
+        columns, rows = select_across(conn, 'coin_history', f'''
+            SELECT * FROM {{table}}
+            WHERE stats_id IN ({placeholders})
+            ORDER BY stats_id, index_num, id
+        ''', chunk, start_time, end_time, db_path=db_path)
+        for row in rows:
+            coin = dict(zip(columns, row))
+            grouped[coin['stats_id']].append(coin)
+
+    if columns is None:
+        cursor = conn.execute('SELECT * FROM coin_history LIMIT 0')
+        columns = [d[0] for d in cursor.description]
+    return columns, grouped
+
+
+def to_columnar(stats_columns, stats_records, coin_columns, coins_by_stats):
+    """行格式 -> 列格式（stats_id 由 offsets 表达，不再逐条重复）"""
+    coin_columns = [c for c in coin_columns if c != 'stats_id']
+    stats = {c: [] for c in stats_columns}
+    coins = {c: [] for c in coin_columns}
+    offsets = [0]
+
+    for record in stats_records:
+        for c in stats_columns:
+            stats[c].append(record[c])
+        for coin in coins_by_stats.get(record['id'], ()):
+            for c in coin_columns:
+                coins[c].append(coin[c])
+        offsets.append(offsets[-1] + len(coins_by_stats.get(record['id'], ())))
+
+    return {
+        'stats': stats,
+        'coins': coins,
+        'offsets': offsets
+    }
+
+
+def load_history(start_time=None, end_time=None, limit=100, columnar=False, db_path=DB_PATH):
+    """
+    查询历史快照及其币种数据（1 次统计查询 + 每 IN_CHUNK_SIZE 条快照 1 次币种查询）
+
+    Args:
+        columnar: True 返回列格式 dict，否则返回行格式列表（与原 query_history_data 相同）
+    """
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+
+    try:
+        stats_columns, stats_records = query_stats(cursor, start_time, end_time, limit)
+        times = [r['record_time'] for r in stats_records]
+        coin_columns, coins_by_stats = load_coins(conn, [r['id'] for r in stats_records],
+                                                  min(times, default=None), max(times, default=None), db_path)
+    finally:
+        conn.close()
+
+    if columnar:
+        return to_columnar(stats_columns, stats_records, coin_columns, coins_by_stats)
+
+    for record in stats_records:
+        record['coins'] = coins_by_stats[record['id']]
+    return stats_records
+
+
+# ==================== 多粒度走势 ====================
+
+def _parse_time(value):
+    return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S' if len(value) > 10 else '%Y-%m-%d')
+
+
+def pick_resolution(start_time, end_time):
+    """按时间跨度选粒度"""
+    span = _parse_time(end_time) - _parse_time(start_time)
+    for days, resolution in RESOLUTION_SPANS:
+        if span <= timedelta(days=days):
+            return resolution
+    return '1d'
+
+
+def bucket_start(resolution, time_str):
+    """所在时间段的起点（与 db_schema.rollup_bucket 一致，按当天零点对齐）"""
+    value = _parse_time(time_str)
+    seconds = ROLLUP_RESOLUTIONS[resolution][0]
+    midnight = value.replace(hour=0, minute=0, second=0)
+    offset = int((value - midnight).total_seconds()) // seconds * seconds
+    return (midnight + timedelta(seconds=offset)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _series_columns(name, resolution):
+    """走势查询的 SELECT 列：原始数据每行当作只有一个样本的时间段"""
+    spec = ROLLUPS[name]
+    if resolution == 'raw':
+        columns = ['record_time AS bucket', *spec['keys'], '1 AS sample_count',
+                   'record_time AS first_time', 'record_time AS last_time']
+        for metric, expr in spec['metrics'].items():
+            value = expr.format(row='')
+            columns += [f'{value} AS {metric}_{agg}' for agg in ('first', 'last', 'min', 'max', 'avg')]
+        return columns
+
+    columns = ['bucket', *spec['keys'], 'sample_count', 'first_time', 'last_time']
+    for metric in spec['metrics']:
+        columns += [f'{metric}_{agg}' for agg in ROLLUP_AGGREGATES[:4]]
+        columns.append(f'{metric}_sum / NULLIF({metric}_n, 0) AS {metric}_avg')
+    return columns
+
+
+def _query_series(conn, name, resolution, start_time, end_time, symbols=None, db_path=DB_PATH):
+    """查询一个汇总表（或原始表）在时间范围内的走势，返回列格式 dict"""
+    spec = ROLLUPS[name]
+    select = ', '.join(_series_columns(name, resolution))
+    params = []
+    if resolution == 'raw':
+        sql = f"SELECT {select} FROM {{table}} WHERE record_time >= ? AND record_time <= ?"
+        params += [start_time, end_time]
+    else:
+        # 起点所在的时间段也要包含
+        sql = f"SELECT {select} FROM {{table}} WHERE resolution = ? AND bucket >= ? AND bucket <= ?"
+        params += [resolution, bucket_start(resolution, start_time), end_time]
+    if symbols and 'symbol' in spec['keys']:
+        sql += f" AND symbol IN ({','.join('?' * len(symbols))})"
+        params += list(symbols)
+    order = ['bucket', *spec['keys']]
+    sql += f" ORDER BY {', '.join(order)}"
+
+    if resolution == 'raw' and spec['source'] in ARCHIVED_TABLES:
+        # 原始币种数据可能已归档
+        columns, rows = select_across(conn, spec['source'], sql, params, start_time, end_time,
+                                      sort_key=lambda row: row[:len(order)], db_path=db_path)
+    else:
+        table = spec['source'] if resolution == 'raw' else name
+        cursor = conn.execute(sql.format(table=table), params)
+        columns = [d[0] for d in cursor.description]
+        rows = cursor.fetchall()
+    return {column: [row[i] for row in rows] for i, column in enumerate(columns)}
+
+
+def load_series(start_time=None, end_time=None, resolution='auto', symbols=None, db_path=DB_PATH):
+    """
+    统计指标和币种价格的走势（每个时间段的首/末/最小/最大/平均）
+
+    Args:
+        start_time/end_time: 缺省为最近一天
+        resolution: 'auto' 按跨度选择，或 'raw' / '15m' / '1h' / '1d'
+        symbols: 只取这些币种的价格，缺省为全部
+
+    Returns:
+        {'resolution', 'start_time', 'end_time', 'stats': {列: [...]}, 'coins': {列: [...]}}
+    """
+    if not end_time:
+        end_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    elif len(end_time) == 10:
+        end_time += ' 23:59:59'
+    if not start_time:
+        start_time = (_parse_time(end_time) - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    elif len(start_time) == 10:
+        start_time += ' 00:00:00'
+
+    if resolution == 'auto':
+        resolution = pick_resolution(start_time, end_time)
+    elif resolution != 'raw' and resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(f'不支持的粒度: {resolution}')
+
+    conn = get_connection(db_path)
+
+    try:
+        return {
+            'resolution': resolution,
+            'start_time': start_time,
+            'end_time': end_time,
+            'stats': _query_series(conn, 'stats_rollup', resolution, start_time, end_time, db_path=db_path),
+            'coins': _query_series(conn, 'coin_rollup', resolution, start_time, end_time, symbols, db_path),
+        }
+    finally:
+        conn.close()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+走势数据接口 /api/history/series
+history_api.py 和 home_data_api_v2.py 共用这一个实现，各自用 register_series_route(app) 注册
+"""
+
+from flask import jsonify, request
+
+from history_loader import load_series
+
+
+def query_history_series():
+    """走势数据：按时间跨度自动选原始 / 15m / 1h / 1d 粒度"""
+    try:
+        start_time = request.args.get('start_time')
+        end_time = request.args.get('end_time')
+        resolution = request.args.get('resolution', 'auto')
+        symbols = [s for s in request.args.get('symbols', '').split(',') if s]
+
+        series = load_series(start_time, end_time, resolution, symbols)
+
+        return jsonify({
+            'success': True,
+            'data': series
+        })
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def register_series_route(app):
+    """在 app 上注册 /api/history/series"""
+    app.add_url_rule('/api/history/series', view_func=query_history_series)
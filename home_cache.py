@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+首页最新数据的快速缓存（home_data_cache 表）
+采集守护进程（ingestion_daemon 的 home 任务）抓到新文件后写入，
+home_data_api_v2 的缓存过期时先读这里，有新鲜的行就直接用，不再自己抓取 Google Drive。
+本模块不依赖 Flask，守护进程可以直接导入。
+"""
+
+import json
+import sqlite3
+import time
+from datetime import datetime
+
+from db_connection import get_connection
+from snapshot_parser import parse_snapshot, coin_displays
+
+DB_PATH = 'crypto_data.db'
+
+
+def parse_api_data(content):
+    """解析首页数据内容（接口格式：统计和币种都保留原文）"""
+    snapshot = parse_snapshot(content)
+    stats = snapshot.text_stats(
+        labeled=[('急涨总和', 'rushUp'), ('急跌总和', 'rushDown'),
+                 ('五种状态', 'status'), ('急涨急跌比值', 'ratio')],
+        plain=[('绿色数量', 'greenCount'), ('百分比', 'percentage')]
+    )
+    coins = coin_displays(snapshot.coin_rows)
+
+    return {
+        'stats': stats,
+        'coins': coins,
+        'updateTime': snapshot.update_time
+    }
+
+
+def save_home_cache(parsed_data, filename, time_diff, update_time=None, db_path=DB_PATH):
+    """保存一份接口格式的首页数据到缓存表，返回是否成功"""
+    update_time = update_time or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    stats = parsed_data.get('stats', {})
+    coins = parsed_data.get('coins', [])
+
+    try:
+        conn = get_connection(db_path)
+        try:
+            conn.execute("""
+                INSERT INTO home_data_cache
+                (filename, time_diff, rush_up, rush_down, status, ratio,
+                 green_count, percentage, coin_data, update_time, parsed_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                filename,
+                time_diff,
+                stats.get('rushUp', 0),
+                stats.get('rushDown', 0),
+                stats.get('status', ''),
+                stats.get('ratio', 0),
+                stats.get('greenCount', 0),
+                stats.get('percentage', 0),
+                json.dumps(coins, ensure_ascii=False),
+                update_time,
+                json.dumps(parsed_data, ensure_ascii=False)
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        print(f"   ⚠️  保存到home_cache失败: {str(e)}")
+        return False
+
+
+def load_home_cache(max_age, db_path=DB_PATH):
+    """
+    最新一行缓存，写入不超过 max_age 秒时返回，否则返回 None
+
+    Returns:
+        {'parsed_data', 'filename', 'time_diff', 'updated_at'(时间戳)}
+    """
+    conn = get_connection(db_path)
+    try:
+        row = conn.execute("""
+            SELECT parsed_data, filename, time_diff, update_time FROM home_data_cache
+            WHERE parsed_data IS NOT NULL
+            ORDER BY update_time DESC LIMIT 1
+        """).fetchone()
+    except sqlite3.OperationalError:
+        # 还没迁移到带 parsed_data 列的表结构
+        return None
+    finally:
+        conn.close()
+
+    if not row:
+        return None
+    updated_at = datetime.strptime(row[3], '%Y-%m-%d %H:%M:%S').timestamp()
+    if time.time() - updated_at > max_age:
+        return None
+    return {
+        'parsed_data': json.loads(row[0]),
+        'filename': row[1],
+        'time_diff': row[2],
+        'updated_at': updated_at
+    }
@@ -13,6 +13,12 @@ import time
 from datetime import datetime, timedelta
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from home_cache import parse_api_data as parse_home_data, save_home_cache, load_home_cache
+from db_connection import get_connection
+from history_loader import load_history
+from history_series_api import register_series_route
+from sync_signal_stats import sync_signal_stats
+from db_schema import ensure_schema, get_daily_summary
 
 app = Flask(__name__)
 
@@ -33,117 +39,69 @@ UPDATE_CYCLE = 180  # 3分钟更新一次（匹配数据源更新频率）
 GDRIVE_WAIT_TIME = 10  # 等待到第10秒开始获取数据
 GDRIVE_WAIT_MAX = 15  # 最多等待到第15秒
 
-def parse_home_data(content):
-    """解析首页数据内容"""
-    lines = content.strip().split('\n')
-    
-    stats = {}
-    coins = []
-    
-    in_coin_section = False
-    
-    for line in lines:
-        line = line.strip()
-        
-        # 解析统计数据
-        if line.startswith('透明标签_'):
-            parts = line.split('=')
-            if len(parts) == 2:
-                key = parts[0].replace('透明标签_', '')
-                value = parts[1]
-                
-                if '急涨总和' in key:
-                    stats['rushUp'] = value.split('：')[1] if '：' in value else value
-                elif '急跌总和' in key:
-                    stats['rushDown'] = value.split('：')[1] if '：' in value else value
-                elif '五种状态' in key:
-                    stats['status'] = value.split('：')[1] if '：' in value else value
-                elif '急涨急跌比值' in key:
-                    stats['ratio'] = value.split('：')[1] if '：' in value else value
-                elif '绿色数量' in key:
-                    stats['greenCount'] = value
-                elif '百分比' in key:
-                    stats['percentage'] = value
-        
-        # 币种数据
-        if '[超级列表框_首页开始]' in line:
-            in_coin_section = True
-            continue
-        
-        if '[超级列表框_首页结束]' in line:
-            break
-        
-        if in_coin_section and '|' in line:
-            parts = line.split('|')
-            if len(parts) >= 16:
-                coin = {
-                    'index': parts[0],
-                    'symbol': parts[1],
-                    'change': parts[2],
-                    'rushUp': parts[3],
-                    'rushDown': parts[4],
-                    'updateTime': parts[5],
-                    'highPrice': parts[6],
-                    'highTime': parts[7],
-                    'decline': parts[8],
-                    'change24h': parts[9],
-                    'rank': parts[12],
-                    'currentPrice': parts[13],
-                    'ratio1': parts[14],
-                    'ratio2': parts[15]
-                }
-                coins.append(coin)
-    
-    # 获取更新时间
-    update_time = coins[0]['updateTime'] if coins else ''
-    
-    return {
-        'stats': stats,
-        'coins': coins,
-        'updateTime': update_time
-    }
+# 收件箱目录 - 设置后上游直接把txt写到该目录，不再抓取Google Drive
+INBOX_DIR = os.environ.get('HOME_DATA_INBOX')
+INBOX_WATCHER = None
 
 def save_to_home_cache(parsed_data, filename, time_diff, update_time):
     """保存首页数据到缓存表"""
-    import json
+    return save_home_cache(parsed_data, filename, time_diff, update_time)
+
+def apply_home_content(filename, content, time_diff):
+    """解析一份首页数据文件并更新缓存、快速缓存表、历史数据库和比价"""
+    parsed_data = parse_home_data(content)
+    
+    CACHE['data'] = {
+        'parsed_data': parsed_data,
+        'filename': filename,
+        'time_diff': time_diff
+    }
+    CACHE['last_update'] = time.time()
     
+    print(f"✅ 缓存更新成功")
+    print(f"   文件名: {filename}")
+    print(f"   时间差: {time_diff:.1f} 分钟")
+    
+    # 保存到home_data_cache表（快速缓存）
     try:
-        conn = sqlite3.connect('crypto_data.db')
-        cursor = conn.cursor()
+        update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if save_to_home_cache(parsed_data, filename, time_diff, update_time):
+            print(f"   💾 已保存到快速缓存表")
+    except Exception as cache_error:
+        print(f"   ⚠️  快速缓存保存失败: {str(cache_error)}")
+    
+    # 自动保存到历史数据库
+    try:
+        from import_history_simple import parse_filename_datetime, parse_home_data as parse_for_db, save_to_database
         
-        # 提取统计数据
-        stats = parsed_data.get('stats', {})
-        coins = parsed_data.get('coins', [])
-        
-        cursor.execute("""
-            INSERT INTO home_data_cache 
-            (filename, time_diff, rush_up, rush_down, status, ratio, 
-             green_count, percentage, coin_data, update_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            filename,
-            time_diff,
-            stats.get('rushUp', 0),
-            stats.get('rushDown', 0),
-            stats.get('status', ''),
-            stats.get('ratio', 0),
-            stats.get('green_count', 0),
-            stats.get('percentage', 0),
-            json.dumps(coins, ensure_ascii=False),
-            update_time
-        ))
+        record_time = parse_filename_datetime(filename)
         
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        print(f"   ⚠️  保存到home_cache失败: {str(e)}")
-        return False
+        if record_time:
+            stats, coins = parse_for_db(content)
+            success, msg = save_to_database(filename, record_time, stats, coins)
+            if success:
+                print(f"   💾 已自动保存到历史数据库")
+            else:
+                print(f"   💾 历史数据库: {msg}")
+    except Exception as db_error:
+        print(f"   ⚠️  保存到历史数据库失败: {str(db_error)}")
+    
+    # 触发比价检查
+    try:
+        trigger_price_comparison(parsed_data['coins'])
+    except Exception as price_error:
+        print(f"   ⚠️  比价检查失败: {str(price_error)}")
+    
+    return parsed_data
 
 def update_cache():
     """后台更新缓存"""
     global CACHE
     
+    if INBOX_WATCHER:
+        # 收件箱模式下数据由上游直接推送，不再抓取Google Drive
+        return
+    
     if CACHE['updating']:
         print("已经在更新中，跳过...")
         return
@@ -154,57 +112,27 @@ def update_cache():
     print(f"{'='*60}")
     
     try:
+        # 采集守护进程已经写入了足够新的数据时直接采用，不再重复抓取
+        cached = load_home_cache(UPDATE_CYCLE)
+        if cached:
+            current = CACHE['data']
+            if not current or current['filename'] != cached['filename']:
+                CACHE['data'] = {
+                    'parsed_data': cached['parsed_data'],
+                    'filename': cached['filename'],
+                    'time_diff': cached['time_diff']
+                }
+                print(f"✅ 采用快速缓存表中的数据: {cached['filename']}")
+            CACHE['last_update'] = time.time()
+            return
+        
         from gdrive_home_data_reader import get_latest_file_by_sorting
         
         # 获取最新数据
         result = asyncio.run(get_latest_file_by_sorting())
         
         if result and result.get('content'):
-            parsed_data = parse_home_data(result['content'])
-            
-            CACHE['data'] = {
-                'parsed_data': parsed_data,
-                'filename': result['filename'],
-                'time_diff': result['time_diff']
-            }
-            CACHE['last_update'] = time.time()
-            
-            print(f"✅ 缓存更新成功")
-            print(f"   文件名: {result['filename']}")
-            print(f"   时间差: {result['time_diff']:.1f} 分钟")
-            
-            # 保存到home_data_cache表（快速缓存）
-            try:
-                update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                if save_to_home_cache(parsed_data, result['filename'], result['time_diff'], update_time):
-                    print(f"   💾 已保存到快速缓存表")
-            except Exception as cache_error:
-                print(f"   ⚠️  快速缓存保存失败: {str(cache_error)}")
-            
-            # 自动保存到历史数据库
-            try:
-                from import_history_simple import parse_filename_datetime, parse_home_data as parse_for_db, save_to_database
-                
-                filename = result['filename']
-                content = result['content']
-                record_time = parse_filename_datetime(filename)
-                
-                if record_time:
-                    stats, coins = parse_for_db(content)
-                    success, msg = save_to_database(filename, record_time, stats, coins)
-                    if success:
-                        print(f"   💾 已自动保存到历史数据库")
-                    else:
-                        print(f"   💾 历史数据库: {msg}")
-            except Exception as db_error:
-                print(f"   ⚠️  保存到历史数据库失败: {str(db_error)}")
-            
-            # 触发比价检查
-            try:
-                trigger_price_comparison(parsed_data['coins'])
-            except Exception as price_error:
-                print(f"   ⚠️  比价检查失败: {str(price_error)}")
-            
+            apply_home_content(result['filename'], result['content'], result['time_diff'])
             print(f"{'='*60}\n")
         else:
             print("❌ 获取数据失败")
@@ -215,96 +143,53 @@ def update_cache():
     finally:
         CACHE['updating'] = False
 
-def sync_signal_stats():
-    """同步做多做空信号统计数据"""
-    try:
-        print("\n" + "="*60)
-        print("同步信号统计数据...")
-        print("="*60)
-        
-        import requests
-        from datetime import timezone, timedelta
-        
-        BEIJING_TZ = timezone(timedelta(hours=8))
-        EXTERNAL_API = "https://8080-ieo4kftymfy546kbm6o33-2e77fc33.sandbox.novita.ai/api/filtered-signals/stats"
-        
-        # 获取数据
-        params = {
-            'limit': 200,
-            'rsi_short_threshold': 65,
-            'rsi_long_threshold': 30
-        }
-        
-        response = requests.get(EXTERNAL_API, params=params, timeout=10)
-        data = response.json()
-        
-        if not data.get('success'):
-            print(f"❌ API返回失败")
-            return False
-        
-        # 提取数据
-        summary = data.get('summary', {})
-        breakdown = data.get('breakdown', {})
-        
-        # 生成记录时间（北京时间，精确到分钟）
-        beijing_now = datetime.now(BEIJING_TZ)
-        record_time = beijing_now.strftime('%Y-%m-%d %H:%M:00')
-        
-        total_count = summary.get('total', 0)
-        long_count = summary.get('long', 0)
-        short_count = summary.get('short', 0)
-        chaodi_count = breakdown.get('抄底做多', 0)
-        dibu_count = breakdown.get('底部做多', 0)
-        dingbu_count = breakdown.get('顶部做空', 0)
-        
-        # 保存到数据库
-        import sqlite3
-        conn = sqlite3.connect('crypto_data.db')
-        cursor = conn.cursor()
-        
-        # 检查是否已存在
-        cursor.execute(
-            'SELECT id FROM signal_stats_history WHERE record_time = ?',
-            (record_time,)
-        )
-        existing = cursor.fetchone()
-        
-        if existing:
-            print(f"⏭️  记录已存在: {record_time}")
-            conn.close()
-            return False
-        
-        # 插入数据
-        cursor.execute('''
-            INSERT INTO signal_stats_history 
-            (record_time, total_count, long_count, short_count,
-             chaodi_count, dibu_count, dingbu_count, source_url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            record_time, total_count, long_count, short_count,
-            chaodi_count, dibu_count, dingbu_count, EXTERNAL_API
-        ))
-        
-        conn.commit()
-        conn.close()
-        
-        print(f"✅ 信号数据同步成功: {record_time}")
-        print(f"   总计: {total_count}, 做多: {long_count}, 做空: {short_count}")
-        print("="*60 + "\n")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ 信号数据同步失败: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+def save_panic_wash_record(data):
+    """保存一条恐慌清洗数据到 panic_wash_history，返回是否新插入"""
+    
+    # 解析数据
+    panic_indicator_str = data['panic_indicator']  # 例如: "10.77-绿"
+    parts = panic_indicator_str.split('-')
+    panic_indicator = float(parts[0])
+    panic_color = parts[1] if len(parts) > 1 else None
+    
+    trend_rating = int(data['trend_rating'])
+    market_zone = data['market_zone']
+    liquidation_24h_people = int(data['liquidation_24h_people'])
+    liquidation_24h_amount = float(data['liquidation_24h_amount'])
+    total_position = float(data['total_position'])
+    record_time = data['update_time']
+    
+    # 保存到数据库
+    conn = get_connection('crypto_data.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        INSERT OR IGNORE INTO panic_wash_history 
+        (record_time, panic_indicator, panic_color, trend_rating, market_zone,
+         liquidation_24h_people, liquidation_24h_amount, total_position)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (record_time, panic_indicator, panic_color, trend_rating, market_zone,
+          liquidation_24h_people, liquidation_24h_amount, total_position))
+    
+    inserted = cursor.rowcount > 0
+    conn.commit()
+    conn.close()
+    
+    if inserted:
+        print(f"✅ 恐慌清洗数据同步成功: {record_time}")
+        print(f"   指标: {panic_indicator} ({panic_color}), 持仓量: {total_position}亿")
+    else:
+        print(f"⚠️  恐慌清洗数据已存在: {record_time}")
+    
+    return inserted
 
 def sync_panic_wash_data():
     """同步恐慌清洗指标数据"""
+    if INBOX_WATCHER:
+        # 收件箱模式下恐慌清洗数据由上游直接推送
+        return True
+    
     try:
-        import sqlite3
-        
         # 从恐慌清洗API获取最新数据（优先使用V4读取器，支持本地文件）
         try:
             from panic_wash_reader_v5 import get_panic_wash_data_sync
@@ -319,39 +204,7 @@ def sync_panic_wash_data():
             print("⚠️  恐慌清洗数据获取失败")
             return False
         
-        # 解析数据
-        panic_indicator_str = data['panic_indicator']  # 例如: "10.77-绿"
-        parts = panic_indicator_str.split('-')
-        panic_indicator = float(parts[0])
-        panic_color = parts[1] if len(parts) > 1 else None
-        
-        trend_rating = int(data['trend_rating'])
-        market_zone = data['market_zone']
-        liquidation_24h_people = int(data['liquidation_24h_people'])
-        liquidation_24h_amount = float(data['liquidation_24h_amount'])
-        total_position = float(data['total_position'])
-        record_time = data['update_time']
-        
-        # 保存到数据库
-        conn = sqlite3.connect('crypto_data.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR IGNORE INTO panic_wash_history 
-            (record_time, panic_indicator, panic_color, trend_rating, market_zone,
-             liquidation_24h_people, liquidation_24h_amount, total_position)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (record_time, panic_indicator, panic_color, trend_rating, market_zone,
-              liquidation_24h_people, liquidation_24h_amount, total_position))
-        
-        conn.commit()
-        conn.close()
-        
-        if cursor.rowcount > 0:
-            print(f"✅ 恐慌清洗数据同步成功: {record_time}")
-            print(f"   指标: {panic_indicator} ({panic_color}), 持仓量: {total_position}亿")
-        else:
-            print(f"⚠️  恐慌清洗数据已存在: {record_time}")
+        save_panic_wash_record(data)
         
         return True
         
@@ -361,6 +214,77 @@ def sync_panic_wash_data():
         traceback.print_exc()
         return False
 
+def parse_panic_wash_content(content):
+    """
+    解析恐慌清洗.txt内容
+    格式: 10.77-绿|5-多头主升区间-99305-2.26-92.18-2025-12-02 20:58:50
+    """
+    import re
+    
+    for line in content.strip().split('\n'):
+        line = line.strip()
+        if '|' not in line:
+            continue
+        
+        panic_indicator, other_data = [part.strip() for part in line.split('|', 1)]
+        time_match = re.search(r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})$', other_data)
+        if not time_match:
+            continue
+        
+        other_parts = other_data[:time_match.start()].rstrip('-').split('-')
+        if len(other_parts) >= 5:
+            return {
+                'panic_indicator': panic_indicator,
+                'trend_rating': other_parts[0].strip(),
+                'market_zone': other_parts[1].strip(),
+                'liquidation_24h_people': other_parts[2].strip(),
+                'liquidation_24h_amount': other_parts[3].strip(),
+                'total_position': other_parts[4].strip(),
+                'update_time': time_match.group(1)
+            }
+    
+    return None
+
+def handle_inbox_file(kind, path, content):
+    """处理收件箱中到达的文件"""
+    filename = os.path.basename(path)
+    
+    if kind == 'home':
+        from import_history_simple import parse_filename_datetime
+        record_time = parse_filename_datetime(filename)
+        beijing_now = datetime.utcnow() + timedelta(hours=8)
+        time_diff = (beijing_now - datetime.strptime(record_time, '%Y-%m-%d %H:%M:%S')).total_seconds() / 60
+        apply_home_content(filename, content, time_diff)
+    
+    elif kind == 'signal':
+        from signal_collector import parse_signal_line, save_signal_to_db
+        # 信号.txt 每行一条记录，最后一行是最新的
+        for line in reversed(content.strip().split('\n')):
+            signal_data = parse_signal_line(line)
+            if signal_data:
+                save_signal_to_db(signal_data, signal_data['record_time'][:10])
+                print(f"✅ 信号数据入库: {signal_data['record_time']}")
+                break
+        else:
+            raise ValueError('信号.txt 中没有有效数据行')
+    
+    elif kind == 'panic':
+        data = parse_panic_wash_content(content)
+        if not data:
+            raise ValueError('恐慌清洗.txt 中没有有效数据行')
+        save_panic_wash_record(data)
+
+def start_inbox_mode(inbox_dir):
+    """启动收件箱模式"""
+    global INBOX_WATCHER
+    from inbox_watcher import InboxWatcher
+    from signal_collector import init_database as init_signal_database
+    
+    os.makedirs(inbox_dir, exist_ok=True)
+    init_signal_database()
+    INBOX_WATCHER = InboxWatcher(inbox_dir, handle_inbox_file).start()
+    return INBOX_WATCHER
+
 def background_updater():
     """后台定时更新线程 - 严格每3分钟更新一次"""
     print("🚀 后台更新线程启动")
@@ -553,6 +477,15 @@ def get_home_data():
             'error': str(e)
         }), 500
 
+@app.route('/api/browser-pool/health')
+def browser_pool_health():
+    """共享浏览器池健康状态"""
+    from browser_pool import get_browser_pool
+    return jsonify({
+        'success': True,
+        'data': get_browser_pool().health_check()
+    })
+
 @app.route('/api/home-data/force-refresh')
 def force_refresh_home_data():
     """强制刷新首页数据API（绕过缓存立即获取最新数据）"""
@@ -587,87 +520,19 @@ def force_refresh_home_data():
 
 # ==================== 历史数据API ====================
 
-def query_history_data(start_time=None, end_time=None, limit=100):
-    """查询历史数据"""
-    import sqlite3
-    conn = sqlite3.connect('crypto_data.db')
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    try:
-        # 构建查询条件
-        where_clauses = []
-        params = []
-        
-        if start_time:
-            where_clauses.append('record_time >= ?')
-            params.append(start_time)
-        
-        if end_time:
-            where_clauses.append('record_time <= ?')
-            params.append(end_time)
-        
-        where_sql = ' AND '.join(where_clauses) if where_clauses else '1=1'
-        
-        # 查询统计数据
-        cursor.execute(f'''
-            SELECT * FROM stats_history
-            WHERE {where_sql}
-            ORDER BY record_time DESC
-            LIMIT ?
-        ''', params + [limit])
-        
-        stats_records = [dict(row) for row in cursor.fetchall()]
-        
-        # 为每条统计数据查询对应的币种数据
-        for record in stats_records:
-            cursor.execute('''
-                SELECT * FROM coin_history
-                WHERE stats_id = ?
-                ORDER BY index_num
-            ''', (record['id'],))
-            
-            record['coins'] = [dict(row) for row in cursor.fetchall()]
-        
-        return stats_records
-        
-    finally:
-        conn.close()
+def query_history_data(start_time=None, end_time=None, limit=100, columnar=False):
+    """查询历史数据（币种数据批量加载，不再逐条查询）"""
+    return load_history(start_time, end_time, limit, columnar=columnar, db_path='crypto_data.db')
 
 @app.route('/api/history/dates')
 def get_dates():
     """获取有数据的日期列表"""
     try:
-        import sqlite3
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT DISTINCT DATE(record_time) as date
-            FROM stats_history
-            ORDER BY date DESC
-        ''')
-        
-        dates = [row[0] for row in cursor.fetchall()]
-        
-        # 获取每个日期的统计信息
-        date_info = []
-        for date in dates:
-            cursor.execute('''
-                SELECT COUNT(*) as count,
-                       MIN(record_time) as min_time,
-                       MAX(record_time) as max_time
-                FROM stats_history
-                WHERE DATE(record_time) = ?
-            ''', (date,))
-            
-            row = cursor.fetchone()
-            date_info.append({
-                'date': date,
-                'count': row[0],
-                'min_time': row[1],
-                'max_time': row[2]
-            })
+        # 每日汇总表随写入维护，不再逐日 COUNT/MIN/MAX
+        date_info = get_daily_summary(cursor, 'stats')
         
         conn.close()
         
@@ -693,17 +558,19 @@ def query_history():
         end_time = request.args.get('end_time')
         date = request.args.get('date')  # 如果只查询某一天
         limit = int(request.args.get('limit', 100))
+        columnar = request.args.get('format') == 'columnar'
         
         # 如果指定了日期，自动设置时间范围
         if date:
             start_time = f"{date} 00:00:00"
             end_time = f"{date} 23:59:59"
         
-        records = query_history_data(start_time, end_time, limit)
+        records = query_history_data(start_time, end_time, limit, columnar)
         
         return jsonify({
             'success': True,
-            'count': len(records),
+            'count': len(records['offsets']) - 1 if columnar else len(records),
+            'format': 'columnar' if columnar else 'rows',
             'data': records,
             'query': {
                 'start_time': start_time,
@@ -720,12 +587,13 @@ def query_history():
             'error': str(e)
         }), 500
 
+register_series_route(app)
+
 @app.route('/api/history/stats')
 def get_history_stats():
     """获取数据库统计信息"""
     try:
-        import sqlite3
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
         cursor.execute('SELECT COUNT(*) FROM stats_history')
@@ -737,7 +605,7 @@ def get_history_stats():
         cursor.execute('SELECT MIN(record_time), MAX(record_time) FROM stats_history')
         time_range = cursor.fetchone()
         
-        cursor.execute('SELECT COUNT(DISTINCT DATE(record_time)) FROM stats_history')
+        cursor.execute("SELECT COUNT(*) FROM daily_summary WHERE kind = 'stats'")
         day_count = cursor.fetchone()[0]
         
         conn.close()
@@ -789,7 +657,6 @@ def save_signal_stats():
     """保存信号统计数据"""
     try:
         from flask import request
-        import sqlite3
         
         data = request.json
         record_time = data.get('record_time')
@@ -797,7 +664,7 @@ def save_signal_stats():
         if not record_time:
             record_time = datetime.now().strftime('%Y-%m-%d %H:%M:00')
         
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -845,7 +712,7 @@ def query_signal_stats():
         end_time = request.args.get('end_time')
         limit = request.args.get('limit', 200, type=int)
         
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -858,8 +725,8 @@ def query_signal_stats():
                 where_clauses.append('record_time BETWEEN ? AND ?')
                 params.extend([f'{date} {start_time}:00', f'{date} {end_time}:59'])
             else:
-                where_clauses.append('DATE(record_time) = ?')
-                params.append(date)
+                where_clauses.append("record_time >= ? AND record_time < date(?, '+1 day')")
+                params.extend([date, date])
         
         where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ''
         
@@ -910,9 +777,8 @@ def query_signal_stats():
 def signal_stats_db_stats():
     """获取信号统计数据库统计信息"""
     try:
-        import sqlite3
         
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
         cursor.execute('SELECT COUNT(*) FROM signal_stats_history')
@@ -944,9 +810,8 @@ def signal_stats_db_stats():
 def get_latest_signal_stats():
     """获取最新的信号统计数据"""
     try:
-        import sqlite3
         
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
         # 查询最新的一条记录
@@ -992,7 +857,6 @@ def get_latest_signal_stats():
 def get_panic_wash_history():
     """查询恐慌清洗历史数据"""
     try:
-        import sqlite3
         from flask import request
         
         # 获取查询参数
@@ -1000,7 +864,7 @@ def get_panic_wash_history():
         end_time = request.args.get('end')
         limit = request.args.get('limit', 1000)  # 默认最多返回1000条
         
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
         # 查询历史数据
@@ -1098,7 +962,7 @@ def price_comparison_page():
 
 @app.route('/api/price-comparison/report')
 def get_price_comparison_report():
-    """获取完整比价报告"""
+    """获取完整比价报告（每批比价后生成，带版本号）"""
     try:
         report = price_comparison.get_full_report()
         return jsonify(report)
@@ -1140,6 +1004,36 @@ def get_today_records():
             'error': str(e)
         }), 500
 
+@app.route('/api/price-comparison/rolling')
+def get_rolling_extremes():
+    """
+    滑动窗口最高/最低价
+
+    参数:
+        symbols: 逗号分隔的币种，缺省为全部
+        windows: 逗号分隔的窗口（如 24h,7d），缺省为全部已配置窗口
+    """
+    try:
+        from flask import request
+        
+        symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+        windows = [w.strip() for w in request.args.get('windows', '').split(',') if w.strip()]
+        result = price_comparison.get_rolling_extremes(symbols or None, windows or None)
+        return jsonify({
+            'success': True,
+            **result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 def trigger_price_comparison(coins_data):
     """
     触发比价检查
@@ -1181,6 +1075,13 @@ if __name__ == '__main__':
     print("缓存有效期: 5 分钟")
     print("="*60)
     
+    ensure_schema('crypto_data.db')
+    
+    # 收件箱模式：上游直接写入共享目录
+    if INBOX_DIR:
+        start_inbox_mode(INBOX_DIR)
+        print(f"✅ 收件箱模式已启用: {INBOX_DIR}\n")
+    
     # 启动后台更新线程
     updater_thread = threading.Thread(target=background_updater, daemon=True)
     updater_thread.start()
@@ -8,6 +8,7 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import sqlite3
+from db_connection import get_connection
 from datetime import datetime, timedelta
 import pytz
 
@@ -15,7 +16,7 @@ app = Flask(__name__)
 CORS(app)
 
 # 数据库配置
-DB_PATH = 'homepage_data.db'
+DB_PATH = 'crypto_data.db'
 
 # 北京时区
 BEIJING_TZ = pytz.timezone('Asia/Shanghai')
@@ -28,7 +29,7 @@ def get_beijing_time():
 
 def get_db_connection():
     """获取数据库连接"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
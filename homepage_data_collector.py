@@ -5,13 +5,15 @@
 从 Google Drive 读取最新的txt文件并存储到数据库
 """
 
-import sqlite3
 import time
 from datetime import datetime, timedelta
 import pytz
 import os
 import re
 import random
+from snapshot_parser import parse_snapshot, coin_detail, percent_value, COIN_FIELD_COUNT
+from db_connection import get_connection
+from db_schema import ensure_schema, insert_summary_record
 
 # 北京时区
 BEIJING_TZ = pytz.timezone('Asia/Shanghai')
@@ -20,7 +22,7 @@ BEIJING_TZ = pytz.timezone('Asia/Shanghai')
 GOOGLE_DRIVE_FOLDER_ID = "1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV"
 
 # 数据库配置
-DB_PATH = 'homepage_data.db'
+DB_PATH = 'crypto_data.db'
 
 # 采集间隔（秒）
 COLLECTION_INTERVAL = 600  # 10分钟
@@ -51,66 +53,8 @@ def get_today_folder_name():
 
 
 def init_database():
-    """初始化数据库表结构"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 创建汇总数据表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS summary_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            rise_total INTEGER,
-            fall_total INTEGER,
-            five_states TEXT,
-            rise_fall_ratio REAL,
-            green_count INTEGER,
-            green_percent REAL,
-            count_times INTEGER,
-            all_green_score REAL,
-            price_lowest_score REAL,
-            price_new_high INTEGER,
-            fall_count INTEGER,
-            diff_result REAL,
-            record_time TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(record_time)
-        )
-    ''')
-    
-    # 创建币种详情表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS coin_details (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            summary_id INTEGER,
-            seq_num INTEGER,
-            coin_name TEXT,
-            rise_speed REAL,
-            rise_signal INTEGER,
-            fall_signal INTEGER,
-            update_time TEXT,
-            history_high REAL,
-            high_time TEXT,
-            drop_from_high REAL,
-            change_24h REAL,
-            plus_4_percent INTEGER,
-            minus_3_percent INTEGER,
-            ranking INTEGER,
-            current_price REAL,
-            high_ratio REAL,
-            low_ratio REAL,
-            anomaly TEXT,
-            record_time TEXT NOT NULL,
-            FOREIGN KEY (summary_id) REFERENCES summary_data(id)
-        )
-    ''')
-    
-    # 创建索引
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_summary_time ON summary_data(record_time)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_coin_time ON coin_details(record_time)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_coin_summary ON coin_details(summary_id)')
-    
-    conn.commit()
-    conn.close()
+    """初始化数据库表结构（汇总和币种写入 stats_history / coin_history，见 db_schema）"""
+    ensure_schema(DB_PATH)
     print(f"数据库初始化完成: {DB_PATH}")
 
 
@@ -158,106 +102,20 @@ def parse_coin_line(line):
     解析币种详情行
     格式: 序号|币名|涨速|急涨|急跌|更新时间|历史高位|高位时间|与现价跌幅|24涨幅|+4%|-3%|排行|当前价格|最高占比|最低占比|异动|
     """
-    try:
-        parts = [p.strip() for p in line.split('|')]
-        if len(parts) >= 16:
-            def safe_int(s):
-                try:
-                    return int(s) if s and s.strip() else 0
-                except:
-                    return 0
-            
-            def safe_float(s):
-                try:
-                    return float(s) if s and s.strip() else 0.0
-                except:
-                    return 0.0
-            
-            return {
-                'seq_num': safe_int(parts[0]),
-                'coin_name': parts[1] if len(parts) > 1 else '',
-                'rise_speed': safe_float(parts[2]),
-                'rise_signal': safe_int(parts[3]),
-                'fall_signal': safe_int(parts[4]),
-                'update_time': parts[5] if len(parts) > 5 else '',
-                'history_high': safe_float(parts[6]),
-                'high_time': parts[7] if len(parts) > 7 else '',
-                'drop_from_high': safe_float(parts[8]),
-                'change_24h': safe_float(parts[9]),
-                'plus_4_percent': safe_int(parts[10]),
-                'minus_3_percent': safe_int(parts[11]),
-                'ranking': safe_int(parts[12]),
-                'current_price': safe_float(parts[13]),
-                'high_ratio': safe_float(parts[14]),
-                'low_ratio': safe_float(parts[15]),
-                'anomaly': parts[16] if len(parts) > 16 else ''
-            }
-    except Exception as e:
-        print(f"解析币种行失败: {line}, 错误: {e}")
-    return None
+    parts = [p.strip() for p in line.split('|')]
+    if len(parts) < COIN_FIELD_COUNT:
+        return None
+    return coin_detail(parts)
 
 
 def save_to_database(summary_data, coins_data, record_time):
     """保存数据到数据库"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
-        # 保存汇总数据
-        cursor.execute('''
-            INSERT OR REPLACE INTO summary_data 
-            (rise_total, fall_total, five_states, rise_fall_ratio, green_count, 
-             green_percent, count_times, all_green_score, price_lowest_score, 
-             price_new_high, fall_count, diff_result, record_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            summary_data['rise_total'],
-            summary_data['fall_total'],
-            summary_data['five_states'],
-            summary_data['rise_fall_ratio'],
-            summary_data['green_count'],
-            summary_data['green_percent'],
-            summary_data['count_times'],
-            summary_data['all_green_score'],
-            summary_data['price_lowest_score'],
-            summary_data['price_new_high'],
-            summary_data['fall_count'],
-            summary_data['diff_result'],
-            record_time
-        ))
-        
-        summary_id = cursor.lastrowid
-        
-        # 保存币种详情
-        for coin in coins_data:
-            cursor.execute('''
-                INSERT INTO coin_details 
-                (summary_id, seq_num, coin_name, rise_speed, rise_signal, fall_signal,
-                 update_time, history_high, high_time, drop_from_high, change_24h,
-                 plus_4_percent, minus_3_percent, ranking, current_price, 
-                 high_ratio, low_ratio, anomaly, record_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                summary_id,
-                coin['seq_num'],
-                coin['coin_name'],
-                coin['rise_speed'],
-                coin['rise_signal'],
-                coin['fall_signal'],
-                coin['update_time'],
-                coin['history_high'],
-                coin['high_time'],
-                coin['drop_from_high'],
-                coin['change_24h'],
-                coin['plus_4_percent'],
-                coin['minus_3_percent'],
-                coin['ranking'],
-                coin['current_price'],
-                coin['high_ratio'],
-                coin['low_ratio'],
-                coin['anomaly'],
-                record_time
-            ))
+        # 同一分钟已有数据时不重复写入
+        insert_summary_record(cursor, summary_data, coins_data, record_time, source='homepage_data_collector')
         
         conn.commit()
         conn.close()
@@ -506,57 +364,24 @@ def parse_txt_content(content):
     解析TXT文件内容
     返回: (summary_data, coin_data_list)
     """
-    lines = content.split('\n')
+    snapshot = parse_snapshot(content)
+    stats = snapshot.stats
     
-    # 解析汇总数据
+    # 解析汇总数据（文件中没有的项不写入）
     summary_data = {}
-    
-    for line in lines:
-        if '透明标签_急涨总和' in line:
-            match = re.search(r'急涨：(\d+)', line)
-            if match:
-                summary_data['rise_total'] = int(match.group(1))
-        
-        elif '透明标签_急跌总和' in line:
-            match = re.search(r'急跌：(\d+)', line)
-            if match:
-                summary_data['fall_total'] = int(match.group(1))
-        
-        elif '透明标签_五种状态' in line:
-            match = re.search(r'状态：([^\s]+)', line)
-            if match:
-                summary_data['five_states'] = match.group(1)
-        
-        elif '透明标签_急涨急跌比值' in line:
-            match = re.search(r'比值：([\d.]+)', line)
-            if match:
-                try:
-                    summary_data['rise_fall_ratio'] = float(match.group(1))
-                except:
-                    summary_data['rise_fall_ratio'] = 0.0
-        
-        elif '透明标签_绿色数量' in line:
-            match = re.search(r'=(\d+)', line)
-            if match:
-                summary_data['green_count'] = int(match.group(1))
-        
-        elif '透明标签_百分比' in line:
-            match = re.search(r'=(\d+)%', line)
-            if match:
-                summary_data['green_percent'] = float(match.group(1))
-        
-        elif '透明标签_计次' in line:
-            match = re.search(r'=(\d+)', line)
-            if match:
-                summary_data['count_times'] = int(match.group(1))
-        
-        elif '透明标签_差值结果' in line:
-            match = re.search(r'差值：([-\d.]+)', line)
-            if match:
-                try:
-                    summary_data['diff_result'] = float(match.group(1))
-                except:
-                    summary_data['diff_result'] = 0.0
+    fields = [
+        ('rise_total', stats['rushUp']),
+        ('fall_total', stats['rushDown']),
+        ('five_states', stats['status'].split()[0] if stats['status'] else None),
+        ('rise_fall_ratio', stats['ratioValue']),
+        ('green_count', stats['greenCount']),
+        ('green_percent', stats['percentageValue']),
+        ('count_times', stats['countTimes']),
+        ('diff_result', stats['diffValue'])
+    ]
+    for key, value in fields:
+        if value is not None:
+            summary_data[key] = value
     
     # 设置记录时间为当前时间
     beijing_tz = pytz.timezone('Asia/Shanghai')
@@ -564,40 +389,24 @@ def parse_txt_content(content):
     summary_data['record_time'] = beijing_time.strftime('%Y-%m-%d %H:%M:%S')
     
     # 解析币种数据
-    coin_data_list = []
-    in_coin_section = False
-    
-    for line in lines:
-        if '[超级列表框_首页开始]' in line:
-            in_coin_section = True
-            continue
-        elif '[超级列表框_首页结束]' in line:
-            break
-        
-        if in_coin_section and '|' in line:
-            parts = line.strip().split('|')
-            if len(parts) >= 14:
-                try:
-                    coin_data = {
-                        'seq_num': int(parts[0]),
-                        'coin_name': parts[1],
-                        'rise_speed': float(parts[2]) if parts[2] else 0.0,
-                        'rise_signal': int(parts[3]) if parts[3] else 0,
-                        'fall_signal': int(parts[4]) if parts[4] else 0,
-                        'record_time': parts[5],
-                        'history_high': float(parts[6]) if parts[6] else 0.0,
-                        'high_time': parts[7],
-                        'drop_from_high': float(parts[8]) if parts[8] else 0.0,
-                        'change_24h': float(parts[9]) if parts[9] else 0.0,
-                        'ranking': int(parts[12]) if parts[12] else 0,
-                        'current_price': float(parts[13]) if parts[13] else 0.0,
-                        'low_ratio': float(parts[14].strip('%')) if len(parts) > 14 and parts[14] else 0.0,
-                        'high_ratio': float(parts[15].strip('%')) if len(parts) > 15 and parts[15] else 0.0,
-                    }
-                    coin_data_list.append(coin_data)
-                except Exception as e:
-                    print(f"解析币种数据失败: {line}, 错误: {e}")
-                    continue
+    coin_data_list = [
+        {
+            'seq_num': coin['index'],
+            'coin_name': coin['symbol'],
+            'rise_speed': coin['change'],
+            'rise_signal': coin['rushUp'],
+            'fall_signal': coin['rushDown'],
+            'record_time': coin['updateTime'],
+            'history_high': coin['highPrice'],
+            'high_time': coin['highTime'],
+            'drop_from_high': coin['decline'],
+            'change_24h': coin['change24h'],
+            'ranking': coin['rank'],
+            'current_price': coin['currentPrice'],
+            'low_ratio': percent_value(coin['ratio1']),
+            'high_ratio': percent_value(coin['ratio2']),
+        }
+        for coin in snapshot.coins
+    ]
     
     return summary_data, coin_data_list
-
@@ -6,7 +6,8 @@
 
 import requests
 import re
-import sqlite3
+from db_connection import get_connection
+from db_schema import ensure_schema, insert_summary_record
 from datetime import datetime, timedelta
 import pytz
 import time
@@ -14,7 +15,7 @@ import sys
 
 # 配置
 PARENT_FOLDER_ID = "1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV"
-DB_PATH = 'homepage_data.db'
+DB_PATH = 'crypto_data.db'
 COLLECTION_INTERVAL = 600  # 10分钟
 
 headers = {
@@ -201,59 +202,16 @@ def parse_content(content):
 
 def save_to_database(summary_data, coin_data_list):
     """保存到数据库"""
-    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(DB_PATH)
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
     
     beijing_time = get_beijing_time()
     record_time = beijing_time.strftime('%Y-%m-%d %H:%M:%S')
     
-    # 插入汇总数据
-    cursor.execute("""
-        INSERT INTO summary_data (
-            rise_total, fall_total, five_states, rise_fall_ratio,
-            green_count, green_percent, count_times, diff_result, record_time
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        summary_data.get('rise_total', 0),
-        summary_data.get('fall_total', 0),
-        summary_data.get('five_states', ''),
-        summary_data.get('rise_fall_ratio', 0.0),
-        summary_data.get('green_count', 0),
-        summary_data.get('green_percent', 0.0),
-        summary_data.get('count_times', 0),
-        summary_data.get('diff_result', 0.0),
-        record_time
-    ))
-    
-    summary_id = cursor.lastrowid
-    
-    # 插入币种数据
-    for coin in coin_data_list:
-        cursor.execute("""
-            INSERT INTO coin_details (
-                summary_id, seq_num, coin_name, rise_speed, rise_signal,
-                fall_signal, update_time, history_high, high_time,
-                drop_from_high, change_24h, ranking, current_price,
-                low_ratio, high_ratio, record_time
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            summary_id,
-            coin['seq_num'],
-            coin['coin_name'],
-            coin['rise_speed'],
-            coin['rise_signal'],
-            coin['fall_signal'],
-            coin['update_time'],
-            coin['history_high'],
-            coin['high_time'],
-            coin['drop_from_high'],
-            coin['change_24h'],
-            coin['ranking'],
-            coin['current_price'],
-            coin['low_ratio'],
-            coin['high_ratio'],
-            record_time
-        ))
+    # 同一分钟已有数据时返回 None，不重复写入
+    summary_id = insert_summary_record(cursor, summary_data, coin_data_list, record_time,
+                                       source='homepage_data_collector_auto')
     
     conn.commit()
     conn.close()
@@ -4,7 +4,8 @@
 首页数据采集器 V2 - 使用 gdown 从 Google Drive 下载数据
 """
 
-import sqlite3
+from db_connection import get_connection
+from db_schema import ensure_schema, insert_summary_record
 import time
 import re
 from datetime import datetime, timedelta
@@ -20,7 +21,7 @@ BEIJING_TZ = pytz.timezone('Asia/Shanghai')
 MAIN_FOLDER_ID = "1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV"
 
 # 数据库配置
-DB_PATH = 'homepage_data.db'
+DB_PATH = 'crypto_data.db'
 
 # 采集间隔（秒）
 COLLECTION_INTERVAL = 600  # 10分钟
@@ -194,49 +195,12 @@ def parse_data(content):
 def save_to_database(summary_data, coins_data, record_time):
     """保存到数据库"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        ensure_schema(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO summary_data 
-            (rise_total, fall_total, five_states, rise_fall_ratio, green_count, 
-             green_percent, count_times, all_green_score, price_lowest_score, 
-             price_new_high, fall_count, diff_result, record_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            summary_data['rise_total'],
-            summary_data['fall_total'],
-            summary_data['five_states'],
-            summary_data['rise_fall_ratio'],
-            summary_data['green_count'],
-            summary_data['green_percent'],
-            summary_data['count_times'],
-            summary_data['all_green_score'],
-            summary_data['price_lowest_score'],
-            summary_data['price_new_high'],
-            summary_data['fall_count'],
-            summary_data['diff_result'],
-            record_time
-        ))
-        
-        summary_id = cursor.lastrowid
-        
-        for coin in coins_data:
-            cursor.execute('''
-                INSERT INTO coin_details 
-                (summary_id, seq_num, coin_name, rise_speed, rise_signal, fall_signal,
-                 update_time, history_high, high_time, drop_from_high, change_24h,
-                 plus_4_percent, minus_3_percent, ranking, current_price, 
-                 high_ratio, low_ratio, anomaly, record_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                summary_id, coin['seq_num'], coin['coin_name'], coin['rise_speed'],
-                coin['rise_signal'], coin['fall_signal'], coin['update_time'],
-                coin['history_high'], coin['high_time'], coin['drop_from_high'],
-                coin['change_24h'], coin['plus_4_percent'], coin['minus_3_percent'],
-                coin['ranking'], coin['current_price'], coin['high_ratio'],
-                coin['low_ratio'], coin['anomaly'], record_time
-            ))
+        # 同一分钟已有数据时不重复写入
+        insert_summary_record(cursor, summary_data, coins_data, record_time, source='homepage_data_collector_v2')
         
         conn.commit()
         conn.close()
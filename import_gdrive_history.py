@@ -10,6 +10,8 @@ import os
 from datetime import datetime
 from playwright.async_api import async_playwright
 from crypto_database import CryptoDatabase
+from snapshot_cache import get_snapshot_cache
+from snapshot_parser import parse_snapshot, coin_displays, SnapshotColumns
 
 # Google Drive文件夹配置
 ROOT_FOLDER_ID = '1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV'
@@ -17,76 +19,18 @@ ROOT_FOLDER_URL = f'https://drive.google.com/drive/folders/{ROOT_FOLDER_ID}'
 
 def parse_home_data(content):
     """解析首页数据内容"""
-    lines = content.strip().split('\n')
-    
-    stats = {}
-    coins = []
-    
-    in_coin_section = False
-    
-    for line in lines:
-        line = line.strip()
-        
-        # 解析统计数据
-        if line.startswith('透明标签_'):
-            parts = line.split('=')
-            if len(parts) == 2:
-                key = parts[0].replace('透明标签_', '')
-                value = parts[1]
-                
-                if '急涨总和' in key:
-                    stats['rushUp'] = value.split('：')[1] if '：' in value else value
-                elif '急跌总和' in key:
-                    stats['rushDown'] = value.split('：')[1] if '：' in value else value
-                elif '五种状态' in key:
-                    stats['status'] = value.split('：')[1] if '：' in value else value
-                elif '急涨急跌比值' in key:
-                    stats['ratio'] = value.split('：')[1] if '：' in value else value
-                elif '绿色数量' in key:
-                    stats['greenCount'] = value
-                elif '百分比' in key:
-                    stats['percentage'] = value
-                elif '计次' in key:
-                    stats['count'] = value
-                elif '差值结果' in key:
-                    stats['diff'] = value.split('：')[1] if '：' in value else value
-        
-        # 币种数据
-        if '[超级列表框_首页开始]' in line:
-            in_coin_section = True
-            continue
-        
-        if '[超级列表框_首页结束]' in line:
-            break
-        
-        if in_coin_section and '|' in line:
-            parts = line.split('|')
-            if len(parts) >= 16:
-                coin = {
-                    'index': parts[0],
-                    'symbol': parts[1],
-                    'change': parts[2],
-                    'rushUp': parts[3],
-                    'rushDown': parts[4],
-                    'updateTime': parts[5],
-                    'highPrice': parts[6],
-                    'highTime': parts[7],
-                    'decline': parts[8],
-                    'change24h': parts[9],
-                    'rank': parts[12],
-                    'currentPrice': parts[13],
-                    'ratio1': parts[14],
-                    'ratio2': parts[15]
-                }
-                coins.append(coin)
-    
-    # 获取更新时间
-    update_time = coins[0]['updateTime'] if coins else ''
+    snapshot = parse_snapshot(content)
+    stats = snapshot.text_stats(
+        labeled=[('急涨总和', 'rushUp'), ('急跌总和', 'rushDown'), ('五种状态', 'status'),
+                 ('急涨急跌比值', 'ratio'), ('差值结果', 'diff')],
+        plain=[('绿色数量', 'greenCount'), ('百分比', 'percentage'), ('计次', 'count')]
+    )
+    coins = coin_displays(snapshot.coin_rows)
     
     return {
         'stats': stats,
         'coins': coins,
-        'updateTime': update_time
+        'updateTime': snapshot.update_time
     }
 
 async def get_all_date_folders(page):
@@ -257,7 +201,8 @@ async def import_all_history():
                     print(f"⚠️ {date_str} 文件夹为空")
                     continue
                 
-                # 3. 逐个读取文件
+                # 3. 逐个读取文件，解析结果按列积累，整个日期文件夹一次写入
+                columns = SnapshotColumns()
                 for idx, filename in enumerate(files, 1):
                     # 解析文件名获取时间
                     # 格式: 2025-12-03_1012.txt -> 2025-12-03 10:12:00
@@ -282,8 +227,10 @@ async def import_all_history():
                     
                     print(f"   [{idx}/{len(files)}] 📥 正在导入: {filename}")
                     
-                    # 读取文件内容
-                    content = await read_file_content(page, filename)
+                    # 读取文件内容（本地缓存优先）
+                    content = await get_snapshot_cache().get_or_fetch_async(
+                        date_str, filename, lambda: read_file_content(page, filename)
+                    )
                     
                     if not content:
                         print(f"      ❌ 无法读取内容")
@@ -291,30 +238,30 @@ async def import_all_history():
                     
                     # 解析数据
                     try:
-                        parsed_data = parse_home_data(content)
+                        snapshot = parse_snapshot(content)
                         
-                        if not parsed_data['coins']:
+                        if not snapshot.coin_rows:
                             print(f"      ❌ 解析失败（无币种数据）")
                             continue
                         
-                        # 保存到数据库
-                        snapshot_id = db.save_snapshot(
-                            data=parsed_data['coins'],
-                            stats=parsed_data['stats'],
-                            snapshot_time=snapshot_time,
-                            filename=filename
-                        )
-                        
-                        print(f"      ✅ 已保存 (ID: {snapshot_id}, {len(parsed_data['coins'])}个币种)")
-                        total_imported += 1
+                        coin_count = columns.add(filename, snapshot_time, snapshot)
+                        print(f"      ✅ 已解析 ({coin_count}个币种)")
                         
                     except Exception as parse_error:
-                        print(f"      ❌ 解析/保存失败: {parse_error}")
+                        print(f"      ❌ 解析失败: {parse_error}")
                         continue
                     
                     # 每5个文件休息一下
                     if idx % 5 == 0:
                         await page.wait_for_timeout(2000)
+                
+                # 4. 保存到数据库
+                if len(columns):
+                    try:
+                        saved = db.save_snapshot_columns(columns)
+                        total_imported += len(saved)
+                    except Exception as save_error:
+                        print(f"   ❌ {date_str} 保存失败: {save_error}")
             
             print(f"\n{'='*60}")
             print(f"导入完成!")
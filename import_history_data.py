@@ -5,7 +5,6 @@
 """
 
 import asyncio
-import sqlite3
 import sys
 import os
 import re
@@ -13,8 +12,13 @@ from datetime import datetime
 from playwright.async_api import async_playwright
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from import_history_simple import save_columns_to_database
+from snapshot_parser import SnapshotColumns
+from db_connection import get_connection
 
 DB_PATH = 'crypto_data.db'
+# 解析好的快照每积累多少个写入一次数据库
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '50'))
 ROOT_FOLDER_ID = '1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV'
 
 def parse_filename_datetime(filename):
@@ -28,149 +32,6 @@ def parse_filename_datetime(filename):
         return f"{date_part} {hour}:{minute}:00"
     return None
 
-def parse_home_data(content):
-    """解析首页数据内容"""
-    lines = content.strip().split('\n')
-    
-    stats = {
-        'rushUp': 0,
-        'rushDown': 0,
-        'status': '',
-        'ratio': '',
-        'greenCount': 0,
-        'percentage': ''
-    }
-    coins = []
-    
-    in_coin_section = False
-    
-    for line in lines:
-        line = line.strip()
-        
-        # 解析统计数据
-        if line.startswith('透明标签_'):
-            parts = line.split('=')
-            if len(parts) == 2:
-                key = parts[0].replace('透明标签_', '')
-                value = parts[1]
-                
-                if '急涨总和' in key:
-                    stats['rushUp'] = int(value.split('：')[1]) if '：' in value else 0
-                elif '急跌总和' in key:
-                    stats['rushDown'] = int(value.split('：')[1]) if '：' in value else 0
-                elif '五种状态' in key:
-                    stats['status'] = value.split('：')[1] if '：' in value else value
-                elif '急涨急跌比值' in key:
-                    stats['ratio'] = value.split('：')[1] if '：' in value else value
-                elif '绿色数量' in key:
-                    match = re.search(r'\d+', value)
-                    stats['greenCount'] = int(match.group()) if match else 0
-                elif '百分比' in key:
-                    stats['percentage'] = value
-        
-        # 币种数据
-        if '[超级列表框_首页开始]' in line:
-            in_coin_section = True
-            continue
-        
-        if '[超级列表框_首页结束]' in line:
-            break
-        
-        if in_coin_section and '|' in line:
-            parts = line.split('|')
-            if len(parts) >= 16:
-                coin = {
-                    'index': int(parts[0]) if parts[0].isdigit() else 0,
-                    'symbol': parts[1],
-                    'change': float(parts[2]) if parts[2] else 0,
-                    'rushUp': int(parts[3]) if parts[3].isdigit() else 0,
-                    'rushDown': int(parts[4]) if parts[4].isdigit() else 0,
-                    'updateTime': parts[5],
-                    'highPrice': float(parts[6]) if parts[6] else 0,
-                    'highTime': parts[7],
-                    'decline': float(parts[8]) if parts[8] else 0,
-                    'change24h': float(parts[9]) if parts[9] else 0,
-                    'rank': int(parts[12]) if parts[12].isdigit() else 0,
-                    'currentPrice': float(parts[13]) if parts[13] else 0,
-                    'ratio1': parts[14],
-                    'ratio2': parts[15]
-                }
-                coins.append(coin)
-    
-    return stats, coins
-
-def save_to_database(filename, record_time, stats, coins):
-    """保存数据到数据库"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    try:
-        # 检查是否已存在
-        cursor.execute('SELECT id FROM stats_history WHERE filename = ?', (filename,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            return False, "已存在"
-        
-        # 插入统计数据
-        cursor.execute('''
-            INSERT INTO stats_history 
-            (filename, record_time, rush_up, rush_down, status, ratio, green_count, percentage)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            filename,
-            record_time,
-            stats['rushUp'],
-            stats['rushDown'],
-            stats['status'],
-            stats['ratio'],
-            stats['greenCount'],
-            stats['percentage']
-        ))
-        
-        stats_id = cursor.lastrowid
-        
-        # 批量插入币种数据
-        coin_records = [
-            (
-                stats_id,
-                filename,
-                record_time,
-                coin['index'],
-                coin['symbol'],
-                coin['change'],
-                coin['rushUp'],
-                coin['rushDown'],
-                coin['updateTime'],
-                coin['highPrice'],
-                coin['highTime'],
-                coin['decline'],
-                coin['change24h'],
-                coin['rank'],
-                coin['currentPrice'],
-                coin['ratio1'],
-                coin['ratio2']
-            )
-            for coin in coins
-        ]
-        
-        cursor.executemany('''
-            INSERT INTO coin_history 
-            (stats_id, filename, record_time, index_num, symbol, change, rush_up, rush_down,
-             update_time, high_price, high_time, decline, change_24h, rank, current_price,
-             ratio1, ratio2)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', coin_records)
-        
-        conn.commit()
-        return True, f"成功导入 {len(coins)} 条币种数据"
-        
-    except Exception as e:
-        conn.rollback()
-        return False, f"数据库错误: {str(e)}"
-    finally:
-        conn.close()
-
 async def get_all_txt_files_from_folder(folder_url):
     """获取文件夹中所有TXT文件列表"""
     print(f"\n🔍 正在扫描文件夹...")
@@ -275,10 +136,24 @@ async def import_all_history():
         print("❌ 没有找到任何文件")
         return
     
-    # 2. 逐个处理文件
+    # 2. 逐个处理文件，解析结果按列积累，每 IMPORT_BATCH_SIZE 个写入一次
     success_count = 0
     skip_count = 0
     fail_count = 0
+    columns = SnapshotColumns()
+    
+    def flush():
+        nonlocal columns, success_count, skip_count
+        if not len(columns):
+            return
+        print(f"\n💾 写入 {len(columns)} 个快照 ({columns.total_coins} 条币种数据)...")
+        for filename, success, msg in save_columns_to_database(columns):
+            if success:
+                success_count += 1
+            else:
+                print(f"   ⏭️  {filename}: {msg}")
+                skip_count += 1
+        columns = SnapshotColumns()
     
     print(f"\n开始处理 {len(files)} 个文件...")
     print("-" * 80)
@@ -308,25 +183,22 @@ async def import_all_history():
         
         # 解析数据
         try:
-            stats, coins = parse_home_data(content)
-            print(f"   解析: 急涨={stats['rushUp']}, 急跌={stats['rushDown']}, 币种={len(coins)}")
+            coin_count = columns.add(filename, record_time, content)
+            stats = columns.stats[-1]
+            print(f"   解析: 急涨={stats['rushUp'] or 0}, 急跌={stats['rushDown'] or 0}, 币种={coin_count}")
         except Exception as e:
             print(f"   ❌ 解析失败: {str(e)}")
             fail_count += 1
             continue
         
-        # 保存到数据库
-        success, msg = save_to_database(filename, record_time, stats, coins)
-        if success:
-            print(f"   ✅ {msg}")
-            success_count += 1
-        else:
-            print(f"   ⏭️  {msg}")
-            skip_count += 1
+        if len(columns) >= IMPORT_BATCH_SIZE:
+            flush()
         
         # 避免请求过快
         await asyncio.sleep(2)
     
+    flush()
+    
     # 3. 显示汇总
     print("\n" + "="*80)
     print("📊 导入完成统计")
@@ -337,7 +209,7 @@ async def import_all_history():
     print(f"📁 总计: {len(files)}")
     
     # 显示数据库统计
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
     cursor.execute('SELECT COUNT(*) FROM stats_history')
     total_stats = cursor.fetchone()[0]
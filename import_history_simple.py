@@ -5,7 +5,6 @@
 """
 
 import asyncio
-import sqlite3
 import sys
 import os
 import re
@@ -13,6 +12,8 @@ from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from gdrive_home_data_reader import get_latest_file_by_sorting
+from snapshot_parser import parse_snapshot
+from db_connection import get_connection
 
 DB_PATH = 'crypto_data.db'
 
@@ -26,199 +27,204 @@ def parse_filename_datetime(filename):
         return f"{date_part} {hour}:{minute}:00"
     return None
 
+# stats_history 写入用的统计项及缺失时的默认值
+DB_STATS_DEFAULTS = {
+    'rushUp': 0,
+    'rushDown': 0,
+    'status': '',
+    'ratio': '',
+    'greenCount': 0,
+    'percentage': '',
+    'difference': '',
+    'priceLowest': '',
+    'priceNewHigh': '',
+    'countTimes': 0,
+    'rushDownCount': 0
+}
+
+def _db_stats(typed):
+    """带类型的统计数据 -> stats_history 写入用的格式（缺失项给默认值）"""
+    return {key: default if typed[key] is None else typed[key]
+            for key, default in DB_STATS_DEFAULTS.items()}
+
 def parse_home_data(content):
-    """解析首页数据内容"""
-    lines = content.strip().split('\n')
+    """解析首页数据内容，返回 (统计数据, 币种列表)，数值已转换"""
+    snapshot = parse_snapshot(content)
+    return _db_stats(snapshot.stats), snapshot.coins
+
+# coin_history 的列顺序（前面再加 stats_id, filename, record_time）
+COIN_HISTORY_FIELDS = ('index', 'symbol', 'change', 'rushUp', 'rushDown', 'updateTime', 'highPrice',
+                       'highTime', 'decline', 'change24h', 'rank', 'currentPrice', 'ratio1', 'ratio2')
+
+COIN_HISTORY_INSERT = '''
+    INSERT INTO coin_history 
+    (stats_id, filename, record_time, index_num, symbol, change, rush_up, rush_down,
+     update_time, high_price, high_time, decline, change_24h, rank, current_price,
+     ratio1, ratio2)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def _insert_stats(cursor, filename, record_time, stats):
+    """写入一条统计数据（不提交），返回 stats_id；文件已存在返回 None"""
+    # 检查是否已存在
+    cursor.execute('SELECT id FROM stats_history WHERE filename = ?', (filename,))
+    existing = cursor.fetchone()
     
-    stats = {
-        'rushUp': 0,
-        'rushDown': 0,
-        'status': '',
-        'ratio': '',
-        'greenCount': 0,
-        'percentage': '',
-        'difference': '',
-        'priceLowest': '',
-        'priceNewHigh': '',
-        'countTimes': 0,
-        'rushDownCount': 0
-    }
-    coins = []
+    if existing:
+        return None
     
-    in_coin_section = False
+    # 计算本轮急涨急跌（与前一条记录对比）
+    this_round_rush_up = 0
+    this_round_rush_down = 0
     
-    for line in lines:
-        line = line.strip()
-        
-        # 解析统计数据
-        if line.startswith('透明标签_'):
-            parts = line.split('=')
-            if len(parts) == 2:
-                key = parts[0].replace('透明标签_', '')
-                value = parts[1]
-                
-                if '急涨总和' in key:
-                    stats['rushUp'] = int(value.split('：')[1]) if '：' in value else 0
-                elif '急跌总和' in key:
-                    stats['rushDown'] = int(value.split('：')[1]) if '：' in value else 0
-                elif '五种状态' in key:
-                    stats['status'] = value.split('：')[1] if '：' in value else value
-                elif '急涨急跌比值' in key:
-                    stats['ratio'] = value.split('：')[1] if '：' in value else value
-                elif '绿色数量' in key:
-                    match = re.search(r'\d+', value)
-                    stats['greenCount'] = int(match.group()) if match else 0
-                elif '百分比' in key:
-                    stats['percentage'] = value
-                elif '差值结果' in key:
-                    # 差值：9 ★
-                    stats['difference'] = value.split('：')[1] if '：' in value else value
-                elif '比价最低得分' in key:
-                    # 比价最低 0 0
-                    stats['priceLowest'] = value.replace('比价最低', '').strip()
-                elif '仓位得分' in key:
-                    # 比价创新高 0 0
-                    stats['priceNewHigh'] = value.replace('比价创新高', '').strip()
-                elif '计次' in key and key == '计次':
-                    # 透明标签_计次=2
-                    match = re.search(r'\d+', value)
-                    stats['countTimes'] = int(match.group()) if match else 0
-                elif '急跌数量' in key:
-                    # 急跌数量 计次 5 6
-                    parts = value.split()
-                    if len(parts) >= 3:
-                        try:
-                            stats['rushDownCount'] = int(parts[2])  # 5 = 急跌币种数量
-                        except:
-                            pass
-        
-        # 币种数据
-        if '[超级列表框_首页开始]' in line:
-            in_coin_section = True
-            continue
-        
-        if '[超级列表框_首页结束]' in line:
-            break
-        
-        if in_coin_section and '|' in line:
-            parts = line.split('|')
-            if len(parts) >= 16:
-                try:
-                    coin = {
-                        'index': int(parts[0]) if parts[0].isdigit() else 0,
-                        'symbol': parts[1],
-                        'change': float(parts[2]) if parts[2] and parts[2] != '' else 0,
-                        'rushUp': int(parts[3]) if parts[3].isdigit() else 0,
-                        'rushDown': int(parts[4]) if parts[4].isdigit() else 0,
-                        'updateTime': parts[5],
-                        'highPrice': float(parts[6]) if parts[6] and parts[6] != '' else 0,
-                        'highTime': parts[7],
-                        'decline': float(parts[8]) if parts[8] and parts[8] != '' else 0,
-                        'change24h': float(parts[9]) if parts[9] and parts[9] != '' else 0,
-                        'rank': int(parts[12]) if parts[12].isdigit() else 0,
-                        'currentPrice': float(parts[13]) if parts[13] and parts[13] != '' else 0,
-                        'ratio1': parts[14],
-                        'ratio2': parts[15]
-                    }
-                    coins.append(coin)
-                except:
-                    continue
+    cursor.execute('''
+        SELECT rush_up, rush_down 
+        FROM stats_history 
+        ORDER BY record_time DESC 
+        LIMIT 1
+    ''')
+    prev_record = cursor.fetchone()
+    if prev_record:
+        this_round_rush_up = stats['rushUp'] - prev_record[0]
+        this_round_rush_down = stats['rushDown'] - prev_record[1]
     
-    return stats, coins
+    # 插入统计数据
+    cursor.execute('''
+        INSERT INTO stats_history 
+        (filename, record_time, rush_up, rush_down, status, ratio, green_count, percentage,
+         difference, price_lowest, price_new_high, count_times, rush_down_count,
+         this_round_rush_up, this_round_rush_down)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        filename,
+        record_time,
+        stats['rushUp'],
+        stats['rushDown'],
+        stats['status'],
+        stats['ratio'],
+        stats['greenCount'],
+        stats['percentage'],
+        stats['difference'],
+        stats['priceLowest'],
+        stats['priceNewHigh'],
+        stats['countTimes'],
+        stats['rushDownCount'],
+        this_round_rush_up,
+        this_round_rush_down
+    ))
+    
+    return cursor.lastrowid
+
+def _insert_snapshot(cursor, filename, record_time, stats, coins):
+    """在给定游标上写入一个快照（不提交），返回 (是否写入, 消息)"""
+    stats_id = _insert_stats(cursor, filename, record_time, stats)
+    if stats_id is None:
+        return False, "已存在"
+    
+    # 批量插入币种数据
+    cursor.executemany(COIN_HISTORY_INSERT, [
+        (
+            stats_id,
+            filename,
+            record_time,
+            coin['index'],
+            coin['symbol'],
+            coin['change'],
+            coin['rushUp'],
+            coin['rushDown'],
+            coin['updateTime'],
+            coin['highPrice'],
+            coin['highTime'],
+            coin['decline'],
+            coin['change24h'],
+            coin['rank'],
+            coin['currentPrice'],
+            coin['ratio1'],
+            coin['ratio2']
+        )
+        for coin in coins
+    ])
+    
+    return True, f"成功导入 {len(coins)} 条币种数据"
 
 def save_to_database(filename, record_time, stats, coins):
     """保存数据到数据库"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
     
     try:
-        # 检查是否已存在
-        cursor.execute('SELECT id FROM stats_history WHERE filename = ?', (filename,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            return False, "已存在"
+        success, msg = _insert_snapshot(cursor, filename, record_time, stats, coins)
+        if success:
+            conn.commit()
+        return success, msg
         
-        # 计算本轮急涨急跌（与前一条记录对比）
-        this_round_rush_up = 0
-        this_round_rush_down = 0
-        
-        cursor.execute('''
-            SELECT rush_up, rush_down 
-            FROM stats_history 
-            ORDER BY record_time DESC 
-            LIMIT 1
-        ''')
-        prev_record = cursor.fetchone()
-        if prev_record:
-            this_round_rush_up = stats['rushUp'] - prev_record[0]
-            this_round_rush_down = stats['rushDown'] - prev_record[1]
-        
-        # 插入统计数据
-        cursor.execute('''
-            INSERT INTO stats_history 
-            (filename, record_time, rush_up, rush_down, status, ratio, green_count, percentage,
-             difference, price_lowest, price_new_high, count_times, rush_down_count,
-             this_round_rush_up, this_round_rush_down)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            filename,
-            record_time,
-            stats['rushUp'],
-            stats['rushDown'],
-            stats['status'],
-            stats['ratio'],
-            stats['greenCount'],
-            stats['percentage'],
-            stats['difference'],
-            stats['priceLowest'],
-            stats['priceNewHigh'],
-            stats['countTimes'],
-            stats['rushDownCount'],
-            this_round_rush_up,
-            this_round_rush_down
-        ))
+    except Exception as e:
+        conn.rollback()
+        return False, f"数据库错误: {str(e)}"
+    finally:
+        conn.close()
+
+def save_batch_to_database(records):
+    """
+    在一个事务中批量保存多个快照
+    
+    Args:
+        records: [(filename, record_time, stats, coins), ...]
         
-        stats_id = cursor.lastrowid
+    Returns:
+        [(filename, 是否写入, 消息), ...]，按记录时间排序
+    """
+    conn = get_connection(DB_PATH)
+    cursor = conn.cursor()
+    results = []
+    
+    try:
+        # 按时间顺序写入，保证本轮急涨急跌与前一条记录对比正确
+        for filename, record_time, stats, coins in sorted(records, key=lambda r: r[1]):
+            success, msg = _insert_snapshot(cursor, filename, record_time, stats, coins)
+            results.append((filename, success, msg))
         
-        # 批量插入币种数据
-        coin_records = [
-            (
-                stats_id,
-                filename,
-                record_time,
-                coin['index'],
-                coin['symbol'],
-                coin['change'],
-                coin['rushUp'],
-                coin['rushDown'],
-                coin['updateTime'],
-                coin['highPrice'],
-                coin['highTime'],
-                coin['decline'],
-                coin['change24h'],
-                coin['rank'],
-                coin['currentPrice'],
-                coin['ratio1'],
-                coin['ratio2']
-            )
-            for coin in coins
-        ]
+        conn.commit()
+        return results
         
-        cursor.executemany('''
-            INSERT INTO coin_history 
-            (stats_id, filename, record_time, index_num, symbol, change, rush_up, rush_down,
-             update_time, high_price, high_time, decline, change_24h, rank, current_price,
-             ratio1, ratio2)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', coin_records)
+    except Exception as e:
+        conn.rollback()
+        return [(record[0], False, f"数据库错误: {str(e)}") for record in records]
+    finally:
+        conn.close()
+
+def save_columns_to_database(columns):
+    """
+    在一个事务中批量保存列式解析的快照（SnapshotColumns），
+    币种行直接从列数组产出给 executemany，不经过逐币种的 dict
+    
+    Returns:
+        [(filename, 是否写入, 消息), ...]，按记录时间排序
+    """
+    conn = get_connection(DB_PATH)
+    cursor = conn.cursor()
+    results = []
+    
+    try:
+        # 按时间顺序写入，保证本轮急涨急跌与前一条记录对比正确
+        for pos in columns.positions_by_time():
+            filename = columns.filenames[pos]
+            record_time = columns.record_times[pos]
+            stats_id = _insert_stats(cursor, filename, record_time, _db_stats(columns.stats[pos]))
+            if stats_id is None:
+                results.append((filename, False, "已存在"))
+                continue
+            
+            cursor.executemany(COIN_HISTORY_INSERT, columns.rows(
+                pos, COIN_HISTORY_FIELDS, prefix=(stats_id, filename, record_time)))
+            results.append((filename, True, f"成功导入 {columns.coin_count(pos)} 条币种数据"))
         
         conn.commit()
-        return True, f"成功导入 {len(coins)} 条币种数据"
+        return results
         
     except Exception as e:
         conn.rollback()
-        return False, f"数据库错误: {str(e)}"
+        return [(filename, False, f"数据库错误: {str(e)}") for filename in columns.filenames]
     finally:
         conn.close()
 
@@ -266,7 +272,7 @@ async def import_current_data():
         print(f"⏭️  {msg}")
     
     # 显示数据库统计
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cursor = conn.cursor()
     cursor.execute('SELECT COUNT(*) FROM stats_history')
     total_stats = cursor.fetchone()[0]
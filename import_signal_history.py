@@ -5,7 +5,7 @@
 数据格式: 做空|变化|做多|变化|时间
 """
 import requests
-import sqlite3
+from db_connection import get_connection
 from datetime import datetime
 import re
 
@@ -68,7 +68,7 @@ def parse_signal_line(line):
 
 def import_to_database(records):
     """导入记录到数据库"""
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     
     imported = 0
@@ -165,7 +165,7 @@ def main():
     print(f"   跳过: {skipped} 条（已存在）")
     
     # 显示数据库统计
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     
     cursor.execute('SELECT COUNT(*) FROM signal_stats_history')
@@ -2,12 +2,12 @@
 """
 导入今天从指定时间开始的所有历史数据
 """
-import sqlite3
 from datetime import datetime
 import time
 import re
 from playwright.sync_api import sync_playwright
 from home_data_api_v2 import parse_home_data  # 复用解析函数
+from db_connection import get_connection
 
 def get_file_list_from_gdrive():
     """从 Google Drive 获取今天的所有 TXT 文件列表"""
@@ -157,7 +157,7 @@ def import_file_to_db(filename, content):
         record_time = f"{date_str} {hour}:{minute}:00"
         
         # 检查是否已存在
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         cursor.execute('SELECT id FROM stats_history WHERE record_time = ?', (record_time,))
         if cursor.fetchone():
@@ -276,7 +276,7 @@ def main():
     print(f"❌ 失败: {fail_count} 个文件")
     
     # 显示数据库统计
-    conn = sqlite3.connect('crypto_data.db')
+    conn = get_connection('crypto_data.db')
     cursor = conn.cursor()
     cursor.execute('SELECT COUNT(*) FROM stats_history')
     total_stats = cursor.fetchone()[0]
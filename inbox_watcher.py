@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+收件箱目录监听
+上游直接把 YYYY-MM-DD_HHMM.txt / 信号.txt / 恐慌清洗.txt 写到共享目录时，
+文件一落地就解析入库，不再经过浏览器抓取 Google Drive。
+有 inotify_simple 时用 inotify（毫秒级），否则用 scandir 轮询。
+也可以在测试中当作本地的 Drive 替身使用。
+
+建议上游先写临时文件（.tmp 或 . 开头）再改名，保证读到的是完整文件。
+"""
+
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+
+try:
+    from inotify_simple import INotify, flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+HOME_FILE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}_\d{4}\.txt$')
+SIGNAL_FILENAME = '信号.txt'
+PANIC_FILENAME = '恐慌清洗.txt'
+
+# 轮询间隔（秒），仅在没有 inotify 时使用
+POLL_INTERVAL = float(os.environ.get('INBOX_POLL_INTERVAL', '0.2'))
+
+
+def classify_inbox_file(name):
+    """返回文件类型: 'home' / 'signal' / 'panic'，不认识的返回 None"""
+    if name.startswith('.') or name.endswith('.tmp'):
+        return None
+    if HOME_FILE_PATTERN.match(name):
+        return 'home'
+    if name == SIGNAL_FILENAME:
+        return 'signal'
+    if name == PANIC_FILENAME:
+        return 'panic'
+    return None
+
+
+def read_text(path):
+    """读取文本，兼容上游的 GBK 编码"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    for encoding in ['utf-8', 'gb18030']:
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode('utf-8', errors='replace')
+
+
+class InboxWatcher:
+    """监听收件箱目录，新文件到达后调用 handler(kind, path, content)"""
+
+    def __init__(self, inbox_dir, handler, poll_interval=POLL_INTERVAL, use_inotify=True):
+        self.inbox_dir = inbox_dir
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and INOTIFY_AVAILABLE
+        self.processed_dir = os.path.join(inbox_dir, 'processed')
+        self.failed_dir = os.path.join(inbox_dir, 'failed')
+        self.running = False
+        self.thread = None
+        # 轮询模式下记录上次看到的 (大小, 修改时间)，连续两次不变才处理
+        self._pending = {}
+        self.stats = {'processed': 0, 'failed': 0, 'last_latency_ms': None}
+
+        os.makedirs(self.processed_dir, exist_ok=True)
+        os.makedirs(self.failed_dir, exist_ok=True)
+
+    def start(self):
+        """启动后台监听线程，先处理目录里已有的文件"""
+        self.running = True
+        if self.use_inotify:
+            # 先登记监听再扫描：扫描期间写完的文件会留下事件，线程启动后处理，不会漏掉
+            inotify = INotify()
+            inotify.add_watch(self.inbox_dir, flags.CLOSE_WRITE | flags.MOVED_TO)
+            self.scan_once(require_stable=False)
+            self.thread = threading.Thread(target=self._run_inotify, args=(inotify,), daemon=True)
+        else:
+            self.scan_once(require_stable=False)
+            self.thread = threading.Thread(target=self._run_polling, daemon=True)
+        self.thread.start()
+        mode = 'inotify' if self.use_inotify else f'轮询 {self.poll_interval}秒'
+        print(f"📥 收件箱监听已启动: {self.inbox_dir} ({mode})")
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def scan_once(self, require_stable=True):
+        """扫描一次目录并处理就绪的文件，返回处理数量"""
+        count = 0
+        seen = set()
+        with os.scandir(self.inbox_dir) as entries:
+            # 按文件名排序，保证同一批里快照按时间顺序入库
+            for entry in sorted(entries, key=lambda e: e.name):
+                if not entry.is_file() or not classify_inbox_file(entry.name):
+                    continue
+                seen.add(entry.name)
+                if require_stable:
+                    stat = entry.stat()
+                    signature = (stat.st_size, stat.st_mtime_ns)
+                    if self._pending.get(entry.name) != signature:
+                        self._pending[entry.name] = signature
+                        continue
+                if self.process_file(entry.name):
+                    count += 1
+
+        for name in list(self._pending):
+            if name not in seen:
+                del self._pending[name]
+        return count
+
+    def process_file(self, name):
+        """解析并处理一个文件，处理后移到 processed/（失败移到 failed/）"""
+        kind = classify_inbox_file(name)
+        path = os.path.join(self.inbox_dir, name)
+        if not kind or not os.path.exists(path):
+            return False
+
+        self._pending.pop(name, None)
+        start = time.perf_counter()
+        try:
+            content = read_text(path)
+            self.handler(kind, path, content)
+            target_dir = self.processed_dir
+            self.stats['processed'] += 1
+        except Exception as e:
+            print(f"❌ 收件箱文件处理失败: {name} - {e}")
+            target_dir = self.failed_dir
+            self.stats['failed'] += 1
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.stats['last_latency_ms'] = round(latency_ms, 1)
+
+        # 固定文件名（信号.txt / 恐慌清洗.txt）会被反复投递，归档时加时间前缀
+        archived = name if kind == 'home' else f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{name}"
+        try:
+            shutil.move(path, os.path.join(target_dir, archived))
+        except OSError as e:
+            print(f"⚠️  归档收件箱文件失败: {name} - {e}")
+
+        if target_dir == self.processed_dir:
+            print(f"📥 收件箱 [{kind}] {name} 处理完成 ({latency_ms:.1f}ms)")
+            return True
+        print(f"📥 收件箱 [{kind}] {name} 已移到 failed/")
+        return False
+
+    def _run_inotify(self, inotify):
+        """inotify 模式：文件写完关闭或改名进来时立即处理（监听已在 start 里登记）"""
+        while self.running:
+            try:
+                for event in inotify.read(timeout=1000):
+                    if event.name:
+                        self.process_file(event.name)
+            except Exception as e:
+                print(f"❌ 收件箱监听错误: {e}")
+                time.sleep(1)
+
+    def _run_polling(self):
+        """轮询模式：scandir 扫描，文件大小和修改时间稳定后处理"""
+        while self.running:
+            try:
+                self.scan_once()
+            except Exception as e:
+                print(f"❌ 收件箱扫描错误: {e}")
+            time.sleep(self.poll_interval)
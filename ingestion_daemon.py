@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一采集守护进程
+用一个 asyncio 事件循环替代并行运行的各个采集循环
+（homepage_data_collector / signal_collector / panic_wash_collector /
+auto_gdrive_collector_v2 / DataCollector / home_data_api_v2.background_updater / 得分系统定时更新）
+
+- 任务注册表：每个任务有自己的间隔和时间预算
+- 所有任务共用一个浏览器池、一个HTTP会话和一个比价系统实例
+- 同一个 Google Drive 文件（或文件夹）每个周期（FOLDER_CYCLE 秒）只抓取一次：
+  别的任务正在抓取或本周期已抓取过时，这次直接跳过，等周期结束后优先重试
+- 阻塞调用通过 ctx.to_thread 放进线程；超时只能停止等待、不能中断线程，
+  线程结束前不会再启动同一任务，也不释放它登记的文件
+- home 任务写入 home_data_cache，home_data_api_v2 读到新鲜的缓存行时不再自己抓取
+
+用法:
+    python ingestion_daemon.py               # 持续运行全部任务
+    python ingestion_daemon.py --once        # 每个任务执行一次后退出
+    python ingestion_daemon.py --only home,scores
+"""
+
+import asyncio
+import contextvars
+import functools
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+HOME_ROOT_FOLDER_ID = '1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV'
+PANIC_WASH_FOLDER_ID = '1JNZKKnZLeoBkxSumjS63SOInCriPfAKX'
+
+# 同一文件两次抓取的最小间隔（秒），不同任务在这段时间内不会重复抓取
+FOLDER_CYCLE = int(os.environ.get('INGESTION_FOLDER_CYCLE', '60'))
+
+# 正在执行的任务（ctx.to_thread 用它把线程记到任务上）
+_current_job = contextvars.ContextVar('ingestion_job', default=None)
+
+
+def beijing_today():
+    """北京时间的今天日期"""
+    return (datetime.utcnow() + timedelta(hours=8)).strftime('%Y-%m-%d')
+
+
+class IngestionContext:
+    """任务之间共享的资源，按需创建"""
+
+    def __init__(self):
+        self._http = None
+        self._price_comparison = None
+        self._shared = {}
+
+    def get(self, name, factory):
+        """取共享对象，第一次用 factory() 创建"""
+        if name not in self._shared:
+            self._shared[name] = factory()
+        return self._shared[name]
+
+    @property
+    def browser_pool(self):
+        from browser_pool import get_browser_pool
+        return get_browser_pool()
+
+    @property
+    def http(self):
+        """共享的HTTP会话（复用连接）"""
+        if self._http is None and REQUESTS_AVAILABLE:
+            self._http = requests.Session()
+        return self._http
+
+    @property
+    def price_comparison(self):
+        if self._price_comparison is None:
+            from price_comparison_system import PriceComparisonSystem
+            self._price_comparison = PriceComparisonSystem()
+        return self._price_comparison
+
+    async def to_thread(self, func, *args):
+        """
+        在线程里执行阻塞调用（任务里代替 asyncio.to_thread）
+
+        任务超时被取消时只停止等待，线程照常跑完；线程记在当前任务上，
+        结束前调度器不会再启动这个任务，也不释放它登记的文件
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, func, *args)
+        future = loop.run_in_executor(None, call)
+        job = _current_job.get()
+        if job is not None:
+            job.track_thread(future)
+        return await asyncio.shield(future)
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
+
+
+class IngestionJob:
+    """一个采集任务"""
+
+    def __init__(self, name, func, interval, budget, folders=None):
+        """
+        Args:
+            name: 任务名
+            func: async def func(ctx)
+            interval: 执行间隔（秒），从上次开始时间算起
+            budget: 单次执行的时间预算（秒），超时停止等待（线程中的调用见 IngestionContext.to_thread）
+            folders: 返回本次要抓取的文件（或文件夹）键列表的函数，同一个键每周期只抓一次
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.budget = budget
+        self.folders = folders or (lambda: [])
+        self.stats = {
+            'runs': 0,
+            'success': 0,
+            'failed': 0,
+            'timeout': 0,
+            'last_start': None,
+            'last_duration': None,
+            'last_error': None,
+            'skipped': 0
+        }
+        # 还在运行的线程（超时后也可能仍在运行），以及线程全部结束后要执行的回调
+        self.threads = set()
+        self._on_idle = []
+
+    def track_thread(self, future):
+        self.threads.add(future)
+        future.add_done_callback(self._thread_done)
+
+    def _thread_done(self, future):
+        self.threads.discard(future)
+        if not future.cancelled() and future.exception() is not None and self._on_idle:
+            # 超时后才结束的线程，异常没有人等待，在这里打印
+            print(f"❌ [{self.name}] 超时后结束的线程出错: {future.exception()}")
+        if not self.threads:
+            callbacks, self._on_idle = self._on_idle, []
+            for callback in callbacks:
+                callback()
+
+    def when_idle(self, callback):
+        """线程全部结束后执行 callback（没有线程时立即执行）"""
+        if self.threads:
+            self._on_idle.append(callback)
+        else:
+            callback()
+
+
+class IngestionDaemon:
+    """任务注册表 + 调度"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.ctx = IngestionContext()
+        # 文件（夹）键 -> {'job', 'start', 'running'}：最近一次抓取
+        self.folder_claims = {}
+        # 文件夹 -> 上次被跳过、周期结束后优先抓取的任务名
+        self.folder_waiting = {}
+        self.running = False
+
+    def register(self, name, func, interval, budget, folders=None):
+        self.jobs[name] = IngestionJob(name, func, interval, budget, folders)
+        return self.jobs[name]
+
+    def _folder_busy(self, job, folder, now):
+        """
+        文件夹本周期是否不能由 job 抓取，返回需要等待的秒数（0 表示可以抓取）
+
+        别的任务正在抓取、本周期已抓取过，或有别的任务在排队等这个文件夹时都不能抓取
+        """
+        claim = self.folder_claims.get(folder)
+        if claim and claim['job'] != job.name:
+            if claim['running']:
+                return FOLDER_CYCLE
+            remaining = claim['start'] + FOLDER_CYCLE - now
+            if remaining > 0:
+                return remaining
+        waiting = self.folder_waiting.get(folder)
+        if waiting and waiting != job.name:
+            return FOLDER_CYCLE
+        return 0
+
+    def _claim_folders(self, job):
+        """
+        登记本次要抓取的文件夹（检查和登记之间没有 await，不会被别的任务插入）
+
+        Returns:
+            (文件夹列表, 需要等待的秒数)；等待秒数大于 0 时没有登记，本次应跳过
+        """
+        now = time.monotonic()
+        folders = sorted(set(job.folders()))
+        wait = max([self._folder_busy(job, folder, now) for folder in folders], default=0)
+        if wait > 0:
+            for folder in folders:
+                self.folder_waiting.setdefault(folder, job.name)
+            return folders, wait
+
+        for folder in folders:
+            self.folder_claims[folder] = {'job': job.name, 'start': now, 'running': True}
+            if self.folder_waiting.get(folder) == job.name:
+                del self.folder_waiting[folder]
+        return folders, 0
+
+    async def run_job(self, job):
+        """
+        执行一次任务：登记文件夹后在时间预算内运行
+
+        Returns:
+            文件夹本周期已被别的任务抓取而跳过时，返回到可以重试的秒数；否则 None
+        """
+        if job.threads:
+            # 上次超时的线程还在写库，不能再启动一份
+            job.stats['skipped'] += 1
+            print(f"⏭️  [{job.name}] 上次超时的线程仍在运行，跳过本次")
+            return job.interval
+
+        folders, wait = self._claim_folders(job)
+        if wait > 0:
+            job.stats['skipped'] += 1
+            print(f"⏭️  [{job.name}] 文件夹本周期已抓取，跳过（{wait:.0f}秒后重试）")
+            return wait
+
+        job.stats['runs'] += 1
+        job.stats['last_start'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        start = time.perf_counter()
+        token = _current_job.set(job)
+        try:
+            await asyncio.wait_for(job.func(self.ctx), timeout=job.budget)
+            job.stats['success'] += 1
+            job.stats['last_error'] = None
+            print(f"✅ [{job.name}] 完成 (耗时 {time.perf_counter() - start:.2f}秒)")
+        except asyncio.TimeoutError:
+            job.stats['timeout'] += 1
+            job.stats['last_error'] = f'超出时间预算 {job.budget}秒'
+            if job.threads:
+                print(f"⏱️  [{job.name}] 超出时间预算 {job.budget}秒，线程中的调用无法中断，"
+                      f"结束前不再启动本任务")
+            else:
+                print(f"⏱️  [{job.name}] 超出时间预算 {job.budget}秒，已取消")
+        except Exception as e:
+            job.stats['failed'] += 1
+            job.stats['last_error'] = str(e)
+            print(f"❌ [{job.name}] 执行失败: {e}")
+        finally:
+            _current_job.reset(token)
+            job.when_idle(functools.partial(self._release_folders, folders))
+            job.stats['last_duration'] = round(time.perf_counter() - start, 2)
+
+    def _release_folders(self, folders):
+        for folder in folders:
+            self.folder_claims[folder]['running'] = False
+
+    async def _run_once(self, job):
+        """执行一次任务，文件夹被占用时等周期结束再试"""
+        retry = await self.run_job(job)
+        while retry is not None:
+            await asyncio.sleep(retry)
+            retry = await self.run_job(job)
+
+    async def _job_loop(self, job):
+        """按间隔循环执行一个任务"""
+        while self.running:
+            start = time.monotonic()
+            retry = await self.run_job(job)
+            if retry is not None:
+                # 被跳过：周期结束时重试（已在等待队列里，优先于别的任务）
+                await asyncio.sleep(min(retry, job.interval))
+                continue
+            elapsed = time.monotonic() - start
+            await asyncio.sleep(max(0, job.interval - elapsed))
+
+    async def run(self, only=None, once=False):
+        """运行已注册的任务，once=True 时每个任务执行一次"""
+        jobs = [job for name, job in self.jobs.items() if not only or name in only]
+
+        print("=" * 70)
+        print("🚀 统一采集守护进程启动")
+        print("=" * 70)
+        for job in jobs:
+            print(f"   {job.name:<14} 间隔 {job.interval}秒, 预算 {job.budget}秒")
+        print("=" * 70)
+
+        self.running = True
+        try:
+            if once:
+                await asyncio.gather(*(self._run_once(job) for job in jobs))
+            else:
+                await asyncio.gather(*(self._job_loop(job) for job in jobs))
+        finally:
+            self.running = False
+            self.ctx.close()
+
+    def stop(self):
+        self.running = False
+
+    def status(self):
+        return {name: dict(job.stats, interval=job.interval, budget=job.budget)
+                for name, job in self.jobs.items()}
+
+
+# ==================== 任务 ====================
+
+async def job_home(ctx):
+    """首页数据：Google Drive 最新快照 -> 历史库 + 比价"""
+    from gdrive_home_data_reader import get_latest_file_by_sorting
+    from import_history_simple import parse_filename_datetime, parse_home_data, save_to_database
+    from home_cache import parse_api_data, save_home_cache
+
+    result = await get_latest_file_by_sorting()
+    if not result or not result.get('content'):
+        raise RuntimeError('获取首页数据失败')
+
+    filename = result['filename']
+    record_time = parse_filename_datetime(filename)
+    stats, coins = parse_home_data(result['content'])
+    if record_time:
+        success, msg = await ctx.to_thread(save_to_database, filename, record_time, stats, coins)
+        print(f"   💾 {filename}: {msg}")
+
+    # 写入首页快速缓存，API 服务读到后不再自己抓取
+    await ctx.to_thread(save_home_cache, parse_api_data(result['content']), filename, result['time_diff'])
+
+    await ctx.to_thread(ctx.price_comparison.batch_compare, coins)
+
+
+async def job_signals(ctx):
+    """信号 + 恐慌清洗文本（Drive API 增量读取）"""
+    from data_collector import DataCollector
+
+    collector = ctx.get('data_collector', DataCollector)
+    await ctx.to_thread(collector.run_once)
+
+
+async def job_panic_wash(ctx):
+    """恐慌清洗文件夹快照"""
+    import auto_gdrive_collector_v2
+
+    ctx.get('panic_wash_db', auto_gdrive_collector_v2.init_database)
+    await auto_gdrive_collector_v2.collect_once()
+
+
+async def job_panic_index(ctx):
+    """恐慌清洗指标（爆仓/持仓）"""
+    from panic_wash_collector import PanicWashCollectorService
+
+    service = ctx.get('panic_service', PanicWashCollectorService)
+    await service.collect_once()
+
+
+async def job_signal_stats(ctx):
+    """做多做空信号统计"""
+    from sync_signal_stats import sync_signal_stats
+    await ctx.to_thread(sync_signal_stats, ctx.http)
+
+
+async def job_scores(ctx):
+    """得分系统：抓取各来源得分并计算统计"""
+    from score_system_final import collector
+    await collector.collect_all_scores()
+    await ctx.to_thread(collector.calculate_and_save_statistics)
+
+
+def build_default_daemon():
+    """注册默认任务"""
+    daemon = IngestionDaemon()
+    home_folder = lambda: f"drive:{HOME_ROOT_FOLDER_ID}/{beijing_today()}"
+
+    # home 读当天的 YYYY-MM-DD_HHMM.txt 快照，signals 读 信号.txt / 恐慌清洗.txt，按文件登记互不影响
+    daemon.register('home', job_home, interval=180, budget=120,
+                    folders=lambda: [f"{home_folder()}/快照"])
+    daemon.register('signals', job_signals, interval=60, budget=45,
+                    folders=lambda: [f"{home_folder()}/信号.txt", f"{home_folder()}/恐慌清洗.txt"])
+    daemon.register('panic_wash', job_panic_wash, interval=180, budget=150,
+                    folders=lambda: [f"drive:{PANIC_WASH_FOLDER_ID}"])
+    daemon.register('panic_index', job_panic_index, interval=180, budget=90)
+    daemon.register('signal_stats', job_signal_stats, interval=180, budget=30)
+    daemon.register('scores', job_scores, interval=180, budget=120)
+    return daemon
+
+
+def main():
+    args = sys.argv[1:]
+    once = '--once' in args
+    only = None
+    if '--only' in args:
+        pos = args.index('--only')
+        if pos + 1 < len(args):
+            only = set(args[pos + 1].split(','))
+
+    daemon = build_default_daemon()
+    try:
+        asyncio.run(daemon.run(only=only, once=once))
+    except KeyboardInterrupt:
+        print("\n采集守护进程已停止")
+
+
+if __name__ == '__main__':
+    main()
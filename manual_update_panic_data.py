@@ -5,7 +5,7 @@
 """
 
 import sys
-import sqlite3
+from db_connection import get_connection
 from datetime import datetime
 
 def parse_and_save(data_line):
@@ -48,7 +48,7 @@ def parse_and_save(data_line):
         print(f"\n✅ 已保存到 panic_wash_latest.txt")
         
         # 保存到数据库
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
         cursor.execute('''
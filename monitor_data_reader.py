@@ -30,7 +30,8 @@ class MonitorDataReader:
         self.gdrive_reader = None
         if GDRIVE_AVAILABLE:
             try:
-                self.gdrive_reader = GDriveReader(self.folder_id)
+                # 轮询场景用增量模式，每次只列出新文件
+                self.gdrive_reader = GDriveReader(self.folder_id, incremental=True)
                 print("✅ Google Drive 读取器已初始化")
             except Exception as e:
                 print(f"⚠️  初始化 Google Drive 读取器失败: {e}")
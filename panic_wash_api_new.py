@@ -10,6 +10,7 @@ import sqlite3
 from datetime import datetime, timedelta
 import asyncio
 from panic_wash_new import MockPanicWashCalculator, PanicWashCalculator
+from db_connection import get_connection
 try:
     from playwright.async_api import async_playwright
     PLAYWRIGHT_AVAILABLE = True
@@ -23,7 +24,7 @@ DB_PATH = 'crypto_data.db'
 
 def get_db_connection():
     """获取数据库连接"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
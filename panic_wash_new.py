@@ -22,7 +22,8 @@ except ImportError:
 from datetime import datetime
 import re
 import json
-import sqlite3
+from db_connection import get_connection
+from db_schema import ensure_schema
 import time
 import random
 
@@ -35,32 +36,8 @@ class PanicWashCalculator:
         self.init_database()
     
     def init_database(self):
-        """初始化数据库表"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 创建新的恐慌清洗指标表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS panic_wash_new (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                record_time DATETIME NOT NULL,
-                hour_1_amount REAL,          -- 1小时爆仓金额（美元）
-                hour_24_amount REAL,         -- 24小时爆仓金额（美元）
-                hour_24_people INTEGER,      -- 24小时爆仓人数
-                total_position REAL,         -- 全网持仓量（美元）
-                panic_index REAL,            -- 恐慌清洗指数
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 创建索引
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_panic_time 
-            ON panic_wash_new(record_time DESC)
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """初始化数据库表（panic_wash_new 表结构见 db_schema）"""
+        ensure_schema(self.db_path)
         
         print("✅ 数据库表初始化完成")
     
@@ -158,7 +135,7 @@ class PanicWashCalculator:
             return False
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -188,7 +165,7 @@ class PanicWashCalculator:
     def get_latest_data(self):
         """获取最新数据"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -12,7 +12,11 @@ import re
 import asyncio
 from datetime import datetime, timedelta
 import pytz
-from playwright.async_api import async_playwright
+from browser_pool import get_browser_pool
+from gdrive_navigation import (
+    StepTimer, FILE_ROW_SELECTOR, goto_ready, settle, wait_for_page_text, wait_for_preview,
+    file_ids_by_name
+)
 import json
 import os
 
@@ -21,21 +25,32 @@ BEIJING_TZ = pytz.timezone('Asia/Shanghai')
 STATE_FILE = 'last_found_time.json'
 MANUAL_IDS_FILE = 'manual_file_ids.json'  # 手动文件ID配置
 
+# 候选窗口：预计上传时间前后各 CANDIDATE_RADIUS 分钟
+CANDIDATE_RADIUS = 5
+# 上传计划：每 10 分钟一个时间点（整 10 分），文件名时间相对计划时间点的偏移为 -5 ~ +4 分钟
+SCHEDULE_MINUTES = 10
+DEFAULT_SCHEDULE_OFFSET = 0
+# 并发探测的候选文件数上限（1 表示逐个尝试）
+PROBE_CONCURRENCY = int(os.environ.get('PANIC_PROBE_CONCURRENCY', '4'))
+
 
 class PanicWashReaderV7:
     """终极自适应版本"""
     
-    def __init__(self):
+    def __init__(self, probe_concurrency=PROBE_CONCURRENCY):
         self.latest_data = None
+        self.probe_concurrency = max(1, probe_concurrency)
+        self.schedule_offset = DEFAULT_SCHEDULE_OFFSET
         self.last_found_time = self.load_last_found_time()
         self.manual_ids = self.load_manual_ids()
     
     def load_last_found_time(self):
-        """加载上次成功找到文件的时间"""
+        """加载上次成功找到文件的时间（以及相对上传计划的偏移）"""
         if os.path.exists(STATE_FILE):
             try:
                 with open(STATE_FILE, 'r') as f:
                     data = json.load(f)
+                    self.schedule_offset = data.get('schedule_offset', DEFAULT_SCHEDULE_OFFSET)
                     time_str = data.get('last_found_time')
                     if time_str:
                         return datetime.fromisoformat(time_str)
@@ -44,13 +59,15 @@ class PanicWashReaderV7:
         return None
     
     def save_last_found_time(self, found_time, filename=None):
-        """保存成功找到文件的时间"""
+        """保存成功找到文件的时间和它相对上传计划的偏移"""
         data = {
             'last_found_time': found_time.isoformat(),
             'timestamp': datetime.now(BEIJING_TZ).isoformat()
         }
         if filename:
             data['filename'] = filename
+        _, self.schedule_offset = self.schedule_slot(found_time)
+        data['schedule_offset'] = self.schedule_offset
         
         with open(STATE_FILE, 'w') as f:
             json.dump(data, f, indent=2)
@@ -71,127 +88,183 @@ class PanicWashReaderV7:
     
     async def get_latest_from_folder(self):
         """从文件夹获取最新可见文件"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        try:
+            return await get_browser_pool().run(self._read_latest_from_folder, viewport=None)
+        except Exception as e:
+            print(f"  ⚠ 文件夹访问失败: {e}")
+            return None
+    
+    async def _read_latest_from_folder(self, page):
+        """在借来的页面上读取文件夹中最新可见文件"""
+        folder_url = f"https://drive.google.com/drive/folders/{FOLDER_ID}"
+        timer = StepTimer('恐慌清洗文件夹', verbose=False)
+        await goto_ready(page, folder_url, selector=FILE_ROW_SELECTOR, timeout=30000, timer=timer)
+        
+        # 滚动几次，每次等列表加载完成
+        for _ in range(3):
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+            await settle(page, timeout=1500)
+        timer.mark('滚动加载')
+        
+        html = await wait_for_page_text(page, r'2025-12-\d{2}_\d{4}\.txt', timeout=5000)
+        
+        # 查找所有txt文件
+        txt_files = re.findall(r'(2025-12-\d{2}_\d{4})\.txt', html)
+        
+        if txt_files:
+            # 找到最新的
+            unique_files = sorted(set(txt_files), reverse=True)
+            latest_file = unique_files[0] + '.txt'
             
-            try:
-                folder_url = f"https://drive.google.com/drive/folders/{FOLDER_ID}"
-                await page.goto(folder_url, timeout=30000)
-                await asyncio.sleep(2)
-                
-                # 滚动几次
-                for _ in range(3):
-                    await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                    await asyncio.sleep(0.5)
-                
-                html = await page.content()
-                
-                # 查找所有txt文件
-                txt_files = re.findall(r'(2025-12-\d{2}_\d{4})\.txt', html)
-                
-                if txt_files:
-                    # 找到最新的
-                    unique_files = sorted(set(txt_files), reverse=True)
-                    latest_file = unique_files[0] + '.txt'
-                    
-                    print(f"  📁 文件夹中最新可见文件: {latest_file}")
-                    
-                    # 解析时间
-                    match = re.match(r'(\d{4})-(\d{2})-(\d{2})_(\d{2})(\d{2})', unique_files[0])
-                    if match:
-                        year, month, day, hour, minute = map(int, match.groups())
-                        file_time = datetime(year, month, day, hour, minute, tzinfo=BEIJING_TZ)
-                        
-                        await browser.close()
-                        return {
-                            'filename': latest_file,
-                            'time': file_time,
-                            'source': 'folder'
-                        }
-                
-                await browser.close()
-                return None
+            print(f"  📁 文件夹中最新可见文件: {latest_file}")
+            
+            # 解析时间
+            match = re.match(r'(\d{4})-(\d{2})-(\d{2})_(\d{2})(\d{2})', unique_files[0])
+            if match:
+                year, month, day, hour, minute = map(int, match.groups())
+                file_time = datetime(year, month, day, hour, minute, tzinfo=BEIJING_TZ)
                 
-            except Exception as e:
-                print(f"  ⚠ 文件夹访问失败: {e}")
-                await browser.close()
-                return None
+                return {
+                    'filename': latest_file,
+                    'time': file_time,
+                    'source': 'folder'
+                }
+        
+        return None
+    
+    @staticmethod
+    def schedule_slot(file_time):
+        """
+        文件时间对应的计划时间点（最近的整 10 分）和偏移（分钟，-5 ~ +4）
+        
+        偏移按固定的计划时间点计算，不随上次找到的时间漂移：12:27 的文件属于 12:30，偏移 -3
+        """
+        minute = file_time.hour * 60 + file_time.minute
+        slot_minute = (minute + SCHEDULE_MINUTES // 2) // SCHEDULE_MINUTES * SCHEDULE_MINUTES
+        slot = file_time.replace(second=0, microsecond=0) + timedelta(minutes=slot_minute - minute)
+        return slot, minute - slot_minute
     
-    def generate_candidates(self, start_time):
-        """生成候选文件列表"""
+    def expected_time(self, last_time):
+        """下一个文件的预计时间：下一个计划时间点 + 上次观测到的偏移"""
+        slot, _ = self.schedule_slot(last_time)
+        return slot + timedelta(minutes=SCHEDULE_MINUTES + self.schedule_offset)
+    
+    def generate_candidates(self, start_time, center=0, radius=CANDIDATE_RADIUS):
+        """
+        生成候选文件列表
+        
+        Args:
+            start_time: 预计上传时间
+            center: 窗口中心相对 start_time 的分钟偏移
+            radius: 窗口半径（分钟）
+        """
         now = datetime.now(BEIJING_TZ)
         candidates = []
         
-        # 从start_time开始，生成+10, +11, +12, ... +19分钟的候选
-        for offset in range(11):  # 0-10分钟
+        for offset in range(center - radius, center + radius + 1):
             candidate_time = start_time + timedelta(minutes=offset)
             
-            # 不能超过当前时间
-            if candidate_time <= now:
-                filename = candidate_time.strftime("%Y-%m-%d_%H%M.txt")
-                candidates.append({
-                    'time': candidate_time,
-                    'filename': filename,
-                    'time_str': candidate_time.strftime('%H:%M'),
-                    'offset': offset
-                })
+            # 不能超过当前时间，也不能早于上次找到的文件
+            if candidate_time > now:
+                continue
+            if self.last_found_time and candidate_time <= self.last_found_time:
+                continue
+            
+            filename = candidate_time.strftime("%Y-%m-%d_%H%M.txt")
+            candidates.append({
+                'time': candidate_time,
+                'filename': filename,
+                'time_str': candidate_time.strftime('%H:%M'),
+                'offset': offset
+            })
         
         return candidates
     
+    async def _probe(self, candidate):
+        """探测一个候选文件，返回 (候选, 解析后的数据或None)"""
+        file_id = self.get_file_id_by_name(candidate['filename'])
+        content = await self.try_access_file(candidate['filename'], file_id)
+        data = self.parse_content(content, candidate['filename']) if content else None
+        return candidate, data
+    
+    async def probe_candidates(self, candidates):
+        """
+        并发探测候选文件，返回最新存在文件的 (候选, 数据)，都不存在返回 None
+        
+        按时间从新到旧排队、最多 probe_concurrency 个同时进行；某个候选命中且
+        比它新的候选都已确认不存在时，它就是最新文件，立即取消其余探测
+        """
+        ordered = sorted(candidates, key=lambda c: c['time'], reverse=True)
+        semaphore = asyncio.Semaphore(self.probe_concurrency)
+        
+        async def limited(candidate):
+            async with semaphore:
+                return await self._probe(candidate)
+        
+        tasks = {asyncio.ensure_future(limited(c)): c for c in ordered}
+        results = {}  # filename -> data（None 表示不存在）
+        best = None
+        
+        try:
+            for finished in asyncio.as_completed(list(tasks)):
+                candidate, data = await finished
+                results[candidate['filename']] = data
+                print(f"    {'✅' if data else '⏭ '} {candidate['filename']} ({candidate['offset']:+d}分钟)")
+                
+                # 从新到旧检查：遇到未完成的探测就还不能确定
+                for c in ordered:
+                    if c['filename'] not in results:
+                        break
+                    if results[c['filename']]:
+                        best = (c, results[c['filename']])
+                        break
+                if best:
+                    return best
+            return None
+        finally:
+            pending = [t for t in tasks if not t.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                print(f"    🛑 已取消 {len(pending)} 个较旧的探测")
+    
     async def try_access_file(self, filename, file_id=None):
         """尝试访问文件"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        try:
+            return await get_browser_pool().run(self._read_file, filename, file_id, viewport=None)
+        except Exception as e:
+            return None
+    
+    async def _read_file(self, page, filename, file_id=None):
+        """在借来的页面上读取文件内容"""
+        if file_id:
+            # 如果有文件ID，直接访问
+            file_url = f"https://drive.google.com/file/d/{file_id}/view"
+            print(f"      使用文件ID访问: {file_id[:15]}...")
+        else:
+            # 否则，先从文件夹查找
+            folder_url = f"https://drive.google.com/drive/folders/{FOLDER_ID}"
+            await goto_ready(page, folder_url, selector=FILE_ROW_SELECTOR, timeout=20000)
+            html = await wait_for_page_text(page, re.escape(filename), timeout=3000)
             
-            try:
-                if file_id:
-                    # 如果有文件ID，直接访问
-                    file_url = f"https://drive.google.com/file/d/{file_id}/view"
-                    print(f"      使用文件ID访问: {file_id[:15]}...")
-                else:
-                    # 否则，先从文件夹查找
-                    folder_url = f"https://drive.google.com/drive/folders/{FOLDER_ID}"
-                    await page.goto(folder_url, timeout=20000)
-                    await asyncio.sleep(2)
-                    
-                    html = await page.content()
-                    
-                    # 检查文件是否可见
-                    if filename not in html:
-                        await browser.close()
-                        return None
-                    
-                    # 文件可见，尝试提取ID
-                    file_id_match = re.search(rf'{filename}[^<]*data-id="([^"]+)"', html)
-                    if not file_id_match:
-                        file_id_match = re.search(rf'data-id="([^"]+)"[^<]*{filename}', html)
-                    
-                    if file_id_match:
-                        file_id = file_id_match.group(1)
-                        file_url = f"https://drive.google.com/file/d/{file_id}/view"
-                    else:
-                        await browser.close()
-                        return None
-                
-                # 访问文件
-                await page.goto(file_url, timeout=20000)
-                await asyncio.sleep(2)
-                
-                # 获取内容
-                content = await page.text_content('body')
-                
-                await browser.close()
-                
-                if content and len(content) > 500:
-                    return content
-                
+            # 检查文件是否可见
+            if filename not in html:
                 return None
-                
-            except Exception as e:
-                await browser.close()
+            
+            # 文件可见，从文件行的 data-id 提取ID
+            file_id = (await file_ids_by_name(page, re.escape(filename))).get(filename)
+            if file_id:
+                file_url = f"https://drive.google.com/file/d/{file_id}/view"
+            else:
+                print(f"      ⚠️  {filename} 没有找到文件ID")
                 return None
+        
+        # 访问文件，正文长度达标即返回
+        return await wait_for_preview(
+            page, marker=None, min_length=501, timeout=20000,
+            open_action=lambda: goto_ready(page, file_url, timeout=20000)
+        )
     
     def parse_content(self, content, filename):
         """解析文件内容"""
@@ -275,16 +348,18 @@ class PanicWashReaderV7:
         print("📂 步骤1: 检查文件夹中最新可见文件...")
         folder_latest = await self.get_latest_from_folder()
         
-        # 确定搜索起点
+        # 确定搜索起点（窗口以预计时间为中心，前后各 CANDIDATE_RADIUS 分钟）
+        center = 0
         if self.last_found_time:
-            # 有历史记录，从历史记录+10分钟开始
-            start_time = self.last_found_time + timedelta(minutes=10)
+            # 有历史记录：下一个计划时间点 + 相对计划的偏移（偏移只计一次）
+            start_time = self.expected_time(self.last_found_time)
             print(f"\n📌 步骤2: 从上次记录开始搜索")
             print(f"  上次成功时间: {self.last_found_time.strftime('%H:%M')}")
-            print(f"  本次搜索起点: {start_time.strftime('%H:%M')} (+10分钟)")
+            print(f"  本次预计时间: {start_time.strftime('%H:%M')} (计划偏移 {self.schedule_offset:+d}分钟)")
         elif folder_latest:
-            # 没有历史记录，但文件夹有最新文件，从最新文件+10分钟开始
-            start_time = folder_latest['time'] + timedelta(minutes=10)
+            # 没有历史记录，但文件夹有最新文件，按它的计划偏移推算下一个
+            _, self.schedule_offset = self.schedule_slot(folder_latest['time'])
+            start_time = self.expected_time(folder_latest['time'])
             print(f"\n📌 步骤2: 从文件夹最新文件开始搜索")
             print(f"  文件夹最新时间: {folder_latest['time'].strftime('%H:%M')}")
             print(f"  本次搜索起点: {start_time.strftime('%H:%M')} (+10分钟)")
@@ -293,12 +368,14 @@ class PanicWashReaderV7:
             now = datetime.now(BEIJING_TZ)
             minute = (now.minute // 10) * 10
             start_time = now.replace(minute=minute, second=0, microsecond=0)
+            # 只向后找 +0 ~ +10 分钟
+            center = CANDIDATE_RADIUS
             print(f"\n📌 步骤2: 首次运行，从当前时间开始")
             print(f"  当前时间: {now.strftime('%H:%M')}")
             print(f"  搜索起点: {start_time.strftime('%H:%M')}")
         
         # 生成候选列表
-        candidates = self.generate_candidates(start_time)
+        candidates = self.generate_candidates(start_time, center=center)
         
         if not candidates:
             print("\n❌ 没有可搜索的候选文件")
@@ -306,46 +383,44 @@ class PanicWashReaderV7:
         
         print(f"\n📝 候选文件列表 ({len(candidates)}个):")
         for i, c in enumerate(candidates):
-            offset_str = f"+{c['offset']}分钟" if c['offset'] > 0 else "起点"
+            offset_str = f"{c['offset']:+d}分钟" if c['offset'] != 0 else "起点"
             # 检查是否有手动配置的ID
             has_id = "🔑" if self.get_file_id_by_name(c['filename']) else "  "
             print(f"  {has_id} {i+1}. {c['filename']} ({c['time_str']}) [{offset_str}]")
         
-        # 第三步：逐个尝试候选文件
-        print(f"\n🔍 步骤3: 开始自适应搜索...")
+        # 第三步：尝试候选文件
+        if self.probe_concurrency > 1:
+            print(f"\n🔍 步骤3: 并发探测 (最多 {self.probe_concurrency} 个同时进行)...")
+            found = await self.probe_candidates(candidates)
+        else:
+            print(f"\n🔍 步骤3: 开始自适应搜索...")
+            found = None
+            for i, candidate in enumerate(candidates):
+                print(f"\n  [{i+1}/{len(candidates)}] {candidate['filename']} ({candidate['time_str']})")
+                candidate, data = await self._probe(candidate)
+                if data:
+                    found = (candidate, data)
+                    break
+                print(f"    ⏭  未找到，尝试+1分钟...")
         
-        for i, candidate in enumerate(candidates):
-            print(f"\n  [{i+1}/{len(candidates)}] {candidate['filename']} ({candidate['time_str']})")
+        if found:
+            candidate, data = found
+            print(f"    ✅ 成功! {candidate['filename']}")
+            print(f"    📈 急涨: {data['rise_total']}")
+            print(f"    📉 急跌: {data['fall_total']}")
+            print(f"    📊 比值: {data['rise_fall_ratio']}")
+            print(f"    ➖ 差值: {data['diff_result']}")
+            print(f"    🪙 币种: {len(data['coins'])}")
             
-            # 获取文件ID（如果有手动配置）
-            file_id = self.get_file_id_by_name(candidate['filename'])
+            # 保存成功时间和相对上传计划的偏移
+            self.save_last_found_time(candidate['time'], candidate['filename'])
             
-            # 尝试访问
-            content = await self.try_access_file(candidate['filename'], file_id)
+            next_time = self.expected_time(candidate['time'])
+            print(f"\n    💾 已保存时间基准 (计划偏移 {self.schedule_offset:+d}分钟)")
+            print(f"    ⏭️  下次将从 {next_time.strftime('%H:%M')} 附近开始搜索")
             
-            if content:
-                # 解析数据
-                data = self.parse_content(content, candidate['filename'])
-                
-                if data:
-                    print(f"    ✅ 成功!")
-                    print(f"    📈 急涨: {data['rise_total']}")
-                    print(f"    📉 急跌: {data['fall_total']}")
-                    print(f"    📊 比值: {data['rise_fall_ratio']}")
-                    print(f"    ➖ 差值: {data['diff_result']}")
-                    print(f"    🪙 币种: {len(data['coins'])}")
-                    
-                    # 保存成功时间
-                    self.save_last_found_time(candidate['time'], candidate['filename'])
-                    
-                    next_time = candidate['time'] + timedelta(minutes=10)
-                    print(f"\n    💾 已保存时间基准")
-                    print(f"    ⏭️  下次将从 {next_time.strftime('%H:%M')} 开始搜索")
-                    
-                    self.latest_data = data
-                    return data
-            else:
-                print(f"    ⏭  未找到，尝试+1分钟...")
+            self.latest_data = data
+            return data
         
         print(f"\n❌ 所有候选文件都未找到")
         print(f"💡 提示:")
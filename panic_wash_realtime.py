@@ -7,7 +7,7 @@
 """
 
 import requests
-import sqlite3
+from db_connection import get_connection
 from datetime import datetime, timedelta
 import pytz
 import time
@@ -108,7 +108,7 @@ class RealTimePanicWashCollector:
             return False
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行历史导入流水线（多周回填用）
+读取 -> 解析 -> 写入 三段并行：
+- 读取：一个线程按文件名顺序读取（本地目录 / 快照缓存 / Drive API 并发下载）
+- 解析：ProcessPoolExecutor，每个任务把一组文件解析成 SnapshotColumns，
+  列式结果在进程间传输很小，解析随 CPU 核数扩展
+- 写入：只有主进程写 SQLite，解析结果按读取顺序合并，每 COMMIT_FILES 个文件一个事务
+
+用法:
+    python parallel_import.py --dir exports/ [更多目录或文件] [--workers 8]
+    python parallel_import.py --drive 2025-12-01 2025-12-14     # Drive API 按日期文件夹
+    python parallel_import.py --cache [2025-12-01 [2025-12-14]] # 只导入本地快照缓存
+可选: --batch 每个解析任务的文件数, --commit 每个事务的文件数
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from snapshot_parser import SnapshotColumns, parse_snapshots_columnar
+from db_connection import get_connection
+
+DB_PATH = 'crypto_data.db'
+ROOT_FOLDER_ID = '1j8YV6KysUCmgcmASFOxztWWIE1Vq-kYV'
+
+DEFAULT_WORKERS = int(os.environ.get('IMPORT_WORKERS', str(os.cpu_count() or 2)))
+# 每个解析任务的文件数（太小进程间往返多，太大流水线填充慢）
+PARSE_BATCH_FILES = int(os.environ.get('IMPORT_PARSE_BATCH', '50'))
+# 每个写入事务的文件数
+COMMIT_FILES = int(os.environ.get('IMPORT_COMMIT_FILES', '500'))
+# Drive 每次并发下载的文件数
+DOWNLOAD_CHUNK = 50
+
+_FILENAME_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})_(\d{2})(\d{2})\.txt$')
+
+
+def record_time_from_filename(filename):
+    """YYYY-MM-DD_HHMM.txt -> YYYY-MM-DD HH:MM:00，不是快照文件名返回 None"""
+    match = _FILENAME_PATTERN.match(filename)
+    if match:
+        return f"{match.group(1)} {match.group(2)}:{match.group(3)}:00"
+    return None
+
+
+def date_range(start, end=None):
+    """start 到 end（含）之间的日期字符串"""
+    first = datetime.strptime(start, '%Y-%m-%d')
+    last = datetime.strptime(end, '%Y-%m-%d') if end else first
+    days = (last - first).days
+    return [(first + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days + 1)]
+
+
+def existing_filenames(db_path=DB_PATH):
+    """数据库中已导入的文件名"""
+    try:
+        conn = get_connection(db_path)
+        try:
+            return {row[0] for row in conn.execute('SELECT filename FROM stats_history')}
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return set()
+
+
+# ==================== 读取来源 ====================
+# 每个来源按文件名顺序产出 (filename, content)，读取失败时 content 为 None
+
+def local_source(paths, exclude=()):
+    """本地目录（递归）或文件"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                files.extend(os.path.join(folder, name) for name in names if name.endswith('.txt'))
+        else:
+            files.append(path)
+
+    for path in sorted(files, key=os.path.basename):
+        filename = os.path.basename(path)
+        if filename in exclude or not record_time_from_filename(filename):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                yield filename, f.read()
+        except OSError as e:
+            print(f"   ❌ {path} 读取失败: {e}")
+            yield filename, None
+
+
+def cache_source(dates=None, exclude=()):
+    """本地快照缓存（snapshot_cache）中已有的文件"""
+    from snapshot_cache import get_snapshot_cache
+
+    for _, filename, path in get_snapshot_cache().entries(dates):
+        if filename in exclude or not record_time_from_filename(filename):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                yield filename, f.read()
+        except OSError:
+            yield filename, None
+
+
+def drive_source(dates, exclude=(), root_folder_id=ROOT_FOLDER_ID):
+    """Drive API：按日期文件夹列出文件，本地缓存优先，未命中的并发下载"""
+    from drive_client import get_drive_client
+    from snapshot_cache import get_snapshot_cache, drive_file_version
+
+    client = get_drive_client()
+    if not client:
+        return
+    cache = get_snapshot_cache()
+
+    for date_str in dates:
+        folder_id = client.find_folder(root_folder_id, date_str)
+        if not folder_id:
+            print(f"⚠️  未找到日期文件夹: {date_str}")
+            continue
+
+        files = [file for file in client.list_files(folder_id, "name contains '.txt'")
+                 if file['name'] not in exclude and record_time_from_filename(file['name'])]
+        files.sort(key=lambda file: file['name'])
+        print(f"📁 {date_str}: {len(files)} 个待导入文件")
+
+        for start in range(0, len(files), DOWNLOAD_CHUNK):
+            chunk = files[start:start + DOWNLOAD_CHUNK]
+            contents = {}
+            missing = []
+            for file in chunk:
+                content = cache.get(date_str, file['name'], drive_file_version(file))
+                if content is None:
+                    missing.append(file)
+                else:
+                    contents[file['id']] = content
+
+            downloaded = client.download_many(file['id'] for file in missing)
+            for file in missing:
+                content = downloaded.get(file['id'])
+                if content:
+                    cache.put(date_str, file['name'], content, drive_file_version(file))
+                    contents[file['id']] = content
+
+            for file in chunk:
+                yield file['name'], contents.get(file['id'])
+
+
+# ==================== 流水线 ====================
+
+def parse_batch(items):
+    """解析进程：[(filename, record_time, content), ...] -> SnapshotColumns"""
+    return parse_snapshots_columnar(items)
+
+
+def _read_stage(source, batch_files, batches, counters):
+    """读取线程：把来源按 batch_files 分组放入队列，结束时放入 None"""
+    batch = []
+    try:
+        for filename, content in source:
+            counters['read'] += 1
+            if not content:
+                counters['failed'] += 1
+                continue
+            batch.append((filename, record_time_from_filename(filename), content))
+            if len(batch) >= batch_files:
+                batches.put(batch)
+                batch = []
+        if batch:
+            batches.put(batch)
+    except Exception as e:
+        print(f"❌ 读取中断: {e}")
+        counters['read_error'] = str(e)
+    finally:
+        batches.put(None)
+
+
+def run_pipeline(source, workers=DEFAULT_WORKERS, batch_files=PARSE_BATCH_FILES, commit_files=COMMIT_FILES):
+    """
+    运行导入流水线
+
+    Args:
+        source: 产出 (filename, content) 的迭代器，应按文件名（时间）顺序
+        workers: 解析进程数
+
+    Returns:
+        统计 dict（含 files_per_second）
+    """
+    # 写入端才需要，解析子进程不必加载
+    from import_history_simple import save_columns_to_database
+
+    workers = max(1, workers)
+    counters = {'read': 0, 'parsed': 0, 'saved': 0, 'skipped': 0, 'failed': 0, 'coins': 0,
+                'write_seconds': 0.0}
+    batches = queue.Queue(maxsize=workers * 2)
+
+    def write(columns):
+        if not len(columns):
+            return
+        start = time.perf_counter()
+        for filename, success, msg in save_columns_to_database(columns):
+            if success:
+                counters['saved'] += 1
+            elif msg == "已存在":
+                counters['skipped'] += 1
+            else:
+                counters['failed'] += 1
+                print(f"   ❌ {filename}: {msg}")
+        counters['coins'] += columns.total_coins
+        counters['write_seconds'] += time.perf_counter() - start
+        elapsed = time.perf_counter() - pipeline_start
+        print(f"💾 已写入 {counters['saved']} 个文件 (读取 {counters['read']}, "
+              f"{counters['saved'] / elapsed:.1f} 文件/秒)")
+
+    print("=" * 70)
+    print(f"🚀 并行导入: {workers} 个解析进程, 每任务 {batch_files} 个文件, 每事务 {commit_files} 个文件")
+    print("=" * 70)
+
+    pipeline_start = time.perf_counter()
+    reader = threading.Thread(target=_read_stage, args=(source, batch_files, batches, counters), daemon=True)
+    reader.start()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        buffer = SnapshotColumns()
+        reading = True
+        while reading or in_flight:
+            # 保持每个进程有任务在排队
+            while reading and len(in_flight) < workers * 2:
+                batch = batches.get()
+                if batch is None:
+                    reading = False
+                    break
+                in_flight.append(executor.submit(parse_batch, batch))
+
+            if in_flight:
+                # 按提交顺序取结果，写入顺序与时间顺序一致
+                columns = in_flight.popleft().result()
+                counters['parsed'] += len(columns)
+                buffer.extend(columns)
+                if len(buffer) >= commit_files:
+                    write(buffer)
+                    buffer = SnapshotColumns()
+        write(buffer)
+
+    reader.join()
+    elapsed = time.perf_counter() - pipeline_start
+    counters['elapsed_seconds'] = round(elapsed, 2)
+    counters['files_per_second'] = round(counters['parsed'] / elapsed, 1) if elapsed > 0 else None
+    counters['write_seconds'] = round(counters['write_seconds'], 2)
+
+    print("\n" + "=" * 70)
+    print("📊 导入完成")
+    print("=" * 70)
+    print(f"📥 读取: {counters['read']}  🧩 解析: {counters['parsed']}  ({counters['coins']} 条币种数据)")
+    print(f"✅ 写入: {counters['saved']}  ⏭️  已存在: {counters['skipped']}  ❌ 失败: {counters['failed']}")
+    print(f"⏱️  总耗时 {elapsed:.2f}秒 (其中写库 {counters['write_seconds']}秒)")
+    print(f"🚀 吞吐: {counters['files_per_second']} 文件/秒")
+    print("=" * 70)
+    return counters
+
+
+def _option(args, name, default):
+    if name in args:
+        pos = args.index(name)
+        value = int(args[pos + 1])
+        del args[pos:pos + 2]
+        return value
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    workers = _option(args, '--workers', DEFAULT_WORKERS)
+    batch_files = _option(args, '--batch', PARSE_BATCH_FILES)
+    commit_files = _option(args, '--commit', COMMIT_FILES)
+
+    if not args or args[0] not in ('--dir', '--drive', '--cache'):
+        print(__doc__)
+        return 1
+
+    mode, values = args[0], args[1:]
+    exclude = existing_filenames()
+    print(f"📊 数据库中已有 {len(exclude)} 个文件，导入时跳过")
+
+    if mode == '--dir':
+        source = local_source(values or ['.'], exclude)
+    elif mode == '--drive':
+        if not values:
+            print("❌ 请指定日期: --drive 开始日期 [结束日期]")
+            return 1
+        source = drive_source(date_range(*values[:2]), exclude)
+    else:
+        source = cache_source(date_range(*values[:2]) if values else None, exclude)
+
+    result = run_pipeline(source, workers, batch_files, commit_files)
+    return 0 if not result['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
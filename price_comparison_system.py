@@ -4,24 +4,120 @@
 比价系统 - 加密货币价格比较和统计系统
 功能：
 1. 维护每个币种的最高价/最低价基准
-2. 比较最新价格并更新基准
+2. 比较最新价格并更新基准（基准常驻内存，每批比价一个事务写入）
 3. 统计每日创新高/创新低
-4. 统计3日、7日创新高/创新低次数
+4. 统计3日、7日创新高/创新低次数（随每批比价增量更新，跨天时滚动窗口）
+5. 完整报告在每批比价后生成并存入 price_comparison_report（带版本号），
+   读报告时只查一次版本号，没变就直接返回内存里的报告
+6. 滑动窗口（默认 24h/3d/7d/30d）最高/最低价：每个币种每个窗口一对单调队列，
+   按 coin_history 的新快照增量更新，每次更新均摊 O(1)，不对历史做 MAX/MIN 范围扫描
 """
 
-import sqlite3
-from datetime import datetime, timedelta
+from db_connection import get_connection
+from datetime import date, datetime, timedelta
+from history_archive import select_across
 from typing import Dict, List, Tuple, Optional
+from collections import deque
 import json
+import os
+import threading
+
+# 内存基准的字段（与 price_baseline 列同名）
+BASELINE_FIELDS = ('highest_price', 'highest_count', 'lowest_price', 'lowest_count',
+                   'last_price', 'highest_ratio', 'lowest_ratio', 'last_update_time')
+
+# 统计窗口（天）
+STAT_WINDOWS = (1, 3, 7)
+
+# 滑动窗口，如 PRICE_ROLLING_WINDOWS="24h,3d,7d,30d"（单位 m/h/d）
+ROLLING_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_window(name: str) -> int:
+    """'24h' / '3d' / '15m' -> 秒数"""
+    name = name.strip()
+    if len(name) < 2 or name[-1] not in ROLLING_UNITS or not name[:-1].isdigit():
+        raise ValueError(f'无效的窗口: {name}')
+    return int(name[:-1]) * ROLLING_UNITS[name[-1]]
+
+
+ROLLING_WINDOWS = {
+    name.strip(): parse_window(name)
+    for name in os.environ.get('PRICE_ROLLING_WINDOWS', '24h,3d,7d,30d').split(',')
+}
+
+
+class RollingExtremes:
+    """
+    一个币种一个窗口的滑动最高/最低价
+    
+    maxq 里价格从旧到新严格递减，队首就是窗口内最高价；新价格入队时
+    先弹出队尾不高于它的价格（它们不可能再成为最高价），过期的从队首弹出。
+    每个价格最多入队出队一次，均摊 O(1)。minq 同理。
+    """
+    
+    __slots__ = ('seconds', 'maxq', 'minq')
+    
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.maxq = deque()
+        self.minq = deque()
+    
+    def push(self, ts, price, time_str):
+        """加入一个价格（ts 必须不早于之前加入的）"""
+        maxq, minq = self.maxq, self.minq
+        while maxq and maxq[-1][1] <= price:
+            maxq.pop()
+        maxq.append((ts, price, time_str))
+        while minq and minq[-1][1] >= price:
+            minq.pop()
+        minq.append((ts, price, time_str))
+        self.expire(ts)
+    
+    def expire(self, now_ts):
+        """丢掉不在 (now_ts - seconds, now_ts] 内的价格"""
+        cutoff = now_ts - self.seconds
+        while self.maxq and self.maxq[0][0] <= cutoff:
+            self.maxq.popleft()
+        while self.minq and self.minq[0][0] <= cutoff:
+            self.minq.popleft()
+    
+    def extremes(self):
+        """(最高价, 最高价时间, 最低价, 最低价时间)，窗口为空时返回 None"""
+        if not self.maxq:
+            return None
+        high, low = self.maxq[0], self.minq[0]
+        return high[1], high[2], low[1], low[2]
 
 class PriceComparisonSystem:
-    def __init__(self, db_path='crypto_data.db'):
+    def __init__(self, db_path='crypto_data.db', rolling_windows: Optional[Dict[str, int]] = None):
         self.db_path = db_path
+        # 基准常驻内存，每批比价只在写入时访问一次数据库
+        self._baseline = {}
+        self._marker = None
+        self._lock = threading.Lock()
+        # 近 7 天每天每个币种的创新高低次数 {日期: {symbol: [高, 低]}}
+        self._day_counts = {}
+        # 统计窗口 {天数: {symbol: [高, 低]}}，_today 为窗口的最后一天
+        self._windows = {}
+        self._today = None
+        # 今日创新高低记录 {'new_high': [...], 'new_low': [...]}（最新在前）
+        self._today_records = {}
+        # 最近一次生成的报告及其版本号
+        self._report = None
+        self._report_version = None
+        # 滑动窗口 {symbol: {窗口名: RollingExtremes}}，首次使用时从 coin_history 载入
+        self.rolling_windows = dict(rolling_windows or ROLLING_WINDOWS)
+        self._rolling = None
+        self._rolling_latest = {}
+        self._rolling_until = None
+        self._rolling_lock = threading.Lock()
         self.init_database()
+        self.reload_baseline()
     
     def init_database(self):
         """初始化数据库表结构"""
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         # 1. 价格基准表
@@ -66,6 +162,21 @@ class PriceComparisonSystem:
             )
         ''')
         
+        # 4. 物化的完整报告（只有一行，每批比价后更新，version 递增）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_comparison_report (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL,
+                report TEXT NOT NULL,
+                generated_at TIMESTAMP
+            )
+        ''')
+        
+        # 基准按 display_order 显示，老库建表时没有这一列
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(price_baseline)')]
+        if 'display_order' not in columns:
+            cursor.execute('ALTER TABLE price_baseline ADD COLUMN display_order INTEGER DEFAULT 999')
+        
         # 创建索引
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_daily_records_date ON daily_price_records(record_date)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_daily_records_symbol ON daily_price_records(symbol)')
@@ -90,7 +201,7 @@ class PriceComparisonSystem:
             ...
         ]
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         imported_count = 0
@@ -123,55 +234,211 @@ class PriceComparisonSystem:
         
         conn.commit()
         conn.close()
+        self.refresh_report()
         print(f"✅ 成功导入 {imported_count} 个币种的基准数据")
         return imported_count
     
-    def compare_and_update(self, coin_data: Dict) -> Dict:
-        """
-        比价并更新
-        coin_data格式：
-        {
-            'symbol': 'BTC',
-            'currentPrice': '92401.66197',
-            'updateTime': '2025-12-03 20:25:46'
+    # ==================== 内存基准 ====================
+    
+    def _baseline_marker(self, cursor):
+        """基准表的汇总值；和本进程上次写入后的不同，说明被其他进程改过"""
+        return cursor.execute('''
+            SELECT COUNT(*), TOTAL(highest_count), TOTAL(lowest_count), MAX(last_update_time),
+                   TOTAL(highest_price), TOTAL(lowest_price)
+            FROM price_baseline
+        ''').fetchone()
+    
+    def _load_state(self, cursor):
+        """从数据库载入基准、近 7 天统计和今日记录到内存"""
+        cursor.execute('''
+            SELECT symbol, highest_price, highest_count, lowest_price, lowest_count,
+                   last_price, highest_ratio, lowest_ratio, last_update_time
+            FROM price_baseline
+            ORDER BY display_order
+        ''')
+        self._baseline = {
+            row[0]: dict(zip(BASELINE_FIELDS, row[1:]))
+            for row in cursor.fetchall()
         }
         
-        返回更新结果：
-        {
-            'symbol': 'BTC',
-            'action': 'new_high' / 'high_count_inc' / 'new_low' / 'low_count_inc' / 'no_change',
-            'old_value': 125370.20986,
-            'new_value': 130000.0,
-            'highest_ratio': 98.5,
-            'lowest_ratio': 115.3
+        today = date.today()
+        since = (today - timedelta(days=max(STAT_WINDOWS) - 1)).strftime('%Y-%m-%d')
+        cursor.execute('''
+            SELECT record_date, symbol, new_high_count, new_low_count
+            FROM daily_statistics
+            WHERE record_date >= ?
+        ''', (since,))
+        self._day_counts = {}
+        for record_date, symbol, high, low in cursor.fetchall():
+            self._day_counts.setdefault(record_date, {})[symbol] = [high or 0, low or 0]
+        self._roll_windows(today.strftime('%Y-%m-%d'))
+        
+        cursor.execute('''
+            SELECT record_type, symbol, old_price, new_price, record_time
+            FROM daily_price_records
+            WHERE record_date = ?
+            ORDER BY record_time DESC
+        ''', (self._today,))
+        self._today_records = {'new_high': [], 'new_low': []}
+        for record_type, symbol, old_price, new_price, record_time in cursor.fetchall():
+            if record_type in self._today_records:
+                self._today_records[record_type].append({
+                    'symbol': symbol,
+                    'old_price': old_price,
+                    'new_price': new_price,
+                    'record_time': record_time
+                })
+        
+        self._marker = self._baseline_marker(cursor)
+    
+    def reload_baseline(self):
+        """重新从数据库载入基准和统计（启动时和外部直接改了基准表后调用）"""
+        conn = get_connection(self.db_path)
+        try:
+            with self._lock:
+                self._load_state(conn.cursor())
+        finally:
+            conn.close()
+        return len(self._baseline)
+    
+    def _window_start(self, days):
+        return (datetime.strptime(self._today, '%Y-%m-%d') - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    
+    def _roll_windows(self, today):
+        """把统计窗口的最后一天设为 today，丢掉移出 7 日窗口的天，重算各窗口合计"""
+        self._today = today
+        oldest = self._window_start(max(STAT_WINDOWS))
+        self._day_counts = {d: counts for d, counts in self._day_counts.items() if d >= oldest}
+        self._windows = {days: {} for days in STAT_WINDOWS}
+        for days in STAT_WINDOWS:
+            start = self._window_start(days)
+            for record_date, counts in self._day_counts.items():
+                if start <= record_date <= today:
+                    self._add_counts(self._windows[days], counts)
+    
+    @staticmethod
+    def _add_counts(target, counts):
+        for symbol, (high, low) in counts.items():
+            total = target.setdefault(symbol, [0, 0])
+            total[0] += high
+            total[1] += low
+    
+    def _apply_pending(self, pending):
+        """把一批比价新增的统计和记录计入内存窗口"""
+        for (symbol, record_date), (high, low) in pending['stats'].items():
+            self._add_counts(self._day_counts.setdefault(record_date, {}), {symbol: (high, low)})
+            for days in STAT_WINDOWS:
+                if self._window_start(days) <= record_date <= self._today:
+                    self._add_counts(self._windows[days], {symbol: (high, low)})
+        
+        for symbol, record_date, record_type, old_price, new_price, record_time in pending['records']:
+            if record_date != self._today:
+                continue
+            records = self._today_records[record_type]
+            # 与 daily_price_records 的唯一约束一致，重复的记录不再计入
+            if any(r['symbol'] == symbol and r['record_time'] == record_time for r in records):
+                continue
+            records.append({
+                'symbol': symbol,
+                'old_price': old_price,
+                'new_price': new_price,
+                'record_time': record_time
+            })
+            records.sort(key=lambda r: r['record_time'] or '', reverse=True)
+    
+    def _build_report(self) -> Dict:
+        """由内存状态生成完整报告（格式同原 get_full_report）"""
+        baseline = [{'symbol': symbol, **base} for symbol, base in self._baseline.items()]
+        
+        statistics = []
+        for symbol in self._baseline:
+            stat = {'symbol': symbol}
+            for days in STAT_WINDOWS:
+                high, low = self._windows[days].get(symbol, (0, 0))
+                stat[f'day{days}_high'] = high
+                stat[f'day{days}_low'] = low
+            statistics.append(stat)
+        
+        total_stats = {}
+        for days in STAT_WINDOWS:
+            total_stats[f'day{days}_high_total'] = sum(s[f'day{days}_high'] for s in statistics)
+            total_stats[f'day{days}_low_total'] = sum(s[f'day{days}_low'] for s in statistics)
+        
+        new_highs = list(self._today_records['new_high'])
+        new_lows = list(self._today_records['new_low'])
+        return {
+            'baseline': baseline,
+            'today_records': {
+                'date': self._today,
+                'new_highs': new_highs,
+                'new_lows': new_lows,
+                'new_high_count': len(new_highs),
+                'new_low_count': len(new_lows)
+            },
+            'statistics': statistics,
+            'total': total_stats,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
+    
+    def _store_report(self, cursor):
+        """生成报告写入 price_comparison_report（不提交），返回 (版本号, 报告)"""
+        report = self._build_report()
+        cursor.execute('''
+            INSERT INTO price_comparison_report (id, version, report, generated_at)
+            VALUES (1, 1, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET version = version + 1,
+                                          report = excluded.report,
+                                          generated_at = excluded.generated_at
+        ''', (json.dumps(report, ensure_ascii=False), report['generated_at']))
+        version = cursor.execute('SELECT version FROM price_comparison_report WHERE id = 1').fetchone()[0]
+        report['version'] = version
+        return version, report
+    
+    def _begin(self, cursor):
+        """开始写事务；其他进程改过基准或已经跨天时重新载入内存状态"""
+        cursor.execute('BEGIN IMMEDIATE')
+        if (self._marker is None or self._today != date.today().strftime('%Y-%m-%d')
+                or self._baseline_marker(cursor) != self._marker):
+            self._load_state(cursor)
+    
+    def refresh_report(self) -> Dict:
+        """重新生成报告（跨天、导入基准后调用）"""
+        with self._lock:
+            conn = get_connection(self.db_path)
+            cursor = conn.cursor()
+            try:
+                self._begin(cursor)
+                version, report = self._store_report(cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                self._marker = None
+                raise
+            finally:
+                conn.close()
+            self._report_version, self._report = version, report
+        return report
+    
+    def _evaluate(self, coin_data: Dict, pending: Dict) -> Dict:
+        """
+        在内存基准上比价一个币种，要写的数据记到 pending：
+        baseline: {symbol: 基准}, records: [创新高低记录], stats: {(symbol, 日期): [高, 低]}
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         symbol = coin_data['symbol']
         current_price = float(coin_data['currentPrice'])
         update_time = coin_data.get('updateTime', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         
-        # 获取基准数据
-        cursor.execute('''
-            SELECT highest_price, highest_count, lowest_price, lowest_count
-            FROM price_baseline
-            WHERE symbol = ?
-        ''', (symbol,))
-        
-        row = cursor.fetchone()
-        
-        if not row:
+        base = self._baseline.get(symbol)
+        if base is None:
             # 如果没有基准数据，忽略
-            conn.close()
             return {
                 'symbol': symbol,
                 'action': 'no_baseline',
                 'message': f'{symbol} 没有基准数据'
             }
         
-        highest_price, highest_count, lowest_price, lowest_count = row
+        highest_price = base['highest_price']
+        lowest_price = base['lowest_price']
         
         # 计算占比
         highest_ratio = (current_price / highest_price) * 100 if highest_price > 0 else 0
@@ -193,112 +460,233 @@ class PriceComparisonSystem:
             result['action'] = 'new_high'
             result['old_value'] = highest_price
             result['new_value'] = current_price
-            
-            # 更新最高价，重置计次为0
-            cursor.execute('''
-                UPDATE price_baseline
-                SET highest_price = ?, 
-                    highest_count = 0,
-                    last_price = ?,
-                    highest_ratio = ?,
-                    lowest_ratio = ?,
-                    last_update_time = ?
-                WHERE symbol = ?
-            ''', (current_price, current_price, highest_ratio, lowest_ratio, update_time, symbol))
-            
-            # 记录创新高
-            cursor.execute('''
-                INSERT OR IGNORE INTO daily_price_records
-                (symbol, record_date, record_type, old_price, new_price, record_time)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (symbol, record_date, 'new_high', highest_price, current_price, update_time))
-            
-            # 更新每日统计
-            cursor.execute('''
-                INSERT INTO daily_statistics (symbol, record_date, new_high_count, new_low_count)
-                VALUES (?, ?, 1, 0)
-                ON CONFLICT(symbol, record_date) 
-                DO UPDATE SET new_high_count = new_high_count + 1
-            ''', (symbol, record_date))
+            base['highest_price'] = current_price
+            base['highest_count'] = 0
+            pending['records'].append((symbol, record_date, 'new_high', highest_price, current_price, update_time))
+            pending['stats'].setdefault((symbol, record_date), [0, 0])[0] += 1
             
         elif current_price >= lowest_price:
             # 在最高价和最低价之间：最高计次+1（徘徊次数累计）
             result['action'] = 'high_hover'
-            
-            cursor.execute('''
-                UPDATE price_baseline
-                SET highest_count = highest_count + 1,
-                    last_price = ?,
-                    highest_ratio = ?,
-                    lowest_ratio = ?,
-                    last_update_time = ?
-                WHERE symbol = ?
-            ''', (current_price, highest_ratio, lowest_ratio, update_time, symbol))
+            base['highest_count'] += 1
             
         elif current_price < lowest_price:
             # 创新低：更新最低价，重置最低计次为0（重新开始计数）
             result['action'] = 'new_low'
             result['old_value'] = lowest_price
             result['new_value'] = current_price
-            
-            # 更新最低价，重置计次为0
-            cursor.execute('''
-                UPDATE price_baseline
-                SET lowest_price = ?,
-                    lowest_count = 0,
-                    last_price = ?,
-                    highest_ratio = ?,
-                    lowest_ratio = ?,
-                    last_update_time = ?
-                WHERE symbol = ?
-            ''', (current_price, current_price, highest_ratio, lowest_ratio, update_time, symbol))
-            
-            # 记录创新低
-            cursor.execute('''
-                INSERT OR IGNORE INTO daily_price_records
-                (symbol, record_date, record_type, old_price, new_price, record_time)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (symbol, record_date, 'new_low', lowest_price, current_price, update_time))
-            
-            # 更新每日统计
-            cursor.execute('''
-                INSERT INTO daily_statistics (symbol, record_date, new_high_count, new_low_count)
-                VALUES (?, ?, 0, 1)
-                ON CONFLICT(symbol, record_date)
-                DO UPDATE SET new_low_count = new_low_count + 1
-            ''', (symbol, record_date))
+            base['lowest_price'] = current_price
+            base['lowest_count'] = 0
+            pending['records'].append((symbol, record_date, 'new_low', lowest_price, current_price, update_time))
+            pending['stats'].setdefault((symbol, record_date), [0, 0])[1] += 1
         
         else:
             # 最低价计次+1
             result['action'] = 'low_count_inc'
-            
-            cursor.execute('''
-                UPDATE price_baseline
-                SET lowest_count = lowest_count + 1,
-                    last_price = ?,
-                    highest_ratio = ?,
-                    lowest_ratio = ?,
-                    last_update_time = ?
-                WHERE symbol = ?
-            ''', (current_price, highest_ratio, lowest_ratio, update_time, symbol))
+            base['lowest_count'] += 1
         
-        conn.commit()
-        conn.close()
+        base['last_price'] = current_price
+        base['highest_ratio'] = highest_ratio
+        base['lowest_ratio'] = lowest_ratio
+        base['last_update_time'] = update_time
+        pending['baseline'][symbol] = base
         
         return result
     
-    def batch_compare(self, coins_data: List[Dict]) -> List[Dict]:
-        """批量比价"""
-        results = []
-        for coin in coins_data:
-            result = self.compare_and_update(coin)
-            if result['action'] != 'no_baseline':
-                results.append(result)
+    def compare_all(self, coins_data: List[Dict]) -> List[Dict]:
+        """
+        在内存基准上比较一批币种，基准更新、创新高低记录、每日统计在一个事务里写入
+        
+        返回每个币种的结果（含 no_baseline）
+        """
+        pending = {'baseline': {}, 'records': [], 'stats': {}}
+        
+        with self._lock:
+            conn = get_connection(self.db_path)
+            cursor = conn.cursor()
+            try:
+                # 多个进程共用一个库时，其他进程写过基准就重新载入
+                self._begin(cursor)
+                
+                results = [self._evaluate(coin, pending) for coin in coins_data]
+                
+                cursor.executemany('''
+                    UPDATE price_baseline
+                    SET highest_price = ?,
+                        highest_count = ?,
+                        lowest_price = ?,
+                        lowest_count = ?,
+                        last_price = ?,
+                        highest_ratio = ?,
+                        lowest_ratio = ?,
+                        last_update_time = ?
+                    WHERE symbol = ?
+                ''', [(*[base[f] for f in BASELINE_FIELDS], symbol)
+                      for symbol, base in pending['baseline'].items()])
+                
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO daily_price_records
+                    (symbol, record_date, record_type, old_price, new_price, record_time)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', pending['records'])
+                
+                cursor.executemany('''
+                    INSERT INTO daily_statistics (symbol, record_date, new_high_count, new_low_count)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(symbol, record_date)
+                    DO UPDATE SET new_high_count = new_high_count + excluded.new_high_count,
+                                  new_low_count = new_low_count + excluded.new_low_count
+                ''', [(symbol, date, high, low) for (symbol, date), (high, low) in pending['stats'].items()])
+                
+                self._apply_pending(pending)
+                version, report = self._store_report(cursor)
+                self._marker = self._baseline_marker(cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                # 内存可能已经改了一半，下次从数据库重新载入
+                self._marker = None
+                raise
+            finally:
+                conn.close()
+            self._report_version, self._report = version, report
+        
+        # 已载入滑动窗口时顺便追上新快照，读接口时不用再补
+        if self._rolling is not None:
+            self.update_rolling()
+        
         return results
     
+    def compare_and_update(self, coin_data: Dict) -> Dict:
+        """
+        比价并更新
+        coin_data格式：
+        {
+            'symbol': 'BTC',
+            'currentPrice': '92401.66197',
+            'updateTime': '2025-12-03 20:25:46'
+        }
+        
+        返回更新结果：
+        {
+            'symbol': 'BTC',
+            'action': 'new_high' / 'high_hover' / 'new_low' / 'low_count_inc' / 'no_change',
+            'old_value': 125370.20986,
+            'new_value': 130000.0,
+            'highest_ratio': 98.5,
+            'lowest_ratio': 115.3
+        }
+        """
+        return self.compare_all([coin_data])[0]
+    
+    def batch_compare(self, coins_data: List[Dict]) -> List[Dict]:
+        """批量比价（一个事务）"""
+        return [result for result in self.compare_all(coins_data) if result['action'] != 'no_baseline']
+    
+    # ==================== 滑动窗口最高/最低价 ====================
+    
+    def _push_rows(self, rows):
+        """按时间顺序把 (record_time, id, symbol, current_price) 行加入各窗口"""
+        for record_time, _, symbol, price in rows:
+            ts = datetime.fromisoformat(record_time).timestamp()
+            windows = self._rolling.get(symbol)
+            if windows is None:
+                windows = self._rolling[symbol] = {
+                    name: RollingExtremes(seconds) for name, seconds in self.rolling_windows.items()
+                }
+            for window in windows.values():
+                window.push(ts, price, record_time)
+            self._rolling_latest[symbol] = (price, record_time)
+            self._rolling_until = record_time
+    
+    def update_rolling(self) -> int:
+        """
+        把 coin_history 里还没加入的快照加入滑动窗口，返回加入的价格数
+        
+        首次调用时载入最长窗口内的历史（含已归档分区），之后只读 record_time 更新的行
+        """
+        with self._rolling_lock:
+            conn = get_connection(self.db_path)
+            try:
+                if self._rolling is None:
+                    latest = conn.execute('SELECT MAX(record_time) FROM coin_history').fetchone()[0]
+                    self._rolling = {}
+                    if not latest:
+                        return 0
+                    since = (datetime.fromisoformat(latest)
+                             - timedelta(seconds=max(self.rolling_windows.values()))).strftime('%Y-%m-%d %H:%M:%S')
+                    _, rows = select_across(conn, 'coin_history', '''
+                        SELECT record_time, id, symbol, current_price FROM {table}
+                        WHERE record_time > ? AND current_price IS NOT NULL
+                        ORDER BY record_time, id
+                    ''', (since,), start_time=since, sort_key=lambda row: row[:2], db_path=self.db_path)
+                else:
+                    # 新快照不会在归档分区里
+                    rows = conn.execute('''
+                        SELECT record_time, id, symbol, current_price FROM coin_history
+                        WHERE record_time > ? AND current_price IS NOT NULL
+                        ORDER BY record_time, id
+                    ''', (self._rolling_until or '',)).fetchall()
+            finally:
+                conn.close()
+            self._push_rows(rows)
+            return len(rows)
+    
+    def get_rolling_extremes(self, symbols: Optional[List[str]] = None,
+                             windows: Optional[List[str]] = None) -> Dict:
+        """
+        各币种各滑动窗口的最高/最低价
+        
+        窗口以最新一次快照的时间为终点；position 为最新价在窗口高低区间中的位置（0~100），
+        breakout 为 'high' / 'low' 表示最新价就是窗口最高/最低价（突破）
+        """
+        windows = windows or list(self.rolling_windows)
+        unknown = [name for name in windows if name not in self.rolling_windows]
+        if unknown:
+            raise ValueError(f"未配置的窗口: {', '.join(unknown)}")
+        
+        self.update_rolling()
+        
+        with self._rolling_lock:
+            if self._rolling_until is None:
+                return {'as_of': None, 'windows': windows, 'data': []}
+            now_ts = datetime.fromisoformat(self._rolling_until).timestamp()
+            
+            # 基准里的币种按显示顺序在前
+            ordered = [s for s in self._baseline if s in self._rolling]
+            ordered += sorted(s for s in self._rolling if s not in self._baseline)
+            if symbols:
+                wanted = set(symbols)
+                ordered = [s for s in ordered if s in wanted]
+            
+            data = []
+            for symbol in ordered:
+                price, update_time = self._rolling_latest[symbol]
+                item = {'symbol': symbol, 'price': price, 'update_time': update_time, 'windows': {}}
+                for name in windows:
+                    window = self._rolling[symbol][name]
+                    window.expire(now_ts)
+                    extremes = window.extremes()
+                    if extremes is None:
+                        item['windows'][name] = None
+                        continue
+                    high, high_time, low, low_time = extremes
+                    item['windows'][name] = {
+                        'high': high,
+                        'high_time': high_time,
+                        'low': low,
+                        'low_time': low_time,
+                        'position': round((price - low) / (high - low) * 100, 2) if high > low else None,
+                        'breakout': 'high' if price >= high and high > low else
+                                    'low' if price <= low and high > low else None
+                    }
+                data.append(item)
+        
+        return {'as_of': self._rolling_until, 'windows': windows, 'data': data}
+    
     def get_baseline_data(self) -> List[Dict]:
         """获取所有基准数据"""
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -338,7 +726,7 @@ class PriceComparisonSystem:
         if not date:
             date = datetime.now().strftime('%Y-%m-%d')
         
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         # 获取创新高记录
@@ -393,7 +781,7 @@ class PriceComparisonSystem:
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days-1)
         
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -419,63 +807,28 @@ class PriceComparisonSystem:
         return results
     
     def get_full_report(self) -> Dict:
-        """获取完整报告"""
-        baseline = self.get_baseline_data()
-        today_records = self.get_daily_new_records()
-        stats_1day = self.get_statistics_summary(1)
-        stats_3day = self.get_statistics_summary(3)
-        stats_7day = self.get_statistics_summary(7)
-        
-        # 合并统计数据
-        stats_by_symbol = {}
-        for coin in baseline:
-            symbol = coin['symbol']
-            stats_by_symbol[symbol] = {
-                'symbol': symbol,
-                'day1_high': 0,
-                'day1_low': 0,
-                'day3_high': 0,
-                'day3_low': 0,
-                'day7_high': 0,
-                'day7_low': 0
-            }
+        """
+        获取完整报告（每批比价后生成的报告，带 version）
         
-        for stat in stats_1day:
-            symbol = stat['symbol']
-            if symbol in stats_by_symbol:
-                stats_by_symbol[symbol]['day1_high'] = stat['new_high_count']
-                stats_by_symbol[symbol]['day1_low'] = stat['new_low_count']
-        
-        for stat in stats_3day:
-            symbol = stat['symbol']
-            if symbol in stats_by_symbol:
-                stats_by_symbol[symbol]['day3_high'] = stat['new_high_count']
-                stats_by_symbol[symbol]['day3_low'] = stat['new_low_count']
-        
-        for stat in stats_7day:
-            symbol = stat['symbol']
-            if symbol in stats_by_symbol:
-                stats_by_symbol[symbol]['day7_high'] = stat['new_high_count']
-                stats_by_symbol[symbol]['day7_low'] = stat['new_low_count']
-        
-        # 计算汇总
-        total_stats = {
-            'day1_high_total': sum(s['day1_high'] for s in stats_by_symbol.values()),
-            'day1_low_total': sum(s['day1_low'] for s in stats_by_symbol.values()),
-            'day3_high_total': sum(s['day3_high'] for s in stats_by_symbol.values()),
-            'day3_low_total': sum(s['day3_low'] for s in stats_by_symbol.values()),
-            'day7_high_total': sum(s['day7_high'] for s in stats_by_symbol.values()),
-            'day7_low_total': sum(s['day7_low'] for s in stats_by_symbol.values())
-        }
+        只查一次版本号：与内存中的相同直接返回，其他进程更新过则读取存好的报告，
+        跨天后重新生成一次（窗口滚动）
+        """
+        conn = get_connection(self.db_path)
+        try:
+            row = conn.execute('SELECT version FROM price_comparison_report WHERE id = 1').fetchone()
+            if row and row[0] != self._report_version:
+                version, report = conn.execute(
+                    'SELECT version, report FROM price_comparison_report WHERE id = 1').fetchone()
+                report = json.loads(report)
+                report['version'] = version
+                self._report_version, self._report = version, report
+        finally:
+            conn.close()
         
-        return {
-            'baseline': baseline,
-            'today_records': today_records,
-            'statistics': list(stats_by_symbol.values()),
-            'total': total_stats,
-            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-
+        report = self._report
+        if row is None or report['today_records']['date'] != date.today().strftime('%Y-%m-%d'):
+            report = self.refresh_report()
+        return report
 
 if __name__ == '__main__':
     # 测试
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比价数据重放
+比价逻辑修正后（见 PRICE_LOGIC_FINAL_CORRECTION.md），按 coin_history 里的历史快照
+重新计算 price_baseline、daily_price_records、daily_statistics，不必逐条调用 compare_and_update。
+
+- 从初始基准（import_baseline_data.BASELINE_DATA）开始，每个币种一次查询按时间顺序取出价格，
+  已归档的月份一起取（history_archive.select_across）
+- 一个价格高于之前所有价格和初始最高价即创新高（低同理），用累计最大/最小值一次算出；
+  计次只取决于最后一次创新高/低之后的徘徊次数，不需要逐条更新
+- 装了 numpy 时用 maximum.accumulate / minimum.accumulate 向量化计算，否则逐条扫描（结果相同）
+- 结果在一个事务里批量写入，写完重新生成比价报告；运行中的服务下一批比价时自动重新载入
+- --since 只缩小重写的范围：仍从初始基准重放全部历史（截止日前的状态就是前面价格的重放结果），
+  只替换该日期起的创新高低记录和每日统计，之前的保留不动；基准总是重放到最新
+
+用法:
+    python price_replay.py                          # 从初始基准重放全部历史
+    python price_replay.py --since 2025-12-03       # 只重写该日期起的记录和统计
+    python price_replay.py --dry-run                # 只计算并打印结果，不写库
+"""
+
+import sys
+import time
+
+from db_connection import get_connection
+from history_archive import select_across
+from import_baseline_data import BASELINE_DATA
+from price_comparison_system import PriceComparisonSystem
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DB_PATH = 'crypto_data.db'
+
+
+def load_prices(conn, symbol, db_path=DB_PATH):
+    """某币种按时间顺序的 (更新时间, 价格) 列表（含已归档的分区）"""
+    _, rows = select_across(conn, 'coin_history', '''
+        SELECT record_time, id, COALESCE(NULLIF(update_time, ''), record_time), current_price
+        FROM {table}
+        WHERE symbol = ? AND current_price IS NOT NULL
+        ORDER BY record_time, id
+    ''', (symbol,), sort_key=lambda row: row[:2], db_path=db_path)
+    return [row[2] for row in rows], [row[3] for row in rows]
+
+
+def _scan_python(prices, seed):
+    """逐条扫描（与 compare_and_update 的分支一一对应）"""
+    high, low = seed['highest_price'], seed['lowest_price']
+    high_count, low_count = seed['highest_count'], seed['lowest_count']
+    events = []
+    high_before = low_before = None
+    for i, price in enumerate(prices):
+        high_before, low_before = high, low
+        if price > high:
+            events.append((i, 'new_high', high))
+            high, high_count = price, 0
+        elif price >= low:
+            high_count += 1
+        elif price < low:
+            events.append((i, 'new_low', low))
+            low, low_count = price, 0
+        else:
+            low_count += 1
+    return {
+        'highest_price': high, 'highest_count': high_count,
+        'lowest_price': low, 'lowest_count': low_count,
+        'high_before': high_before, 'low_before': low_before,
+        'events': events
+    }
+
+
+def _scan_numpy(prices, seed):
+    """向量化扫描：之前的最高/最低价就是含初始基准的累计最大/最小值"""
+    p = np.asarray(prices, dtype='f8')
+    high_before = np.maximum.accumulate(np.concatenate(([seed['highest_price']], p)))[:-1]
+    low_before = np.minimum.accumulate(np.concatenate(([seed['lowest_price']], p)))[:-1]
+    new_high = p > high_before
+    hover = ~new_high & (p >= low_before)
+    new_low = ~new_high & (p < low_before)
+    low_inc = ~(new_high | hover | new_low)
+
+    high_idx = np.flatnonzero(new_high)
+    low_idx = np.flatnonzero(new_low)
+    if len(high_idx):
+        high_count = int(hover[high_idx[-1] + 1:].sum())
+    else:
+        high_count = seed['highest_count'] + int(hover.sum())
+    if len(low_idx):
+        low_count = int(low_inc[low_idx[-1] + 1:].sum())
+    else:
+        low_count = seed['lowest_count'] + int(low_inc.sum())
+
+    events = [(int(i), 'new_high', float(high_before[i])) for i in high_idx]
+    events += [(int(i), 'new_low', float(low_before[i])) for i in low_idx]
+    events.sort()
+    return {
+        'highest_price': max(seed['highest_price'], float(p.max())),
+        'highest_count': high_count,
+        'lowest_price': min(seed['lowest_price'], float(p.min())),
+        'lowest_count': low_count,
+        'high_before': float(high_before[-1]), 'low_before': float(low_before[-1]),
+        'events': events
+    }
+
+
+def replay_symbol(seed, times, prices):
+    """
+    从初始基准重放一个币种的价格序列
+
+    Returns:
+        (基准行, 创新高低记录列表, {日期: [高, 低]})
+    """
+    symbol = seed['symbol']
+    if not prices:
+        # 没有历史价格，按导入时的方式用最高价作当前价
+        highest, lowest = seed['highest_price'], seed['lowest_price']
+        return {
+            'symbol': symbol,
+            'highest_price': highest, 'highest_count': seed['highest_count'],
+            'lowest_price': lowest, 'lowest_count': seed['lowest_count'],
+            'last_price': highest,
+            'highest_ratio': 100 if highest > 0 else 0,
+            'lowest_ratio': (highest / lowest) * 100 if lowest > 0 else 0,
+            'last_update_time': None
+        }, [], {}
+
+    scan = _scan_numpy(prices, seed) if NUMPY_AVAILABLE else _scan_python(prices, seed)
+
+    records = []
+    stats = {}
+    for i, record_type, old_price in scan['events']:
+        record_date = times[i].split(' ')[0]
+        records.append((symbol, record_date, record_type, old_price, prices[i], times[i]))
+        stats.setdefault(record_date, [0, 0])[0 if record_type == 'new_high' else 1] += 1
+
+    # 占比用最后一次比价之前的最高/最低价（与 compare_and_update 相同）
+    last_price = prices[-1]
+    high_before, low_before = scan['high_before'], scan['low_before']
+    return {
+        'symbol': symbol,
+        'highest_price': scan['highest_price'], 'highest_count': scan['highest_count'],
+        'lowest_price': scan['lowest_price'], 'lowest_count': scan['lowest_count'],
+        'last_price': last_price,
+        'highest_ratio': (last_price / high_before) * 100 if high_before > 0 else 0,
+        'lowest_ratio': (last_price / low_before) * 100 if low_before > 0 else 0,
+        'last_update_time': times[-1]
+    }, records, stats
+
+
+def write_results(conn, baselines, records, stats, since_date=None):
+    """
+    在一个事务里替换重放币种的基准、记录和统计
+
+    since_date: 只替换该日期（含）起的记录和统计，records / stats 需已按同一日期筛选
+    """
+    symbols = [b['symbol'] for b in baselines]
+    where = f"symbol IN ({','.join('?' * len(symbols))})"
+    params = list(symbols)
+    if since_date:
+        where += ' AND record_date >= ?'
+        params.append(since_date)
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute(f'DELETE FROM daily_price_records WHERE {where}', params)
+        cursor.execute(f'DELETE FROM daily_statistics WHERE {where}', params)
+
+        # 保留 display_order、created_at
+        cursor.executemany('''
+            INSERT INTO price_baseline
+            (symbol, highest_price, highest_count, lowest_price, lowest_count,
+             last_price, highest_ratio, lowest_ratio, last_update_time)
+            VALUES (:symbol, :highest_price, :highest_count, :lowest_price, :lowest_count,
+                    :last_price, :highest_ratio, :lowest_ratio, :last_update_time)
+            ON CONFLICT(symbol) DO UPDATE SET
+                highest_price = excluded.highest_price,
+                highest_count = excluded.highest_count,
+                lowest_price = excluded.lowest_price,
+                lowest_count = excluded.lowest_count,
+                last_price = excluded.last_price,
+                highest_ratio = excluded.highest_ratio,
+                lowest_ratio = excluded.lowest_ratio,
+                last_update_time = excluded.last_update_time
+        ''', baselines)
+
+        cursor.executemany('''
+            INSERT OR IGNORE INTO daily_price_records
+            (symbol, record_date, record_type, old_price, new_price, record_time)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', records)
+
+        cursor.executemany('''
+            INSERT INTO daily_statistics (symbol, record_date, new_high_count, new_low_count)
+            VALUES (?, ?, ?, ?)
+        ''', stats)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def replay(db_path=DB_PATH, since=None, seeds=BASELINE_DATA, dry_run=False):
+    """
+    从初始基准重放历史快照，重建比价三张表
+
+    Args:
+        since: 日期（或时间，只取日期部分），只替换该日期起的记录和统计
+
+    Returns:
+        {'symbols', 'prices', 'records', 'elapsed_seconds'}
+    """
+    start = time.perf_counter()
+    # 确保比价表存在
+    system = PriceComparisonSystem(db_path)
+
+    since_date = since[:10] if since else None
+    baselines, records, stats = [], [], []
+    price_total = 0
+    conn = get_connection(db_path)
+    try:
+        for seed in seeds:
+            times, prices = load_prices(conn, seed['symbol'], db_path)
+            baseline, symbol_records, symbol_stats = replay_symbol(seed, times, prices)
+            baselines.append(baseline)
+            records.extend(r for r in symbol_records if not since_date or r[1] >= since_date)
+            stats.extend((seed['symbol'], d, high, low) for d, (high, low) in symbol_stats.items()
+                         if not since_date or d >= since_date)
+            price_total += len(prices)
+
+        if not dry_run:
+            write_results(conn, baselines, records, stats, since_date)
+    finally:
+        conn.close()
+
+    if not dry_run:
+        system.refresh_report()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ 重放 {len(baselines)} 个币种、{price_total} 条价格，"
+          f"创新高低 {len(records)} 次，用时 {elapsed:.2f} 秒"
+          f"（{'numpy' if NUMPY_AVAILABLE else '逐条扫描'}）")
+    for b in baselines:
+        print(f"   {b['symbol']}: 最高 {b['highest_price']:.8f} (计次 {b['highest_count']})  "
+              f"最低 {b['lowest_price']:.8f} (计次 {b['lowest_count']})")
+    return {
+        'symbols': len(baselines),
+        'prices': price_total,
+        'records': len(records),
+        'elapsed_seconds': round(elapsed, 3)
+    }
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    since = args[args.index('--since') + 1] if '--since' in args else None
+    dry_run = '--dry-run' in args
+    if dry_run:
+        print("🔍 演练模式，不写入数据库")
+    replay(DB_PATH, since, dry_run=dry_run)
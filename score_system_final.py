@@ -10,7 +10,10 @@
 import sqlite3
 import json
 import asyncio
-from playwright.async_api import async_playwright
+from browser_pool import get_browser_pool
+from gdrive_navigation import StepTimer, goto_ready, settle, wait_for_stable_count
+from db_connection import get_connection
+from db_schema import ensure_schema, get_daily_summary
 import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
@@ -18,6 +21,11 @@ from flask import Flask, jsonify, send_from_directory, request
 from flask_cors import CORS
 import threading
 import time
+import os
+
+# 单个数据源的抓取超时（秒，从借到页面开始计：打开页面、等待表格、读取单元格）
+SOURCE_TIMEOUT = int(os.environ.get('SCORE_SOURCE_TIMEOUT', '60'))
+
 
 class ScoreDatabase:
     """得分数据库管理 - 支持历史数据"""
@@ -30,7 +38,7 @@ class ScoreDatabase:
     
     def get_connection(self):
         """获取数据库连接"""
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         conn.row_factory = sqlite3.Row
         return conn
     
@@ -82,6 +90,8 @@ class ScoreDatabase:
         
         conn.commit()
         conn.close()
+        # 在已建好的 score_history 上补齐每日汇总触发器等规范结构
+        ensure_schema(self.db_path)
         print("✅ 数据库初始化完成")
     
     def clean_excluded_coins(self):
@@ -246,14 +256,8 @@ class ScoreDatabase:
         cursor = conn.cursor()
         
         cutoff = datetime.now() - timedelta(days=days)
-        cursor.execute('''
-            SELECT DISTINCT DATE(record_time) as record_date
-            FROM score_history
-            WHERE record_time >= ?
-            ORDER BY record_date DESC
-        ''', (cutoff.strftime('%Y-%m-%d'),))
-        
-        dates = [row['record_date'] for row in cursor.fetchall()]
+        # 读每日汇总表，不扫 score_history
+        dates = [info['date'] for info in get_daily_summary(cursor, 'score', cutoff.strftime('%Y-%m-%d'))]
         conn.close()
         return dates
     
@@ -321,9 +325,12 @@ class WebScoreCollector:
         print(f"📡 正在加载: {url}")
         
         try:
-            await page.goto(url, wait_until='networkidle', timeout=30000)
-            await page.wait_for_selector('table tbody tr', timeout=10000)
-            await asyncio.sleep(3)
+            timer = StepTimer(source_name)
+            await goto_ready(page, url, selector='table tbody tr', timeout=30000, timer=timer)
+            # 网络空闲且行数稳定即表格渲染完成
+            await settle(page, timeout=5000)
+            await wait_for_stable_count(page, 'table tbody tr', timeout=10000)
+            timer.mark('表格就绪')
             
             rows = await page.query_selector_all('table tbody tr')
             print(f"✅ {source_name}: 找到 {len(rows)} 行数据")
@@ -388,6 +395,47 @@ class WebScoreCollector:
             print(f"❌ {source_name}: 抓取失败 - {e}")
             return {}
     
+    async def _scrape_page_in_time(self, page, url: str, source_name: str) -> Dict:
+        """借到页面后才开始计时，等待浏览器池空出页面的时间不算在 SOURCE_TIMEOUT 内"""
+        return await asyncio.wait_for(self.scrape_page(page, url, source_name), SOURCE_TIMEOUT)
+    
+    async def _scrape_source(self, source_name: str, url: str) -> Tuple[str, Dict]:
+        """借一个页面抓取一个数据源，超时或失败时返回空结果"""
+        start = time.time()
+        try:
+            data = await get_browser_pool().run(self._scrape_page_in_time, url, source_name, viewport=None)
+        except asyncio.TimeoutError:
+            print(f"⏰ {source_name}: 超过 {SOURCE_TIMEOUT} 秒未完成，本轮跳过")
+            data = {}
+        except Exception as e:
+            print(f"❌ {source_name}: 抓取失败 - {e}")
+            data = {}
+        print(f"⏱️  {source_name}: {time.time() - start:.1f}秒")
+        return source_name, data
+    
+    async def _scrape_sources(self) -> Dict:
+        """
+        各数据源在各自的页面上并发抓取，先完成的先合并
+        
+        同一币种多个数据源都有时以 self.urls 中靠前的为准（与原来依次抓取时相同）
+        """
+        priority = {name: i for i, name in enumerate(self.urls)}
+        all_data = {}
+        owner = {}  # 币种 -> 当前数据来自的数据源
+        
+        tasks = [asyncio.ensure_future(self._scrape_source(name, url)) for name, url in self.urls.items()]
+        for finished in asyncio.as_completed(tasks):
+            source_name, data = await finished
+            if not data:
+                continue
+            print(f"✅ {source_name}: 获取到 {len(data)} 个币种")
+            for coin, scores in data.items():
+                if coin not in owner or priority[source_name] < priority[owner[coin]]:
+                    all_data[coin] = scores
+                    owner[coin] = source_name
+        
+        return all_data
+    
     def extract_number(self, text: str) -> float:
         """从文本中提取数字"""
         if not text:
@@ -406,29 +454,11 @@ class WebScoreCollector:
         """抓取所有数据源"""
         print(f"\n🔄 开始抓取得分数据... {datetime.now().strftime('%H:%M:%S')}")
         
-        all_data = {}
-        
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            # 抓取第一个数据源
-            data1 = await self.scrape_page(page, self.urls['source_1'], 'source_1')
-            if data1:
-                print(f"✅ 数据源1: 获取到 {len(data1)} 个币种")
-                all_data.update(data1)
-            
-            await asyncio.sleep(2)
-            
-            # 抓取第二个数据源
-            data2 = await self.scrape_page(page, self.urls['source_2'], 'source_2')
-            if data2:
-                print(f"✅ 数据源2: 获取到 {len(data2)} 个币种")
-                for coin, scores in data2.items():
-                    if coin not in all_data:
-                        all_data[coin] = scores
-            
-            await browser.close()
+        # 从共享浏览器池为每个数据源借一个页面（每次调用都在新事件循环中，浏览器仍只启动一次），
+        # 总耗时约等于最慢的数据源
+        start = time.time()
+        all_data = await self._scrape_sources()
+        print(f"⏱️  抓取总耗时: {time.time() - start:.1f}秒")
         
         # 保存到数据库
         collected_count = 0
@@ -6,6 +6,8 @@
 """
 
 import sqlite3
+from db_connection import get_connection
+from db_schema import ensure_schema
 import json
 import asyncio
 from playwright.async_api import async_playwright
@@ -26,7 +28,7 @@ class ScoreDatabase:
     
     def get_connection(self):
         """获取数据库连接"""
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         conn.row_factory = sqlite3.Row
         return conn
     
@@ -76,6 +78,8 @@ class ScoreDatabase:
         
         conn.commit()
         conn.close()
+        # 在已建好的 score_history 上补齐每日汇总触发器等规范结构
+        ensure_schema(self.db_path)
         print("✅ 数据库初始化完成")
     
     def save_score_record(self, symbol: str, time_range: str, 
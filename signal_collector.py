@@ -5,7 +5,8 @@
 从 Google Drive 定期读取信号数据并存储到数据库
 """
 
-import sqlite3
+from db_connection import get_connection
+from db_schema import ensure_schema
 import time
 from datetime import datetime, timedelta
 import pytz
@@ -17,7 +18,7 @@ import random
 BEIJING_TZ = pytz.timezone('Asia/Shanghai')
 
 # 数据库配置
-DB_PATH = 'signal_data.db'
+DB_PATH = 'crypto_data.db'
 
 # Google Drive 配置
 GOOGLE_DRIVE_FOLDER_ID = "1-IfqZxMVVCSg3ct6XVMyFtAbuCV3huQ"
@@ -43,29 +44,8 @@ def get_today_folder_name():
 
 
 def init_database():
-    """初始化数据库"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS signal_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            short_count INTEGER NOT NULL,
-            short_change INTEGER NOT NULL,
-            long_count INTEGER NOT NULL,
-            long_change INTEGER NOT NULL,
-            record_time TEXT NOT NULL,
-            folder_date TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(record_time)
-        )
-    ''')
-    
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_record_time ON signal_data(record_time)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_folder_date ON signal_data(folder_date)')
-    
-    conn.commit()
-    conn.close()
+    """初始化数据库（signal_data 表结构见 db_schema）"""
+    ensure_schema(DB_PATH)
 
 
 def parse_signal_line(line):
@@ -94,7 +74,7 @@ def parse_signal_line(line):
 def save_signal_to_db(signal_data, folder_date):
     """保存信号数据到数据库"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -12,7 +12,8 @@ from datetime import datetime, timedelta
 import pytz
 import re
 import os
-import sqlite3
+from db_connection import get_connection
+from db_schema import ensure_schema
 import threading
 import time
 
@@ -23,38 +24,15 @@ CORS(app)
 GOOGLE_DRIVE_FOLDER_ID = "1-IfqZxMVVCSg3ct6XVMyFtAbuCV3huQ"
 
 # 数据库配置
-DB_PATH = 'signal_data.db'
+DB_PATH = 'crypto_data.db'
 
 # 北京时区
 BEIJING_TZ = pytz.timezone('Asia/Shanghai')
 
 # 初始化数据库
 def init_database():
-    """初始化数据库表结构"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 创建信号数据表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS signal_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            short_count INTEGER NOT NULL,
-            short_change INTEGER NOT NULL,
-            long_count INTEGER NOT NULL,
-            long_change INTEGER NOT NULL,
-            record_time TEXT NOT NULL,
-            folder_date TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(record_time)
-        )
-    ''')
-    
-    # 创建索引
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_record_time ON signal_data(record_time)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_folder_date ON signal_data(folder_date)')
-    
-    conn.commit()
-    conn.close()
+    """初始化数据库表结构（signal_data 表结构见 db_schema）"""
+    ensure_schema(DB_PATH)
     print(f"数据库初始化完成: {DB_PATH}")
 
 def get_beijing_time():
@@ -124,7 +102,7 @@ def parse_signal_line(line):
 def save_signal_to_db(signal_data, folder_date):
     """保存信号数据到数据库"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -150,7 +128,7 @@ def save_signal_to_db(signal_data, folder_date):
 def get_latest_signal_from_db():
     """从数据库获取最新信号"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -180,7 +158,7 @@ def get_latest_signal_from_db():
 def get_signal_history_from_db(start_datetime, end_datetime):
     """从数据库查询历史信号数据"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -287,7 +265,7 @@ def get_signal_history():
 def get_signal_stats():
     """获取信号统计数据"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
         
         # 获取总记录数
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快照文件本地内容缓存
+Google Drive 上的 YYYY-MM-DD_HHMM.txt 写入后不再变化，读过一次就存到本地，
+以 文件夹 + 文件名 为键（有 Drive 的 md5/modifiedTime 时一并校验），
+按总大小做 LRU 淘汰。回填和重启时只需下载从未见过的文件。
+"""
+
+import hashlib
+import os
+from db_connection import get_connection
+import threading
+import time
+
+CACHE_DIR = os.environ.get('SNAPSHOT_CACHE_DIR', 'snapshot_cache')
+CACHE_MAX_BYTES = int(float(os.environ.get('SNAPSHOT_CACHE_MAX_MB', '200')) * 1024 * 1024)
+
+
+class SnapshotCache:
+    """文件夹 + 文件名 -> 文件内容 的本地 LRU 缓存"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, 'index.db')
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.init_index()
+
+    def init_index(self):
+        """初始化索引表"""
+        conn = get_connection(self.index_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                cache_key TEXT PRIMARY KEY,
+                folder TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                version TEXT,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def make_key(folder, filename):
+        return f"{folder}/{filename}"
+
+    def _content_path(self, cache_key):
+        digest = hashlib.sha1(cache_key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.txt")
+
+    def get(self, folder, filename, version=None):
+        """
+        读取缓存内容，未命中返回 None
+
+        Args:
+            version: Drive 的 md5Checksum 或 modifiedTime；提供时必须与缓存一致
+        """
+        cache_key = self.make_key(folder, filename)
+        with self.lock:
+            conn = get_connection(self.index_path)
+            cursor = conn.cursor()
+            try:
+                cursor.execute('SELECT version, path FROM entries WHERE cache_key = ?', (cache_key,))
+                row = cursor.fetchone()
+                if not row or (version and row[0] and row[0] != version):
+                    self.misses += 1
+                    return None
+
+                try:
+                    with open(row[1], 'r', encoding='utf-8') as f:
+                        content = f.read()
+                except OSError:
+                    # 内容文件被删了，索引作废
+                    cursor.execute('DELETE FROM entries WHERE cache_key = ?', (cache_key,))
+                    conn.commit()
+                    self.misses += 1
+                    return None
+
+                cursor.execute('UPDATE entries SET last_access = ? WHERE cache_key = ?',
+                               (time.time(), cache_key))
+                conn.commit()
+                self.hits += 1
+                return content
+            finally:
+                conn.close()
+
+    def put(self, folder, filename, content, version=None):
+        """写入缓存，超出大小上限时淘汰最久未访问的条目"""
+        if not content:
+            return
+
+        cache_key = self.make_key(folder, filename)
+        path = self._content_path(cache_key)
+        data = content.encode('utf-8')
+
+        with self.lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            conn = get_connection(self.index_path)
+            cursor = conn.cursor()
+            try:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO entries
+                    (cache_key, folder, filename, version, path, size, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (cache_key, folder, filename, version, path, len(data), time.time()))
+                self._evict(cursor)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def _evict(self, cursor):
+        """按 LRU 淘汰直到总大小不超过上限"""
+        cursor.execute('SELECT COALESCE(SUM(size), 0) FROM entries')
+        total = cursor.fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        cursor.execute('SELECT cache_key, path, size FROM entries ORDER BY last_access')
+        evicted = []
+        for cache_key, path, size in cursor.fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            evicted.append((cache_key,))
+            total -= size
+
+        cursor.executemany('DELETE FROM entries WHERE cache_key = ?', evicted)
+        if evicted:
+            print(f"🗑️  快照缓存淘汰 {len(evicted)} 个文件")
+
+    def get_or_fetch(self, folder, filename, fetch, version=None):
+        """先查缓存，未命中时调用 fetch() 获取并写入缓存"""
+        content = self.get(folder, filename, version)
+        if content is not None:
+            return content
+
+        content = fetch()
+        if content:
+            self.put(folder, filename, content, version)
+        return content
+
+    async def get_or_fetch_async(self, folder, filename, fetch, version=None):
+        """get_or_fetch 的异步版本，fetch 为返回协程的函数"""
+        content = self.get(folder, filename, version)
+        if content is not None:
+            return content
+
+        content = await fetch()
+        if content:
+            self.put(folder, filename, content, version)
+        return content
+
+    def entries(self, folders=None):
+        """已缓存的文件 [(folder, filename, path), ...]，可按文件夹过滤"""
+        conn = get_connection(self.index_path)
+        cursor = conn.cursor()
+        if folders:
+            folders = list(folders)
+            placeholders = ','.join('?' * len(folders))
+            cursor.execute(f'SELECT folder, filename, path FROM entries WHERE folder IN ({placeholders}) '
+                           f'ORDER BY filename', folders)
+        else:
+            cursor.execute('SELECT folder, filename, path FROM entries ORDER BY filename')
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def stats(self):
+        """缓存统计"""
+        conn = get_connection(self.index_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries')
+        count, size = cursor.fetchone()
+        conn.close()
+        return {
+            'files': count,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def drive_file_version(file):
+    """从 Drive 文件元数据中取版本标识（md5 优先，其次修改时间）"""
+    if not file:
+        return None
+    return file.get('md5Checksum') or file.get('modifiedTime') or file.get('modifiedDate')
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache():
+    """获取进程内共享的快照缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SnapshotCache()
+        return _cache
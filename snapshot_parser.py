@@ -0,0 +1,657 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+首页快照 TXT 统一解析
+格式:
+    透明标签_急涨总和=急涨：1
+    ...
+    [超级列表框_首页开始]
+    1|BTC|-0.02|0|0|2025-12-06 12:10:53|126259.48|2025-10-07|-28.99|-2.86|||7|89305.97183|71.23%|109.77%
+    ...
+    [超级列表框_首页结束]
+
+先用 str.find 定位币种列表的开始/结束标记，统计行按前缀直接切出；
+币种区在第一次用到时才拆行，每行只做一次 strip/split，数值转换在同一次遍历里完成。
+各调用方（API、导入、采集）在此基础上组装自己的输出格式。
+历史回填一次处理成百上千个文件时用 SnapshotColumns 按列存放，不为每个币种建 dict。
+"""
+
+import codecs
+import re
+from array import array
+from itertools import repeat
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+START_MARKER = '[超级列表框_首页开始]'
+END_MARKER = '[超级列表框_首页结束]'
+STAT_PREFIX = '透明标签_'
+
+# 完整的币种行至少有 16 列
+COIN_FIELD_COUNT = 16
+
+_INT_PATTERN = re.compile(r'-?\d+')
+_NUMBER_PATTERN = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def strip_label(value):
+    """去掉“急涨：”之类的标签前缀，没有冒号时原样返回"""
+    if '：' in value:
+        return value.split('：', 1)[1]
+    return value
+
+
+def first_int(text):
+    """文本中的第一个整数，没有返回 None"""
+    if text.isdecimal():
+        # 常见情况（“12”“急涨：1” 去掉标签后）不走正则
+        return int(text)
+    match = _INT_PATTERN.search(text)
+    return int(match.group()) if match else None
+
+
+def first_number(text):
+    """文本中的第一个数字（可带小数），没有返回 None"""
+    match = _NUMBER_PATTERN.search(text)
+    return float(match.group()) if match else None
+
+
+def to_int(s):
+    """整数列：空或非数字返回 0"""
+    try:
+        return int(s)
+    except ValueError:
+        return 0
+
+
+def to_float(s):
+    """浮点列：空返回 0.0，非数字抛 ValueError（整行作废）"""
+    return float(s) if s else 0.0
+
+
+def safe_float(s):
+    """浮点列：空或非数字返回 0.0"""
+    try:
+        return float(s) if s else 0.0
+    except ValueError:
+        return 0.0
+
+
+def percent_value(s):
+    """百分比列 '71.23%' -> 71.23，解析不了返回 0.0"""
+    s = s.strip().rstrip('%')
+    try:
+        return float(s) if s else 0.0
+    except ValueError:
+        return 0.0
+
+
+def coin_record(parts):
+    """
+    把一行币种字段转成带类型的记录
+
+    Raises:
+        ValueError: 数值列不是数字
+    """
+    return {
+        'index': to_int(parts[0]),
+        'symbol': parts[1],
+        'change': to_float(parts[2]),
+        'rushUp': to_int(parts[3]),
+        'rushDown': to_int(parts[4]),
+        'updateTime': parts[5],
+        'highPrice': to_float(parts[6]),
+        'highTime': parts[7],
+        'decline': to_float(parts[8]),
+        'change24h': to_float(parts[9]),
+        'rank': to_int(parts[12]),
+        'currentPrice': to_float(parts[13]),
+        'ratio1': parts[14],
+        'ratio2': parts[15]
+    }
+
+
+def coin_detail(parts):
+    """币种行 -> 首页上传格式的字段（coin_details 的列名，解析不了的数值按 0）"""
+    return {
+        'seq_num': to_int(parts[0]),
+        'coin_name': parts[1],
+        'rise_speed': safe_float(parts[2]),
+        'rise_signal': to_int(parts[3]),
+        'fall_signal': to_int(parts[4]),
+        'update_time': parts[5],
+        'history_high': safe_float(parts[6]),
+        'high_time': parts[7],
+        'drop_from_high': safe_float(parts[8]),
+        'change_24h': safe_float(parts[9]),
+        'plus_4_percent': to_int(parts[10]),
+        'minus_3_percent': to_int(parts[11]),
+        'ranking': to_int(parts[12]),
+        'current_price': safe_float(parts[13]),
+        'high_ratio': percent_value(parts[14]),
+        'low_ratio': percent_value(parts[15]),
+        'anomaly': parts[16] if len(parts) > 16 else ''
+    }
+
+
+def coin_displays(rows):
+    """币种行的原始文本格式（API 直接返回给前端）"""
+    return [
+        {
+            'index': parts[0],
+            'symbol': parts[1],
+            'change': parts[2],
+            'rushUp': parts[3],
+            'rushDown': parts[4],
+            'updateTime': parts[5],
+            'highPrice': parts[6],
+            'highTime': parts[7],
+            'decline': parts[8],
+            'change24h': parts[9],
+            'rank': parts[12],
+            'currentPrice': parts[13],
+            'ratio1': parts[14],
+            'ratio2': parts[15]
+        }
+        for parts in rows
+    ]
+
+
+def coin_records(rows):
+    """
+    批量转换币种行（每行至少 COIN_FIELD_COUNT 列）
+
+    常规行直接内联转换；有空值或非法数值的行交给 coin_record，仍不合法的行跳过。
+    占比列只保留原文（需要数值的调用方用 percent_value 转换），入库路径不必为每个币种多解析两次
+    """
+    records = []
+    append = records.append
+    for parts in rows:
+        try:
+            append({
+                'index': int(parts[0]),
+                'symbol': parts[1],
+                'change': float(parts[2]),
+                'rushUp': int(parts[3]),
+                'rushDown': int(parts[4]),
+                'updateTime': parts[5],
+                'highPrice': float(parts[6]),
+                'highTime': parts[7],
+                'decline': float(parts[8]),
+                'change24h': float(parts[9]),
+                'rank': int(parts[12]),
+                'currentPrice': float(parts[13]),
+                'ratio1': parts[14],
+                'ratio2': parts[15]
+            })
+        except ValueError:
+            try:
+                append(coin_record(parts))
+            except ValueError:
+                continue
+    return records
+
+
+class Snapshot:
+    """一个快照文件的解析结果"""
+
+    def __init__(self, raw_stats, body='', rows=None):
+        # 透明标签_<键>=<值> 的原始文本
+        self.raw_stats = raw_stats
+        # 币种区文本，用到时才拆行（只取统计数据的调用方不必拆）
+        self.body = body
+        # 流式解析时行已经拆好，直接传入
+        self._rows = rows
+        self._coin_rows = None
+        self._stats = None
+        self._coins = None
+
+    @property
+    def rows(self):
+        """币种区中每一行按 | 拆开的字段（未过滤列数）"""
+        if self._rows is None:
+            self._rows = [line.strip().split('|') for line in self.body.split('\n') if '|' in line]
+        return self._rows
+
+    @property
+    def coin_rows(self):
+        """列数完整的币种行"""
+        if self._coin_rows is None:
+            self._coin_rows = [parts for parts in self.rows if len(parts) >= COIN_FIELD_COUNT]
+        return self._coin_rows
+
+    def text(self, key, label=True):
+        """统计文本，label=True 时去掉标签前缀；没有该项返回 None"""
+        value = self.raw_stats.get(key)
+        if value is None:
+            return None
+        return strip_label(value) if label else value
+
+    def text_stats(self, labeled=(), plain=()):
+        """
+        按 (原始键, 输出键) 取统计文本，缺失的项不出现在结果中
+
+        Args:
+            labeled: 需要去掉“急涨：”之类前缀的项
+            plain: 保留原值的项
+        """
+        result = {}
+        for key, name in labeled:
+            if key in self.raw_stats:
+                result[name] = strip_label(self.raw_stats[key])
+        for key, name in plain:
+            if key in self.raw_stats:
+                result[name] = self.raw_stats[key]
+        return result
+
+    @property
+    def stats(self):
+        """带类型的统计数据，缺失的项为 None"""
+        if self._stats is None:
+            self._stats = self._typed_stats()
+        return self._stats
+
+    @property
+    def coins(self):
+        """带类型的币种记录，数值列不合法的行跳过"""
+        if self._coins is None:
+            self._coins = coin_records(self.coin_rows)
+        return self._coins
+
+    @property
+    def update_time(self):
+        """第一个币种的更新时间"""
+        rows = self.coin_rows
+        return rows[0][5] if rows else ''
+
+    def _typed_stats(self):
+        # 入库路径每个文件都会调用，直接取 raw_stats，不经过 text()
+        get = self.raw_stats.get
+        rush_up = get('急涨总和')
+        rush_down = get('急跌总和')
+        status = get('五种状态')
+        ratio = get('急涨急跌比值')
+        green = get('绿色数量')
+        percentage = get('百分比')
+        count = get('计次')
+        difference = get('差值结果')
+        lowest = get('比价最低得分')
+        new_high = get('仓位得分')
+        if ratio is not None:
+            ratio = strip_label(ratio)
+        if difference is not None:
+            difference = strip_label(difference)
+
+        # 急跌数量 计次 25 22 -> 25 为急跌币种数量
+        rush_down_count = None
+        rush_down_parts = (get('急跌数量') or '').split()
+        if len(rush_down_parts) >= 3:
+            try:
+                rush_down_count = int(rush_down_parts[2])
+            except ValueError:
+                pass
+
+        return {
+            'rushUp': first_int(strip_label(rush_up)) if rush_up is not None else None,
+            'rushDown': first_int(strip_label(rush_down)) if rush_down is not None else None,
+            'status': strip_label(status).strip() if status is not None else None,
+            'ratio': ratio,
+            'ratioValue': first_number(ratio) if ratio is not None else None,
+            'greenCount': first_int(green) if green is not None else None,
+            'percentage': percentage,
+            'percentageValue': first_number(percentage) if percentage is not None else None,
+            'countTimes': first_int(count) if count is not None else None,
+            'difference': difference,
+            'diffValue': first_number(difference) if difference is not None else None,
+            'priceLowest': lowest.replace('比价最低', '').strip() if lowest is not None else None,
+            'priceNewHigh': new_high.replace('比价创新高', '').strip() if new_high is not None else None,
+            'allGreen': get('全绿得分'),
+            'rushDownCount': rush_down_count
+        }
+
+
+def _line_start(content, pos):
+    """pos 所在行的行首位置"""
+    return content.rfind('\n', 0, pos) + 1
+
+
+def split_sections(content):
+    """返回 (统计区文本, 币种区文本)；标记所在的行不属于任何一区"""
+    start = content.find(START_MARKER)
+    if start == -1:
+        end = content.find(END_MARKER)
+        header_end = _line_start(content, end) if end != -1 else len(content)
+        return content[:header_end], ''
+
+    header = content[:_line_start(content, start)]
+    body_start = content.find('\n', start)
+    if body_start == -1:
+        return header, ''
+    end = content.find(END_MARKER, body_start)
+    body_end = _line_start(content, end) if end != -1 else len(content)
+    return header, content[body_start + 1:body_end]
+
+
+def parse_snapshot(content):
+    """解析快照文本，返回 Snapshot"""
+    if not content:
+        return Snapshot({})
+
+    header, body = split_sections(content)
+
+    # 统计行都以 透明标签_ 开头，按前缀切开后每段的第一行就是一条统计
+    raw_stats = {}
+    for chunk in header.split(STAT_PREFIX)[1:]:
+        key, sep, value = chunk.split('\n', 1)[0].strip().partition('=')
+        if sep:
+            raw_stats[key] = value
+
+    return Snapshot(raw_stats, body)
+
+
+class SnapshotStream:
+    """
+    增量解析：边下载边喂入字节（或文本），每凑满一行就解析，
+    读到列表结束标记后 done=True，调用方即可停止下载。
+    只保留统计数据和币种行，不保留整份文本。
+    """
+
+    def __init__(self, encoding='utf-8'):
+        self.raw_stats = {}
+        self.rows = []
+        self.done = False
+        self._in_section = False
+        self._pending = ''
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+    def feed(self, chunk):
+        """喂入一块数据，返回这块数据中新完成的币种行"""
+        if self.done or not chunk:
+            return []
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+
+        lines = (self._pending + chunk).split('\n')
+        self._pending = lines.pop()
+        return self._consume(lines)
+
+    def close(self):
+        """数据结束，处理最后不带换行的一行，返回新完成的币种行"""
+        if self.done:
+            return []
+        tail = self._pending + self._decoder.decode(b'', final=True)
+        self._pending = ''
+        rows = self._consume([tail]) if tail else []
+        self.done = True
+        return rows
+
+    def _consume(self, lines):
+        new_rows = []
+        for line in lines:
+            if self._in_section:
+                if END_MARKER in line:
+                    self.done = True
+                    break
+                if '|' in line:
+                    parts = line.strip().split('|')
+                    self.rows.append(parts)
+                    new_rows.append(parts)
+            elif START_MARKER in line:
+                self._in_section = True
+            elif END_MARKER in line:
+                self.done = True
+                break
+            else:
+                line = line.strip()
+                if line.startswith(STAT_PREFIX):
+                    key, sep, value = line[len(STAT_PREFIX):].partition('=')
+                    if sep:
+                        self.raw_stats[key] = value
+        if self.done:
+            self._pending = ''
+        return new_rows
+
+    def snapshot(self):
+        """转成 Snapshot（币种行已拆好）"""
+        return Snapshot(self.raw_stats, rows=self.rows)
+
+    def to_text(self):
+        """只含统计行和币种列表的精简文本（用于缓存），parse_snapshot 解析结果与原文一致"""
+        lines = [f"{STAT_PREFIX}{key}={value}" for key, value in self.raw_stats.items()]
+        lines.append(START_MARKER)
+        lines.extend('|'.join(parts) for parts in self.rows)
+        lines.append(END_MARKER)
+        return '\n'.join(lines)
+
+
+def parse_snapshot_stream(chunks, encoding='utf-8'):
+    """
+    从数据块迭代器（下载流）解析快照，读到结束标记即停止迭代
+
+    Returns:
+        SnapshotStream
+    """
+    stream = SnapshotStream(encoding)
+    for chunk in chunks:
+        stream.feed(chunk)
+        if stream.done:
+            break
+    else:
+        stream.close()
+
+    close = getattr(chunks, 'close', None)
+    if close:
+        # 提前结束时关闭生成器，停止后续下载
+        close()
+    return stream
+
+
+def stream_coins(chunks, encoding='utf-8'):
+    """逐行产出带类型的币种记录，读到结束标记即停止"""
+    stream = SnapshotStream(encoding)
+    try:
+        for chunk in chunks:
+            for record in coin_records(r for r in stream.feed(chunk) if len(r) >= COIN_FIELD_COUNT):
+                yield record
+            if stream.done:
+                return
+        for record in coin_records(r for r in stream.close() if len(r) >= COIN_FIELD_COUNT):
+            yield record
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close:
+            close()
+
+
+# 列式存放的币种字段: (列名, 行内位置, 类型码)
+# 'q' 整数列、'd' 浮点列用 array 存放；'dict' 字典编码（重复多的文本）；None 为普通文本列
+COLUMN_SPECS = (
+    ('index', 0, 'q'),
+    ('symbol', 1, 'dict'),
+    ('change', 2, 'd'),
+    ('rushUp', 3, 'q'),
+    ('rushDown', 4, 'q'),
+    ('updateTime', 5, 'dict'),
+    ('highPrice', 6, 'd'),
+    ('highTime', 7, 'dict'),
+    ('decline', 8, 'd'),
+    ('change24h', 9, 'd'),
+    ('rank', 12, 'q'),
+    ('currentPrice', 13, 'd'),
+    ('ratio1', 14, None),
+    ('ratio2', 15, None),
+)
+
+_CONVERTERS = {'q': int, 'd': float}
+
+
+class SnapshotColumns:
+    """
+    多个快照文件的币种数据按列存放（历史回填用）
+
+    数值列是 array，每个值只占 8 字节；币种名、更新时间、最高价时间做字典编码
+    （columns 中是编码，values[列名][编码] 是原文）；其余文本列只保留原字符串。
+    第 pos 个文件的币种位于 offsets[pos]:offsets[pos + 1]。
+    数值转换规则与 coin_records 相同，数值列不合法的行跳过。
+    """
+
+    def __init__(self):
+        self.filenames = []
+        self.record_times = []
+        # 每个文件带类型的统计数据（Snapshot.stats）
+        self.stats = []
+        self.offsets = array('q', [0])
+        self.columns = {}
+        # 字典编码列: 编码 -> 原文，以及原文 -> 编码
+        self.values = {}
+        self._codes = {}
+        for name, _, kind in COLUMN_SPECS:
+            if kind in _CONVERTERS:
+                self.columns[name] = array(kind)
+            elif kind == 'dict':
+                self.columns[name] = array('i')
+                self.values[name] = []
+                self._codes[name] = {}
+            else:
+                self.columns[name] = []
+
+    def __len__(self):
+        return len(self.filenames)
+
+    @property
+    def symbols(self):
+        """出现过的币种名，下标即编码"""
+        return self.values['symbol']
+
+    @property
+    def total_coins(self):
+        return self.offsets[-1]
+
+    def coin_count(self, pos):
+        return self.offsets[pos + 1] - self.offsets[pos]
+
+    def add(self, filename, record_time, content):
+        """
+        追加一个快照文件
+
+        Args:
+            content: 快照文本或已解析的 Snapshot
+
+        Returns:
+            这个文件的币种数
+        """
+        snapshot = content if isinstance(content, Snapshot) else parse_snapshot(content)
+        rows = snapshot.coin_rows
+
+        # 先整列转换，全部成功后再追加，转换失败时不会留下半个文件
+        values = {}
+        if rows:
+            fields = list(zip(*rows))
+            try:
+                for name, pos, kind in COLUMN_SPECS:
+                    column = fields[pos]
+                    values[name] = list(map(_CONVERTERS[kind], column)) if kind in _CONVERTERS else column
+            except ValueError:
+                # 有空值或非法数值：按 coin_records 的容错规则逐行转换
+                records = coin_records(rows)
+                values = {name: [record[name] for record in records] for name, _, _ in COLUMN_SPECS}
+
+        count = len(values['symbol']) if values else 0
+        if count:
+            for name, column in values.items():
+                if name in self._codes:
+                    self.columns[name].extend(self._encode(name, column))
+                elif isinstance(self.columns[name], array):
+                    # array.fromlist 比从迭代器逐个 extend 快
+                    self.columns[name].fromlist(column)
+                else:
+                    self.columns[name].extend(column)
+
+        self.filenames.append(filename)
+        self.record_times.append(record_time)
+        self.stats.append(snapshot.stats)
+        self.offsets.append(self.offsets[-1] + count)
+        return count
+
+    def _encode(self, name, texts):
+        known = self._codes[name]
+        values = self.values[name]
+        # 同一文件里重复的文本很多，先按首次出现的顺序登记新文本，再整列查表
+        for text in dict.fromkeys(texts):
+            if text not in known:
+                known[text] = len(values)
+                values.append(text)
+        return array('i', map(known.__getitem__, texts))
+
+    def extend(self, other):
+        """把另一个 SnapshotColumns（如子进程的解析结果）追加到末尾，字典编码按本对象重新编号"""
+        base = self.offsets[-1]
+        for name, column in other.columns.items():
+            if name in self._codes:
+                remap = self._encode(name, other.values[name])
+                column = array('i', map(remap.__getitem__, column))
+            self.columns[name].extend(column)
+        self.filenames.extend(other.filenames)
+        self.record_times.extend(other.record_times)
+        self.stats.extend(other.stats)
+        self.offsets.extend(offset + base for offset in other.offsets[1:])
+
+    def positions_by_time(self):
+        """文件序号按记录时间排序"""
+        return sorted(range(len(self.filenames)), key=self.record_times.__getitem__)
+
+    def rows(self, pos, fields, prefix=(), suffix=()):
+        """
+        第 pos 个文件的币种逐行产出元组，可直接交给 executemany
+
+        Args:
+            fields: 列名顺序；'order' 表示文件内序号（从 0 开始）
+            prefix/suffix: 每行前后附加的常量（如 stats_id、记录时间）
+        """
+        start, end = self.offsets[pos], self.offsets[pos + 1]
+        iterators = [repeat(value) for value in prefix]
+        for name in fields:
+            if name == 'order':
+                iterators.append(range(end - start))
+            elif name in self.values:
+                iterators.append(map(self.values[name].__getitem__, self.columns[name][start:end]))
+            else:
+                iterators.append(self.columns[name][start:end])
+        iterators.extend(repeat(value) for value in suffix)
+        return zip(*iterators)
+
+    def to_numpy(self):
+        """数值列和字典编码列转成 NumPy 结构化数组，file 列为文件序号（需要 numpy）"""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError('numpy 未安装')
+        dtype = [('file', 'i4')]
+        for name, _, kind in COLUMN_SPECS:
+            if kind in _CONVERTERS:
+                dtype.append((name, 'i8' if kind == 'q' else 'f8'))
+            elif kind == 'dict':
+                dtype.append((name, 'i4'))
+        table = np.empty(self.total_coins, dtype=dtype)
+        table['file'] = np.repeat(np.arange(len(self.filenames)), np.diff(self.offsets))
+        for name, _ in dtype[1:]:
+            table[name] = self.columns[name]
+        return table
+
+
+def parse_snapshots_columnar(items):
+    """
+    批量解析快照为列式数据
+
+    Args:
+        items: [(filename, record_time, 快照文本或 Snapshot), ...]
+
+    Returns:
+        SnapshotColumns
+    """
+    columns = SnapshotColumns()
+    for filename, record_time, content in items:
+        columns.add(filename, record_time, content)
+    return columns
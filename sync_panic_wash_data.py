@@ -6,7 +6,7 @@
 """
 
 import asyncio
-import sqlite3
+from db_connection import get_connection
 from datetime import datetime
 import pytz
 from panic_wash_reader import get_panic_wash_data
@@ -18,7 +18,7 @@ def save_to_database(data):
         return False
     
     try:
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
         # 解析恐慌指标和颜色
@@ -79,7 +79,7 @@ async def sync_panic_wash_data():
         save_to_database(data)
         
         # 3. 显示数据库统计
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM panic_wash_history")
         count = cursor.fetchone()[0]
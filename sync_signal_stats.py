@@ -2,9 +2,12 @@
 """
 同步做多做空信号统计数据
 从外部API获取数据并保存到本地数据库
+
+home_data_api_v2 的后台更新和 ingestion_daemon 都调用这里的 sync_signal_stats()，
+本模块不依赖 Flask，导入时不创建比价系统等服务对象
 """
 import requests
-import sqlite3
+from db_connection import get_connection
 from datetime import datetime, timezone, timedelta
 import time
 
@@ -14,8 +17,8 @@ BEIJING_TZ = timezone(timedelta(hours=8))
 # 外部信号API地址
 EXTERNAL_API = "https://8080-ieo4kftymfy546kbm6o33-2e77fc33.sandbox.novita.ai/api/filtered-signals/stats"
 
-def fetch_signal_stats():
-    """从外部API获取信号统计"""
+def fetch_signal_stats(session=None):
+    """从外部API获取信号统计（session: 可复用的 requests.Session）"""
     try:
         params = {
             'limit': 200,
@@ -23,7 +26,7 @@ def fetch_signal_stats():
             'rsi_long_threshold': 30
         }
         
-        response = requests.get(EXTERNAL_API, params=params, timeout=10)
+        response = (session or requests).get(EXTERNAL_API, params=params, timeout=10)
         data = response.json()
         
         if data.get('success'):
@@ -39,7 +42,7 @@ def fetch_signal_stats():
 def save_to_database(data):
     """保存数据到本地数据库"""
     try:
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
         # 提取数据
@@ -104,6 +107,20 @@ def save_to_database(data):
         traceback.print_exc()
         return False
 
+def sync_signal_stats(session=None):
+    """获取一次信号统计并保存，返回是否新插入了记录"""
+    print("\n" + "="*60)
+    print("同步信号统计数据...")
+    print("="*60)
+    
+    data = fetch_signal_stats(session)
+    if not data:
+        return False
+    
+    success = save_to_database(data)
+    print("="*60 + "\n")
+    return success
+
 def main():
     """主函数"""
     print("=" * 70)
@@ -126,7 +143,7 @@ def main():
     
     if success:
         # 显示数据库统计
-        conn = sqlite3.connect('crypto_data.db')
+        conn = get_connection('crypto_data.db')
         cursor = conn.cursor()
         
         cursor.execute('SELECT COUNT(*) FROM signal_stats_history')
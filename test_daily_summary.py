@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+daily_summary 触发器：插入、INSERT OR REPLACE、删除之后与按来源表重新统计的结果一致
+
+运行: python -m pytest -q test_daily_summary.py
+"""
+
+import random
+
+import pytest
+
+import db_schema
+from db_connection import open_connection
+
+
+@pytest.fixture
+def conn(tmp_path):
+    path = str(tmp_path / 'crypto_data.db')
+    db_schema.migrate(path, legacy_dir=str(tmp_path), verbose=False)
+    # open_connection 打开 recursive_triggers，REPLACE 删除旧行时也触发删除触发器
+    conn = open_connection(path)
+    yield conn
+    conn.close()
+
+
+def _insert_signal(conn, record_time, verb='INSERT'):
+    conn.execute(f'''
+        {verb} INTO signal_data (short_count, short_change, long_count, long_change, record_time, folder_date)
+        VALUES (1, 0, 1, 0, ?, ?)
+    ''', (record_time, record_time[:10]))
+
+
+def _summary(conn):
+    return [tuple(row) for row in conn.execute(
+        "SELECT date, record_count, first_time, last_time FROM daily_summary WHERE kind = 'signal' ORDER BY date"
+    )]
+
+
+def _rebuilt(conn):
+    """同一个库上按来源表重新统计（在事务里算完回滚，不影响触发器维护的结果）"""
+    conn.execute('SAVEPOINT rebuild')
+    db_schema.rebuild_daily_summary(conn.cursor(), ['signal'])
+    result = _summary(conn)
+    conn.execute('ROLLBACK TO rebuild')
+    conn.execute('RELEASE rebuild')
+    return result
+
+
+def test_insert_and_replace(conn):
+    times = [f'2025-12-0{day} {hour:02d}:{minute:02d}:00'
+             for day in (5, 6) for hour in (0, 9, 23) for minute in (0, 30)]
+    random.Random(1).shuffle(times)
+    for record_time in times:
+        _insert_signal(conn, record_time)
+    # 同一时间重复写入：OR REPLACE 先删后插，计数不变
+    _insert_signal(conn, times[0], 'INSERT OR REPLACE')
+    _insert_signal(conn, times[1], 'INSERT OR IGNORE')
+    conn.commit()
+
+    assert _summary(conn) == [
+        ('2025-12-05', 6, '2025-12-05 00:00:00', '2025-12-05 23:30:00'),
+        ('2025-12-06', 6, '2025-12-06 00:00:00', '2025-12-06 23:30:00'),
+    ]
+    assert _summary(conn) == _rebuilt(conn)
+
+
+def test_delete_first_last_and_whole_day(conn):
+    for record_time in ('2025-12-05 08:00:00', '2025-12-05 12:00:00', '2025-12-05 20:00:00',
+                        '2025-12-06 10:00:00'):
+        _insert_signal(conn, record_time)
+    conn.execute("DELETE FROM signal_data WHERE record_time IN ('2025-12-05 08:00:00', '2025-12-05 20:00:00')")
+    conn.execute("DELETE FROM signal_data WHERE record_time = '2025-12-06 10:00:00'")
+    conn.commit()
+
+    assert _summary(conn) == [('2025-12-05', 1, '2025-12-05 12:00:00', '2025-12-05 12:00:00')]
+    assert _summary(conn) == _rebuilt(conn)
+
+
+def test_get_daily_summary(conn):
+    for record_time in ('2025-12-04 01:00:00', '2025-12-05 02:00:00', '2025-12-05 03:00:00'):
+        _insert_signal(conn, record_time)
+    conn.commit()
+
+    assert db_schema.get_daily_summary(conn.cursor(), 'signal', since='2025-12-05') == [
+        {'date': '2025-12-05', 'count': 2, 'min_time': '2025-12-05 02:00:00', 'max_time': '2025-12-05 03:00:00'}
+    ]
+    assert [row['date'] for row in db_schema.get_daily_summary(conn.cursor(), 'signal')] == \
+        ['2025-12-05', '2025-12-04']
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+db_connection 共享连接：复用、嵌套、游标占用、close 之后的行为、事务归还时回滚
+
+运行: python -m pytest -q test_db_connection.py
+"""
+
+import gc
+import sqlite3
+import threading
+
+import pytest
+
+from db_connection import close_thread_connections, get_connection
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'shared.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)')
+    conn.commit()
+    conn.close()
+    yield path
+    close_thread_connections()
+
+
+def _count(db_path):
+    conn = get_connection(db_path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM t').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_reused_after_close(db_path):
+    first = get_connection(db_path)
+    raw = first._conn
+    first.close()
+
+    second = get_connection(db_path)
+    assert second._conn is raw
+    second.close()
+
+
+def test_nested_connections_are_independent(db_path):
+    outer = get_connection(db_path)
+    inner = get_connection(db_path)
+    assert inner._conn is not outer._conn
+
+    # 内层的事务不影响外层，外层未提交的修改内层也看不到
+    outer.execute("INSERT INTO t (v) VALUES ('outer')")
+    assert inner.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+    inner_raw = inner._conn
+    inner.close()
+    # 嵌套时另开的连接 close() 时真正关闭
+    with pytest.raises(sqlite3.ProgrammingError):
+        inner_raw.execute('SELECT 1')
+
+    outer.commit()
+    raw = outer._conn
+    outer.close()
+    assert _count(db_path) == 1
+
+    again = get_connection(db_path)
+    assert again._conn is raw
+    again.close()
+
+
+def test_cursor_keeps_slot_borrowed(db_path):
+    conn = get_connection(db_path)
+    raw = conn._conn
+    cursor = conn.cursor()
+    del conn
+    gc.collect()
+
+    # 借出对象只剩游标引用着，连接不能被下一个使用者拿走
+    other = get_connection(db_path)
+    assert other._conn is not raw
+    other.close()
+    assert cursor.execute('SELECT COUNT(*) FROM t').fetchone() == (0,)
+
+    del cursor
+    gc.collect()
+    reused = get_connection(db_path)
+    assert reused._conn is raw
+    reused.close()
+
+
+def test_forgotten_close_is_released_on_collect(db_path):
+    conn = get_connection(db_path)
+    raw = conn._conn
+    conn.execute("INSERT INTO t (v) VALUES ('lost')")
+    del conn
+    gc.collect()
+
+    again = get_connection(db_path)
+    assert again._conn is raw
+    assert not again.in_transaction
+    assert again.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+    again.close()
+
+
+def test_operations_after_close_raise(db_path):
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    conn.close()
+    conn.close()  # 重复 close 无效果
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.cursor()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.commit()
+    with pytest.raises(sqlite3.ProgrammingError):
+        cursor.execute('SELECT 1')
+    with pytest.raises(sqlite3.ProgrammingError):
+        with conn:
+            pass
+
+    # 底层共享连接没有被关闭，下一个使用者照常可用
+    assert _count(db_path) == 0
+
+
+def test_uncommitted_work_rolled_back_on_close(db_path):
+    conn = get_connection(db_path)
+    conn.execute("INSERT INTO t (v) VALUES ('pending')")
+    assert conn.in_transaction
+    conn.close()
+
+    again = get_connection(db_path)
+    assert not again.in_transaction
+    again.close()
+    assert _count(db_path) == 0
+
+
+def test_with_commits_or_rolls_back(db_path):
+    conn = get_connection(db_path)
+    with conn:
+        conn.execute("INSERT INTO t (v) VALUES ('kept')")
+    with pytest.raises(RuntimeError):
+        with conn:
+            conn.execute("INSERT INTO t (v) VALUES ('dropped')")
+            raise RuntimeError('boom')
+    # with 不关闭连接
+    assert conn.execute('SELECT v FROM t').fetchall() == [('kept',)]
+    conn.close()
+
+
+def test_row_factory_only_for_this_borrow(db_path):
+    conn = get_connection(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("INSERT INTO t (v) VALUES ('x')")
+    assert conn.execute('SELECT v FROM t').fetchone()['v'] == 'x'
+    conn.commit()
+    conn.close()
+
+    again = get_connection(db_path)
+    assert again.execute('SELECT v FROM t').fetchone() == ('x',)
+    again.close()
+
+
+def test_threads_do_not_share(db_path):
+    main = get_connection(db_path)
+    raw = main._conn
+    main.close()
+
+    seen = []
+
+    def worker():
+        conn = get_connection(db_path)
+        seen.append(conn._conn)
+        conn.close()
+        close_thread_connections()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert seen and seen[0] is not raw
+
+
+def test_memory_database_not_shared():
+    first = get_connection(':memory:')
+    first.execute('CREATE TABLE m (x)')
+    first.close()
+    second = get_connection(':memory:')
+    assert second.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'm'").fetchone()[0] == 0
+    second.close()
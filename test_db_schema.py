@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+db_schema 迁移：旧表合并进规范表后，兼容视图的行数和内容不变，视图上的 INSTEAD OF 触发器可写
+
+运行: python -m pytest -q test_db_schema.py
+"""
+
+import sqlite3
+
+import pytest
+
+import db_schema
+
+# 旧 crypto_database.init_database 建的表（只保留迁移用到的部分）
+LEGACY_DDL = '''
+CREATE TABLE crypto_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    snapshot_time TEXT NOT NULL, snapshot_date TEXT NOT NULL,
+    rush_up INTEGER, rush_down INTEGER, diff INTEGER, count INTEGER, ratio REAL,
+    status TEXT, green_count INTEGER, percentage TEXT, filename TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(snapshot_time)
+);
+CREATE TABLE crypto_coin_data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    snapshot_id INTEGER NOT NULL, snapshot_time TEXT NOT NULL, symbol TEXT NOT NULL,
+    index_order INTEGER DEFAULT 0, change REAL, rush_up INTEGER, rush_down INTEGER,
+    update_time TEXT, high_price REAL, high_time TEXT, decline REAL, change_24h REAL,
+    rank INTEGER, current_price REAL, ratio1 TEXT, ratio2 TEXT, priority_level TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(snapshot_time, symbol)
+);
+CREATE TABLE signal_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    snapshot_time TEXT NOT NULL, snapshot_date TEXT NOT NULL,
+    short_value INTEGER, short_change INTEGER, long_value INTEGER, long_change INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(snapshot_time)
+);
+CREATE TABLE panic_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    snapshot_time TEXT NOT NULL, snapshot_date TEXT NOT NULL,
+    panic_indicator TEXT, trend_rating TEXT, market_zone TEXT,
+    liquidation_24h_count TEXT, liquidation_24h_amount TEXT, total_position TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(snapshot_time)
+);
+'''
+
+SNAPSHOTS = [
+    ('2025-12-06 12:00:00', '2025-12-06', 3, 20, -17, 5, 0.15, '震荡偏空', 10, '34%', '2025-12-06_1200.txt',
+     '2025-12-06 12:00:30'),
+    ('2025-12-06 12:10:00', '2025-12-06', 1, 22, -21, 9, 0.05, '震荡偏空', 12, '41%', '2025-12-06_1210.txt',
+     '2025-12-06 12:10:30'),
+]
+
+COINS = [
+    ('BTC', 0, -0.02, 0, 0, '2025-12-06 12:10:53', 126259.48, '2025-10-07', -28.99, -2.86, 7, 89305.97,
+     '71.23%', '109.77%', '-'),
+    ('ETH', 1, 0.15, 1, 0, '2025-12-06 12:10:53', 4953.73, '2025-08-24', -39.02, -3.1, 3, 3020.5,
+     '61.00%', '120.01%', '高'),
+]
+
+SIGNALS = [
+    ('2025-12-06 12:00:00', '2025-12-06', 120, 3, 40, -1, '2025-12-06 12:00:05'),
+    ('2025-12-06 12:03:00', '2025-12-06', 118, -2, 42, 2, '2025-12-06 12:03:05'),
+]
+
+PANICS = [
+    ('2025-12-06 12:00:00', '2025-12-06', '10.68-绿', '3', '多头主升区间', '15000', '3.2', '98.5',
+     '2025-12-06 12:00:05'),
+    ('2025-12-06 12:10:00', '2025-12-06', '11.02-红', '2', '空头区间', '16000', '3.4', '97.1',
+     '2025-12-06 12:10:05'),
+]
+
+SNAPSHOT_COLUMNS = ('snapshot_time, snapshot_date, rush_up, rush_down, diff, count, ratio, status, '
+                    'green_count, percentage, filename, created_at')
+COIN_COLUMNS = ('snapshot_id, snapshot_time, symbol, index_order, change, rush_up, rush_down, update_time, '
+                'high_price, high_time, decline, change_24h, rank, current_price, ratio1, ratio2, '
+                'priority_level')
+SIGNAL_COLUMNS = 'snapshot_time, snapshot_date, short_value, short_change, long_value, long_change, created_at'
+PANIC_COLUMNS = ('snapshot_time, snapshot_date, panic_indicator, trend_rating, market_zone, '
+                 'liquidation_24h_count, liquidation_24h_amount, total_position, created_at')
+
+
+def _rows(conn, table, columns):
+    return conn.execute(f'SELECT {columns} FROM {table} ORDER BY {columns}').fetchall()
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """旧表结构的库，迁移前各表内容一并返回"""
+    path = str(tmp_path / 'crypto_data.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_DDL)
+    for snapshot in SNAPSHOTS:
+        cursor = conn.execute(f'INSERT INTO crypto_snapshots ({SNAPSHOT_COLUMNS}) VALUES '
+                              f'({", ".join("?" * 12)})', snapshot)
+        for coin in COINS:
+            symbol, order, *values, priority = coin
+            conn.execute(f'INSERT INTO crypto_coin_data ({COIN_COLUMNS}) VALUES ({", ".join("?" * 17)})',
+                         (cursor.lastrowid, snapshot[0], symbol, order, *values, priority))
+    conn.executemany(f'INSERT INTO signal_history ({SIGNAL_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)', SIGNALS)
+    conn.executemany(f'INSERT INTO panic_history ({PANIC_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', PANICS)
+    conn.commit()
+
+    before = {
+        'crypto_snapshots': _rows(conn, 'crypto_snapshots', SNAPSHOT_COLUMNS.replace('snapshot_date, ', '')),
+        'crypto_coin_data': _rows(conn, 'crypto_coin_data', COIN_COLUMNS.replace('snapshot_id, ', '')),
+        'signal_history': _rows(conn, 'signal_history', SIGNAL_COLUMNS),
+        'panic_history': _rows(conn, 'panic_history', PANIC_COLUMNS),
+    }
+    conn.close()
+
+    # 合并来源目录里没有 homepage_data.db / signal_data.db
+    legacy_dir = tmp_path / 'legacy'
+    legacy_dir.mkdir()
+    return path, str(legacy_dir), before
+
+
+@pytest.fixture
+def migrated_db(legacy_db):
+    path, legacy_dir, before = legacy_db
+    applied = db_schema.migrate(path, legacy_dir=legacy_dir, verbose=False)
+    assert applied == [version for version, _, _ in db_schema.MIGRATIONS]
+    conn = sqlite3.connect(path)
+    yield path, legacy_dir, before, conn
+    conn.close()
+
+
+def test_views_keep_legacy_rows(migrated_db):
+    path, _, before, conn = migrated_db
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'crypto_snapshots'").fetchone() == ('view',)
+
+    assert _rows(conn, 'crypto_snapshots', SNAPSHOT_COLUMNS.replace('snapshot_date, ', '')) == \
+        before['crypto_snapshots']
+    assert _rows(conn, 'crypto_coin_data', COIN_COLUMNS.replace('snapshot_id, ', '')) == \
+        before['crypto_coin_data']
+    assert _rows(conn, 'signal_history', SIGNAL_COLUMNS) == before['signal_history']
+    assert _rows(conn, 'panic_history', PANIC_COLUMNS) == before['panic_history']
+
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('stats_history', 'coin_history', 'signal_data', 'panic_wash_history')}
+    assert counts == {'stats_history': len(SNAPSHOTS), 'coin_history': len(SNAPSHOTS) * len(COINS),
+                      'signal_data': len(SIGNALS), 'panic_wash_history': len(PANICS)}
+
+
+def test_migrate_is_idempotent(migrated_db):
+    path, legacy_dir, before, conn = migrated_db
+    assert db_schema.migrate(path, legacy_dir=legacy_dir, verbose=False) == []
+    assert conn.execute('SELECT COUNT(*) FROM stats_history').fetchone()[0] == len(SNAPSHOTS)
+
+
+def test_signal_view_insert_trigger(migrated_db):
+    _, _, _, conn = migrated_db
+    row = ('2025-12-06 12:06:00', '2025-12-06', 115, -3, 45, 3, '2025-12-06 12:06:05')
+    conn.execute(f'INSERT INTO signal_history ({SIGNAL_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)', row)
+    # 重复时间按外层 OR IGNORE 处理
+    conn.execute(f'INSERT OR IGNORE INTO signal_history ({SIGNAL_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)', row)
+    conn.commit()
+
+    assert conn.execute('SELECT short_count, short_change, long_count, long_change, folder_date '
+                        'FROM signal_data WHERE record_time = ?', (row[0],)).fetchall() == \
+        [(115, -3, 45, 3, '2025-12-06')]
+    assert conn.execute(f'SELECT {SIGNAL_COLUMNS} FROM signal_history WHERE snapshot_time = ?',
+                        (row[0],)).fetchall() == [row]
+
+
+def test_panic_view_insert_trigger_splits_indicator(migrated_db):
+    _, _, _, conn = migrated_db
+    conn.execute(f'INSERT INTO panic_history ({PANIC_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                 ('2025-12-06 12:20:00', '2025-12-06', '9.5-红', '4', '空头区间', '17000', '3.5', '96.0',
+                  '2025-12-06 12:20:05'))
+    conn.commit()
+
+    assert conn.execute('SELECT panic_indicator, panic_color, trend_rating FROM panic_wash_history '
+                        "WHERE record_time = '2025-12-06 12:20:00'").fetchone() == (9.5, '红', 4)
+    assert conn.execute("SELECT panic_indicator FROM panic_history "
+                        "WHERE snapshot_time = '2025-12-06 12:20:00'").fetchone() == ('9.5-红',)
+
+
+def test_insert_snapshot_record_replace(migrated_db):
+    _, _, _, conn = migrated_db
+    stats = {'rushUp': 4, 'rushDown': 18, 'status': '震荡', 'ratio': '0.22', 'greenCount': 15,
+             'percentage': '50%', 'diff': '-14', 'count': 6}
+    coins = [{'symbol': 'BTC', 'currentPrice': 90000.0}]
+    record_time = SNAPSHOTS[1][0]
+    cursor = conn.cursor()
+
+    assert db_schema.insert_snapshot_record(cursor, stats, coins, record_time) is None
+    stats_id = db_schema.insert_snapshot_record(cursor, stats, coins, record_time, replace=True)
+    conn.commit()
+
+    assert conn.execute('SELECT id, rush_up FROM stats_history WHERE record_time = ?',
+                        (record_time,)).fetchall() == [(stats_id, 4)]
+    assert conn.execute('SELECT symbol, current_price, priority_level FROM coin_history WHERE record_time = ?',
+                        (record_time,)).fetchall() == [('BTC', 90000.0, '-')]
+    assert conn.execute('SELECT COUNT(*) FROM stats_history').fetchone()[0] == len(SNAPSHOTS)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+price_replay 的重放结果与逐批调用 compare_all 的结果一致
+
+同一份 coin_history：先按快照顺序逐批 compare_all，记下比价三张表；
+再用 price_replay.replay 从同一初始基准重放，三张表应完全相同（逐条扫描和 numpy 两种实现都测）
+
+运行: python -m pytest -q test_price_replay.py
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import db_schema
+import price_replay
+from db_connection import open_connection
+from price_comparison_system import PriceComparisonSystem
+
+SEEDS = [
+    {'symbol': 'BTC', 'highest_price': 100.0, 'highest_count': 12, 'lowest_price': 80.0, 'lowest_count': 3},
+    {'symbol': 'ETH', 'highest_price': 10.0, 'highest_count': 0, 'lowest_price': 8.0, 'lowest_count': 5},
+    # 没有任何历史价格的币种
+    {'symbol': 'DOGE', 'highest_price': 0.5, 'highest_count': 1, 'lowest_price': 0.1, 'lowest_count': 1},
+]
+
+
+def _snapshots(count=80, seed=11):
+    """跨越三天的快照；价格从少量取值里抽，故意出现与最高/最低价相等的情况"""
+    rng = random.Random(seed)
+    start = datetime(2025, 12, 3, 20, 0)
+    levels = {
+        'BTC': [78.0, 79.5, 80.0, 85.0, 100.0, 101.0, 103.5, 77.0],
+        'ETH': [7.5, 8.0, 9.0, 10.0, 10.5, 11.0, 7.0],
+    }
+    snapshots = []
+    for i in range(count):
+        record_time = (start + timedelta(minutes=50 * i)).strftime('%Y-%m-%d %H:%M:%S')
+        coins = []
+        for symbol, prices in levels.items():
+            # 偶尔缺价格，或 update_time 与 record_time 不同
+            price = None if rng.random() < 0.1 else rng.choice(prices)
+            update_time = (datetime.strptime(record_time, '%Y-%m-%d %H:%M:%S')
+                           - timedelta(seconds=rng.randint(0, 90))).strftime('%Y-%m-%d %H:%M:%S')
+            coins.append({'symbol': symbol, 'current_price': price, 'update_time': update_time})
+        snapshots.append((record_time, coins))
+    return snapshots
+
+
+def _tables(db_path):
+    conn = open_connection(db_path)
+    try:
+        return {
+            'price_baseline': conn.execute('''
+                SELECT symbol, highest_price, highest_count, lowest_price, lowest_count,
+                       last_price, highest_ratio, lowest_ratio, last_update_time
+                FROM price_baseline ORDER BY symbol
+            ''').fetchall(),
+            'daily_price_records': conn.execute('''
+                SELECT symbol, record_date, record_type, old_price, new_price, record_time
+                FROM daily_price_records ORDER BY symbol, record_time, record_type
+            ''').fetchall(),
+            'daily_statistics': conn.execute('''
+                SELECT symbol, record_date, new_high_count, new_low_count
+                FROM daily_statistics WHERE new_high_count + new_low_count > 0
+                ORDER BY symbol, record_date
+            ''').fetchall(),
+        }
+    finally:
+        conn.close()
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def numpy_mode(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(price_replay, 'NUMPY_AVAILABLE', True)
+    else:
+        monkeypatch.setattr(price_replay, 'NUMPY_AVAILABLE', False)
+    return request.param
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'crypto_data.db')
+    db_schema.migrate(path, legacy_dir=str(tmp_path), verbose=False)
+    return path
+
+
+def test_replay_matches_live_compare_all(db_path, numpy_mode):
+    snapshots = _snapshots()
+    conn = open_connection(db_path)
+    for record_time, coins in snapshots:
+        db_schema.insert_sample(conn.cursor(), record_time, {}, coins)
+    conn.commit()
+    conn.close()
+
+    system = PriceComparisonSystem(db_path)
+    system.import_baseline_data(SEEDS)
+    for record_time, coins in snapshots:
+        system.compare_all([
+            {'symbol': c['symbol'], 'currentPrice': c['current_price'], 'updateTime': c['update_time']}
+            for c in coins if c['current_price'] is not None
+        ])
+    live = _tables(db_path)
+    assert live['daily_price_records'], '测试序列应包含创新高低'
+
+    result = price_replay.replay(db_path, seeds=SEEDS)
+    replayed = _tables(db_path)
+
+    # 没有历史价格的币种按导入方式写基准，last_update_time 不同（导入时间 vs NULL）
+    live['price_baseline'] = [row for row in live['price_baseline'] if row[0] != 'DOGE']
+    doge = [row for row in replayed['price_baseline'] if row[0] == 'DOGE']
+    replayed['price_baseline'] = [row for row in replayed['price_baseline'] if row[0] != 'DOGE']
+    assert doge == [('DOGE', 0.5, 1, 0.1, 1, 0.5, 100, 500.0, None)]
+
+    assert replayed == live
+    assert result['records'] == len(live['daily_price_records'])
+
+
+def test_since_keeps_earlier_rows(db_path, numpy_mode):
+    snapshots = _snapshots(count=60, seed=3)
+    conn = open_connection(db_path)
+    for record_time, coins in snapshots:
+        db_schema.insert_sample(conn.cursor(), record_time, {}, coins)
+    conn.commit()
+    conn.close()
+
+    price_replay.replay(db_path, seeds=SEEDS)
+    full = _tables(db_path)
+
+    # 改掉 since 之前的一条记录：--since 不应碰它，之后的记录应被重写回来
+    conn = open_connection(db_path)
+    conn.execute("UPDATE daily_statistics SET new_high_count = new_high_count + 100 WHERE record_date < '2025-12-04'")
+    conn.execute("DELETE FROM daily_price_records WHERE record_date >= '2025-12-04'")
+    conn.commit()
+    conn.close()
+
+    price_replay.replay(db_path, since='2025-12-04 00:00:00', seeds=SEEDS)
+    partial = _tables(db_path)
+
+    assert partial['price_baseline'] == full['price_baseline']
+    assert partial['daily_price_records'] == full['daily_price_records']
+    before = [(s, d, h + 100, l) for s, d, h, l in full['daily_statistics'] if d < '2025-12-04']
+    after = [row for row in full['daily_statistics'] if row[1] >= '2025-12-04']
+    assert before and after
+    assert partial['daily_statistics'] == sorted(before + after)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RollingExtremes 单调队列与暴力扫描窗口 (now - seconds, now] 的结果一致
+
+运行: python -m pytest -q test_rolling_extremes.py
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import db_schema
+from db_connection import open_connection
+from price_comparison_system import PriceComparisonSystem, RollingExtremes
+
+START = datetime(2025, 12, 3, 20, 0)
+
+
+def _brute_force(points, now_ts, seconds):
+    """窗口内的最高/最低价；价格相同时取最新的一条（与单调队列的弹出规则一致）"""
+    window = [p for p in points if now_ts - seconds < p[0] <= now_ts]
+    if not window:
+        return None
+    high = max(window, key=lambda p: (p[1], p[0]))
+    low = min(window, key=lambda p: (p[1], -p[0]))
+    return high[1], high[2], low[1], low[2]
+
+
+def _points(count, seed):
+    """间隔不规则、价格取值有限（经常相等）的 (ts, price, time_str) 序列，偶尔同一时间多条"""
+    rng = random.Random(seed)
+    points = []
+    moment = START
+    for _ in range(count):
+        moment += timedelta(seconds=rng.choice([0, 30, 60, 300, 900, 3600, 4 * 3600]))
+        time_str = moment.strftime('%Y-%m-%d %H:%M:%S')
+        points.append((moment.timestamp(), float(rng.randint(90, 110)), time_str))
+    return points
+
+
+@pytest.mark.parametrize('seconds', [60, 900, 3600, 86400])
+@pytest.mark.parametrize('seed', range(5))
+def test_push_matches_brute_force(seconds, seed):
+    points = _points(400, seed)
+    window = RollingExtremes(seconds)
+    for i, (ts, price, time_str) in enumerate(points):
+        window.push(ts, price, time_str)
+        assert window.extremes() == _brute_force(points[:i + 1], ts, seconds)
+
+
+def test_expire_without_new_prices():
+    points = _points(50, seed=9)
+    window = RollingExtremes(3600)
+    for point in points:
+        window.push(*point)
+
+    last_ts = points[-1][0]
+    for later in (0, 1, 1800, 3599, 3600, 7200):
+        window.expire(last_ts + later)
+        assert window.extremes() == _brute_force(points, last_ts + later, 3600)
+    assert window.extremes() is None
+
+
+def _insert(db_path, snapshots):
+    conn = open_connection(db_path)
+    for record_time, prices in snapshots:
+        db_schema.insert_sample(conn.cursor(), record_time, {}, [
+            {'symbol': symbol, 'current_price': price} for symbol, price in prices.items()
+        ])
+    conn.commit()
+    conn.close()
+
+
+def test_system_windows_match_brute_force(tmp_path):
+    db_path = str(tmp_path / 'crypto_data.db')
+    db_schema.migrate(db_path, legacy_dir=str(tmp_path), verbose=False)
+    rng = random.Random(5)
+    snapshots = []
+    for i in range(300):
+        record_time = (START + timedelta(minutes=17 * i)).strftime('%Y-%m-%d %H:%M:%S')
+        prices = {'BTC': float(rng.randint(90, 110))}
+        if rng.random() < 0.8:
+            prices['ETH'] = float(rng.randint(9, 11))
+        snapshots.append((record_time, prices))
+
+    windows = {'1h': 3600, '24h': 86400, '3d': 3 * 86400}
+    system = PriceComparisonSystem(db_path, rolling_windows=windows)
+
+    # 先载入前一部分，再增量追上后一部分
+    for part in (snapshots[:200], snapshots[200:]):
+        _insert(db_path, part)
+        report = system.get_rolling_extremes()
+        as_of = part[-1][0]
+        now_ts = datetime.fromisoformat(as_of).timestamp()
+        assert report['as_of'] == as_of
+
+        for item in report['data']:
+            symbol = item['symbol']
+            points = [(datetime.fromisoformat(t).timestamp(), p[symbol], t)
+                      for t, p in snapshots if symbol in p and t <= as_of]
+            assert (item['price'], item['update_time']) == points[-1][1:]
+            for name, seconds in windows.items():
+                expected = _brute_force(points, now_ts, seconds)
+                got = item['windows'][name]
+                if expected is None:
+                    assert got is None
+                else:
+                    assert (got['high'], got['high_time'], got['low'], got['low_time']) == expected
+        assert {item['symbol'] for item in report['data']} == {'BTC', 'ETH'}
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+stats_rollup / coin_rollup 触发器：乱序写入后与逐行暴力计算、rebuild_rollups 的结果一致
+
+运行: python -m pytest -q test_rollups.py
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import db_schema
+from db_connection import open_connection
+
+SYMBOLS = ('BTC', 'ETH', 'SOL')
+STATS_METRICS = tuple(db_schema.ROLLUPS['stats_rollup']['metrics'])
+
+
+@pytest.fixture
+def conn(tmp_path):
+    path = str(tmp_path / 'crypto_data.db')
+    db_schema.migrate(path, legacy_dir=str(tmp_path), verbose=False)
+    conn = open_connection(path)
+    yield conn
+    conn.close()
+
+
+def _samples(count=60, seed=7):
+    """跨越两天、间隔不规则的快照；ratio 偶尔是非数字文本，coin 偶尔缺价格"""
+    rng = random.Random(seed)
+    start = datetime(2025, 12, 5, 22, 3)
+    samples = []
+    for i in range(count):
+        record_time = (start + timedelta(minutes=7 * i + rng.randint(0, 5))).strftime('%Y-%m-%d %H:%M:%S')
+        stats = {
+            'rush_up': rng.randint(0, 30),
+            'rush_down': rng.randint(0, 30),
+            'ratio': rng.choice(['数据不足', f'{rng.uniform(0, 5):.2f}', f'{rng.uniform(0, 5):.2f} ★']),
+            'green_count': rng.randint(0, 29),
+            'count_times': rng.choice([None, rng.randint(0, 12)]),
+        }
+        coins = [{'symbol': symbol, 'current_price': rng.choice([None, round(rng.uniform(1, 100), 2)])}
+                 for symbol in SYMBOLS]
+        samples.append((record_time, stats, coins))
+    rng.shuffle(samples)
+    return samples
+
+
+def _bucket(resolution, record_time):
+    t = datetime.strptime(record_time, '%Y-%m-%d %H:%M:%S')
+    if resolution == '15m':
+        t = t.replace(minute=t.minute // 15 * 15, second=0)
+    elif resolution == '1h':
+        t = t.replace(minute=0, second=0)
+    else:
+        t = t.replace(hour=0, minute=0, second=0)
+    return t.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _ratio_value(text):
+    """与 ROLLUPS 中 ratio 表达式相同：含数字的按 CAST 取前缀数值，否则为空"""
+    if not any(ch.isdigit() for ch in text):
+        return None
+    prefix = ''
+    for ch in text:
+        if ch.isdigit() or ch in '.-+':
+            prefix += ch
+        else:
+            break
+    return float(prefix) if prefix else 0.0
+
+
+def _aggregate(points):
+    """[(时间, 值)] -> first/last/min/max/sum/n（值为 None 的只计入样本数）"""
+    points = sorted(points, key=lambda p: p[0])
+    values = [v for _, v in points if v is not None]
+    return {
+        'first': points[0][1], 'last': points[-1][1],
+        'min': min(values) if values else None, 'max': max(values) if values else None,
+        'sum': sum(values) if values else None, 'n': len(values),
+    }
+
+
+def _brute_stats(samples):
+    result = {}
+    for resolution in db_schema.ROLLUP_RESOLUTIONS:
+        groups = {}
+        for record_time, stats, _ in samples:
+            groups.setdefault(_bucket(resolution, record_time), []).append((record_time, stats))
+        for bucket, rows in groups.items():
+            times = [t for t, _ in rows]
+            row = {'sample_count': len(rows), 'first_time': min(times), 'last_time': max(times)}
+            for metric in STATS_METRICS:
+                points = [(t, _ratio_value(s['ratio']) if metric == 'ratio' else s[metric]) for t, s in rows]
+                for agg, value in _aggregate(points).items():
+                    row[f'{metric}_{agg}'] = value
+            result[(resolution, bucket)] = row
+    return result
+
+
+def _brute_coins(samples):
+    result = {}
+    for resolution in db_schema.ROLLUP_RESOLUTIONS:
+        groups = {}
+        for record_time, _, coins in samples:
+            for coin in coins:
+                key = (resolution, _bucket(resolution, record_time), coin['symbol'])
+                groups.setdefault(key, []).append((record_time, coin['current_price']))
+        for key, points in groups.items():
+            times = [t for t, _ in points]
+            row = {'sample_count': len(points), 'first_time': min(times), 'last_time': max(times)}
+            for agg, value in _aggregate(points).items():
+                row[f'price_{agg}'] = value
+            result[key] = row
+    return result
+
+
+def _table(conn, name, keys):
+    cursor = conn.execute(f'SELECT * FROM {name}')
+    columns = [d[0] for d in cursor.description]
+    result = {}
+    for values in cursor.fetchall():
+        row = dict(zip(columns, values))
+        result[tuple(row.pop(key) for key in keys)] = row
+    return result
+
+
+def _assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, row in expected.items():
+        for column, value in row.items():
+            assert actual[key][column] == pytest.approx(value), (key, column)
+
+
+def _write(conn, samples):
+    cursor = conn.cursor()
+    for record_time, stats, coins in samples:
+        db_schema.insert_sample(cursor, record_time, stats, coins)
+    conn.commit()
+
+
+def test_triggers_match_brute_force(conn):
+    samples = _samples()
+    _write(conn, samples)
+
+    _assert_same(_table(conn, 'stats_rollup', ('resolution', 'bucket')), _brute_stats(samples))
+    _assert_same(_table(conn, 'coin_rollup', ('resolution', 'bucket', 'symbol')), _brute_coins(samples))
+
+
+def test_rebuild_matches_triggers(conn):
+    _write(conn, _samples())
+    by_trigger = (_table(conn, 'stats_rollup', ('resolution', 'bucket')),
+                  _table(conn, 'coin_rollup', ('resolution', 'bucket', 'symbol')))
+
+    db_schema.rebuild_rollups(conn.cursor())
+    conn.commit()
+
+    _assert_same(_table(conn, 'stats_rollup', ('resolution', 'bucket')), by_trigger[0])
+    _assert_same(_table(conn, 'coin_rollup', ('resolution', 'bucket', 'symbol')), by_trigger[1])
+
+
+def test_replaced_sample_is_not_counted_twice(conn):
+    samples = _samples(count=10)
+    _write(conn, samples)
+    record_time, stats, coins = samples[0]
+    corrected = dict(stats, rush_up=999)
+    db_schema.insert_sample(conn.cursor(), record_time, corrected, coins, replace=True)
+    conn.commit()
+
+    expected = [(t, corrected if t == record_time else s, c) for t, s, c in samples]
+    _assert_same(_table(conn, 'stats_rollup', ('resolution', 'bucket')), _brute_stats(expected))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式解析（SnapshotColumns）与逐文件解析（parse_snapshot）结果一致
+
+运行: python -m pytest -q test_snapshot_columns.py
+"""
+
+import os
+
+import pytest
+
+from snapshot_parser import parse_snapshot, SnapshotColumns, COLUMN_SPECS
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content_2025-12-06_1210.txt')
+FIELDS = [name for name, _, _ in COLUMN_SPECS]
+
+
+@pytest.fixture(scope='module')
+def sample():
+    with open(SAMPLE_PATH, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _variants(content):
+    """原文件、空值行（走逐行容错）、非法数值行（跳过）、币种顺序打乱（字典编码复用）"""
+    lines = content.split('\n')
+    coin_lines = [i for i, line in enumerate(lines) if line.count('|') >= 15]
+    empty = list(lines)
+    parts = empty[coin_lines[0]].split('|')
+    parts[2] = ''
+    empty[coin_lines[0]] = '|'.join(parts)
+    invalid = list(lines)
+    parts = invalid[coin_lines[1]].split('|')
+    parts[13] = 'abc'
+    invalid[coin_lines[1]] = '|'.join(parts)
+    shuffled = list(lines)
+    for a, b in zip(coin_lines, reversed(coin_lines)):
+        shuffled[a] = lines[b]
+    return [content, '\n'.join(empty), '\n'.join(invalid), '\n'.join(shuffled)]
+
+
+def test_columns_match_parse_snapshot(sample):
+    contents = _variants(sample)
+    columns = SnapshotColumns()
+    for i, content in enumerate(contents):
+        columns.add(f'file{i}.txt', f'2025-12-06 12:{i:02d}:00', content)
+
+    assert len(columns) == len(contents)
+    for pos, content in enumerate(contents):
+        snapshot = parse_snapshot(content)
+        expected = [tuple(coin[name] for name in FIELDS) for coin in snapshot.coins]
+        assert list(columns.rows(pos, FIELDS)) == expected
+        assert columns.coin_count(pos) == len(expected)
+        assert columns.stats[pos] == snapshot.stats
+    # 非法数值行被跳过，与 snapshot.coins 相同
+    assert columns.coin_count(2) == columns.coin_count(0) - 1
+
+
+def test_extend_matches_single_columns(sample):
+    contents = _variants(sample)
+    whole = SnapshotColumns()
+    first, second = SnapshotColumns(), SnapshotColumns()
+    for i, content in enumerate(contents):
+        whole.add(str(i), str(i), content)
+        (first if i < 2 else second).add(str(i), str(i), content)
+    first.extend(second)
+
+    assert first.filenames == whole.filenames
+    assert list(first.offsets) == list(whole.offsets)
+    for pos in range(len(contents)):
+        assert list(first.rows(pos, FIELDS)) == list(whole.rows(pos, FIELDS))
+
+
+def test_add_accepts_parsed_snapshot(sample):
+    from_text, from_snapshot = SnapshotColumns(), SnapshotColumns()
+    from_text.add('a', 'a', sample)
+    from_snapshot.add('a', 'a', parse_snapshot(sample))
+    assert list(from_text.rows(0, FIELDS)) == list(from_snapshot.rows(0, FIELDS))
+
+
+def test_empty_snapshot_adds_no_coins():
+    columns = SnapshotColumns()
+    assert columns.add('empty.txt', '2025-12-06 00:00:00', '') == 0
+    assert columns.coin_count(0) == 0
+    assert list(columns.rows(0, FIELDS)) == []
@@ -1,4 +1,4 @@
-import sqlite3
+from db_connection import get_connection
 import requests
 from datetime import datetime
 import pytz
@@ -10,7 +10,7 @@ print("="*70)
 # 1. 检查数据库
 print("\n1. 数据库最新记录:")
 print("-"*70)
-conn = sqlite3.connect('homepage_data.db')
+conn = get_connection('crypto_data.db')
 cursor = conn.cursor()
 cursor.execute("""
     SELECT id, rise_total, fall_total, rise_fall_ratio, diff_result, record_time
@@ -66,7 +66,7 @@ print("""
           ↓
   [auto_gdrive_collector_v2.py] 每10分钟采集一次
           ↓
-  [homepage_data.db] 数据库存储
+  [crypto_data.db] 数据库存储
           ↓
   [crypto_server_demo.py] Flask API服务
           ↓